@@ -1,14 +1,37 @@
-from typing import Dict
-from core.analysis import AnalysisCore
-from services.reference_generator import ReferenceGenerator
+"""
+Servicios compartidos de la API, construidos en el primer uso.
+Importar este módulo no abre Chroma, ni crea el cliente Groq, ni toca Postgres:
+los routers llaman a los getters dentro de cada endpoint.
+Los trabajos de análisis no se guardan aquí: viven en la cola persistente (services.job_queue).
+"""
+from core.analysis import AnalysisCore, get_analysis_core
 from services.book_enricher import get_book_enricher
 
-# Inicializar Core y servicios (Singleton instances)
-# Se instancian aquí para ser importados por los routers y main.py
-analysis_core = AnalysisCore()
-reference_generator = ReferenceGenerator()
-book_enricher = get_book_enricher()
+_reference_generator = None
 
-# Memoria simple de Jobs (en prod usar Redis/DB)
-# Estructura: job_id -> {status, result, message}
-jobs_db: Dict[str, Dict] = {}
+
+def get_reference_generator():
+    """ReferenceGenerator compartido (se crea en la primera llamada)."""
+    global _reference_generator
+    if _reference_generator is None:
+        from services.reference_generator import ReferenceGenerator
+        _reference_generator = ReferenceGenerator()
+    return _reference_generator
+
+
+# Compatibilidad: `from app.dependencies import analysis_core` sigue funcionando,
+# pero construye el servicio en ese momento; preferir los getters.
+_LAZY_ATTRS = {
+    "analysis_core": get_analysis_core,
+    "reference_generator": get_reference_generator,
+    "book_enricher": get_book_enricher,
+}
+
+
+def __getattr__(name):
+    if name in _LAZY_ATTRS:
+        return _LAZY_ATTRS[name]()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+__all__ = ["AnalysisCore", "get_analysis_core", "get_reference_generator", "get_book_enricher"]
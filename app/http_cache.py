@@ -0,0 +1,126 @@
+"""
+Caché HTTP de la API: validadores ETag / If-None-Match (304) para las respuestas
+JSON y cabeceras inmutables para los estáticos con nombre direccionado por contenido.
+La compresión (gzip) la hace GZipMiddleware en app.main, por fuera de este middleware:
+el ETag se calcula sobre el JSON sin comprimir.
+"""
+import hashlib
+import re
+from email.utils import format_datetime
+from datetime import datetime, timezone
+from typing import Optional
+
+from fastapi.staticfiles import StaticFiles
+
+# Revalidar siempre: el cliente guarda la respuesta pero pregunta con If-None-Match
+REVALIDATE = "no-cache"
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+# Nombres direccionados por contenido: <hex de 16 a 64 caracteres>.<ext> (ver IngestionService.generate_thumbnail)
+CONTENT_ADDRESSED_NAME = re.compile(r"^[0-9a-f]{16,64}\.[A-Za-z0-9]+$")
+
+
+def make_etag(body: bytes) -> str:
+    """ETag débil a partir del cuerpo serializado (el mismo JSON da el mismo ETag)."""
+    return f'W/"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Comparación débil de If-None-Match (RFC 9110): lista de ETags o '*'."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if (candidate[2:] if candidate.startswith("W/") else candidate) == opaque:
+            return True
+    return False
+
+
+def http_date(value: datetime) -> str:
+    """Fecha en formato HTTP (Last-Modified). Las fechas naive se toman como UTC."""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return format_datetime(value.astimezone(timezone.utc), usegmt=True)
+
+
+class ETagMiddleware:
+    """
+    Middleware ASGI: a los GET/HEAD con respuesta 200 JSON les añade ETag y
+    Cache-Control: no-cache, y responde 304 sin cuerpo si coincide If-None-Match.
+    Streaming (SSE) y estáticos pasan sin tocar.
+    """
+
+    def __init__(self, app, exclude_prefixes=("/static",)):
+        self.app = app
+        self.exclude_prefixes = tuple(exclude_prefixes)
+
+    async def __call__(self, scope, receive, send):
+        if (scope["type"] != "http" or scope["method"] not in ("GET", "HEAD")
+                or scope["path"].startswith(self.exclude_prefixes)):
+            await self.app(scope, receive, send)
+            return
+
+        if_none_match = None
+        for name, value in scope["headers"]:
+            if name == b"if-none-match":
+                if_none_match = value.decode("latin-1")
+                break
+
+        start = None
+        chunks = []
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start, passthrough
+            if passthrough:
+                await send(message)
+                return
+            if message["type"] == "http.response.start":
+                headers = dict(message.get("headers", []))
+                content_type = headers.get(b"content-type", b"")
+                if message["status"] != 200 or not content_type.startswith(b"application/json"):
+                    passthrough = True
+                    await send(message)
+                    return
+                start = message
+                return
+            if message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+                if message.get("more_body", False):
+                    return
+                await self._finish(start, b"".join(chunks), if_none_match, send)
+                return
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+    @staticmethod
+    async def _finish(start, body: bytes, if_none_match: Optional[str], send):
+        headers = [(k, v) for k, v in start.get("headers", []) if k != b"etag"]
+        etag = make_etag(body)
+        headers.append((b"etag", etag.encode("latin-1")))
+        if not any(k == b"cache-control" for k, _ in headers):
+            headers.append((b"cache-control", REVALIDATE.encode("latin-1")))
+
+        if etag_matches(if_none_match, etag):
+            # 304: mismas cabeceras de validación, sin cuerpo ni Content-Length
+            headers = [(k, v) for k, v in headers if k not in (b"content-length", b"content-type")]
+            await send({"type": "http.response.start", "status": 304, "headers": headers})
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        await send({**start, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
+
+
+class ImmutableStaticFiles(StaticFiles):
+    """StaticFiles que marca como inmutables los archivos con nombre direccionado por contenido."""
+
+    def file_response(self, full_path, stat_result, scope, status_code=200):
+        response = super().file_response(full_path, stat_result, scope, status_code)
+        if CONTENT_ADDRESSED_NAME.match(str(full_path).rsplit("/", 1)[-1]):
+            response.headers["Cache-Control"] = IMMUTABLE
+        return response
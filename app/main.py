@@ -1,19 +1,24 @@
+from services.startup import startup_report
+
 from fastapi import FastAPI, Request
-from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.responses import JSONResponse
 from pathlib import Path
 from contextlib import asynccontextmanager
 from dotenv import load_dotenv
+import asyncio
 import logging
 import json
+import os
 import traceback
-from datetime import datetime
+from datetime import datetime, timedelta
 
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 
-# Importar Routers
+# Importar Routers (no construyen servicios: ver app.dependencies)
 from app.routers import papers, channels, processing
+from app.http_cache import ETagMiddleware, ImmutableStaticFiles
 
 # Importar Excepciones
 from app.exceptions import (
@@ -50,6 +55,10 @@ logger.addHandler(handler)
 # Scheduler Global
 scheduler = AsyncIOScheduler()
 
+# Primer escaneo de Telegram diferido: no compite con el arranque ni con los
+# reinicios de --reload (0 = no escanear al arrancar, sólo cada 12 horas)
+CHANNEL_SCAN_STARTUP_DELAY = int(os.getenv("CHANNEL_SCAN_STARTUP_DELAY_SECONDS", "300"))
+
 async def scheduled_scan():
     """Tarea programada para escanear canales periódicamente"""
     print("⏰ Ejecutando escaneo programado de Telegram...")
@@ -61,37 +70,45 @@ async def scheduled_scan():
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
-    print("🚀 Iniciando Scheduler...")
-    
-    # Imprimir rutas registradas para debug
-    print("🛣️ Rutas registradas:")
-    for route in app.routes:
-        if hasattr(route, "path"):
-            print(f"  - {route.path}")
-    
-    # Ejecutar escaneo inmediatamente al iniciar
-    import asyncio
-    asyncio.create_task(scheduled_scan())
+    with startup_report.phase("scheduler"):
+        logger.info("🚀 Iniciando Scheduler...")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Rutas registradas: " + ", ".join(
+                route.path for route in app.routes if hasattr(route, "path")))
+        
+        # Programar escaneo cada 12 horas; el primero, diferido tras el arranque
+        scan_trigger = {}
+        if CHANNEL_SCAN_STARTUP_DELAY > 0:
+            scan_trigger["next_run_time"] = datetime.now() + timedelta(seconds=CHANNEL_SCAN_STARTUP_DELAY)
+        scheduler.add_job(scheduled_scan, 'interval', hours=12, **scan_trigger)
+        scheduler.start()
     
-    # Programar escaneo cada 12 horas
-    scheduler.add_job(scheduled_scan, 'interval', hours=12)
-    scheduler.start()
+    startup_report.mark_ready()
+    startup_report.log_summary(logger)
     yield
     # Shutdown
     print("🛑 Deteniendo Scheduler...")
     scheduler.shutdown()
+    from services.database import stats_refresher
+    await asyncio.to_thread(stats_refresher.flush)
+    from services.async_database import close_async_db_service
+    await close_async_db_service()
+    from services.http_clients import get_http_registry
+    await get_http_registry().aclose()
+
+startup_report.checkpoint("imports")
 
 app = FastAPI(title="MedFlix Core API", lifespan=lifespan)
 
 # Configuración Global
-# Mount static files (thumbnails)
+# Mount static files (thumbnails). Los nombres <hash>.png se sirven como inmutables
 counts_dir = Path("data/thumbnails")
 counts_dir.mkdir(parents=True, exist_ok=True)
-app.mount("/static/thumbnails", StaticFiles(directory="data/thumbnails"), name="thumbnails")
+app.mount("/static/thumbnails", ImmutableStaticFiles(directory="data/thumbnails"), name="thumbnails")
 
 # Mount static files (PDFs)
-app.mount("/static/pdfs", StaticFiles(directory="data/uploads"), name="pdfs")
-app.mount("/static/uploads_channels", StaticFiles(directory="data/uploads_channels"), name="pdfs_channels")
+app.mount("/static/pdfs", ImmutableStaticFiles(directory="data/uploads"), name="pdfs")
+app.mount("/static/uploads_channels", ImmutableStaticFiles(directory="data/uploads_channels"), name="pdfs_channels")
 
 # CORS setup
 app.add_middleware(
@@ -100,8 +117,13 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag"],
 )
 
+# Caché HTTP: ETag + 304 en los GET JSON; gzip por fuera (el ETag se calcula sin comprimir)
+app.add_middleware(ETagMiddleware)
+app.add_middleware(GZipMiddleware, minimum_size=1000, compresslevel=6)
+
 
 # --- Exception Handlers ---
 @app.exception_handler(PaperNotFoundError)
@@ -154,6 +176,8 @@ app.include_router(papers.router)
 app.include_router(channels.router)
 app.include_router(processing.router)
 
+startup_report.checkpoint("app_setup")
+
 
 @app.get("/")
 def read_root():
@@ -163,27 +187,19 @@ def read_root():
 @app.get("/health")
 def health_check():
     """Health check mejorado que verifica servicios críticos."""
-    import os
-    from sqlalchemy import create_engine, text
+    from sqlalchemy import text
+    from services.database import get_db_service
     
     status = {
         "status": "ok",
         "version": "1.0.0",
-        "services": {}
+        "services": {},
+        "startup": startup_report.as_dict(),
     }
     
-    # Verificar PostgreSQL
+    # Verificar PostgreSQL (engine compartido: sin crear un pool por cada health check)
     try:
-        user = os.getenv("POSTGRES_USER", "medflix")
-        password = os.getenv("POSTGRES_PASSWORD", "medflix_secret")
-        host = os.getenv("POSTGRES_HOST", "db")
-        port = os.getenv("POSTGRES_PORT", "5432")
-        database = os.getenv("POSTGRES_DB", "medflix_db")
-        
-        db_url = f"postgresql://{user}:{password}@{host}:{port}/{database}"
-        engine = create_engine(db_url)
-        
-        with engine.connect() as conn:
+        with get_db_service().engine.connect() as conn:
             conn.execute(text("SELECT 1"))
         status["services"]["postgresql"] = "ok"
     except Exception as e:
@@ -191,4 +207,3 @@ def health_check():
         status["status"] = "degraded"
     
     return status
-
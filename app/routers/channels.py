@@ -1,7 +1,6 @@
 from fastapi import APIRouter, HTTPException, BackgroundTasks
 from typing import List, Dict, Optional
 from services.database import get_db_service
-from services.telegram_ingestor import ChannelIngestor
 import services.scan_status as scan_status_module
 
 router = APIRouter(
@@ -38,6 +37,8 @@ async def trigger_scan(background_tasks: BackgroundTasks):
     
     async def run_scan():
         try:
+            # Telethon se importa al escanear, no al arrancar la API
+            from services.telegram_ingestor import ChannelIngestor
             ingestor = ChannelIngestor()
             await ingestor.run_all()
         except Exception as e:
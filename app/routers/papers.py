@@ -1,7 +1,18 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from typing import List, Dict, Optional
-from app.dependencies import analysis_core, reference_generator
-from services.database import get_db_service
+from pathlib import Path
+from datetime import datetime
+import json
+from app.dependencies import get_analysis_core, get_reference_generator, get_book_enricher
+from app.http_cache import http_date
+from services.database import as_uuid, get_db_service
+from services.async_database import get_async_db_service
+from services.pagination import InvalidCursorError
+from services.paper_cache import get_paper_cache
+from services.groq_service import stream_metrics
+from core.ingestion import ANALYSIS_TEXT_PAGES
 
 router = APIRouter(
     prefix="/papers",
@@ -10,68 +21,136 @@ router = APIRouter(
 
 # --- Endpoints de Papers ---
 
+async def _paginated_cards(response: Response, listing: str, limit: int, cursor: Optional[str], **filters) -> List[Dict]:
+    """
+    Página de tarjetas por keyset. El cursor de la siguiente página (opaco)
+    va en la cabecera X-Next-Cursor; ausente en la última página.
+    Read-through sobre el cache de papers (services.paper_cache).
+    """
+    cache = get_paper_cache()
+    key = cache.cards_key(listing, limit=limit, cursor=cursor, **filters) if cache else None
+    payload = cache.get_cards(key) if cache else None
+    if payload is None:
+        try:
+            page = await get_async_db_service().get_papers_page(listing, limit, cursor=cursor, cards=True, **filters)
+        except InvalidCursorError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        payload = {"items": [p.to_card_dict() for p in page.items], "next_cursor": page.next_cursor}
+        if cache:
+            cache.set_cards(key, payload)
+    if payload["next_cursor"]:
+        response.headers["X-Next-Cursor"] = payload["next_cursor"]
+    return payload["items"]
+
 @router.get("", response_model=List[Dict])
 async def list_papers(
-    limit: int = 20, 
-    offset: int = 0,
+    response: Response,
+    limit: int = Query(20, ge=1, le=200), 
+    offset: int = Query(0, ge=0),
+    cursor: Optional[str] = None,
     specialty: Optional[str] = None,
     sort: Optional[str] = "recent",
     is_quiz: bool = False,
     categoria: Optional[str] = None,
     include_deleted: bool = False
 ):
-    """Lista papers para el catálogo. Filtra por categoría si se especifica."""
-    db = get_db_service()
-    
+    """
+    Lista papers para el catálogo. Filtra por categoría si se especifica.
+    Paginación: pasar `cursor` (de X-Next-Cursor) para la página siguiente; `offset` sólo sin cursor.
+    """
+    filters = {"offset": offset}
     if categoria:
-        papers = db.get_papers_by_categoria(categoria, limit, include_deleted)
+        listing = "categoria"
+        filters.update(categoria=categoria, include_deleted=include_deleted)
     elif is_quiz:
-        papers = db.get_quiz_papers(limit)
+        listing = "quiz"
     elif specialty and specialty != "Todas":
-        papers = db.get_papers_by_especialidad(specialty, limit)
+        listing = "especialidad"
+        filters.update(especialidad=specialty)
     elif sort == "quality":
-        papers = db.get_top_papers(limit)
+        listing = "quality"
     else:
-        papers = db.get_recent_papers(limit)
+        listing = "recent"
         
-    return [p.to_card_dict() for p in papers]
+    return await _paginated_cards(response, listing, limit, cursor, **filters)
 
 # --- Endpoints Estáticos (ANTES de rutas dinámicas) ---
 
 @router.get("/stats", tags=["stats"])
-async def get_stats():
-    return get_db_service().get_stats()
+async def get_stats(response: Response):
+    stats = await get_async_db_service().get_stats()
+    # Las estadísticas cambian sólo al refrescar paper_stats
+    if stats.get("actualizado"):
+        response.headers["Last-Modified"] = http_date(datetime.fromisoformat(stats["actualizado"]))
+    return stats
+
+@router.get("/cache-stats", tags=["stats"])
+async def get_cache_stats():
+    """Métricas del cache de detalle/tarjetas: aciertos, fallos y tasa de acierto."""
+    cache = get_paper_cache()
+    return cache.stats() if cache else {"enabled": False}
+
+@router.get("/doi-cache-stats", tags=["stats"])
+async def get_doi_cache_stats():
+    """Métricas del cache persistente de metadatos por DOI (aciertos, negativos, stale)."""
+    from services.doi_cache import get_doi_cache
+    cache = get_doi_cache()
+    return cache.stats() if cache else {"enabled": False}
+
+@router.get("/http-stats", tags=["stats"])
+async def get_http_stats():
+    """Latencia (p50/p90/p99), requests, errores y reintentos de las llamadas salientes, por host."""
+    from services.http_clients import http_metrics
+    return http_metrics.snapshot()
 
 @router.get("/especialidades", tags=["stats"])
 async def get_especialidades():
     """Retorna lista única de especialidades en la DB."""
-    return get_db_service().get_all_especialidades()
+    return await get_async_db_service().get_all_especialidades()
 
 @router.get("/search", tags=["search"])
 async def search_papers(q: str, limit: int = 20):
-    """Busca papers por título, autores o tags (SQL ILIKE)."""
-    db = get_db_service()
-    papers = db.search_papers(q, limit)
-    return [p.to_card_dict() for p in papers]
+    """Búsqueda full-text por título, autores o tags (search_vector + índice GIN, ordenada por ts_rank)."""
+    cache = get_paper_cache()
+    key = cache.cards_key("search", q=q, limit=limit) if cache else None
+    cards = cache.get_cards(key) if cache else None
+    if cards is None:
+        papers = await get_async_db_service().search_papers(q, limit, cards=True)
+        cards = [p.to_card_dict() for p in papers]
+        if cache:
+            cache.set_cards(key, cards)
+    return cards
 
 @router.get("/query", tags=["search"])
-def query_papers(q: str):
-    """Busca papers usando RAG simple"""
-    results = analysis_core.vector_store.query_similar(q)
-    return results
+def query_papers(q: str, k: int = Query(8, ge=1, le=50)):
+    """
+    Búsqueda semántica (RAG) sobre los chunks indexados.
+    Retorna tarjetas de los papers de los top-k chunks, con los fragmentos que coincidieron.
+    """
+    hits = get_analysis_core().vector_store.query_chunks(q, n_results=k)
+    papers = get_db_service().get_papers_by_ids([hit["paper_id"] for hit in hits], cards=True)
+    
+    cards: Dict[str, Dict] = {}
+    for hit in hits:
+        paper = papers.get(hit["paper_id"])
+        if not paper:
+            continue
+        card = cards.setdefault(hit["paper_id"], {**paper.to_card_dict(), "fragmentos": []})
+        card["fragmentos"].append({"page": hit["page"], "text": hit["text"], "distance": hit["distance"]})
+    return list(cards.values())
 
 @router.get("/citar/{doc_id}", tags=["tools"])
 def generate_citation(doc_id: str, style: str = "vancouver"):
     """
     Genera una cita formateada para un documento.
     """
-    results = analysis_core.vector_store.collection.get(ids=[doc_id])
+    results = get_analysis_core().vector_store.collection.get(ids=[doc_id])
     
     if not results['ids']:
         raise HTTPException(status_code=404, detail="Documento no encontrado")
     
     metadata = results['metadatas'][0] if results['metadatas'] else {}
-    citation = reference_generator.generate_citation(metadata, style=style)
+    citation = get_reference_generator().generate_citation(metadata, style=style)
     
     return {
         "doc_id": doc_id,
@@ -82,17 +161,15 @@ def generate_citation(doc_id: str, style: str = "vancouver"):
 # --- Endpoints de Gestión ---
 
 @router.get("/deleted", response_model=List[Dict], tags=["management"])
-async def list_deleted_papers(limit: int = 50):
-    """Lista papers eliminados (soft delete)."""
-    db = get_db_service()
-    papers = db.get_deleted_papers(limit)
-    return [p.to_card_dict() for p in papers]
+async def list_deleted_papers(response: Response, limit: int = Query(50, ge=1, le=200), cursor: Optional[str] = None):
+    """Lista papers eliminados (soft delete). Paginado por cursor (X-Next-Cursor)."""
+    return await _paginated_cards(response, "deleted", limit, cursor)
 
 @router.delete("/{paper_id}", tags=["management"])
 async def soft_delete_paper(paper_id: str):
     """Marca un paper como eliminado (soft delete). No se volverá a descargar."""
-    db = get_db_service()
-    success = db.soft_delete_paper(paper_id)
+    db = get_async_db_service()
+    success = await db.soft_delete_paper(paper_id)
     if not success:
         raise HTTPException(status_code=404, detail="Paper no encontrado")
     return {"success": True, "message": "Paper marcado como eliminado"}
@@ -100,8 +177,8 @@ async def soft_delete_paper(paper_id: str):
 @router.put("/{paper_id}/restore", tags=["management"])
 async def restore_paper(paper_id: str):
     """Restaura un paper eliminado."""
-    db = get_db_service()
-    success = db.restore_paper(paper_id)
+    db = get_async_db_service()
+    success = await db.restore_paper(paper_id)
     if not success:
         raise HTTPException(status_code=404, detail="Paper no encontrado")
     return {"success": True, "message": "Paper restaurado"}
@@ -113,8 +190,8 @@ async def change_paper_categoria(paper_id: str, payload: Dict):
     if not nueva_categoria:
         raise HTTPException(status_code=400, detail="Falta el campo 'categoria'")
     
-    db = get_db_service()
-    paper = db.change_categoria(paper_id, nueva_categoria)
+    db = get_async_db_service()
+    paper = await db.change_categoria(paper_id, nueva_categoria)
     if not paper:
         raise HTTPException(status_code=400, detail="Categoría inválida o paper no encontrado")
     return {"success": True, "message": f"Categoría cambiada a {nueva_categoria}", "paper": paper.to_dict()}
@@ -122,8 +199,8 @@ async def change_paper_categoria(paper_id: str, payload: Dict):
 @router.delete("/{paper_id}/permanent", tags=["management"])
 async def permanent_delete_paper(paper_id: str):
     """Elimina permanentemente un paper de la base de datos."""
-    db = get_db_service()
-    success = db.delete_paper(paper_id)
+    db = get_async_db_service()
+    success = await db.delete_paper(paper_id)
     if not success:
         raise HTTPException(status_code=404, detail="Paper no encontrado")
     return {"success": True, "message": "Paper eliminado permanentemente"}
@@ -137,13 +214,21 @@ async def permanent_delete_paper(paper_id: str):
 # --- Endpoints Dinámicos (DESPUÉS de rutas estáticas/específicas) ---
 
 @router.get("/{paper_id}", response_model=Dict)
-def get_paper_details(paper_id: str):
-    """Obtiene los detalles completos de un paper."""
-    db = get_db_service()
-    paper = db.get_paper_by_id(paper_id)
-    if not paper:
+async def get_paper_details(paper_id: str):
+    """Obtiene los detalles completos de un paper (read-through sobre el cache de papers)."""
+    pid = as_uuid(paper_id)
+    if pid is None:
         raise HTTPException(status_code=404, detail="Paper no encontrado")
-    return paper.to_dict()
+    cache = get_paper_cache()
+    payload = cache.get_detail(str(pid)) if cache else None
+    if payload is None:
+        paper = await get_async_db_service().get_paper_by_id(pid)
+        if not paper:
+            raise HTTPException(status_code=404, detail="Paper no encontrado")
+        payload = paper.to_dict()
+        if cache:
+            cache.set_detail(str(pid), payload)
+    return payload
 
 
 @router.put("/{paper_id}")
@@ -151,14 +236,14 @@ async def update_paper_metadata(paper_id: str, updates: Dict):
     """
     Actualiza metadatos de un paper manualmente.
     """
-    db = get_db_service()
+    db = get_async_db_service()
     
     try:
         # Extraer campos permitidos
         valid_fields = ["titulo", "autores", "año", "especialidad", "tipo_estudio"]
         clean_updates = {k: v for k, v in updates.items() if k in valid_fields}
         
-        paper = db.update_paper(paper_id, **clean_updates)
+        paper = await db.update_paper(paper_id, **clean_updates)
         if not paper:
             raise HTTPException(status_code=404, detail="Paper no encontrado")
             
@@ -175,10 +260,10 @@ async def enrich_paper_doi(paper_id: str, payload: Optional[Dict] = None):
     Payload opcional: {"doi": "10.xxxx/yyyy"} para especificar un DOI diferente.
     Si no se provee, usa el DOI existente del paper.
     """
-    from services.metadata_enricher import MetadataService
+    from services.metadata_enricher import MetadataService, enrichment_update_fields
     
-    db = get_db_service()
-    paper = db.get_paper_by_id(paper_id)
+    db = get_async_db_service()
+    paper = await db.get_paper_by_id(paper_id)
     
     if not paper:
         raise HTTPException(status_code=404, detail="Paper no encontrado")
@@ -195,9 +280,9 @@ async def enrich_paper_doi(paper_id: str, payload: Optional[Dict] = None):
             detail="No hay DOI disponible. Proporcione uno en el payload: {\"doi\": \"10.xxxx/yyyy\"}"
         )
     
-    # Consultar servicios de metadatos
+    # Consultar servicios de metadatos (doi.org, PubMed y CrossRef en paralelo)
     metadata_service = MetadataService()
-    enriched_data = metadata_service.get_metadata_by_doi(doi)
+    enriched_data = await metadata_service.get_metadata_by_doi_async(doi)
     
     if not enriched_data:
         raise HTTPException(
@@ -211,46 +296,11 @@ async def enrich_paper_doi(paper_id: str, payload: Optional[Dict] = None):
     # DOI (actualizar si era diferente)
     if doi != paper.doi:
         update_fields["doi"] = doi
-    
-    # Campos básicos
-    if enriched_data.get("titulo") and not paper.titulo:
-        update_fields["titulo"] = enriched_data["titulo"]
-    if enriched_data.get("autores"):
-        update_fields["autores"] = enriched_data["autores"]
-    if enriched_data.get("revista"):
-        update_fields["revista"] = enriched_data["revista"]
-    if enriched_data.get("año"):
-        update_fields["año"] = enriched_data["año"]
-    if enriched_data.get("abstract") and not paper.abstract:
-        update_fields["abstract"] = enriched_data["abstract"]
-    
-    # Campos multi-fuente
-    if enriched_data.get("pmid"):
-        update_fields["pmid"] = enriched_data["pmid"]
-    if enriched_data.get("mesh_terms"):
-        update_fields["mesh_terms"] = enriched_data["mesh_terms"]
-    if enriched_data.get("abstract_estructurado"):
-        update_fields["abstract_estructurado"] = enriched_data["abstract_estructurado"]
-    if enriched_data.get("affiliaciones"):
-        update_fields["affiliaciones"] = enriched_data["affiliaciones"]
-    if enriched_data.get("funders"):
-        update_fields["funders"] = enriched_data["funders"]
-    if enriched_data.get("license"):
-        update_fields["license"] = enriched_data["license"]
-    if enriched_data.get("referencias"):
-        update_fields["referencias"] = enriched_data["referencias"]
-    if enriched_data.get("crossmark_status"):
-        update_fields["crossmark_status"] = enriched_data["crossmark_status"]
-    if enriched_data.get("fecha_publicacion"):
-        update_fields["fecha_publicacion_exacta"] = enriched_data["fecha_publicacion"]
-    if enriched_data.get("metadata_source"):
-        update_fields["metadata_source"] = enriched_data["metadata_source"]
-    if enriched_data.get("doi_validado") is not None:
-        update_fields["doi_validado"] = enriched_data["doi_validado"]
+    update_fields.update(enrichment_update_fields(enriched_data, paper))
     
     # Actualizar en base de datos
     if update_fields:
-        updated_paper = db.update_paper(paper_id, **update_fields)
+        updated_paper = await db.update_paper(paper_id, **update_fields)
         if not updated_paper:
             raise HTTPException(status_code=500, detail="Error actualizando paper")
         return {
@@ -273,9 +323,9 @@ async def enrich_book_metadata(paper_id: str, payload: Optional[Dict] = None):
     Enriquece metadatos de un libro usando ISBN o título.
     Payload: {"isbn": "9780323341905"} o vacío para auto-detectar.
     """
-    from app.dependencies import book_enricher
-    db = get_db_service()
-    paper = db.get_paper_by_id(paper_id)
+    book_enricher = get_book_enricher()
+    db = get_async_db_service()
+    paper = await db.get_paper_by_id(paper_id)
     
     if not paper:
         raise HTTPException(status_code=404, detail="Libro no encontrado")
@@ -296,11 +346,11 @@ async def enrich_book_metadata(paper_id: str, payload: Optional[Dict] = None):
     if not isbn:
         # Fallback: buscar por título
         title = paper.titulo.replace('.pdf', '').replace('_', ' ')
-        enriched_data = book_enricher.enrich_by_title(title)
+        enriched_data = await run_in_threadpool(book_enricher.enrich_by_title, title)
         if not enriched_data or not enriched_data.get('titulo'):
              raise HTTPException(status_code=400, detail="No se pudo encontrar ISBN ni metadatos por título")
     else:
-        enriched_data = book_enricher.enrich_by_isbn(isbn)
+        enriched_data = await run_in_threadpool(book_enricher.enrich_by_isbn, isbn)
         
     if not enriched_data or not enriched_data.get('titulo'):
         raise HTTPException(status_code=404, detail="No se encontraron metadatos satisfactorios")
@@ -324,7 +374,7 @@ async def enrich_book_metadata(paper_id: str, payload: Optional[Dict] = None):
     
     # Descargar portada localmente si hay URL
     if enriched_data.get("isbn") and enriched_data.get("cover_url"):
-        cover_path = book_enricher._download_cover(enriched_data['isbn'], enriched_data['cover_url'])
+        cover_path = await run_in_threadpool(book_enricher._download_cover, enriched_data['isbn'], enriched_data['cover_url'])
         if cover_path:
             update_fields["cover_path"] = str(cover_path)
     
@@ -332,7 +382,7 @@ async def enrich_book_metadata(paper_id: str, payload: Optional[Dict] = None):
     if paper.titulo and ('.pdf' in paper.titulo.lower() or '_' in paper.titulo or len(paper.titulo) < 5):
         update_fields["titulo"] = enriched_data["titulo"]
 
-    updated_paper = db.update_paper(paper_id, **update_fields)
+    updated_paper = await db.update_paper(paper_id, **update_fields)
     if not updated_paper:
         raise HTTPException(status_code=500, detail="Error actualizando libro en DB")
         
@@ -342,13 +392,14 @@ async def enrich_book_metadata(paper_id: str, payload: Optional[Dict] = None):
         "paper": updated_paper.to_dict()
     }
 @router.post("/{paper_id}/clinical-insights", tags=["analysis"])
-async def generate_clinical_insights(paper_id: str):
+async def generate_clinical_insights(paper_id: str, refresh: bool = False):
     """
     Genera Insights Clínicos (Modo Guardia) para un paper existente.
+    refresh=true ignora el cache de respuestas LLM y vuelve a consultar a Groq.
     """
-    from app.dependencies import analysis_core
-    db = get_db_service()
-    paper = db.get_paper_by_id(paper_id)
+    analysis_core = get_analysis_core()
+    db = get_async_db_service()
+    paper = await db.get_paper_by_id(paper_id)
     
     if not paper:
         raise HTTPException(status_code=404, detail="Paper no encontrado")
@@ -364,18 +415,23 @@ async def generate_clinical_insights(paper_id: str):
         pass
         
     if not content and paper.archivo_path:
-        # Fallback: Extraer de PDF de nuevo
-        doc_data = analysis_core.ingestion.process_pdf(Path(paper.archivo_path))
-        content = doc_data['content']
+        # Fallback: Extraer texto del PDF (sin thumbnail ni imágenes; sólo las páginas de análisis)
+        extracted = await run_in_threadpool(
+            analysis_core.ingestion.extract, Path(paper.archivo_path),
+            with_thumbnail=False, max_text_pages=ANALYSIS_TEXT_PAGES
+        )
+        content = extracted.analysis_text
         
     if not content:
         raise HTTPException(status_code=400, detail="No se pudo recuperar el contenido del documento")
     
     # Generar insights
-    insights = analysis_core.groq.generate_clinical_insights(content)
+    insights = await run_in_threadpool(
+        analysis_core.groq.generate_clinical_insights, content, use_cache=not refresh
+    )
     
     # Actualizar DB
-    updated_paper = db.update_paper(paper_id, clinical_insights=insights)
+    updated_paper = await db.update_paper(paper_id, clinical_insights=insights)
     
     return {
         "success": True,
@@ -417,5 +473,35 @@ async def chat_paper(paper_id: str, payload: Dict[str, str]):
     if not question:
         raise HTTPException(status_code=400, detail="Falta la pregunta")
         
-    answer = analysis_core.chat_with_paper(paper_id, question)
+    answer = await get_analysis_core().chat_with_paper_async(paper_id, question)
     return {"answer": answer}
+
+@router.post("/chat/{paper_id}/stream", tags=["chat"])
+async def chat_paper_stream(paper_id: str, payload: Dict[str, str]):
+    """
+    Chat con un paper en streaming (Server-Sent Events).
+    Cada fragmento llega como `data: {"token": "..."}`; al final `event: done`.
+    Payload: {"question": "¿Cuál es la conclusión?"}
+    """
+    question = payload.get("question")
+    if not question:
+        raise HTTPException(status_code=400, detail="Falta la pregunta")
+
+    analysis_core = get_analysis_core()
+
+    async def events():
+        # Generador async: el rate limiter de Groq espera sin bloquear el event loop
+        async for token in analysis_core.stream_chat_with_paper_async(paper_id, question):
+            yield f"data: {json.dumps({'token': token})}\n\n"
+        yield "event: done\ndata: {}\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.get("/chat/metrics", tags=["chat"])
+def chat_stream_metrics():
+    """Time-to-first-token y duración de las respuestas de chat en streaming (percentiles)."""
+    return stream_metrics.snapshot()
@@ -1,10 +1,10 @@
-from fastapi import APIRouter, HTTPException, BackgroundTasks, UploadFile, File
-from typing import Dict, List
+from fastapi import APIRouter, HTTPException, UploadFile, File, Query
+from typing import Dict, List, Optional
 import shutil
 import uuid
 from pathlib import Path
-from app.dependencies import jobs_db, analysis_core
-from app.schemas import UploadResponse, JobStatusResponse
+from app.schemas import UploadResponse, JobStatusResponse, JobQueueResponse
+from services.job_queue import get_job_queue
 
 router = APIRouter(
     tags=["processing"]
@@ -13,43 +13,13 @@ router = APIRouter(
 UPLOAD_DIR = Path("data/uploads")
 UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
 
-def process_file_task(job_id: str, file_path: str):
-    """Tarea en segundo plano para procesar el paper"""
-    try:
-        jobs_db[job_id]["status"] = "procesando"
-        
-        # Procesar
-        result = analysis_core.process_and_analyze(file_path)
-        
-        if result["status"] == "duplicate":
-            jobs_db[job_id]["status"] = "completado"
-            jobs_db[job_id]["result"] = {
-                "status": "duplicate",
-                "message": f"Documento duplicado. Razón: {result['reason']}",
-                "doc_id": result['data']['hash'],
-                "analysis": result.get("analysis", ""), 
-                "snippets": result.get("snippets", {})
-            }
-        else:
-            jobs_db[job_id]["status"] = "completado"
-            jobs_db[job_id]["result"] = {
-                "status": "success", 
-                "message": "Análisis completado exitosamente",
-                "doc_id": result["doc_id"],
-                "analysis": result["analysis"],
-                "snippets": result["snippets"],
-                "graficos_analizados": result.get("graficos_analizados", []),
-                "metadata": result.get("metadata", {})
-            }
-            
-    except Exception as e:
-        jobs_db[job_id]["status"] = "fallido"
-        jobs_db[job_id]["message"] = str(e)
+# El análisis lo ejecutan los workers (python -m services.job_worker), no la API.
 
 @router.post("/upload", response_model=UploadResponse)
-async def upload_paper(background_tasks: BackgroundTasks, file: UploadFile = File(...)):
+def upload_paper(file: UploadFile = File(...), priority: int = Query(0, description="Mayor = se procesa antes")):
     """
-    Sube un paper e inicia su procesamiento asíncrono.
+    Sube un paper y lo encola para análisis.
+    Sólo guarda el archivo e inserta el trabajo; los workers hacen el resto.
     """
     try:
         job_id = str(uuid.uuid4())
@@ -57,38 +27,44 @@ async def upload_paper(background_tasks: BackgroundTasks, file: UploadFile = Fil
         
         # Guardar archivo
         with open(file_location, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+            shutil.copyfileobj(file.file, buffer, 1024 * 1024)
             
-        # Inicializar job
-        jobs_db[job_id] = {
-            "status": "pendiente",
-            "message": "Iniciando procesamiento...",
-            "result": None
-        }
-        
-        # Lanzar tarea background
-        background_tasks.add_task(process_file_task, job_id, str(file_location))
+        get_job_queue().enqueue(
+            {"file_path": str(file_location), "file_name": file.filename},
+            priority=priority,
+            job_id=job_id
+        )
         
         return {
             "status": "pendiente",
             "job_id": job_id,
-            "message": "Archivo recibido. Procesamiento iniciado."
+            "message": "Archivo recibido. En cola para procesamiento."
         }
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error al subir archivo: {str(e)}")
 
+@router.get("/jobs", response_model=JobQueueResponse)
+def list_jobs(status: Optional[str] = None, limit: int = Query(50, ge=1, le=500)):
+    """Trabajos recientes, profundidad de la cola y percentiles de latencia."""
+    queue = get_job_queue()
+    return {
+        **queue.stats(),
+        "jobs": queue.list_jobs(status=status, limit=limit)
+    }
+
 @router.get("/jobs/{job_id}", response_model=JobStatusResponse)
 def get_job_status(job_id: str):
     """Consulta el estado del trabajo de análisis."""
-    job = jobs_db.get(job_id)
+    job = get_job_queue().get(job_id)
     if not job:
         raise HTTPException(status_code=404, detail="Trabajo no encontrado")
     
     response = {
         "job_id": job_id,
         "status": job["status"],
-        "message": job.get("message")
+        "message": job.get("message"),
+        "attempts": job.get("attempts")
     }
     
     if job["status"] == "completado" and job["result"]:
@@ -97,6 +73,8 @@ def get_job_status(job_id: str):
              "doc_id": res.get("doc_id"),
              "analysis": res.get("analysis"),
              "snippets": res.get("snippets"),
+             "graficos_analizados": res.get("graficos_analizados"),
+             "metadata": res.get("metadata"),
              "message": res.get("message")
         })
     
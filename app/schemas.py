@@ -25,6 +25,15 @@ class JobStatusResponse(BaseModel):
     snippets: Optional[Dict[str, Any]] = None
     graficos_analizados: Optional[List[Dict[str, Any]]] = None
     metadata: Optional[Dict[str, Any]] = None
+    attempts: Optional[int] = None
+
+
+class JobQueueResponse(BaseModel):
+    """Listado de la cola de trabajos con métricas."""
+    depth: Dict[str, int]
+    oldest_pending_seconds: Optional[float] = None
+    latency_seconds: Dict[str, Any]
+    jobs: List[Dict[str, Any]]
 
 
 class QueryRequest(BaseModel):
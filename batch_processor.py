@@ -1,42 +1,55 @@
 import asyncio
+import logging
 from pathlib import Path
-from core.analysis import AnalysisCore
+from core.batch_engine import BatchIngestionEngine
 import os
 from dotenv import load_dotenv
 
 load_dotenv()
 
-async def process_batch_directory(directory: str):
-    core = AnalysisCore()
+logging.basicConfig(
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    level=logging.INFO
+)
+
+async def process_batch_directory(directory: str, resume: bool = True):
     path = Path(directory)
     
     if not path.exists():
         print(f"Directorio no encontrado: {directory}")
         return
 
-    files = list(path.glob("*.pdf"))
+    files = sorted(path.glob("*.pdf"))
     print(f"🚀 Iniciando procesamiento masivo de {len(files)} archivos en {directory}...")
     
-    for file_path in files:
-        print(f"Processing: {file_path.name}...")
-        try:
-            # Ejecutar de forma asíncrona (run_in_executor no es estrictamente necesario aquí si es un script batch simple, 
-            # pero mantenemos consistencia)
-            result = core.process_and_analyze(str(file_path))
-            
-            if result["status"] == "duplicate":
-                print(f"  ⏭️ Duplicado ({result['reason']}). Skipping analysis.")
-            else:
-                print(f"  ✅ Procesado. ID: {result['doc_id']}")
-                if result.get('snippets'):
-                    print(f"     Resumen: {result['snippets'].get('summary_slide')}")
-        except Exception as e:
-            print(f"  ❌ Error: {e}")
+    # Extracción en pool de procesos + análisis con concurrencia acotada.
+    # El checkpoint permite reanudar el lote si se interrumpe.
+    engine = BatchIngestionEngine(
+        checkpoint_path=os.getenv("BATCH_CHECKPOINT_PATH", "data/batch_checkpoint.jsonl") if resume else None
+    )
+
+    def report(file_path: Path, status: str, detail):
+        # Se imprime al terminar cada archivo: el resumen sólo guarda conteos
+        if status == "success":
+            print(f"  ✅ {file_path.name}: Procesado. ID: {detail}")
+        elif status == "duplicate":
+            print(f"  ⏭️ {file_path.name}: Duplicado ({detail}).")
+        else:
+            print(f"  ❌ {file_path.name}: Error: {detail}")
+
+    summary = await engine.run(files, on_result=report)
+    
+    print(
+        f"🏁 {summary['success']} procesados | {summary['duplicate']} duplicados | "
+        f"{summary['error']} errores | {summary['skipped']} ya procesados antes"
+    )
+    return summary
 
 if __name__ == "__main__":
     # Procesar lo que haya bajado el UserBot
     import sys
     # Permitir pasar directorio como argumento, defecto al de canales
-    target_dir = sys.argv[1] if len(sys.argv) > 1 else "data/uploads_channels"
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    target_dir = args[0] if args else "data/uploads_channels"
     
-    asyncio.run(process_batch_directory(target_dir))
+    asyncio.run(process_batch_directory(target_dir, resume="--no-resume" not in sys.argv))
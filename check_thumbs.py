@@ -4,7 +4,6 @@ import os
 from pathlib import Path
 from services.database import get_db_service
 from core.ingestion import IngestionService
-import fitz
 
 def check_thumbnails():
     db = get_db_service()
@@ -15,6 +14,7 @@ def check_thumbnails():
     
     processed_count = 0
     regenerated_count = 0
+    new_thumbs = {}  # {paper_id: {"thumbnail_path": ...}}, un solo UPDATE en bloque al final
     
     for p in papers:
         if p.procesado:
@@ -34,22 +34,22 @@ def check_thumbnails():
             # Intentar regenerar si existe el PDF original
             if p.archivo_path and Path(p.archivo_path).exists():
                 try:
-                    doc = fitz.open(p.archivo_path)
-                    # Asegurar directorio de salida
-                    output_dir = Path("data/thumbnails")
-                    output_dir.mkdir(parents=True, exist_ok=True)
-                    
-                    new_thumb = ingestion.generate_thumbnail(doc, Path(p.archivo_path).name)
+                    # Sólo thumbnail: max_text_pages=0 evita parsear texto
+                    extracted = ingestion.extract(Path(p.archivo_path), max_text_pages=0)
+                    new_thumb = extracted.thumbnail_path
                     if new_thumb:
-                         # Actualizar DB
-                         db.update_paper(str(p.id), thumbnail_path=new_thumb)
-                         print(f"  [OK] Regenerado y actualizado en DB: {new_thumb}")
+                         new_thumbs[str(p.id)] = {"thumbnail_path": new_thumb}
+                         print(f"  [OK] Regenerado: {new_thumb}")
                          regenerated_count += 1
                 except Exception as e:
                     print(f"  [ERROR] Falló regeneración: {e}")
             else:
                 print(f"  [FATAL] PDF original no encontrado en {p.archivo_path}")
 
+    if new_thumbs:
+        db.bulk_update_papers(new_thumbs)
+        print(f"Actualizados en DB: {len(new_thumbs)}")
+
     print(f"\nResumen:")
     print(f"Total Papers: {len(papers)}")
     print(f"Procesados (visibles en UI): {processed_count}")
@@ -1,48 +1,119 @@
+import asyncio
 import os
-from .ingestion import IngestionService
-from .visual_analysis import VisualAnalysisService
-from services.groq_service import GroqService
-from services.vector_store import VectorStoreService
+import threading
+from .ingestion import IngestionService, ExtractedDocument
+from .chunking import chunk_document
 from services.database import get_db_service
 from services.notification_service import NotificationService
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, Any, Optional, List
+from typing import TYPE_CHECKING, AsyncIterator, Dict, Any, Iterator, Optional, List, Tuple
 import logging
 
+if TYPE_CHECKING:
+    # Imports pesados (chromadb, SDK de Groq): se cargan en el primer uso
+    from .visual_analysis import VisualAnalysisService
+    from services.groq_service import GroqService
+    from services.vector_store import VectorStoreService
+
 logger = logging.getLogger(__name__)
 
+
+class _LazyService:
+    """
+    Atributo que construye su servicio en el primer acceso (factory(core)).
+    Se puede asignar directamente (servicios inyectados, tests).
+    """
+
+    def __init__(self, factory):
+        self.factory = factory
+
+    def __set_name__(self, owner, name):
+        self.attr = f"_{name}"
+
+    def __get__(self, obj, objtype=None):
+        if obj is None:
+            return self
+        try:
+            return obj.__dict__[self.attr]
+        except KeyError:
+            pass
+        with obj._init_lock:
+            if self.attr not in obj.__dict__:
+                obj.__dict__[self.attr] = self.factory(obj)
+        return obj.__dict__[self.attr]
+
+    def __set__(self, obj, value):
+        obj.__dict__[self.attr] = value
+
+
+def _build_vector_store(core: "AnalysisCore") -> "VectorStoreService":
+    from services.vector_store import VectorStoreService
+    return VectorStoreService()
+
+
+def _build_groq(core: "AnalysisCore") -> Optional["GroqService"]:
+    from services.groq_service import GroqService
+    try:
+        return GroqService()
+    except ValueError:
+        logger.warning("GROQ_API_KEY no encontrada. Funciones de IA deshabilitadas.")
+        return None
+
+
+def _build_visual(core: "AnalysisCore") -> "VisualAnalysisService":
+    from .visual_analysis import VisualAnalysisService
+    return VisualAnalysisService(groq_service=core.groq)
+
 class AnalysisCore:
+    # Chunks recuperados por pregunta en chat_with_paper
+    CHAT_TOP_K = int(os.getenv("RAG_TOP_K", "5"))
+
+    # Servicios caros (Chroma, cliente Groq, VLM): se construyen en el primer uso,
+    # no al importar app.dependencies ni al arrancar el bot
+    vector_store = _LazyService(_build_vector_store)
+    groq = _LazyService(_build_groq)
+    visual = _LazyService(_build_visual)
+
     def __init__(self, 
                  ingestion_service: Optional[IngestionService] = None,
-                 vector_store_service: Optional[VectorStoreService] = None,
-                 groq_service: Optional[GroqService] = None,
-                 visual_service: Optional[VisualAnalysisService] = None):
+                 vector_store_service: Optional["VectorStoreService"] = None,
+                 groq_service: Optional["GroqService"] = None,
+                 visual_service: Optional["VisualAnalysisService"] = None,
+                 llm_workers: Optional[int] = None):
         
+        self._init_lock = threading.RLock()
         self.ingestion = ingestion_service or IngestionService()
-        self.vector_store = vector_store_service or VectorStoreService()
         self.db_service = get_db_service()  # Servicio PostgreSQL
         self.notifier = NotificationService()
         
+        if vector_store_service:
+            self.vector_store = vector_store_service
         if groq_service:
             self.groq = groq_service
-        else:
-            try:
-                self.groq = GroqService()
-            except ValueError:
-                print("Advertencia: GROQ_API_KEY no encontrada. Funciones de IA deshabilitadas.")
-                self.groq = None
+        if visual_service:
+            self.visual = visual_service
         
-        self.visual = visual_service or VisualAnalysisService(groq_service=self.groq)
+        # Llamadas LLM concurrentes por documento (1 = modo secuencial clásico).
+        # El RateLimiter de GroqService sigue aplicando por modelo dentro de cada hilo.
+        self.llm_workers = llm_workers or int(os.getenv("GROQ_LLM_WORKERS", "4"))
+        self._llm_executor: Optional[ThreadPoolExecutor] = None
 
-    def process_and_analyze(self, file_path: str, analyze_graphs: bool = True) -> Dict[str, Any]:
+    def process_and_analyze(self, file_path: str, analyze_graphs: bool = True,
+                            extracted: Optional[ExtractedDocument] = None) -> Dict[str, Any]:
+        """
+        Pipeline completo de un documento.
+        `extracted` permite pasar una extracción ya hecha (p.ej. en un proceso worker del batch).
+        """
         path = Path(file_path)
         
-        # 1. Ingesta enriquecida (incluye thumbnail)
-        doc_data = self.ingestion.process_pdf(path)
-        
-        # 2. Verificar duplicados (Hash en DB)
-        logger.info(f"DEBUG: Buscando hash en DB: {doc_data['hash']}")
-        existing_paper = self.db_service.get_paper_by_hash(doc_data['hash'])
+        # 1. Verificar duplicados ANTES de parsear (Hash en DB)
+        if extracted is None:
+            data, file_hash = self.ingestion.read_and_hash(path)
+        else:
+            data, file_hash = None, extracted.hash
+        logger.info(f"DEBUG: Buscando hash en DB: {file_hash}")
+        existing_paper = self.db_service.get_paper_by_hash(file_hash)
         logger.info(f"DEBUG: Resultado DB: {existing_paper}")
         if existing_paper:
              # Si ya existe y está procesado, retornar datos
@@ -52,19 +123,38 @@ class AnalysisCore:
                     "reason": "Ya existe en la biblioteca", 
                     "data": existing_paper.to_dict()
                 }
+        
+        # 2. Ingesta enriquecida en una sola pasada sobre los bytes ya leídos
+        if extracted is None:
+            extracted = self.ingestion.extract(
+                path,
+                with_images=analyze_graphs and self.groq is not None,
+                data=data,
+                file_hash=file_hash
+            )
+        doc_data = extracted.to_dict()
 
-        # 3. Crear registro inicial en DB (estado pendiente)
-        paper = self.db_service.create_paper(
-            hash=doc_data['hash'],
+        # 3. Registro inicial en DB (estado pendiente). Si un intento anterior ya lo
+        # creó y falló antes de terminar, se retoma ese paper en vez de insertar otro
+        # (el hash es único: un segundo INSERT fallaría en todos los reintentos).
+        initial_fields = dict(
             doi=doc_data['doi'],
             titulo=doc_data['title'] or doc_data['file_name'],
             autores=[doc_data['author']] if doc_data['author'] else [],
-            año=None, # Se completará con IA
             thumbnail_path=doc_data.get('thumbnail_path'),
             archivo_path=str(path),
             archivo_nombre=path.name,
             num_paginas=doc_data['page_count']
         )
+        if existing_paper:
+            logger.info(f"🔁 Retomando paper sin procesar {existing_paper.id}")
+            paper = self.db_service.update_paper(str(existing_paper.id), **initial_fields) or existing_paper
+        else:
+            paper = self.db_service.create_paper(
+                hash=doc_data['hash'],
+                año=None, # Se completará con IA
+                **initial_fields
+            )
         
         # 4. Determinación de Categoría TEMPRANA (antes de IA)
         categoria = 'sin_categorizar'
@@ -83,36 +173,28 @@ class AnalysisCore:
         snippets = {}
         clinical_insights = {}
         graphs_analysis: List[Dict] = []
+        enriched_meta = {}
+        final_ano = None
+        veredicto = ""
+        final_path, final_name = str(path), path.name
+        is_quiz, quiz_data = False, {}
         
         if self.groq:
             if categoria == 'libros':
                 logger.info(f"📚 Procesando como LIBRO: {path.name}")
-                analysis_result = self.groq.book_analysis(doc_data['content'])
-                snippets = self.groq.generate_book_metadata(doc_data['content'])
+                analysis_result, snippets = self._run_book_llm_stage(doc_data['content'])
                 # Mapear snippets de libro a campos generales
                 snippets['summary_slide'] = snippets.get('summary_short')
                 snippets['quality_score'] = 9.0 # Default para libros detectados
                 snippets['study_type'] = "Libro / Manual"
             else:
                 logger.info(f"📄 Procesando como PAPER: {path.name}")
-                # Auditoría Epistemológica (retorna string markdown)
-                analysis_result = self.groq.epistemological_audit(doc_data['content'])
-                # Snippets enriquecidos (JSON estructurado)
-                snippets = self.groq.generate_snippets(doc_data['content'])
-                # Clinical Insights para Modo Guardia (Nuevo)
-                logger.info(f"⚡ Generando Clinical Insights para Modo Guardia: {path.name}")
-                clinical_insights = self.groq.generate_clinical_insights(doc_data['content'])
-                
-                # Fase 2: GPC y Calculadoras
-                is_gpc = any(kw in (doc_data['title'] or "").lower() for kw in ["guía", "guia", "guideline", "consens"]) or \
-                         snippets.get('study_type', '').lower() in ["guía", "guideline"]
-                
+                analysis_result, snippets, clinical_insights, is_gpc = self._run_paper_llm_stage(
+                    doc_data['content'], doc_data['title'] or ""
+                )
                 if is_gpc:
                     logger.info(f"📜 Detectada GPC: {path.name}")
-                    clinical_insights['gpc_recommendations'] = self.groq.extract_gpc_recommendations(doc_data['content'])
                     categoria = 'papers' # Mantener en papers pero con flag GPC? O nueva categoria 'guias'
-                
-                clinical_insights['suggested_calculators'] = self.groq.suggest_calculators(doc_data['content'])
 
             veredicto = "" # Se extrae del markdown si es necesario
 
@@ -160,6 +242,8 @@ class AnalysisCore:
                         os.rename(path, new_path)
                         final_path = str(new_path)
                         final_name = new_filename
+                        # Persistir ya la ruta nueva: un reintento localiza el archivo por hash
+                        self.db_service.update_paper(str(paper.id), archivo_path=final_path, archivo_nombre=final_name)
                         logger.info(f"♻️ Archivo renombrado: {path.name} -> {new_filename}")
                     else:
                         logger.warning(f"No se pudo renombrar a {new_filename}, el archivo ya existe.")
@@ -172,7 +256,8 @@ class AnalysisCore:
                     conclusion_hint = snippets.get('summary_slide', '')
                     graphs_analysis = self.visual.analyze_all_graphs(
                         final_path, # Usar el nuevo path
-                        paper_conclusion=conclusion_hint
+                        paper_conclusion=conclusion_hint,
+                        candidates=extracted.images # Reusar imágenes de la ingesta
                     )
                     
                     # --- EKG DOJO LOGIC ---
@@ -214,7 +299,16 @@ class AnalysisCore:
             elif any(kw in stp for kw in ['rct', 'meta-análisis', 'estudio', 'ensayo']):
                 categoria = 'papers'
         
-        # 6. Actualizar DB con resultados completos
+        # 6. Actualizar DB con resultados completos (un solo UPDATE ... RETURNING)
+        extra_fields = {}
+        if is_quiz:
+            extra_fields.update(is_quiz=True, quiz_data=quiz_data)
+        if final_path != str(path):
+            extra_fields.update(archivo_path=final_path, archivo_nombre=final_name)
+        if enriched_meta.get('titulo'):
+            extra_fields["titulo"] = enriched_meta.get('titulo')
+        if enriched_meta.get('autores'):
+            extra_fields["autores"] = enriched_meta.get('autores')
 
         # Preparar datos de update incluyendo enriquecidos
         paper_updated = self.db_service.mark_as_processed(
@@ -243,7 +337,8 @@ class AnalysisCore:
                 "edicion": snippets.get('edicion'),
                 "descripcion_libro": snippets.get('summary_short'),
                 "clinical_insights": clinical_insights
-            }
+            },
+            **extra_fields
         )
         
         # --- Alerta Proactiva (Fase 4) ---
@@ -254,27 +349,7 @@ class AnalysisCore:
                 except Exception as e:
                     logger.error(f"Error disparando alerta: {e}")
 
-        
-        # Update Quiz Data
-        if is_quiz:
-             self.db_service.update_paper(str(paper.id), is_quiz=True, quiz_data=quiz_data)
-        
-        # Actualizar paths y título si cambiaron
-        updates = {}
-        if final_path != str(path):
-            updates["archivo_path"] = final_path
-            updates["archivo_nombre"] = final_name
-            # Thumbnails también suelen basarse en nombre, pero aquí es path separado. OK.
-            
-        if enriched_meta.get('titulo'):
-            updates["titulo"] = enriched_meta.get('titulo')
-        
-        if enriched_meta.get('autores'):
-            updates["autores"] = enriched_meta.get('autores')
-            
-        if updates:
-            self.db_service.update_paper(str(paper.id), **updates)
-        
+
         # 7. Guardar en ChromaDB (para búsqueda semántica)
         # Usamos el análisis y metadatos clave para el embedding
         combined_text_for_embedding = (
@@ -295,6 +370,18 @@ class AnalysisCore:
                 "specialty": paper.especialidad or ""
             }
         )
+        
+        # 8. Indexar chunks por página (RAG para chat y /papers/query)
+        try:
+            chunks = chunk_document(extracted)
+            indexed = self.vector_store.add_chunks(
+                str(paper.id),
+                chunks,
+                metadata={"title": paper.titulo, "specialty": paper.especialidad or ""}
+            )
+            logger.info(f"🧩 {indexed} chunks indexados para {paper.id}")
+        except Exception as e:
+            logger.error(f"Error indexando chunks de {paper.id}: {e}")
 
         return {
             "status": "success",
@@ -303,59 +390,185 @@ class AnalysisCore:
         }
 
 
+    def partition_known_files(self, paths: List[Path]) -> Tuple[List[Path], List[Path]]:
+        """
+        Separa archivos nuevos de los ya procesados con una sola consulta a la DB.
+        Sólo calcula hashes (streaming), sin abrir los PDFs con fitz.
+        
+        Returns:
+            (pendientes, duplicados)
+        """
+        hashes = {}
+        for path in paths:
+            try:
+                hashes[path] = self.ingestion.compute_file_hash(path)
+            except OSError as e:
+                logger.warning(f"No se pudo leer {path}: {e}")
+        
+        known = self.db_service.get_papers_by_hashes(list(hashes.values()))
+        pending, duplicates = [], []
+        for path, file_hash in hashes.items():
+            paper = known.get(file_hash)
+            if paper and paper.procesado:
+                duplicates.append(path)
+            else:
+                pending.append(path)
+        return pending, duplicates
+
+    # ==================== FAN-OUT LLM ====================
+
+    def _get_llm_executor(self) -> Optional[ThreadPoolExecutor]:
+        """Pool compartido para las llamadas a Groq (None en modo secuencial)."""
+        if self.llm_workers <= 1:
+            return None
+        if self._llm_executor is None:
+            self._llm_executor = ThreadPoolExecutor(
+                max_workers=self.llm_workers,
+                thread_name_prefix="groq-llm"
+            )
+        return self._llm_executor
+
+    def _submit_llm(self, fn, *args) -> Future:
+        """Lanza una llamada LLM en el pool o la ejecuta inline si no hay pool."""
+        executor = self._get_llm_executor()
+        if executor is None:
+            future = Future()
+            try:
+                future.set_result(fn(*args))
+            except Exception as e:
+                future.set_exception(e)
+            return future
+        return executor.submit(fn, *args)
+
+    def _run_book_llm_stage(self, content: str) -> Tuple[str, Dict]:
+        """Análisis de libro: auditoría y metadatos son independientes entre sí."""
+        analysis_future = self._submit_llm(self.groq.book_analysis, content)
+        metadata_future = self._submit_llm(self.groq.generate_book_metadata, content)
+        return analysis_future.result(), metadata_future.result()
+
+    def _run_paper_llm_stage(self, content: str, title: str) -> Tuple[str, Dict, Dict, bool]:
+        """
+        Análisis de paper con las llamadas independientes en paralelo.
+        Sólo la extracción de GPC depende de los snippets cuando el título
+        no permite detectar la guía por sí solo.
+        
+        Returns:
+            (auditoría markdown, snippets, clinical_insights, is_gpc)
+        """
+        gpc_keywords = ["guía", "guia", "guideline", "consens"]
+        gpc_by_title = any(kw in title.lower() for kw in gpc_keywords)
+        
+        # Auditoría Epistemológica (retorna string markdown)
+        audit_future = self._submit_llm(self.groq.epistemological_audit, content)
+        # Snippets enriquecidos (JSON estructurado)
+        snippets_future = self._submit_llm(self.groq.generate_snippets, content)
+        # Clinical Insights para Modo Guardia
+        insights_future = self._submit_llm(self.groq.generate_clinical_insights, content)
+        # Fase 2: Calculadoras
+        calculators_future = self._submit_llm(self.groq.suggest_calculators, content)
+        # GPC: si el título ya lo indica no hace falta esperar a los snippets
+        gpc_future = self._submit_llm(self.groq.extract_gpc_recommendations, content) if gpc_by_title else None
+        
+        snippets = snippets_future.result()
+        is_gpc = gpc_by_title or str(snippets.get('study_type') or '').lower() in ["guía", "guideline"]
+        if is_gpc and gpc_future is None:
+            gpc_future = self._submit_llm(self.groq.extract_gpc_recommendations, content)
+        
+        clinical_insights = insights_future.result()
+        if gpc_future is not None:
+            clinical_insights['gpc_recommendations'] = gpc_future.result()
+        clinical_insights['suggested_calculators'] = calculators_future.result()
+        
+        return audit_future.result(), snippets, clinical_insights, is_gpc
+
+
     def chat_with_paper(self, paper_id: str, question: str) -> str:
         """
         Permite chatear con un paper específico usando RAG.
-        1. Recuperar contexto de vector store filtrando por paper_id
-        2. Consultar LLM con el contexto
+        1. Recuperar los top-k chunks de ESTE paper (metadata paper_id)
+        2. Consultar LLM sólo con ese contexto, citando páginas
         """
         if not self.groq:
             return "El servicio de IA no está disponible."
-            
-        # Buscar contexto relevante solo de ESTE paper
-        context_results = self.vector_store.collection.query(
-            query_texts=[question],
-            n_results=3,
-            where={"id": paper_id} # Asumiendo que guardamos ID en metadata o podemos filtrar
-            # NOTA: En vector_store.add_document usamos doc_id como ID del chunk? 
-            # Si usamos doc_id como ID de documento, esto funciona.
-            # Veamos vector_store.py: ids=[doc_id] -> Un paper = Un chunk gigante?
-            # En la implementación actual linea 118: doc_id=str(paper.id). 
-            # Sí, es un chunk por paper.
-        )
-        
-        # Si no usamos metadata filtering, usamos IDs directos si es un solo doc
-        # Pero query busca en toda la colección. Mejor filtrar.
-        # En ingestion linea 121: metadata ID no se incluye explicitamente como campo 'id'
-        # pero se pasa como 'ids' argument.
-        
-        # Recuperar texto
-        context = ""
-        if context_results['documents'] and context_results['documents'][0]:
-            context = "\n\n".join(context_results['documents'][0])
+        context, prompt = self._chat_prompt(paper_id, question)
+        if not context:
+            return "No pude encontrar el contenido de este documento para responder."
+        return self.groq.analyze_text(text="", prompt_template=prompt)
+
+    def stream_chat_with_paper(self, paper_id: str, question: str) -> Iterator[str]:
+        """Igual que chat_with_paper, pero genera la respuesta por fragmentos (streaming de Groq)."""
+        if not self.groq:
+            yield "El servicio de IA no está disponible."
+            return
+        context, prompt = self._chat_prompt(paper_id, question)
+        if not context:
+            yield "No pude encontrar el contenido de este documento para responder."
+            return
+        yield from self.groq.stream_text(text="", prompt_template=prompt)
+
+    async def chat_with_paper_async(self, paper_id: str, question: str) -> str:
+        """
+        chat_with_paper para la API y el bot: la recuperación (Chroma) corre en un hilo
+        y la llamada a Groq espera el rate limiter sin bloquear el event loop.
+        """
+        if not self.groq:
+            return "El servicio de IA no está disponible."
+        context, prompt = await asyncio.to_thread(self._chat_prompt, paper_id, question)
+        if not context:
+            return "No pude encontrar el contenido de este documento para responder."
+        return await self.groq.analyze_text_async(text="", prompt_template=prompt)
+
+    async def stream_chat_with_paper_async(self, paper_id: str, question: str) -> AsyncIterator[str]:
+        """stream_chat_with_paper para callers async (ver chat_with_paper_async)."""
+        if not self.groq:
+            yield "El servicio de IA no está disponible."
+            return
+        context, prompt = await asyncio.to_thread(self._chat_prompt, paper_id, question)
+        if not context:
+            yield "No pude encontrar el contenido de este documento para responder."
+            return
+        async for token in self.groq.stream_text_async(text="", prompt_template=prompt):
+            yield token
+
+    def _chat_prompt(self, paper_id: str, question: str) -> Tuple[str, str]:
+        """Contexto RAG del paper y prompt de chat (plantilla para GroqService.analyze_text)."""
+        hits = self.vector_store.query_chunks(question, n_results=self.CHAT_TOP_K, paper_id=paper_id)
+        context = "\n\n".join(f"[Pág. {hit['page']}] {hit['text']}" for hit in hits)
             
         if not context:
-            # Fallback a buscar por ID directo si chroma query falla
+            # Papers indexados antes del chunking: documento-resumen completo
             try: 
                  doc = self.vector_store.collection.get(ids=[paper_id])
                  if doc['documents']:
                      context = doc['documents'][0]
-            except:
+            except Exception:
                 pass
-        
-        if not context:
-            return "No pude encontrar el contenido de este documento para responder."
 
+        # Llaves escapadas: GroqService aplica str.format(text=...) sobre el prompt
+        escape = lambda value: value.replace("{", "{{").replace("}", "}}")
         prompt = f"""
         Utilizando SÓLO la siguiente información del paper médico (y tus conocimientos generales para dar coherencia pero sin inventar datos):
         
         CONTEXTO:
-        {context[:15000]}
+        {escape(context[:15000])}
         
         PREGUNTA DEL USUARIO:
-        {question}
+        {escape(question)}
         
         Responde de manera concisa, profesional y en ESPAÑOL.
         """
-        
-        return self.groq.analyze_text(text="", prompt_template=prompt)
+        return context, prompt
+
+
+_analysis_core: Optional[AnalysisCore] = None
+_analysis_core_lock = threading.Lock()
+
+
+def get_analysis_core() -> AnalysisCore:
+    """AnalysisCore compartido del proceso (API, bot), creado en la primera llamada."""
+    global _analysis_core
+    if _analysis_core is None:
+        with _analysis_core_lock:
+            if _analysis_core is None:
+                _analysis_core = AnalysisCore()
+    return _analysis_core
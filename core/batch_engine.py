@@ -0,0 +1,258 @@
+"""
+Motor de ingesta masiva para MedFlix Core.
+Pipeline por etapas: hash/dedupe -> extracción (pool de procesos, CPU-bound)
+-> análisis (concurrencia acotada, I/O-bound contra Groq/DB/Chroma).
+Con backpressure entre etapas, checkpoints reanudables y métricas por etapa.
+"""
+import asyncio
+import json
+import logging
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Optional, Set
+
+from .ingestion import IngestionService, ExtractedDocument
+
+logger = logging.getLogger(__name__)
+
+# Estados de checkpoint que no se vuelven a procesar al reanudar
+_DONE_STATUSES = {"success", "duplicate"}
+
+
+def _extract_worker(path_str: str, with_images: bool) -> ExtractedDocument:
+    """
+    Extracción de un PDF dentro de un proceso worker (fitz + thumbnail).
+    Función de módulo para que sea picklable por ProcessPoolExecutor.
+    """
+    return IngestionService().extract(Path(path_str), with_images=with_images)
+
+
+class StageStats:
+    """Contadores de una etapa del pipeline."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.count = 0
+        self.errors = 0
+        self.busy_seconds = 0.0
+
+    def record(self, elapsed: float, ok: bool = True):
+        self.count += 1
+        self.busy_seconds += elapsed
+        if not ok:
+            self.errors += 1
+
+    def to_dict(self, wall_seconds: float) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "busy_seconds": round(self.busy_seconds, 2),
+            "avg_seconds": round(self.busy_seconds / self.count, 3) if self.count else 0.0,
+            "throughput_per_min": round(self.count / wall_seconds * 60, 2) if wall_seconds > 0 else 0.0,
+        }
+
+
+class BatchCheckpoint:
+    """
+    Checkpoint en JSONL (una línea por archivo terminado).
+    Append-only: el último estado registrado de cada ruta es el vigente.
+    """
+
+    def __init__(self, path: Optional[str]):
+        self.path = Path(path) if path else None
+        if self.path:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+
+    def completed(self) -> Set[str]:
+        """Rutas ya procesadas (éxito o duplicado). Los errores se reintentan."""
+        if not self.path or not self.path.exists():
+            return set()
+        last_status: Dict[str, str] = {}
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # línea truncada por una interrupción
+                last_status[entry["path"]] = entry["status"]
+        return {p for p, status in last_status.items() if status in _DONE_STATUSES}
+
+    def record(self, path: str, status: str, detail: Optional[str] = None):
+        if not self.path:
+            return
+        entry = {"path": path, "status": status, "ts": time.time()}
+        if detail:
+            entry["detail"] = detail
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+
+class BatchIngestionEngine:
+    """
+    Ingesta masiva de PDFs sobre un AnalysisCore.
+
+    - Extracción (fitz, thumbnails) y re-encoding de imágenes (Pillow) en un pool de procesos.
+    - Análisis (Groq, DB, vector store) con `io_concurrency` documentos en vuelo.
+    - Cola acotada entre etapas: si el análisis va lento, la extracción se detiene.
+    """
+
+    def __init__(self,
+                 core=None,
+                 cpu_workers: Optional[int] = None,
+                 io_concurrency: Optional[int] = None,
+                 queue_size: Optional[int] = None,
+                 checkpoint_path: Optional[str] = "data/batch_checkpoint.jsonl",
+                 analyze_graphs: bool = True,
+                 use_processes: bool = True):
+        if core is None:
+            from .analysis import AnalysisCore
+            core = AnalysisCore()
+        self.core = core
+        self.cpu_workers = cpu_workers or int(os.getenv("BATCH_CPU_WORKERS", str(os.cpu_count() or 2)))
+        self.io_concurrency = io_concurrency or int(os.getenv("BATCH_IO_CONCURRENCY", "4"))
+        self.queue_size = queue_size or self.io_concurrency * 2
+        self.checkpoint = BatchCheckpoint(checkpoint_path)
+        self.analyze_graphs = analyze_graphs
+        self.use_processes = use_processes
+
+    def _make_executor(self) -> Executor:
+        if self.use_processes:
+            return ProcessPoolExecutor(max_workers=self.cpu_workers)
+        return ThreadPoolExecutor(max_workers=self.cpu_workers, thread_name_prefix="batch-cpu")
+
+    async def run(self, files: Iterable[Path],
+                  on_result: Optional[Callable[[Path, str, Optional[str]], None]] = None) -> Dict[str, Any]:
+        """
+        Procesa los archivos y retorna un resumen con el conteo por estado
+        y las métricas de cada etapa (sin resultados por archivo: memoria constante
+        aunque el lote tenga miles de PDFs).
+        `on_result(path, status, detalle)` recibe cada archivo al terminar; el detalle
+        es el ID del paper (success), la razón (duplicate) o el error (error).
+        """
+        started = time.perf_counter()
+        stats = {name: StageStats(name) for name in ("hash", "extract", "analyze")}
+        counts = {"success": 0, "duplicate": 0, "error": 0, "skipped": 0}
+
+        def finish(path: Path, status: str, detail: Optional[str] = None):
+            counts[status] += 1
+            self.checkpoint.record(str(path), status, detail)
+            if on_result is not None:
+                on_result(path, status, detail)
+
+        # 0. Reanudar: saltar lo ya registrado en el checkpoint
+        files = [Path(f) for f in files]
+        done = self.checkpoint.completed()
+        pending = [f for f in files if str(f) not in done]
+        counts["skipped"] = len(files) - len(pending)
+        if counts["skipped"]:
+            logger.info(f"⏩ Reanudando: {counts['skipped']} archivos ya procesados según checkpoint")
+
+        # 1. Hash + dedupe contra la DB (una sola consulta)
+        t0 = time.perf_counter()
+        pending, known = await asyncio.to_thread(self.core.partition_known_files, pending)
+        stats["hash"].busy_seconds = time.perf_counter() - t0
+        stats["hash"].count = len(pending) + len(known)
+        for path in known:
+            finish(path, "duplicate", "hash")
+
+        logger.info(
+            f"🚀 Batch: {len(pending)} pendientes | {self.cpu_workers} workers CPU | "
+            f"{self.io_concurrency} análisis concurrentes"
+        )
+
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        path_queue: asyncio.Queue = asyncio.Queue()
+        for path in pending:
+            path_queue.put_nowait(path)
+
+        loop = asyncio.get_running_loop()
+        with_images = self.analyze_graphs and getattr(self.core, "groq", None) is not None
+        executor = self._make_executor()
+
+        # El re-encoding de imágenes del análisis visual también usa el pool
+        visual = getattr(self.core, "visual", None)
+        previous_visual_executor = getattr(visual, "cpu_executor", None)
+        if visual is not None:
+            visual.cpu_executor = executor
+
+        async def extractor():
+            while True:
+                try:
+                    path = path_queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                t = time.perf_counter()
+                try:
+                    doc = await loop.run_in_executor(executor, _extract_worker, str(path), with_images)
+                    stats["extract"].record(time.perf_counter() - t)
+                except Exception as e:
+                    stats["extract"].record(time.perf_counter() - t, ok=False)
+                    logger.error(f"❌ Extracción fallida {path.name}: {e}")
+                    finish(path, "error", f"extract: {e}")
+                    continue
+                # Backpressure: bloquea si el análisis no da abasto
+                await queue.put((path, doc))
+
+        async def analyzer():
+            while True:
+                item = await queue.get()
+                if item is None:
+                    return
+                path, doc = item
+                t = time.perf_counter()
+                try:
+                    result = await asyncio.to_thread(
+                        self.core.process_and_analyze, str(path), self.analyze_graphs, doc
+                    )
+                    status = result.get("status")
+                    ok = status in _DONE_STATUSES
+                    stats["analyze"].record(time.perf_counter() - t, ok=ok)
+                    if status == "success":
+                        finish(path, status, result.get("job_id"))
+                    elif ok:
+                        finish(path, status, result.get("reason"))
+                    else:
+                        finish(path, "error", str(result.get("error") or status))
+                except Exception as e:
+                    stats["analyze"].record(time.perf_counter() - t, ok=False)
+                    logger.error(f"❌ Análisis fallido {path.name}: {e}")
+                    finish(path, "error", f"analyze: {e}")
+
+        try:
+            analyzers = [asyncio.create_task(analyzer()) for _ in range(self.io_concurrency)]
+            await asyncio.gather(*(extractor() for _ in range(self.cpu_workers)))
+            for _ in analyzers:
+                await queue.put(None)
+            await asyncio.gather(*analyzers)
+        finally:
+            if visual is not None:
+                visual.cpu_executor = previous_visual_executor
+            executor.shutdown(wait=True)
+
+        # Un solo refresco de paper_stats por lote (las escrituras sólo lo marcan pendiente)
+        from services.database import stats_refresher
+        await asyncio.to_thread(stats_refresher.flush)
+
+        wall = time.perf_counter() - started
+        summary = {
+            **counts,
+            "total": len(files),
+            "wall_seconds": round(wall, 2),
+            "stages": {name: s.to_dict(wall) for name, s in stats.items()},
+        }
+        self._log_summary(summary)
+        return summary
+
+    @staticmethod
+    def _log_summary(summary: Dict[str, Any]):
+        logger.info(
+            f"🏁 Batch: {summary['success']} procesados | {summary['duplicate']} duplicados | "
+            f"{summary['error']} errores | {summary['skipped']} reanudados | {summary['wall_seconds']}s"
+        )
+        for name, s in summary["stages"].items():
+            logger.info(
+                f"   · {name:<8} {s['count']:>5} docs | {s['errors']} errores | "
+                f"{s['avg_seconds']}s/doc | {s['throughput_per_min']} docs/min"
+            )
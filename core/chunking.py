@@ -0,0 +1,82 @@
+"""
+Chunking de documentos para el índice vectorial (RAG).
+Divide el texto extraído en fragmentos solapados que nunca cruzan páginas,
+para poder citar la página de cada fragmento recuperado.
+"""
+import re
+from dataclasses import dataclass
+from typing import Iterable, List, Tuple
+
+from .ingestion import ExtractedDocument
+
+# Valores por defecto (~300 tokens por chunk, ~50 de solapamiento)
+DEFAULT_CHUNK_SIZE = 1200
+DEFAULT_CHUNK_OVERLAP = 200
+MIN_CHUNK_CHARS = 40
+
+
+@dataclass
+class TextChunk:
+    """Fragmento de texto con su posición en el documento."""
+    text: str
+    page: int
+    index: int  # Posición global del chunk en el documento
+
+
+def _split_page(text: str, chunk_size: int, overlap: int) -> List[str]:
+    """
+    Ventana deslizante sobre una página, cortando en espacios en blanco
+    para no partir palabras.
+    """
+    text = re.sub(r"[ \t]+", " ", text).strip()
+    if len(text) <= chunk_size:
+        return [text]
+
+    pieces = []
+    start = 0
+    while start < len(text):
+        end = min(start + chunk_size, len(text))
+        if end < len(text):
+            # Retroceder hasta el último espacio/salto dentro de la ventana
+            cut = max(text.rfind(" ", start, end), text.rfind("\n", start, end))
+            if cut > start + chunk_size // 2:
+                end = cut
+        pieces.append(text[start:end].strip())
+        if end >= len(text):
+            break
+        start = max(end - overlap, start + 1)
+        # Empezar el siguiente chunk en un límite de palabra
+        next_space = text.find(" ", start, end)
+        if next_space != -1:
+            start = next_space + 1
+    return pieces
+
+
+def chunk_pages(pages: Iterable[Tuple[int, str]],
+                chunk_size: int = DEFAULT_CHUNK_SIZE,
+                overlap: int = DEFAULT_CHUNK_OVERLAP) -> List[TextChunk]:
+    """
+    Genera chunks a partir de pares (página, texto).
+    Las páginas vacías o casi vacías (portadas, escaneos sin OCR) se omiten.
+    """
+    if overlap >= chunk_size:
+        raise ValueError("overlap debe ser menor que chunk_size")
+
+    chunks: List[TextChunk] = []
+    for page, text in pages:
+        for piece in _split_page(text or "", chunk_size, overlap):
+            if len(piece) < MIN_CHUNK_CHARS:
+                continue
+            chunks.append(TextChunk(text=piece, page=page, index=len(chunks)))
+    return chunks
+
+
+def chunk_document(doc: ExtractedDocument,
+                   chunk_size: int = DEFAULT_CHUNK_SIZE,
+                   overlap: int = DEFAULT_CHUNK_OVERLAP) -> List[TextChunk]:
+    """Chunks de un documento extraído, usando sus offsets por página."""
+    if doc.page_spans:
+        pages = ((span["page"], doc.page_text(span["page"])) for span in doc.page_spans)
+    else:
+        pages = [(1, doc.content)]
+    return chunk_pages(pages, chunk_size=chunk_size, overlap=overlap)
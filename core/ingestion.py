@@ -1,23 +1,107 @@
 import hashlib
+import os
 import re
 import fitz  # PyMuPDF
+from dataclasses import dataclass, field
 from pathlib import Path
 from typing import Tuple, Dict, Optional, List
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Páginas iniciales que entran en el texto de análisis (prompt del LLM). El chunking
+# para el vector store usa el texto de todas las páginas.
+ANALYSIS_TEXT_PAGES = 30
+
+# Tope de imágenes candidatas por documento (y de bytes por imagen): los bytes en bruto
+# viajan en ExtractedDocument durante toda la etapa LLM y vuelven del pool de procesos del batch
+MAX_IMAGE_CANDIDATES = int(os.getenv("INGEST_MAX_IMAGES", "12"))
+MAX_IMAGE_BYTES = int(float(os.getenv("INGEST_MAX_IMAGE_MB", "5")) * 1024 * 1024)
+
+
+@dataclass
+class ExtractedDocument:
+    """
+    Resultado de una única pasada sobre un PDF.
+    Lo reutilizan todas las etapas posteriores (dedupe, IA, visión, vector store)
+    para no volver a abrir ni parsear el archivo.
+    """
+    file_name: str
+    file_path: str
+    hash: str
+    doi: Optional[str]
+    title: str
+    author: str
+    creation_date: str
+    page_count: int
+    # Texto de todas las páginas leídas (ver max_text_pages en IngestionService.extract)
+    content: str
+    # Offsets de cada página dentro de `content`: [{page, start, end}]
+    page_spans: List[Dict] = field(default_factory=list)
+    analysis_pages: int = ANALYSIS_TEXT_PAGES
+    thumbnail_path: Optional[str] = None
+    # Imágenes candidatas en bruto: [{page, index, xref, width, height, ext, image}]
+    images: List[Dict] = field(default_factory=list)
+
+    def page_text(self, page: int) -> str:
+        """Texto de una página (1-indexed) extraída en esta pasada."""
+        for span in self.page_spans:
+            if span["page"] == page:
+                return self.content[span["start"]:span["end"]]
+        return ""
+
+    @property
+    def analysis_text(self) -> str:
+        """Texto de las primeras `analysis_pages` páginas: el que va al prompt del LLM."""
+        if len(self.page_spans) <= self.analysis_pages:
+            return self.content
+        if self.analysis_pages <= 0:
+            return ""
+        return self.content[:self.page_spans[self.analysis_pages - 1]["end"]]
+
+    def to_dict(self) -> Dict:
+        """
+        Formato dict histórico de process_pdf (sin las imágenes en bruto).
+        `content` es el texto de análisis (primeras páginas), como antes.
+        """
+        return {
+            "file_name": self.file_name,
+            "hash": self.hash,
+            "doi": self.doi,
+            "title": self.title,
+            "author": self.author,
+            "creation_date": self.creation_date,
+            "page_count": self.page_count,
+            "content": self.analysis_text,
+            "file_path": self.file_path,
+            "thumbnail_path": self.thumbnail_path
+        }
+
+
 class IngestionService:
+    # Tamaño de lectura para hashing/carga del PDF
+    READ_BUFFER_SIZE = 1024 * 1024
+
     def __init__(self):
         pass
 
     def compute_file_hash(self, file_path: Path) -> str:
-        """Calcula el hash SHA-256 de un archivo para detección de duplicados."""
+        """
+        Calcula el hash SHA-256 de un archivo para detección de duplicados.
+        Streaming con buffer grande (hashlib.file_digest), sin cargar el archivo en memoria.
+        """
+        with open(file_path, "rb") as f:
+            return hashlib.file_digest(f, "sha256").hexdigest()
+
+    def read_and_hash(self, file_path: Path) -> Tuple[bytes, str]:
+        """Lee el archivo una sola vez, calculando el SHA-256 mientras se lee."""
         sha256_hash = hashlib.sha256()
+        buffer = bytearray()
         with open(file_path, "rb") as f:
-            for byte_block in iter(lambda: f.read(4096), b""):
+            for byte_block in iter(lambda: f.read(self.READ_BUFFER_SIZE), b""):
                 sha256_hash.update(byte_block)
-        return sha256_hash.hexdigest()
+                buffer.extend(byte_block)
+        return bytes(buffer), sha256_hash.hexdigest()
 
     def extract_doi(self, text: str) -> Optional[str]:
         """Intenta extraer un DOI del texto usando regex."""
@@ -26,59 +110,137 @@ class IngestionService:
         if match:
             return match.group(1)
         return None
-    
-    def generate_thumbnail(self, doc: fitz.Document, file_name: str) -> Optional[str]:
-        """Genera un thumbnail de la primera página del PDF."""
+
+    def generate_thumbnail(self, doc: fitz.Document) -> Optional[str]:
+        """
+        Genera un thumbnail de la primera página del PDF.
+        Nombre direccionado por contenido (<sha256>.png): la API lo sirve como inmutable.
+        """
         try:
             page = doc[0]
             pix = page.get_pixmap(matrix=fitz.Matrix(0.3, 0.3))  # Escalar a 30%
             output_dir = Path("data/thumbnails")
             output_dir.mkdir(parents=True, exist_ok=True)
-            
-            thumb_name = f"{Path(file_name).stem}_thumb.png"
-            thumb_path = output_dir / thumb_name
-            pix.save(str(thumb_path))
+
+            png = pix.tobytes("png")
+            thumb_path = output_dir / f"{hashlib.sha256(png).hexdigest()[:32]}.png"
+            if not thumb_path.exists():
+                thumb_path.write_bytes(png)
             return str(thumb_path)
         except Exception as e:
             logger.error(f"Error generando thumbnail: {e}")
             return None
 
-    def process_pdf(self, file_path: Path) -> Dict:
+    @staticmethod
+    def extract_image_candidates(doc: fitz.Document,
+                                 min_width: int = 100,
+                                 min_height: int = 100,
+                                 max_images: int = MAX_IMAGE_CANDIDATES,
+                                 max_image_bytes: int = MAX_IMAGE_BYTES) -> List[Dict]:
         """
-        Procesa un PDF para extraer texto, metadatos, imágenes y generar thumbnail.
+        Extrae las imágenes embebidas (sin re-codificar) de un documento ya abierto.
+        Filtra las muy pequeñas (iconos, logos) sin decodificarlas, las repetidas
+        (misma xref en varias páginas) y las de más de max_image_bytes; se detiene
+        al llegar a max_images.
         """
-        doc = fitz.open(file_path)
-        full_text = ""
-        
-        # Extraer texto de todas las páginas (limitamos a primeras 30 para evitar sobrecarga)
-        for i, page in enumerate(doc):
-            if i < 30:
-                full_text += page.get_text()
-            else:
-                break
-
-        # Metadatos básicos del PDF
-        metadata = doc.metadata
-        
-        # Intentar extraer DOI
-        doi = self.extract_doi(full_text)
-        
-        # Hash
-        file_hash = self.compute_file_hash(file_path)
-        
-        # Thumbnail
-        thumbnail_path = self.generate_thumbnail(doc, file_path.name)
+        candidates = []
+        seen = set()  # xrefs ya evaluadas
 
-        return {
-            "file_name": file_path.name,
-            "hash": file_hash,
-            "doi": doi,
-            "title": metadata.get("title", ""),
-            "author": metadata.get("author", ""),
-            "creation_date": metadata.get("creationDate", ""),
-            "page_count": doc.page_count,
-            "content": full_text,
-            "file_path": str(file_path),
-            "thumbnail_path": thumbnail_path
-        }
+        for page_num, page in enumerate(doc):
+            for img_index, img_info in enumerate(page.get_images(full=True)):
+                if len(candidates) >= max_images:
+                    return candidates
+                # img_info = (xref, smask, width, height, ...): descarte previo por tamaño
+                xref, width, height = img_info[0], img_info[2], img_info[3]
+                if xref in seen or width < min_width or height < min_height:
+                    continue
+                seen.add(xref)
+                try:
+                    base_image = doc.extract_image(xref)
+
+                    if base_image["width"] < min_width or base_image["height"] < min_height:
+                        continue
+                    if len(base_image["image"]) > max_image_bytes:
+                        logger.info(f"Imagen de página {page_num + 1} omitida ({len(base_image['image'])} bytes)")
+                        continue
+
+                    candidates.append({
+                        "page": page_num + 1,
+                        "index": img_index + 1,
+                        "xref": xref,
+                        "width": base_image["width"],
+                        "height": base_image["height"],
+                        "ext": base_image["ext"],
+                        "image": base_image["image"]
+                    })
+                except Exception as e:
+                    logger.warning(f"Error extrayendo imagen {img_index} de página {page_num}: {e}")
+                    continue
+
+        return candidates
+
+    def extract(self,
+                file_path: Path,
+                with_thumbnail: bool = True,
+                with_images: bool = False,
+                max_text_pages: Optional[int] = None,
+                analysis_pages: int = ANALYSIS_TEXT_PAGES,
+                data: Optional[bytes] = None,
+                file_hash: Optional[str] = None) -> ExtractedDocument:
+        """
+        Extracción en una sola pasada: lee y hashea los bytes, abre el fitz.Document
+        desde ese mismo buffer y obtiene texto, spans por página, thumbnail e imágenes.
+        Si ya se leyó el archivo (chequeo de duplicados), se pueden pasar `data` y `file_hash`.
+        El texto se lee de todas las páginas (chunking completo para RAG) salvo que
+        `max_text_pages` lo limite; el prompt usa sólo las primeras `analysis_pages`.
+        """
+        file_path = Path(file_path)
+        if data is None or file_hash is None:
+            data, file_hash = self.read_and_hash(file_path)
+
+        with fitz.open(stream=data, filetype="pdf") as doc:
+            # Extraer texto por página (todas, o las primeras max_text_pages)
+            parts = []
+            page_spans = []
+            offset = 0
+            for i, page in enumerate(doc):
+                if max_text_pages is not None and i >= max_text_pages:
+                    break
+                text = page.get_text()
+                parts.append(text)
+                page_spans.append({"page": i + 1, "start": offset, "end": offset + len(text)})
+                offset += len(text)
+            full_text = "".join(parts)
+
+            # Metadatos básicos del PDF
+            metadata = doc.metadata or {}
+
+            thumbnail_path = self.generate_thumbnail(doc) if with_thumbnail else None
+            images = self.extract_image_candidates(doc) if with_images else []
+            page_count = doc.page_count
 
+        extracted = ExtractedDocument(
+            file_name=file_path.name,
+            file_path=str(file_path),
+            hash=file_hash,
+            doi=None,
+            title=metadata.get("title", ""),
+            author=metadata.get("author", ""),
+            creation_date=metadata.get("creationDate", ""),
+            page_count=page_count,
+            content=full_text,
+            page_spans=page_spans,
+            analysis_pages=analysis_pages,
+            thumbnail_path=thumbnail_path,
+            images=images
+        )
+        # El DOI se busca en las primeras páginas (no en citas de capítulos posteriores)
+        extracted.doi = self.extract_doi(extracted.analysis_text)
+        return extracted
+
+    def process_pdf(self, file_path: Path) -> Dict:
+        """
+        Procesa un PDF para extraer texto, metadatos y generar thumbnail.
+        Mantiene el formato dict histórico; ver `extract` para el objeto completo.
+        """
+        return self.extract(file_path).to_dict()
@@ -6,9 +6,73 @@ import fitz  # PyMuPDF
 import base64
 import io
 import os
+from concurrent.futures import Executor
 from pathlib import Path
 from typing import List, Dict, Optional
 from services.groq_service import GroqService
+from .ingestion import IngestionService
+
+
+def optimize_images(candidates: List[Dict], pdf_name: str, output_dir: str) -> List[Dict]:
+    """
+    Re-codifica imágenes en bruto a JPEG optimizado y las guarda en disco.
+    Función de módulo para poder ejecutarse en un ProcessPoolExecutor.
+    """
+    from PIL import Image
+    
+    output_dir = Path(output_dir)
+    
+    images_data = []
+    
+    for candidate in candidates:
+        page_num = candidate["page"]
+        img_index = candidate["index"]
+        width = candidate["width"]
+        height = candidate["height"]
+        
+        try:
+            img_pil = Image.open(io.BytesIO(candidate["image"]))
+            
+            # Convertir a RGB si es necesario
+            if img_pil.mode in ("RGBA", "P"):
+                img_pil = img_pil.convert("RGB")
+                
+            # Redimensionar si es muy grande (max 800px lado mayor)
+            max_dimension = 800
+            if width > max_dimension or height > max_dimension:
+                img_pil.thumbnail((max_dimension, max_dimension))
+                
+            # Guardar a buffer optimizado (JPEG quality 70)
+            buffer = io.BytesIO()
+            img_pil.save(buffer, format="JPEG", quality=70)
+            optimized_bytes = buffer.getvalue()
+            
+            # Convertir a base64
+            image_base64 = base64.b64encode(optimized_bytes).decode('utf-8')
+            data_uri = f"data:image/jpeg;base64,{image_base64}"
+            
+            # Guardar imagen localmente (versión optimizada)
+            image_filename = f"{pdf_name}_page{page_num}_img{img_index}.jpg"
+            image_path = output_dir / image_filename
+            
+            with open(image_path, "wb") as f:
+                f.write(optimized_bytes)
+            
+            images_data.append({
+                "page": page_num,
+                "index": img_index,
+                "width": img_pil.width,
+                "height": img_pil.height,
+                "extension": "jpg",
+                "data_uri": data_uri,
+                "local_path": str(image_path)
+            })
+            
+        except Exception as e:
+            print(f"Error procesando imagen {img_index} de página {page_num}: {e}")
+            continue
+    
+    return images_data
 
 
 class VisualAnalysisService:
@@ -16,6 +80,8 @@ class VisualAnalysisService:
     
     def __init__(self, groq_service: Optional[GroqService] = None):
         self.groq = groq_service
+        # Executor opcional para el trabajo CPU-bound (Pillow)
+        self.cpu_executor: Optional[Executor] = None
         self.output_dir = Path("data/extracted_images")
         self.output_dir.mkdir(parents=True, exist_ok=True)
     
@@ -31,79 +97,31 @@ class VisualAnalysisService:
         Returns:
             Lista de diccionarios con información de cada imagen
         """
-        images_data = []
-        
         try:
-            doc = fitz.open(pdf_path)
-            
-            for page_num, page in enumerate(doc):
-                image_list = page.get_images(full=True)
-                
-                for img_index, img_info in enumerate(image_list):
-                    xref = img_info[0]
-                    
-                    try:
-                        base_image = doc.extract_image(xref)
-                        image_bytes = base_image["image"]
-                        image_ext = base_image["ext"]
-                        width = base_image["width"]
-                        height = base_image["height"]
-                        
-                        # Filtrar imágenes muy pequeñas (probablemente iconos)
-                        if width < min_width or height < min_height:
-                            continue
-                        
-                        # Procesar con Pillow para optimizar tamaño
-                        from PIL import Image
-                        
-                        img_pil = Image.open(io.BytesIO(image_bytes))
-                        
-                        # Convertir a RGB si es necesario
-                        if img_pil.mode in ("RGBA", "P"):
-                            img_pil = img_pil.convert("RGB")
-                            
-                        # Redimensionar si es muy grande (max 800px lado mayor)
-                        max_dimension = 800
-                        if width > max_dimension or height > max_dimension:
-                            img_pil.thumbnail((max_dimension, max_dimension))
-                            
-                        # Guardar a buffer optimizado (JPEG quality 70)
-                        buffer = io.BytesIO()
-                        img_pil.save(buffer, format="JPEG", quality=70)
-                        optimized_bytes = buffer.getvalue()
-                        
-                        # Convertir a base64
-                        image_base64 = base64.b64encode(optimized_bytes).decode('utf-8')
-                        data_uri = f"data:image/jpeg;base64,{image_base64}"
-                        
-                        # Guardar imagen localmente (versión optimizada)
-                        pdf_name = Path(pdf_path).stem
-                        image_filename = f"{pdf_name}_page{page_num + 1}_img{img_index + 1}.jpg"
-                        image_path = self.output_dir / image_filename
-                        
-                        with open(image_path, "wb") as f:
-                            f.write(optimized_bytes)
-                        
-                        images_data.append({
-                            "page": page_num + 1,
-                            "index": img_index + 1,
-                            "width": img_pil.width,
-                            "height": img_pil.height,
-                            "extension": "jpg",
-                            "data_uri": data_uri,
-                            "local_path": str(image_path)
-                        })
-                        
-                    except Exception as e:
-                        print(f"Error extrayendo imagen {img_index} de página {page_num}: {e}")
-                        continue
-            
-            doc.close()
-            
+            with fitz.open(pdf_path) as doc:
+                candidates = IngestionService.extract_image_candidates(doc, min_width, min_height)
         except Exception as e:
             print(f"Error abriendo PDF para extracción de imágenes: {e}")
+            return []
         
-        return images_data
+        return self.prepare_images(candidates, Path(pdf_path).stem)
+    
+    def prepare_images(self, candidates: List[Dict], pdf_name: str) -> List[Dict]:
+        """
+        Optimiza imágenes candidatas ya extraídas (ver IngestionService.extract)
+        y las guarda en disco, sin volver a abrir el PDF.
+        Si hay `cpu_executor` (pool de procesos del batch), el re-encoding corre allí.
+        
+        Args:
+            candidates: Imágenes en bruto [{page, index, width, height, image}]
+            pdf_name: Nombre base para los archivos generados
+            
+        Returns:
+            Lista de diccionarios con información de cada imagen
+        """
+        if self.cpu_executor is not None and candidates:
+            return self.cpu_executor.submit(optimize_images, candidates, pdf_name, str(self.output_dir)).result()
+        return optimize_images(candidates, pdf_name, str(self.output_dir))
     
     def analyze_graph(self, image_data_uri: str, paper_conclusion: str = "") -> str:
         """
@@ -121,18 +139,23 @@ class VisualAnalysisService:
         
         return self.groq.analyze_image_url(image_data_uri, context=paper_conclusion)
     
-    def analyze_all_graphs(self, pdf_path: str, paper_conclusion: str = "") -> List[Dict]:
+    def analyze_all_graphs(self, pdf_path: str, paper_conclusion: str = "",
+                           candidates: Optional[List[Dict]] = None) -> List[Dict]:
         """
         Extrae y analiza todos los gráficos de un PDF.
         
         Args:
             pdf_path: Ruta al PDF
             paper_conclusion: Conclusión del paper para comparación antisesgo
+            candidates: Imágenes ya extraídas en la pasada de ingesta (evita reabrir el PDF)
             
         Returns:
             Lista de diccionarios con info de imagen + análisis
         """
-        images = self.extract_images(pdf_path)
+        if candidates is None:
+            images = self.extract_images(pdf_path)
+        else:
+            images = self.prepare_images(candidates, Path(pdf_path).stem)
         results = []
         
         for img in images:
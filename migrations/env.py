@@ -19,6 +19,8 @@ sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
 # Importar Base y todos los modelos para que Alembic los detecte
 from models.paper import Base, Paper, get_database_url
 from models.channel import Channel
+from models.job import Job
+from models.paper_analysis import PaperAnalysis
 
 # Configuración de Alembic desde alembic.ini
 config = context.config
@@ -0,0 +1,52 @@
+"""Cola de trabajos persistente (tabla jobs)
+
+Reemplaza el diccionario en memoria jobs_db. Los workers reclaman trabajos
+con SELECT ... FOR UPDATE SKIP LOCKED sobre el índice ix_jobs_claim.
+
+Revision ID: 002_job_queue
+Revises: 001_initial
+Create Date: 2026-10-17
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = '002_job_queue'
+down_revision: Union[str, None] = '001_initial'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'jobs',
+        sa.Column('id', postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column('tipo', sa.String(50), nullable=False, server_default='analyze_pdf'),
+        sa.Column('payload', postgresql.JSONB(), server_default='{}'),
+        
+        # Estado
+        sa.Column('status', sa.String(20), nullable=False, server_default='pendiente'),
+        sa.Column('priority', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('message', sa.Text()),
+        sa.Column('result', postgresql.JSONB()),
+        
+        # Reintentos
+        sa.Column('attempts', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('max_attempts', sa.Integer(), nullable=False, server_default='3'),
+        sa.Column('run_after', sa.DateTime(), nullable=False, server_default=sa.func.now()),
+        sa.Column('locked_by', sa.String(100)),
+        
+        # Timestamps
+        sa.Column('created_at', sa.DateTime(), nullable=False, server_default=sa.func.now()),
+        sa.Column('started_at', sa.DateTime()),
+        sa.Column('finished_at', sa.DateTime()),
+    )
+    op.create_index('ix_jobs_claim', 'jobs', ['status', 'priority', 'created_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_jobs_claim', table_name='jobs')
+    op.drop_table('jobs')
@@ -0,0 +1,48 @@
+"""Búsqueda full-text en papers (tsvector generado + índice GIN)
+
+Agrega papers.search_vector como columna generada STORED a partir de título,
+abstract (español + inglés), tags, MeSH y autores. PostgreSQL la calcula para
+todas las filas existentes al agregarla (backfill), y la mantiene en cada
+INSERT/UPDATE. Reemplaza las búsquedas ILIKE '%q%' de search_papers.
+
+Revision ID: 003_search_vector
+Revises: 002_job_queue
+Create Date: 2026-10-17
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = '003_search_vector'
+down_revision: Union[str, None] = '002_job_queue'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Copia congelada de models.paper.SEARCH_VECTOR_SQL al momento de esta revisión
+SEARCH_VECTOR_SQL = (
+    "setweight(to_tsvector('spanish'::regconfig, coalesce(titulo, '')), 'A') || "
+    "setweight(to_tsvector('english'::regconfig, coalesce(titulo, '')), 'A') || "
+    "setweight(jsonb_to_tsvector('spanish'::regconfig, coalesce(tags, '[]'::jsonb), '[\"string\"]'), 'B') || "
+    "setweight(jsonb_to_tsvector('english'::regconfig, coalesce(mesh_terms, '[]'::jsonb), '[\"string\"]'), 'B') || "
+    "setweight(to_tsvector('spanish'::regconfig, coalesce(abstract, '')), 'C') || "
+    "setweight(to_tsvector('english'::regconfig, coalesce(abstract, '')), 'C') || "
+    "setweight(jsonb_to_tsvector('simple'::regconfig, coalesce(autores, '[]'::jsonb), '[\"string\"]'), 'D')"
+)
+
+
+def upgrade() -> None:
+    # ADD COLUMN ... GENERATED ALWAYS AS (...) STORED reescribe la tabla
+    # calculando el vector de todas las filas existentes.
+    op.add_column(
+        'papers',
+        sa.Column('search_vector', postgresql.TSVECTOR(), sa.Computed(SEARCH_VECTOR_SQL, persisted=True))
+    )
+    op.create_index('ix_papers_search_vector', 'papers', ['search_vector'], postgresql_using='gin')
+
+
+def downgrade() -> None:
+    op.drop_index('ix_papers_search_vector', table_name='papers')
+    op.drop_column('papers', 'search_vector')
@@ -0,0 +1,44 @@
+"""Estadísticas del catálogo en una vista materializada (paper_stats)
+
+Una sola fila con todos los agregados de /papers/stats. La ingesta la refresca
+con REFRESH MATERIALIZED VIEW CONCURRENTLY (por eso el índice único sobre id),
+así la lectura cuesta lo mismo sea cual sea el tamaño de la biblioteca.
+
+Revision ID: 004_paper_stats
+Revises: 003_search_vector
+Create Date: 2026-10-17
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '004_paper_stats'
+down_revision: Union[str, None] = '003_search_vector'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Copia congelada de models.paper.PAPER_STATS_SQL al momento de esta revisión
+PAPER_STATS_SQL = (
+    "SELECT 1 AS id, "
+    "count(*) AS total_papers, "
+    "count(*) FILTER (WHERE procesado) AS procesados, "
+    "count(*) FILTER (WHERE num_graficos > 0) AS con_graficos, "
+    "count(DISTINCT especialidad) AS especialidades, "
+    "coalesce(avg(score_calidad), 0) AS score_promedio, "
+    "coalesce((SELECT jsonb_object_agg(b.especialidad, b.n) FROM ("
+    "SELECT especialidad, count(*) AS n FROM papers "
+    "WHERE procesado AND especialidad IS NOT NULL GROUP BY especialidad) b), '{}'::jsonb) "
+    "AS especialidades_breakdown, "
+    "now() AS refreshed_at "
+    "FROM papers"
+)
+
+
+def upgrade() -> None:
+    op.execute(f"CREATE MATERIALIZED VIEW IF NOT EXISTS paper_stats AS {PAPER_STATS_SQL}")
+    op.execute("CREATE UNIQUE INDEX IF NOT EXISTS ux_paper_stats_id ON paper_stats (id)")
+
+
+def downgrade() -> None:
+    op.execute("DROP MATERIALIZED VIEW IF EXISTS paper_stats")
@@ -0,0 +1,53 @@
+"""Índices compuestos y parciales para los listados del catálogo
+
+Un índice por listado de DatabaseService.get_papers_page, con el filtro del
+listado como predicado parcial y la clave keyset (orden, id) como columnas.
+Se crean CONCURRENTLY (fuera de la transacción de Alembic) para no bloquear
+escrituras sobre papers durante la construcción.
+
+Revision ID: 005_catalog_indexes
+Revises: 004_paper_stats
+Create Date: 2026-10-17
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '005_catalog_indexes'
+down_revision: Union[str, None] = '004_paper_stats'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (nombre, columnas/expresiones, predicado parcial)
+INDEXES = [
+    ('ix_papers_fecha_subida', ['fecha_subida', 'id'], None),
+    ('ix_papers_recent', ['fecha_subida', 'id'], 'procesado'),
+    ('ix_papers_quality', [sa.text('coalesce(score_calidad, -1.0)'), 'id'],
+     'procesado AND score_calidad IS NOT NULL'),
+    ('ix_papers_especialidad_quality', ['especialidad', sa.text('coalesce(score_calidad, -1.0)'), 'id'],
+     'procesado'),
+    ('ix_papers_categoria_recent', ['categoria', 'fecha_subida', 'id'], 'NOT deleted'),
+    ('ix_papers_quiz_recent', ['fecha_subida', 'id'], 'is_quiz'),
+    ('ix_papers_deleted_recent', [sa.text('coalesce(deleted_at, fecha_subida)'), 'id'], 'deleted'),
+]
+
+
+def upgrade() -> None:
+    # CREATE INDEX CONCURRENTLY no puede ejecutarse dentro de una transacción
+    with op.get_context().autocommit_block():
+        for name, columns, where in INDEXES:
+            op.create_index(
+                name, 'papers', columns,
+                postgresql_where=sa.text(where) if where else None,
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+    op.execute("ANALYZE papers")
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, _, _ in reversed(INDEXES):
+            op.drop_index(name, table_name='papers', postgresql_concurrently=True, if_exists=True)
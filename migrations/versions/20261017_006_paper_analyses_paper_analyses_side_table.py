@@ -0,0 +1,88 @@
+"""Artefactos pesados del análisis en una tabla aparte (paper_analyses)
+
+analisis_completo, analisis_graficos, referencias, affiliaciones y quiz_data salen
+de papers: los listados, filtros y el vacuum recorren filas compactas. Cada
+ejecución del pipeline guarda una versión nueva; papers.analysis_version apunta
+a la vigente. Los datos existentes pasan a la versión 1.
+
+DROP COLUMN no reduce el heap ya escrito: tras migrar, `VACUUM FULL papers`
+(o pg_repack) en una ventana de mantenimiento para recuperar el espacio.
+
+Revision ID: 006_paper_analyses
+Revises: 005_catalog_indexes
+Create Date: 2026-10-17
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = '006_paper_analyses'
+down_revision: Union[str, None] = '005_catalog_indexes'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'paper_analyses',
+        sa.Column('id', postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column('paper_id', postgresql.UUID(as_uuid=True),
+                  sa.ForeignKey('papers.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('version', sa.Integer(), nullable=False, server_default='1'),
+        sa.Column('created_at', sa.DateTime(), nullable=False, server_default=sa.func.now()),
+
+        # Artefactos
+        sa.Column('analisis_completo', sa.Text()),
+        sa.Column('analisis_graficos', postgresql.JSONB(), server_default='[]'),
+        sa.Column('referencias', postgresql.JSONB(), server_default='[]'),
+        sa.Column('affiliaciones', postgresql.JSONB(), server_default='[]'),
+        sa.Column('quiz_data', postgresql.JSONB(), server_default='{}'),
+        sa.UniqueConstraint('paper_id', 'version', name='uq_paper_analyses_paper_version'),
+    )
+    op.add_column('papers', sa.Column('analysis_version', sa.Integer()))
+
+    # Mover los datos existentes a la versión 1 (sólo papers con algún artefacto)
+    op.execute("""
+        INSERT INTO paper_analyses (id, paper_id, version, created_at, analisis_completo,
+                                    analisis_graficos, referencias, affiliaciones, quiz_data)
+        SELECT gen_random_uuid(), id, 1, coalesce(fecha_analisis, fecha_subida, now()),
+               analisis_completo, analisis_graficos, referencias, affiliaciones, quiz_data
+        FROM papers
+        WHERE analisis_completo IS NOT NULL
+           OR coalesce(analisis_graficos, '[]'::jsonb) <> '[]'::jsonb
+           OR coalesce(referencias, '[]'::jsonb) <> '[]'::jsonb
+           OR coalesce(affiliaciones, '[]'::jsonb) <> '[]'::jsonb
+           OR coalesce(quiz_data, '{}'::jsonb) <> '{}'::jsonb
+    """)
+    op.execute("""
+        UPDATE papers SET analysis_version = 1
+        FROM paper_analyses a WHERE a.paper_id = papers.id
+    """)
+
+    for column in ('analisis_completo', 'analisis_graficos', 'referencias', 'affiliaciones', 'quiz_data'):
+        op.drop_column('papers', column)
+
+
+def downgrade() -> None:
+    op.add_column('papers', sa.Column('analisis_completo', sa.Text()))
+    op.add_column('papers', sa.Column('analisis_graficos', postgresql.JSONB(), server_default='[]'))
+    op.add_column('papers', sa.Column('referencias', postgresql.JSONB(), server_default='[]'))
+    op.add_column('papers', sa.Column('affiliaciones', postgresql.JSONB(), server_default='[]'))
+    op.add_column('papers', sa.Column('quiz_data', postgresql.JSONB(), server_default='{}'))
+
+    # Restaurar la versión vigente de cada paper
+    op.execute("""
+        UPDATE papers SET analisis_completo = a.analisis_completo,
+                          analisis_graficos = a.analisis_graficos,
+                          referencias = a.referencias,
+                          affiliaciones = a.affiliaciones,
+                          quiz_data = a.quiz_data
+        FROM paper_analyses a
+        WHERE a.paper_id = papers.id AND a.version = papers.analysis_version
+    """)
+
+    op.drop_column('papers', 'analysis_version')
+    op.drop_table('paper_analyses')
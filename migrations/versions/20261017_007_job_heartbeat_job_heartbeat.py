@@ -0,0 +1,28 @@
+"""Heartbeat de los trabajos en curso (jobs.heartbeat_at)
+
+El worker actualiza heartbeat_at mientras ejecuta un trabajo; requeue_stale
+detecta workers caídos por heartbeat (no por la hora de inicio) y manda a
+'fallido' los trabajos que ya agotaron sus intentos.
+
+Revision ID: 007_job_heartbeat
+Revises: 006_paper_analyses
+Create Date: 2026-10-17
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '007_job_heartbeat'
+down_revision: Union[str, None] = '006_paper_analyses'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('jobs', sa.Column('heartbeat_at', sa.DateTime()))
+
+
+def downgrade() -> None:
+    op.drop_column('jobs', 'heartbeat_at')
@@ -0,0 +1,33 @@
+"""Generación de invalidación compartida del cache de papers (cache_generations)
+
+Cada escritura de papers incrementa la generación 'papers'; los procesos con el
+cache en proceso (LRU) la consultan periódicamente y vacían su cache si cambió,
+así las escrituras del worker o del batch invalidan también el cache de la API.
+
+Revision ID: 008_cache_generation
+Revises: 007_job_heartbeat
+Create Date: 2026-10-17
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '008_cache_generation'
+down_revision: Union[str, None] = '007_job_heartbeat'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    table = op.create_table(
+        'cache_generations',
+        sa.Column('name', sa.String(50), primary_key=True),
+        sa.Column('generation', sa.BigInteger(), nullable=False, server_default='0'),
+    )
+    op.bulk_insert(table, [{'name': 'papers', 'generation': 0}])
+
+
+def downgrade() -> None:
+    op.drop_table('cache_generations')
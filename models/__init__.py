@@ -1,4 +1,5 @@
 # Modelos de MedFlix Core
 from .paper import Paper, Base, init_db, get_session, get_database_url
+from .paper_analysis import PaperAnalysis, ANALYSIS_FIELDS
 from .channel import Channel
-
+from .job import Job
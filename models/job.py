@@ -0,0 +1,63 @@
+from sqlalchemy import Column, String, Integer, DateTime, Text, JSON, Index
+from sqlalchemy.dialects.postgresql import UUID, JSONB
+from datetime import datetime
+import uuid
+from .paper import Base
+
+# JSONB en PostgreSQL, JSON genérico en otros motores (tests)
+JSONType = JSON().with_variant(JSONB(), "postgresql")
+
+
+class Job(Base):
+    """
+    Trabajo de la cola de procesamiento persistente.
+    Los workers lo reclaman con SELECT ... FOR UPDATE SKIP LOCKED.
+    """
+    __tablename__ = 'jobs'
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    tipo = Column(String(50), nullable=False, default='analyze_pdf')
+    payload = Column(JSONType, default=dict)  # {file_path, analyze_graphs, ...}
+
+    # Estado: pendiente, procesando, completado, fallido
+    status = Column(String(20), nullable=False, default='pendiente')
+    priority = Column(Integer, nullable=False, default=0)  # Mayor = antes
+    message = Column(Text)
+    result = Column(JSONType)
+
+    # Reintentos
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=3)
+    run_after = Column(DateTime, nullable=False, default=datetime.utcnow)  # Backoff entre reintentos
+
+    # Worker que lo tiene reclamado
+    locked_by = Column(String(100))
+
+    # Timestamps (para métricas de latencia)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    started_at = Column(DateTime)
+    finished_at = Column(DateTime)
+    heartbeat_at = Column(DateTime)  # Lo actualiza el worker mientras ejecuta el trabajo
+
+    __table_args__ = (
+        # Índice de la consulta de reclamo: pendientes por prioridad y antigüedad
+        Index('ix_jobs_claim', 'status', 'priority', 'created_at'),
+    )
+
+    def to_dict(self):
+        return {
+            "job_id": str(self.id),
+            "tipo": self.tipo,
+            "payload": self.payload or {},
+            "status": self.status,
+            "priority": self.priority,
+            "message": self.message,
+            "result": self.result,
+            "attempts": self.attempts,
+            "max_attempts": self.max_attempts,
+            "locked_by": self.locked_by,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+            "heartbeat_at": self.heartbeat_at.isoformat() if self.heartbeat_at else None
+        }
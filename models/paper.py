@@ -2,16 +2,53 @@
 Modelos de Base de Datos para MedFlix Core
 Usando SQLAlchemy para PostgreSQL
 """
-from sqlalchemy import Column, String, Integer, Float, Text, DateTime, JSON, Boolean, create_engine
-from sqlalchemy.dialects.postgresql import UUID, JSONB
+from sqlalchemy import Column, String, Integer, Float, Text, DateTime, JSON, Boolean, Computed, Index, create_engine, inspect, text
+from sqlalchemy.dialects.postgresql import UUID, JSONB, TSVECTOR
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import sessionmaker, deferred, relationship
 from datetime import datetime
 import uuid
 import os
 
 Base = declarative_base()
 
+# Vector de búsqueda full-text (columna generada en PostgreSQL).
+# Título y abstract en español e inglés; tags, MeSH y autores como términos.
+# Pesos: A = título, B = tags/MeSH, C = abstract, D = autores.
+SEARCH_VECTOR_SQL = (
+    "setweight(to_tsvector('spanish'::regconfig, coalesce(titulo, '')), 'A') || "
+    "setweight(to_tsvector('english'::regconfig, coalesce(titulo, '')), 'A') || "
+    "setweight(jsonb_to_tsvector('spanish'::regconfig, coalesce(tags, '[]'::jsonb), '[\"string\"]'), 'B') || "
+    "setweight(jsonb_to_tsvector('english'::regconfig, coalesce(mesh_terms, '[]'::jsonb), '[\"string\"]'), 'B') || "
+    "setweight(to_tsvector('spanish'::regconfig, coalesce(abstract, '')), 'C') || "
+    "setweight(to_tsvector('english'::regconfig, coalesce(abstract, '')), 'C') || "
+    "setweight(jsonb_to_tsvector('simple'::regconfig, coalesce(autores, '[]'::jsonb), '[\"string\"]'), 'D')"
+)
+
+
+# Estadísticas del catálogo en una sola pasada (FILTER en vez de una consulta por métrica).
+# Es el cuerpo de la vista materializada paper_stats (una fila); la API lee la vista
+# y la ingesta la refresca (REFRESH ... CONCURRENTLY requiere el índice único sobre id).
+PAPER_STATS_VIEW = "paper_stats"
+PAPER_STATS_SQL = (
+    "SELECT 1 AS id, "
+    "count(*) AS total_papers, "
+    "count(*) FILTER (WHERE procesado) AS procesados, "
+    "count(*) FILTER (WHERE num_graficos > 0) AS con_graficos, "
+    "count(DISTINCT especialidad) AS especialidades, "
+    "coalesce(avg(score_calidad), 0) AS score_promedio, "
+    "coalesce((SELECT jsonb_object_agg(b.especialidad, b.n) FROM ("
+    "SELECT especialidad, count(*) AS n FROM papers "
+    "WHERE procesado AND especialidad IS NOT NULL GROUP BY especialidad) b), '{}'::jsonb) "
+    "AS especialidades_breakdown, "
+    "now() AS refreshed_at "
+    "FROM papers"
+)
+PAPER_STATS_DDL = (
+    f"CREATE MATERIALIZED VIEW IF NOT EXISTS {PAPER_STATS_VIEW} AS {PAPER_STATS_SQL}",
+    f"CREATE UNIQUE INDEX IF NOT EXISTS ux_{PAPER_STATS_VIEW}_id ON {PAPER_STATS_VIEW} (id)",
+)
+
 
 class Paper(Base):
     """Modelo completo de paper médico."""
@@ -47,10 +84,8 @@ class Paper(Base):
     pmid = Column(String(20), index=True)  # PubMed ID
     mesh_terms = Column(JSONB, default=list)  # ["Cardiovascular Diseases", "Biomarkers/blood"]
     abstract_estructurado = Column(JSONB, default=dict)  # {antecedentes, metodos, resultados, conclusiones}
-    affiliaciones = Column(JSONB, default=list)  # [{author, institution, country}]
     funders = Column(JSONB, default=list)  # [{name, doi, award}]
     license = Column(String(500))  # URL licencia CC-BY, etc.
-    referencias = Column(JSONB, default=list)  # [{doi, key}]
     crossmark_status = Column(String(50))  # current, updated, retracted
     metadata_source = Column(String(50))  # pubmed, crossref, merged
     doi_validado = Column(Boolean, default=False)  # DOI verificado via doi.org
@@ -58,18 +93,15 @@ class Paper(Base):
     # Análisis IA
     veredicto_ia = Column(String(100)) # "Aprobado", "Evidencia Baja", etc.
     resumen_slide = Column(Text)  # Frase para diapositiva
-    analisis_completo = Column(Text)  # Auditoría epistemológica completa
     score_calidad = Column(Float)  # 0-10, calculado de la auditoría
     
     # EKG Dojo / Quiz Mode
     is_quiz = Column(Boolean, default=False, index=True)
-    quiz_data = Column(JSONB, default=dict) # {question, options, correct, explanation}
     
     # Imágenes y Gráficos
     thumbnail_path = Column(String(500))  # Ruta a imagen de portada
     imagenes = Column(JSONB, default=list)  # Lista de rutas a imágenes extraídas
     num_graficos = Column(Integer, default=0)
-    analisis_graficos = Column(JSONB, default=list)  # Análisis VLM de cada gráfico
     
     # Archivo Original
     archivo_path = Column(String(500))
@@ -103,11 +135,53 @@ class Paper(Base):
     
     # Modo Guardia (UCI/ER)
     clinical_insights = Column(JSONB, default=dict) # {bottom_line, key_dosages, safety_warnings, grade}
+    
+    # Artefactos pesados (auditoría, análisis de gráficos, referencias, afiliaciones, quiz)
+    # en paper_analyses, versionados por ejecución del pipeline (models.paper_analysis).
+    # lazy="raise": sólo el detalle los carga (joinedload en get_paper_by_id).
+    analysis_version = Column(Integer)
+    analysis = relationship(
+        "PaperAnalysis",
+        primaryjoin="and_(Paper.id == foreign(PaperAnalysis.paper_id), "
+                    "Paper.analysis_version == foreign(PaperAnalysis.version))",
+        viewonly=True, uselist=False, lazy="raise"
+    )
+    
+    # Búsqueda full-text (generada por PostgreSQL, no se carga salvo que se pida)
+    search_vector = deferred(Column(TSVECTOR, Computed(SEARCH_VECTOR_SQL, persisted=True)))
+    
+    # Índices de los listados del catálogo (DatabaseService.get_papers_page). Cada uno
+    # sigue el filtro + orden keyset (clave, id) de un listado; los DESC se resuelven
+    # recorriendo el índice hacia atrás. Los parciales sólo indexan las filas del listado.
+    __table_args__ = (
+        Index('ix_papers_search_vector', 'search_vector', postgresql_using='gin'),
+        # all
+        Index('ix_papers_fecha_subida', 'fecha_subida', 'id'),
+        # recent
+        Index('ix_papers_recent', 'fecha_subida', 'id', postgresql_where=text('procesado')),
+        # quality
+        Index('ix_papers_quality', text('coalesce(score_calidad, -1.0)'), 'id',
+              postgresql_where=text('procesado AND score_calidad IS NOT NULL')),
+        # especialidad
+        Index('ix_papers_especialidad_quality', 'especialidad', text('coalesce(score_calidad, -1.0)'), 'id',
+              postgresql_where=text('procesado')),
+        # categoria (sin eliminados)
+        Index('ix_papers_categoria_recent', 'categoria', 'fecha_subida', 'id',
+              postgresql_where=text('NOT deleted')),
+        # quiz
+        Index('ix_papers_quiz_recent', 'fecha_subida', 'id', postgresql_where=text('is_quiz')),
+        # deleted
+        Index('ix_papers_deleted_recent', text('coalesce(deleted_at, fecha_subida)'), 'id',
+              postgresql_where=text('deleted')),
+    )
 
     
     def to_dict(self):
-        """Convierte el modelo a diccionario para APIs."""
-        return {
+        """
+        Convierte el modelo a diccionario para APIs.
+        Los artefactos de paper_analyses se incluyen sólo si la relación está cargada.
+        """
+        data = {
             "id": str(self.id),
             "hash": self.hash,
             "doi": self.doi,
@@ -128,17 +202,14 @@ class Paper(Base):
             "pmid": self.pmid,
             "mesh_terms": self.mesh_terms or [],
             "abstract_estructurado": self.abstract_estructurado or {},
-            "affiliaciones": self.affiliaciones or [],
             "funders": self.funders or [],
             "license": self.license,
-            "referencias": self.referencias or [],
             "crossmark_status": self.crossmark_status,
             "metadata_source": self.metadata_source,
             "doi_validado": self.doi_validado,
             # Análisis IA
             "veredicto_ia": self.veredicto_ia,
             "resumen_slide": self.resumen_slide,
-            "analisis_completo": self.analisis_completo,
             "score_calidad": self.score_calidad,
             "thumbnail_path": self.thumbnail_path,
             "imagenes": self.imagenes or [],
@@ -150,7 +221,6 @@ class Paper(Base):
             "fecha_analisis": self.fecha_analisis.isoformat() if self.fecha_analisis else None,
             "procesado": self.procesado,
             "is_quiz": self.is_quiz,
-            "quiz_data": self.quiz_data or {},
             # Campos de categorización
             "categoria": self.categoria,
             "deleted": self.deleted,
@@ -166,7 +236,11 @@ class Paper(Base):
             "open_library_id": self.open_library_id,
             "clinical_insights": self.clinical_insights or {}
         }
-
+        if "analysis" not in inspect(self).unloaded:
+            data.update(self.analysis.to_dict() if self.analysis else {
+                "analisis_completo": None, "referencias": [], "affiliaciones": [], "quiz_data": {}
+            })
+        return data
 
     
     def to_card_dict(self):
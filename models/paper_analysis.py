@@ -0,0 +1,41 @@
+from sqlalchemy import Column, ForeignKey, Integer, Text, DateTime, UniqueConstraint
+from sqlalchemy.dialects.postgresql import UUID, JSONB
+from datetime import datetime
+import uuid
+from .paper import Base
+
+# Artefactos pesados del análisis: viven fuera de papers para que los listados,
+# filtros y el vacuum recorran filas compactas. Se leen sólo en el detalle.
+ANALYSIS_FIELDS = ("analisis_completo", "analisis_graficos", "referencias", "affiliaciones", "quiz_data")
+
+
+class PaperAnalysis(Base):
+    """
+    Versión de los artefactos de análisis de un paper.
+    Cada ejecución del pipeline (mark_as_processed) crea una versión nueva;
+    papers.analysis_version apunta a la vigente.
+    """
+    __tablename__ = 'paper_analyses'
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    paper_id = Column(UUID(as_uuid=True), ForeignKey('papers.id', ondelete='CASCADE'), nullable=False)
+    version = Column(Integer, nullable=False, default=1)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    analisis_completo = Column(Text)  # Auditoría epistemológica completa (markdown)
+    analisis_graficos = Column(JSONB, default=list)  # Análisis VLM de cada gráfico
+    referencias = Column(JSONB, default=list)  # [{doi, key}]
+    affiliaciones = Column(JSONB, default=list)  # [{author, institution, country}]
+    quiz_data = Column(JSONB, default=dict)  # {question, options, correct, explanation}
+
+    __table_args__ = (
+        UniqueConstraint('paper_id', 'version', name='uq_paper_analyses_paper_version'),
+    )
+
+    def to_dict(self):
+        return {
+            "analisis_completo": self.analisis_completo,
+            "referencias": self.referencias or [],
+            "affiliaciones": self.affiliaciones or [],
+            "quiz_data": self.quiz_data or {},
+        }
@@ -0,0 +1,253 @@
+"""
+Servicio de Base de Datos asíncrono para los endpoints FastAPI.
+SQLAlchemy asyncio + asyncpg: las consultas no bloquean el event loop.
+Usa las mismas sentencias que DatabaseService (services.database); el servicio
+síncrono sigue siendo el de scripts, workers y el bot.
+"""
+import logging
+import os
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy.exc import ProgrammingError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm.attributes import set_committed_value
+
+from models.paper import Paper, get_database_url
+from services.database import (
+    CATEGORIAS,
+    LISTING_SORTS,
+    analysis_values,
+    analysis_write_statement,
+    as_uuid,
+    build_stats,
+    bump_cache_generation_statement,
+    current_analysis_statement,
+    especialidades_statement,
+    page_statement,
+    paper_detail_statement,
+    paper_values,
+    papers_by_ids_statement,
+    search_statement,
+    stats_cache,
+    stats_refresher,
+    stats_live_statement,
+    stats_view_statement,
+    update_paper_statement,
+)
+from services.pagination import Page, build_page
+from services.paper_cache import invalidate_paper, shared_generation_enabled
+
+logger = logging.getLogger(__name__)
+
+
+def get_async_database_url() -> str:
+    """URL de get_database_url() con el driver asyncpg."""
+    return get_database_url().replace("postgresql://", "postgresql+asyncpg://", 1)
+
+
+def pool_options() -> Dict[str, Any]:
+    """
+    Pool de conexiones del engine asíncrono (configurable por entorno).
+    pool_size + max_overflow acota las conexiones por proceso de la API.
+    """
+    return {
+        "pool_size": int(os.getenv("DB_POOL_SIZE", "10")),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "10")),
+        "pool_timeout": float(os.getenv("DB_POOL_TIMEOUT", "10")),
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", "1800")),
+        "pool_pre_ping": True,
+    }
+
+
+class AsyncDatabaseService:
+    """Operaciones de papers para la API, sobre AsyncSession."""
+
+    def __init__(self, database_url: Optional[str] = None, **engine_options):
+        self.database_url = database_url or get_async_database_url()
+        self.engine = create_async_engine(self.database_url, **{**pool_options(), **engine_options})
+        # expire_on_commit=False: los objetos siguen legibles al cerrar la sesión
+        self.SessionLocal = async_sessionmaker(self.engine, expire_on_commit=False)
+
+    @asynccontextmanager
+    async def get_session(self) -> AsyncSession:
+        """Context manager para sesiones asíncronas (commit al salir, rollback si falla)."""
+        session = self.SessionLocal()
+        try:
+            yield session
+            await session.commit()
+        except Exception as e:
+            await session.rollback()
+            logger.error(f"Error en sesión de base de datos: {e}")
+            raise
+        finally:
+            await session.close()
+
+    async def dispose(self):
+        """Cierra las conexiones del pool (shutdown de la API)."""
+        await self.engine.dispose()
+
+    # ==================== READ ====================
+
+    async def get_paper_by_id(self, paper_id: str) -> Optional[Paper]:
+        """Obtiene un paper por su ID, con su análisis vigente (paper_analyses)."""
+        pid = as_uuid(paper_id)
+        if pid is None:
+            return None
+        async with self.get_session() as session:
+            return (await session.scalars(paper_detail_statement(pid))).unique().first()
+
+    async def get_papers_page(self,
+                              listing: str = "recent",
+                              limit: int = 20,
+                              cursor: Optional[str] = None,
+                              offset: int = 0,
+                              especialidad: Optional[str] = None,
+                              categoria: Optional[str] = None,
+                              include_deleted: bool = False,
+                              cards: bool = False) -> Page:
+        """Listados paginados por keyset (ver DatabaseService.get_papers_page)."""
+        stmt = page_statement(
+            listing, limit, cursor=cursor, offset=offset, especialidad=especialidad,
+            categoria=categoria, include_deleted=include_deleted, cards=cards
+        )
+        async with self.get_session() as session:
+            rows = (await session.scalars(stmt)).all()
+        return build_page(rows, LISTING_SORTS[listing], limit)
+
+    async def get_papers_by_ids(self, paper_ids: List[str], cards: bool = False) -> Dict[str, Paper]:
+        """Obtiene varios papers en una sola consulta. Retorna {id: Paper}."""
+        unique_ids = [pid for pid in dict.fromkeys(as_uuid(p) for p in paper_ids if p) if pid]
+        if not unique_ids:
+            return {}
+        async with self.get_session() as session:
+            papers = (await session.scalars(papers_by_ids_statement(unique_ids, cards))).all()
+        return {str(paper.id): paper for paper in papers}
+
+    async def search_papers(self, query: str, limit: int = 20, cards: bool = False) -> List[Paper]:
+        """Búsqueda full-text (ver DatabaseService.search_papers)."""
+        stmt = search_statement(query, limit, cards=cards)
+        if stmt is None:
+            return []
+        async with self.get_session() as session:
+            return list((await session.scalars(stmt)).all())
+
+    async def get_all_especialidades(self) -> List[str]:
+        """Obtiene lista única de especialidades."""
+        async with self.get_session() as session:
+            return [e for e in (await session.scalars(especialidades_statement())).all() if e]
+
+    async def get_stats(self) -> Dict[str, Any]:
+        """Estadísticas del catálogo desde paper_stats, con el cache en proceso compartido."""
+        cached = stats_cache.get()
+        if cached is not None:
+            return cached
+        try:
+            async with self.get_session() as session:
+                row = (await session.execute(stats_view_statement())).mappings().first()
+        except ProgrammingError:
+            async with self.get_session() as session:
+                row = (await session.execute(stats_live_statement())).mappings().first()
+        stats = build_stats(row)
+        stats_cache.set(stats)
+        return stats
+
+    def mark_stats_dirty(self):
+        """Invalida el cache y marca paper_stats para el refresco diferido (ver StatsRefresher)."""
+        stats_cache.invalidate()
+        stats_refresher.mark_dirty()
+
+    @staticmethod
+    async def _bump_shared_generation(session: AsyncSession):
+        """Publica la escritura a los caches de otros procesos, por la misma AsyncSession."""
+        if shared_generation_enabled():
+            await session.execute(bump_cache_generation_statement())
+
+    # ==================== UPDATE ====================
+
+    async def update_paper(self, paper_id: str, **kwargs) -> Optional[Paper]:
+        """
+        Actualiza campos de un paper existente (UPDATE ... RETURNING, un round trip).
+        Los artefactos de ANALYSIS_FIELDS van a paper_analyses en la misma transacción
+        (ver DatabaseService.update_paper).
+        """
+        pid = as_uuid(paper_id)
+        if pid is None:
+            return None
+        values, analysis = paper_values(kwargs), analysis_values(kwargs)
+        if not values and not analysis:
+            return await self.get_paper_by_id(pid)
+        async with self.get_session() as session:
+            if analysis:
+                current = (await session.scalars(current_analysis_statement(pid))).first()
+                analysis_stmt, values["analysis_version"] = analysis_write_statement(pid, current, analysis)
+            result = await session.scalars(
+                update_paper_statement(pid, values),
+                execution_options={"synchronize_session": False}
+            )
+            paper = result.first()
+            if paper and analysis:
+                written = await session.scalars(analysis_stmt, execution_options={"populate_existing": True})
+                set_committed_value(paper, "analysis", written.one())
+            if paper:
+                await self._bump_shared_generation(session)
+        if paper:
+            invalidate_paper(pid)
+        return paper
+
+    async def change_categoria(self, paper_id: str, nueva_categoria: str) -> Optional[Paper]:
+        """Cambia la categoría de un paper."""
+        if nueva_categoria not in CATEGORIAS:
+            return None
+        return await self.update_paper(paper_id, categoria=nueva_categoria)
+
+    # ==================== DELETE ====================
+
+    async def soft_delete_paper(self, paper_id: str) -> bool:
+        """Marca un paper como eliminado (soft delete). No se vuelve a descargar."""
+        return await self._update_and_refresh(paper_id, deleted=True, deleted_at=datetime.utcnow())
+
+    async def restore_paper(self, paper_id: str) -> bool:
+        """Restaura un paper eliminado."""
+        return await self._update_and_refresh(paper_id, deleted=False, deleted_at=None)
+
+    async def delete_paper(self, paper_id: str) -> bool:
+        """Elimina permanentemente un paper de la base de datos."""
+        pid = as_uuid(paper_id)
+        if pid is None:
+            return False
+        async with self.get_session() as session:
+            paper = await session.get(Paper, pid)
+            if not paper:
+                return False
+            await session.delete(paper)
+            await self._bump_shared_generation(session)
+        invalidate_paper(pid)
+        self.mark_stats_dirty()
+        return True
+
+    async def _update_and_refresh(self, paper_id: str, **kwargs) -> bool:
+        if await self.update_paper(paper_id, **kwargs) is None:
+            return False
+        self.mark_stats_dirty()
+        return True
+
+
+# Singleton para uso global
+_async_db_service = None
+
+def get_async_db_service() -> AsyncDatabaseService:
+    """Obtiene la instancia global del servicio asíncrono (el esquema lo crea el servicio síncrono/Alembic)."""
+    global _async_db_service
+    if _async_db_service is None:
+        _async_db_service = AsyncDatabaseService()
+    return _async_db_service
+
+
+async def close_async_db_service():
+    """Libera el pool del singleton, si se llegó a crear."""
+    global _async_db_service
+    if _async_db_service is not None:
+        await _async_db_service.dispose()
+        _async_db_service = None
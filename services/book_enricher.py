@@ -6,12 +6,15 @@ Usa OpenLibrary (principal) y Google Books (fallback) para obtener:
 - Descripción, idioma
 """
 
-import requests
 import re
 import logging
 from typing import Optional, Dict, Any
 from pathlib import Path
 
+import httpx
+
+from services.http_clients import get_http_client
+
 logger = logging.getLogger(__name__)
 
 
@@ -23,9 +26,11 @@ class BookMetadataEnricher:
     OPENLIBRARY_COVERS = "https://covers.openlibrary.org/b/isbn/{isbn}-{size}.jpg"
     GOOGLE_BOOKS_API = "https://www.googleapis.com/books/v1/volumes"
     
-    def __init__(self, covers_dir: str = "data/covers"):
+    def __init__(self, covers_dir: str = "data/covers", http: Optional[httpx.Client] = None):
         self.covers_dir = Path(covers_dir)
         self.covers_dir.mkdir(parents=True, exist_ok=True)
+        # Cliente compartido (keep-alive) para OpenLibrary, portadas y Google Books
+        self.http = http or get_http_client("books")
     
     def extract_isbn_from_text(self, text: str) -> Optional[str]:
         """Extrae ISBN del texto de un PDF."""
@@ -80,7 +85,7 @@ class BookMetadataEnricher:
         """Busca en OpenLibrary por ISBN."""
         try:
             url = self.OPENLIBRARY_ISBN.format(isbn=isbn)
-            res = requests.get(url, timeout=10)
+            res = self.http.get(url, timeout=10)
             
             if res.status_code != 200:
                 return None
@@ -112,7 +117,7 @@ class BookMetadataEnricher:
             if author:
                 params['author'] = author
             
-            res = requests.get(self.OPENLIBRARY_SEARCH, params=params, timeout=10)
+            res = self.http.get(self.OPENLIBRARY_SEARCH, params=params, timeout=10)
             
             if res.status_code != 200:
                 return None
@@ -145,7 +150,7 @@ class BookMetadataEnricher:
         """Busca en Google Books API."""
         try:
             params = {'q': query, 'maxResults': 1}
-            res = requests.get(self.GOOGLE_BOOKS_API, params=params, timeout=10)
+            res = self.http.get(self.GOOGLE_BOOKS_API, params=params, timeout=10)
             
             if res.status_code != 200:
                 return None
@@ -192,7 +197,7 @@ class BookMetadataEnricher:
             return None
         
         try:
-            res = requests.get(cover_url, timeout=15)
+            res = self.http.get(cover_url, timeout=15)
             if res.status_code != 200 or len(res.content) < 1000:  # Imagen vacía
                 return None
             
@@ -3,17 +3,349 @@ Servicio de Base de Datos para MedFlix Core
 Maneja operaciones CRUD sobre PostgreSQL
 """
 import logging
+import os
+import re
+import threading
+import time
+import uuid
 from typing import List, Optional, Dict, Any
-from sqlalchemy import create_engine, desc, or_
-from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy import and_, create_engine, desc, or_, func, insert, select, text, update
+from sqlalchemy.exc import ProgrammingError
+from sqlalchemy.orm import sessionmaker, Session, joinedload, load_only
+from sqlalchemy.orm.attributes import set_committed_value
 from datetime import datetime
 from contextlib import contextmanager
 
-from models.paper import Paper, Base, get_database_url
+from models.paper import Paper, Base, get_database_url, PAPER_STATS_VIEW, PAPER_STATS_SQL, PAPER_STATS_DDL
+from models.paper_analysis import ANALYSIS_FIELDS, PaperAnalysis
 from models.channel import Channel
+from models.job import Job
+from services.pagination import Page, build_page, keyset_statement
+from services.paper_cache import invalidate_paper, invalidate_papers, shared_generation_enabled
 
 logger = logging.getLogger(__name__)
 
+# Listado -> orden keyset (ver services.pagination.KEYSET_SORTS)
+LISTING_SORTS = {
+    "all": "recent",
+    "recent": "recent",
+    "quality": "quality",
+    "especialidad": "quality",
+    "categoria": "recent",
+    "quiz": "recent",
+    "deleted": "deleted",
+}
+
+# Columnas que usa Paper.to_card_dict, más las claves del keyset (fecha_subida, deleted_at).
+# Los listados de tarjetas cargan sólo esto: abstract, funders, mesh_terms... y los artefactos
+# de paper_analyses (varios KB por fila) se leen únicamente en get_paper_by_id.
+CARD_COLUMNS = (
+    Paper.id, Paper.titulo, Paper.autores, Paper.año, Paper.tipo_estudio, Paper.especialidad,
+    Paper.n_muestra, Paper.score_calidad, Paper.thumbnail_path, Paper.cover_path,
+    Paper.resumen_slide, Paper.categoria, Paper.clinical_insights,
+    Paper.fecha_subida, Paper.deleted_at,
+)
+
+
+CATEGORIAS = ('papers', 'libros', 'ekg_dojo', 'sin_categorizar')
+
+
+# Columnas que se pueden escribir (search_vector la calcula PostgreSQL)
+PAPER_COLUMNS = frozenset(attr.key for attr in Paper.__mapper__.column_attrs) - {"id", "search_vector"}
+
+
+def as_uuid(paper_id) -> Optional[uuid.UUID]:
+    """Id de paper como UUID; None si está mal formado (equivale a inexistente)."""
+    if isinstance(paper_id, uuid.UUID):
+        return paper_id
+    try:
+        return uuid.UUID(str(paper_id))
+    except ValueError:
+        return None
+
+
+def paper_values(fields: Dict[str, Any]) -> Dict[str, Any]:
+    """Filtra a columnas de Paper; las claves desconocidas se ignoran."""
+    return {key: value for key, value in fields.items() if key in PAPER_COLUMNS}
+
+
+def analysis_values(fields: Dict[str, Any]) -> Dict[str, Any]:
+    """Filtra a los artefactos que se guardan en paper_analyses (ANALYSIS_FIELDS)."""
+    return {key: value for key, value in fields.items() if key in ANALYSIS_FIELDS}
+
+
+# ==================== CONSULTAS ====================
+# Sentencias select() compartidas por DatabaseService y AsyncDatabaseService
+# (services.async_database): cada servicio sólo se encarga de ejecutarlas.
+
+def paper_select(cards: bool = False):
+    """select(Paper); con cards=True proyectado a CARD_COLUMNS (leer otro campo lanza error)."""
+    stmt = select(Paper)
+    if cards:
+        stmt = stmt.options(load_only(*CARD_COLUMNS, raiseload=True))
+    return stmt
+
+
+def listing_statement(listing: str,
+                      especialidad: Optional[str] = None,
+                      categoria: Optional[str] = None,
+                      include_deleted: bool = False,
+                      cards: bool = False):
+    """Filtros de cada listado (ver DatabaseService.get_papers_page), sin orden ni límite."""
+    if listing not in LISTING_SORTS:
+        raise ValueError(f"Listado no soportado: {listing}")
+    
+    stmt = paper_select(cards)
+    if listing in ("recent", "quality", "especialidad"):
+        stmt = stmt.where(Paper.procesado == True)
+    if listing == "quality":
+        stmt = stmt.where(Paper.score_calidad.isnot(None))
+    elif listing == "especialidad":
+        stmt = stmt.where(Paper.especialidad == especialidad)
+    elif listing == "categoria":
+        stmt = stmt.where(Paper.categoria == categoria)
+        if not include_deleted:
+            stmt = stmt.where(Paper.deleted == False)
+    elif listing == "quiz":
+        stmt = stmt.where(Paper.is_quiz == True)
+    elif listing == "deleted":
+        stmt = stmt.where(Paper.deleted == True)
+    return stmt
+
+
+def page_statement(listing: str, limit: int, cursor: Optional[str] = None, offset: int = 0, **filters):
+    """listing_statement + keyset. Lanza InvalidCursorError antes de tocar la base."""
+    return keyset_statement(
+        listing_statement(listing, **filters), LISTING_SORTS[listing], limit, cursor=cursor, offset=offset
+    )
+
+
+def paper_detail_statement(paper_id: uuid.UUID):
+    """Paper completo con su versión vigente de paper_analyses (un solo SELECT con LEFT JOIN)."""
+    return select(Paper).options(joinedload(Paper.analysis)).where(Paper.id == paper_id)
+
+
+def papers_by_ids_statement(paper_ids: List[str], cards: bool = False):
+    return paper_select(cards).where(Paper.id.in_(paper_ids), Paper.deleted == False)
+
+
+def insert_paper_statement(values: Dict[str, Any]):
+    """INSERT ... RETURNING: el paper creado vuelve en el mismo round trip."""
+    return insert(Paper).values(**values).returning(Paper)
+
+
+def update_paper_statement(paper_id: uuid.UUID, values: Dict[str, Any]):
+    """UPDATE ... RETURNING: todos los cambios de un paper en una sola sentencia."""
+    return update(Paper).where(Paper.id == paper_id).values(**values).returning(Paper)
+
+
+def current_analysis_statement(paper_id: uuid.UUID):
+    """Versión vigente de paper_analyses de un paper (la que apunta papers.analysis_version)."""
+    return select(PaperAnalysis).join(Paper, and_(
+        Paper.id == PaperAnalysis.paper_id, Paper.analysis_version == PaperAnalysis.version
+    )).where(Paper.id == paper_id)
+
+
+def analysis_write_statement(paper_id: uuid.UUID,
+                             current: Optional[PaperAnalysis],
+                             values: Dict[str, Any],
+                             new_run: bool = False):
+    """
+    Sentencia que guarda `values` en paper_analyses, y la versión vigente resultante.
+    Una ejecución del pipeline (new_run) crea la versión siguiente arrastrando los
+    artefactos que no cambian; el resto de escrituras corrige la versión vigente.
+    """
+    if current is None or new_run:
+        version = current.version + 1 if current else 1
+        carried = {field: getattr(current, field) for field in ANALYSIS_FIELDS} if current else {}
+        stmt = insert(PaperAnalysis).values(paper_id=paper_id, version=version, **{**carried, **values})
+        return stmt.returning(PaperAnalysis), version
+    stmt = update(PaperAnalysis).where(PaperAnalysis.id == current.id).values(**values)
+    return stmt.returning(PaperAnalysis), current.version
+
+
+def missing_enrichment_statement(limit: int, after: Optional[uuid.UUID] = None):
+    """
+    Papers con DOI y sin enriquecimiento externo (metadata_source vacío), por id.
+    Sólo las columnas que necesita el backfill (enrichment_update_fields).
+    """
+    query = select(Paper.id, Paper.doi, Paper.titulo, Paper.abstract).where(
+        Paper.doi.isnot(None), Paper.doi != '', Paper.metadata_source.is_(None), Paper.deleted == False
+    )
+    if after is not None:
+        query = query.where(Paper.id > after)
+    return query.order_by(Paper.id).limit(limit)
+
+
+def especialidades_statement():
+    return select(Paper.especialidad).where(Paper.especialidad.isnot(None)).distinct()
+
+
+def stats_view_statement():
+    """Lectura de la vista materializada paper_stats (una fila, costo constante)."""
+    return text(f"SELECT * FROM {PAPER_STATS_VIEW}")
+
+
+def stats_live_statement():
+    """Mismo agregado calculado en vivo (si la vista aún no existe)."""
+    return text(PAPER_STATS_SQL)
+
+
+def refresh_stats_statement():
+    # CONCURRENTLY: no bloquea las lecturas de la vista mientras se recalcula
+    return text(f"REFRESH MATERIALIZED VIEW CONCURRENTLY {PAPER_STATS_VIEW}")
+
+
+def bump_cache_generation_statement(name: str = "papers"):
+    # Se ejecuta en la transacción de la escritura: un UPDATE por escritura o lote
+    return text(
+        "UPDATE cache_generations SET generation = generation + 1 WHERE name = :name"
+    ).bindparams(name=name)
+
+
+def build_stats(row) -> Dict[str, Any]:
+    """Respuesta de get_stats a partir de una fila de paper_stats."""
+    total = row["total_papers"] or 0
+    procesados = row["procesados"] or 0
+    refreshed_at = row.get("refreshed_at")
+    return {
+        "total_papers": total,
+        "procesados": procesados,
+        "pendientes": total - procesados,
+        "con_graficos": row["con_graficos"] or 0,
+        "especialidades": row["especialidades"] or 0,
+        "especialidades_breakdown": dict(row["especialidades_breakdown"] or {}),
+        "score_promedio": round(float(row["score_promedio"] or 0), 2),
+        "actualizado": refreshed_at.isoformat() if refreshed_at else None
+    }
+
+
+class StatsCache:
+    """
+    Cache en proceso de get_stats: TTL + invalidación al procesar o eliminar papers.
+    Lo comparten DatabaseService y AsyncDatabaseService del mismo proceso; entre
+    procesos (API / worker) manda el TTL.
+    """
+    
+    def __init__(self, ttl_seconds: float = 60.0):
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._value: Optional[Dict[str, Any]] = None
+        self._expires_at = 0.0
+    
+    def get(self) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            if self._value is not None and time.monotonic() < self._expires_at:
+                return self._value
+            return None
+    
+    def set(self, value: Dict[str, Any]):
+        with self._lock:
+            self._value = value
+            self._expires_at = time.monotonic() + self.ttl_seconds
+    
+    def invalidate(self):
+        with self._lock:
+            self._value = None
+
+
+stats_cache = StatsCache(float(os.getenv("STATS_CACHE_TTL_SECONDS", "60")))
+
+
+class StatsRefresher:
+    """
+    Refresco diferido (debounce) de paper_stats. Las escrituras sólo marcan la vista
+    como sucia; un timer la recalcula en segundo plano como mucho una vez cada
+    `delay_seconds`, sea cual sea el número de papers escritos entretanto.
+    Con delay_seconds <= 0 se refresca en línea. `flush()` fuerza el refresco
+    pendiente (fin de un lote, shutdown del proceso).
+    """
+    
+    def __init__(self, delay_seconds: float = 30.0):
+        self.delay_seconds = delay_seconds
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._timer: Optional[threading.Timer] = None
+    
+    def mark_dirty(self):
+        with self._lock:
+            self._dirty = True
+            if self.delay_seconds <= 0 or self._timer is not None:
+                schedule = False
+            else:
+                self._timer = threading.Timer(self.delay_seconds, self._run)
+                self._timer.daemon = True
+                schedule = True
+        if schedule:
+            self._timer.start()
+        elif self.delay_seconds <= 0:
+            self._run()
+    
+    @property
+    def dirty(self) -> bool:
+        return self._dirty
+    
+    def flush(self):
+        """Refresca ya si hay cambios pendientes (y cancela el timer)."""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+        self._run()
+    
+    def _run(self):
+        with self._lock:
+            self._timer = None
+            dirty, self._dirty = self._dirty, False
+        if dirty:
+            try:
+                get_db_service().refresh_stats()
+            except Exception as e:
+                logger.warning(f"Refresco diferido de {PAPER_STATS_VIEW} falló: {e}")
+
+
+stats_refresher = StatsRefresher(float(os.getenv("STATS_REFRESH_DELAY_SECONDS", "30")))
+
+
+# Configuraciones de texto usadas en search_vector (ver models.paper.SEARCH_VECTOR_SQL)
+SEARCH_CONFIGS = ("spanish", "english", "simple")
+
+
+def build_tsquery_text(query: str) -> str:
+    """
+    Convierte texto libre en una expresión to_tsquery segura:
+    cada palabra como prefijo, todas requeridas ("beta bloq" -> "beta:* & bloq:*").
+    Se descartan los operadores de tsquery que pudiera traer el usuario.
+    """
+    terms = re.findall(r"\w+", query or "", flags=re.UNICODE)
+    return " & ".join(f"{term.lower()}:*" for term in terms)
+
+
+def or_tsqueries(*queries):
+    """Combina tsqueries con || (OR)."""
+    combined = queries[0]
+    for q in queries[1:]:
+        combined = combined.op('||')(q)
+    return combined
+
+
+
+def search_statement(query: str, limit: int = 20, cards: bool = False):
+    """
+    Búsqueda full-text sobre el índice GIN de search_vector, ordenada por ts_rank.
+    Retorna None si la consulta no tiene términos.
+    """
+    tsquery_text = build_tsquery_text(query)
+    if not tsquery_text:
+        return None
+    # Español, inglés y 'simple' (nombres propios sin stemming), combinados con OR
+    ts_query = or_tsqueries(*(
+        func.to_tsquery(config, tsquery_text) for config in SEARCH_CONFIGS
+    ))
+    rank = func.ts_rank(Paper.search_vector, ts_query)
+    return paper_select(cards)\
+        .where(Paper.search_vector.op('@@')(ts_query))\
+        .order_by(desc(rank), desc(Paper.fecha_subida))\
+        .limit(limit)
 
 
 class DatabaseService:
@@ -25,9 +357,22 @@ class DatabaseService:
         self.SessionLocal = sessionmaker(bind=self.engine)
         
     def init_db(self):
-        """Crea las tablas si no existen."""
+        """
+        Crea las tablas si no existen (scripts y entornos de desarrollo).
+        El esquema de la API, el bot y los workers lo gestiona Alembic (`alembic upgrade head`).
+        """
         Base.metadata.create_all(self.engine)
+        self._create_stats_view()
         logger.info("Base de datos inicializada correctamente.")
+    
+    def _create_stats_view(self):
+        """Vista materializada de estadísticas (también la crea la migración 004)."""
+        try:
+            with self.engine.begin() as conn:
+                for ddl in PAPER_STATS_DDL:
+                    conn.execute(text(ddl))
+        except Exception as e:
+            logger.warning(f"No se pudo crear la vista {PAPER_STATS_VIEW}: {e}")
         
     @contextmanager
     def get_session(self) -> Session:
@@ -43,26 +388,42 @@ class DatabaseService:
         finally:
             session.close()
     
+    @staticmethod
+    def _bump_shared_generation(session: Session):
+        """Publica la escritura a los caches de papers de otros procesos (misma transacción)."""
+        if shared_generation_enabled():
+            session.execute(bump_cache_generation_statement())
+    
     # ==================== CREATE ====================
     
     def create_paper(self, **kwargs) -> Paper:
-        """Crea un nuevo paper en la base de datos."""
+        """Crea un nuevo paper en la base de datos (INSERT ... RETURNING)."""
+        values, analysis = paper_values(kwargs), analysis_values(kwargs)
+        if analysis:
+            values["analysis_version"] = 1
         with self.get_session() as session:
-            paper = Paper(**kwargs)
-            session.add(paper)
-            session.flush()
-            session.commit()
-            session.refresh(paper)
+            paper = session.scalars(insert_paper_statement(values)).one()
+            if analysis:
+                analysis_stmt, _ = analysis_write_statement(paper.id, None, analysis)
+                self._attach_analysis(session, paper, analysis_stmt)
+            self._bump_shared_generation(session)
             session.expunge(paper)
-            return paper
+        invalidate_paper(paper.id)
+        self.mark_stats_dirty()
+        return paper
     
     # ==================== READ ====================
     
     def get_paper_by_id(self, paper_id: str) -> Optional[Paper]:
-        """Obtiene un paper por su ID."""
+        """Obtiene un paper por su ID, con su análisis vigente (paper_analyses)."""
+        pid = as_uuid(paper_id)
+        if pid is None:
+            return None
         with self.get_session() as session:
-            paper = session.query(Paper).filter(Paper.id == paper_id).first()
+            paper = session.scalars(paper_detail_statement(pid)).unique().first()
             if paper:
+                if paper.analysis:
+                    session.expunge(paper.analysis)
                 session.expunge(paper)  # Desacoplar del session
             return paper
     
@@ -74,67 +435,129 @@ class DatabaseService:
                 session.expunge(paper)
             return paper
     
-    def get_all_papers(self, limit: int = 100, offset: int = 0) -> List[Paper]:
-        """Obtiene todos los papers con paginación."""
+    def get_papers_by_hashes(self, hashes: List[str], chunk_size: int = 1000) -> Dict[str, Paper]:
+        """
+        Búsqueda batch de duplicados: un solo IN por bloque de hashes.
+        Retorna {hash: Paper} sólo para los hashes que existen.
+        """
+        unique_hashes = list(dict.fromkeys(h for h in hashes if h))
+        found: Dict[str, Paper] = {}
+        if not unique_hashes:
+            return found
+        
         with self.get_session() as session:
-            papers = session.query(Paper)\
-                .order_by(desc(Paper.fecha_subida))\
-                .offset(offset)\
-                .limit(limit)\
-                .all()
-            for paper in papers:
-                session.expunge(paper)
-            return papers
+            for i in range(0, len(unique_hashes), chunk_size):
+                chunk = unique_hashes[i:i + chunk_size]
+                papers = session.query(Paper).filter(Paper.hash.in_(chunk)).all()
+                for paper in papers:
+                    session.expunge(paper)
+                    found[paper.hash] = paper
+        return found
     
-    def get_recent_papers(self, limit: int = 10) -> List[Paper]:
-        """Obtiene los papers más recientes."""
+    def get_papers_by_ids(self, paper_ids: List[str], cards: bool = False) -> Dict[str, Paper]:
+        """
+        Obtiene varios papers en una sola consulta. Retorna {id: Paper} (ids inexistentes se omiten).
+        Con cards=True sólo se cargan las columnas de tarjeta (CARD_COLUMNS).
+        """
+        unique_ids = list(dict.fromkeys(pid for pid in paper_ids if pid))
+        if not unique_ids:
+            return {}
         with self.get_session() as session:
-            papers = session.query(Paper)\
-                .filter(Paper.procesado == True)\
-                .order_by(desc(Paper.fecha_analisis))\
-                .limit(limit)\
-                .all()
+            papers = session.scalars(papers_by_ids_statement(unique_ids, cards)).all()
             for paper in papers:
                 session.expunge(paper)
-            return papers
+            return {str(paper.id): paper for paper in papers}
     
-    def get_papers_by_especialidad(self, especialidad: str, limit: int = 20) -> List[Paper]:
-        """Obtiene papers filtrados por especialidad."""
+    def get_all_papers(self, limit: int = 100, offset: int = 0, cursor: Optional[str] = None) -> List[Paper]:
+        """Obtiene todos los papers (incluye no procesados y eliminados), más recientes primero."""
+        return self.get_papers_page("all", limit, cursor=cursor, offset=offset).items
+    
+    def iter_all_papers(self, page_size: int = 200):
+        """Recorre toda la biblioteca por keyset: costo constante por página."""
+        cursor = None
+        while True:
+            page = self.get_papers_page("all", page_size, cursor=cursor)
+            yield from page.items
+            if not page.next_cursor:
+                break
+            cursor = page.next_cursor
+    
+    def iter_papers_missing_enrichment(self, page_size: int = 500):
+        """Filas (id, doi, titulo, abstract) de papers con DOI pendientes de enriquecer, por keyset."""
+        after = None
+        while True:
+            with self.get_session() as session:
+                rows = session.execute(missing_enrichment_statement(page_size, after)).all()
+            yield from rows
+            if len(rows) < page_size:
+                break
+            after = rows[-1].id
+    
+    def get_papers_page(self,
+                        listing: str = "recent",
+                        limit: int = 20,
+                        cursor: Optional[str] = None,
+                        offset: int = 0,
+                        especialidad: Optional[str] = None,
+                        categoria: Optional[str] = None,
+                        include_deleted: bool = False,
+                        cards: bool = False) -> Page:
+        """
+        Listados paginados por keyset.
+        
+        listing:
+            all            -> todos, por fecha_subida
+            recent         -> procesados, por fecha_subida
+            quality        -> procesados con score, por score_calidad
+            especialidad   -> procesados de una especialidad, por score_calidad
+            categoria      -> de una categoría, por fecha_subida
+            quiz           -> EKG Dojo, por fecha_subida
+            deleted        -> eliminados, por deleted_at
+        
+        cards=True carga sólo las columnas de tarjeta (CARD_COLUMNS): para el catálogo,
+        que serializa con to_card_dict.
+        
+        Returns:
+            Page(items, next_cursor). next_cursor es None en la última página.
+        
+        Raises:
+            InvalidCursorError: si el cursor no es válido para este listado.
+        """
+        stmt = page_statement(
+            listing, limit, cursor=cursor, offset=offset, especialidad=especialidad,
+            categoria=categoria, include_deleted=include_deleted, cards=cards
+        )
         with self.get_session() as session:
-            papers = session.query(Paper)\
-                .filter(Paper.especialidad == especialidad)\
-                .filter(Paper.procesado == True)\
-                .order_by(desc(Paper.score_calidad))\
-                .limit(limit)\
-                .all()
-            for paper in papers:
+            page = build_page(session.scalars(stmt).all(), LISTING_SORTS[listing], limit)
+            for paper in page.items:
                 session.expunge(paper)
-            return papers
+            return page
+    
+    def get_recent_papers(self, limit: int = 10, cursor: Optional[str] = None) -> List[Paper]:
+        """Obtiene los papers más recientes."""
+        return self.get_papers_page("recent", limit, cursor=cursor).items
+    
+    def get_papers_by_especialidad(self, especialidad: str, limit: int = 20, cursor: Optional[str] = None) -> List[Paper]:
+        """Obtiene papers filtrados por especialidad."""
+        return self.get_papers_page("especialidad", limit, cursor=cursor, especialidad=especialidad).items
     
     def get_all_especialidades(self) -> List[str]:
         """Obtiene lista única de especialidades."""
         with self.get_session() as session:
-            result = session.query(Paper.especialidad)\
-                .filter(Paper.especialidad.isnot(None))\
-                .distinct()\
-                .all()
-            return [e[0] for e in result if e[0]]
+            return [e for e in session.scalars(especialidades_statement()).all() if e]
     
-    def search_papers(self, query: str, limit: int = 20) -> List[Paper]:
-        """Búsqueda por título, autores o tags."""
+    def search_papers(self, query: str, limit: int = 20, cards: bool = False) -> List[Paper]:
+        """
+        Búsqueda full-text (título, abstract, tags, MeSH, autores) sobre el índice GIN
+        de search_vector, ordenada por ts_rank. Cada término admite prefijo ("cardio" -> "cardiología").
+        Con cards=True sólo se cargan las columnas de tarjeta.
+        """
+        stmt = search_statement(query, limit, cards=cards)
+        if stmt is None:
+            return []
+        
         with self.get_session() as session:
-            search_term = f"%{query}%"
-            papers = session.query(Paper)\
-                .filter(
-                    or_(
-                        Paper.titulo.ilike(search_term),
-                        Paper.autores.cast(str).ilike(search_term),
-                        Paper.tags.cast(str).ilike(search_term)
-                    )
-                )\
-                .order_by(desc(Paper.fecha_subida))\
-                .limit(limit)\
-                .all()
+            papers = session.scalars(stmt).all()
             for paper in papers:
                 session.expunge(paper)
             return papers
@@ -163,30 +586,13 @@ class DatabaseService:
                 session.expunge(paper)
             return papers
     
-    def get_top_papers(self, limit: int = 10) -> List[Paper]:
+    def get_top_papers(self, limit: int = 10, cursor: Optional[str] = None) -> List[Paper]:
         """Obtiene los papers con mayor score de calidad."""
-        with self.get_session() as session:
-            papers = session.query(Paper)\
-                .filter(Paper.procesado == True)\
-                .filter(Paper.score_calidad.isnot(None))\
-                .order_by(desc(Paper.score_calidad))\
-                .limit(limit)\
-                .all()
-            for paper in papers:
-                session.expunge(paper)
-            return papers
+        return self.get_papers_page("quality", limit, cursor=cursor).items
 
-    def get_quiz_papers(self, limit: int = 50) -> List[Paper]:
+    def get_quiz_papers(self, limit: int = 50, cursor: Optional[str] = None) -> List[Paper]:
         """Obtiene papers marcados como Quiz (EKG Dojo)."""
-        with self.get_session() as session:
-            papers = session.query(Paper)\
-                .filter(Paper.is_quiz == True)\
-                .order_by(desc(Paper.fecha_subida))\
-                .limit(limit)\
-                .all()
-            for paper in papers:
-                session.expunge(paper)
-            return papers
+        return self.get_papers_page("quiz", limit, cursor=cursor).items
     
     def count_papers(self) -> int:
         """Cuenta el total de papers."""
@@ -196,28 +602,80 @@ class DatabaseService:
     # ==================== UPDATE ====================
     
     def update_paper(self, paper_id: str, **kwargs) -> Optional[Paper]:
-        """Actualiza campos de un paper existente."""
+        """
+        Actualiza campos de un paper existente con un único UPDATE ... RETURNING.
+        Los artefactos de ANALYSIS_FIELDS van a la versión vigente de paper_analyses,
+        en la misma transacción. Retorna el paper actualizado, o None si no existe.
+        """
+        return self._update_paper(paper_id, kwargs)
+    
+    def _update_paper(self, paper_id: str, fields: Dict[str, Any], new_analysis_run: bool = False) -> Optional[Paper]:
+        pid = as_uuid(paper_id)
+        if pid is None:
+            return None
+        values, analysis = paper_values(fields), analysis_values(fields)
+        if not values and not analysis:
+            return self.get_paper_by_id(pid)
+        
         with self.get_session() as session:
-            paper = session.query(Paper).filter(Paper.id == paper_id).first()
-            if not paper:
-                return None
-            
-            for key, value in kwargs.items():
-                if hasattr(paper, key):
-                    setattr(paper, key, value)
-            
-            session.commit()
-            session.refresh(paper)
-            # Access attributes to force load
-            _ = paper.id
-            _ = paper.titulo
-            _ = paper.procesado
-            _ = paper.score_calidad
-            session.expunge(paper)
-            return paper
+            if analysis:
+                current = session.scalars(current_analysis_statement(pid)).first()
+                analysis_stmt, values["analysis_version"] = analysis_write_statement(
+                    pid, current, analysis, new_run=new_analysis_run
+                )
+            paper = session.scalars(
+                update_paper_statement(pid, values),
+                execution_options={"synchronize_session": False}
+            ).first()
+            if paper:
+                if analysis:
+                    self._attach_analysis(session, paper, analysis_stmt)
+                self._bump_shared_generation(session)
+                session.expunge(paper)
+        if paper:
+            invalidate_paper(pid)
+        return paper
+    
+    @staticmethod
+    def _attach_analysis(session: Session, paper: Paper, analysis_stmt):
+        """Ejecuta la escritura en paper_analyses y deja el resultado en paper.analysis."""
+        analysis = session.scalars(analysis_stmt, execution_options={"populate_existing": True}).one()
+        session.expunge(analysis)
+        set_committed_value(paper, "analysis", analysis)
     
-    def mark_as_processed(self, paper_id: str, analysis_data: Dict[str, Any]) -> Optional[Paper]:
-        """Marca un paper como procesado y guarda el análisis."""
+    def bulk_update_papers(self, updates: Dict[str, Dict[str, Any]]) -> int:
+        """
+        Aplica cambios a muchos papers en una transacción: {paper_id: {campo: valor}}.
+        UPDATE por clave primaria en executemany (agrupado por conjunto de columnas),
+        para scripts de reproceso / enriquecimiento. Retorna cuántos papers se enviaron.
+        Los papers con artefactos de ANALYSIS_FIELDS se escriben uno a uno (update_paper).
+        """
+        rows, with_analysis = [], {}
+        for paper_id, fields in updates.items():
+            pid, values = as_uuid(paper_id), paper_values(fields)
+            if pid and analysis_values(fields):
+                with_analysis[pid] = fields
+            elif pid and values:
+                rows.append({"id": pid, **values})
+        if not rows and not with_analysis:
+            return 0
+        
+        if rows:
+            with self.get_session() as session:
+                session.execute(update(Paper), rows)
+                self._bump_shared_generation(session)
+            invalidate_papers(row["id"] for row in rows)
+        for pid, fields in with_analysis.items():
+            self._update_paper(pid, fields)
+        self.mark_stats_dirty()
+        return len(rows) + len(with_analysis)
+    
+    def mark_as_processed(self, paper_id: str, analysis_data: Dict[str, Any], **extra_fields) -> Optional[Paper]:
+        """
+        Marca un paper como procesado y guarda el análisis como una versión nueva de
+        paper_analyses. `extra_fields` (quiz, rutas renombradas, título enriquecido...)
+        van en la misma transacción.
+        """
         # Truncar campos que tienen límites en DB
         n_muestra = analysis_data.get("n_muestra")
         if n_muestra and len(str(n_muestra)) > 50:
@@ -231,8 +689,7 @@ class DatabaseService:
         if tipo_estudio and len(str(tipo_estudio)) > 100:
             tipo_estudio = str(tipo_estudio)[:97] + "..."
         
-        return self.update_paper(
-            paper_id,
+        paper = self._update_paper(paper_id, dict(
             procesado=True,
             fecha_analisis=datetime.utcnow(),
             analisis_completo=analysis_data.get("analisis_completo"),
@@ -245,33 +702,29 @@ class DatabaseService:
             imagenes=analysis_data.get("imagenes"),
             num_graficos=analysis_data.get("num_graficos"),
             analisis_graficos=analysis_data.get("analisis_graficos"),
-            categoria=analysis_data.get("categoria", "sin_categorizar")
-        )
+            categoria=analysis_data.get("categoria", "sin_categorizar"),
+            **extra_fields
+        ), new_analysis_run=True)
+        if paper:
+            self.mark_stats_dirty()
+        return paper
 
     
     # ==================== DELETE & CATEGORÍAS ====================
     
     def soft_delete_paper(self, paper_id: str) -> bool:
         """Marca un paper como eliminado (soft delete). No se vuelve a descargar."""
-        with self.get_session() as session:
-            paper = session.query(Paper).filter(Paper.id == paper_id).first()
-            if not paper:
-                return False
-            paper.deleted = True
-            paper.deleted_at = datetime.utcnow()
-            session.commit()
-            return True
+        if self.update_paper(paper_id, deleted=True, deleted_at=datetime.utcnow()) is None:
+            return False
+        self.mark_stats_dirty()
+        return True
     
     def restore_paper(self, paper_id: str) -> bool:
         """Restaura un paper eliminado."""
-        with self.get_session() as session:
-            paper = session.query(Paper).filter(Paper.id == paper_id).first()
-            if not paper:
-                return False
-            paper.deleted = False
-            paper.deleted_at = None
-            session.commit()
-            return True
+        if self.update_paper(paper_id, deleted=False, deleted_at=None) is None:
+            return False
+        self.mark_stats_dirty()
+        return True
     
     def delete_paper(self, paper_id: str) -> bool:
         """Elimina permanentemente un paper de la base de datos."""
@@ -279,80 +732,79 @@ class DatabaseService:
             paper = session.query(Paper).filter(Paper.id == paper_id).first()
             if not paper:
                 return False
+            pid = paper.id
             session.delete(paper)
+            self._bump_shared_generation(session)
             session.commit()
-            return True
+        invalidate_paper(pid)
+        self.mark_stats_dirty()
+        return True
     
     def change_categoria(self, paper_id: str, nueva_categoria: str) -> Optional[Paper]:
         """Cambia la categoría de un paper."""
-        valid_categorias = ['papers', 'libros', 'ekg_dojo', 'sin_categorizar']
-        if nueva_categoria not in valid_categorias:
+        if nueva_categoria not in CATEGORIAS:
             return None
         return self.update_paper(paper_id, categoria=nueva_categoria)
     
-    def get_papers_by_categoria(self, categoria: str, limit: int = 50, include_deleted: bool = False) -> List[Paper]:
+    def get_papers_by_categoria(self, categoria: str, limit: int = 50, include_deleted: bool = False,
+                                cursor: Optional[str] = None) -> List[Paper]:
         """Obtiene papers filtrados por categoría."""
-        with self.get_session() as session:
-            query = session.query(Paper).filter(Paper.categoria == categoria)
-            if not include_deleted:
-                query = query.filter(Paper.deleted == False)
-            papers = query.order_by(desc(Paper.fecha_subida)).limit(limit).all()
-            for paper in papers:
-                session.expunge(paper)
-            return papers
+        return self.get_papers_page(
+            "categoria", limit, cursor=cursor, categoria=categoria, include_deleted=include_deleted
+        ).items
     
-    def get_deleted_papers(self, limit: int = 50) -> List[Paper]:
+    def get_deleted_papers(self, limit: int = 50, cursor: Optional[str] = None) -> List[Paper]:
         """Obtiene papers eliminados (soft delete)."""
-        with self.get_session() as session:
-            papers = session.query(Paper)\
-                .filter(Paper.deleted == True)\
-                .order_by(desc(Paper.deleted_at))\
-                .limit(limit)\
-                .all()
-            for paper in papers:
-                session.expunge(paper)
-            return papers
+        return self.get_papers_page("deleted", limit, cursor=cursor).items
 
     
     # ==================== STATS ====================
     
     def get_stats(self) -> Dict[str, Any]:
-        """Obtiene estadísticas generales del catálogo."""
-        with self.get_session() as session:
-            total = session.query(Paper).count()
-            procesados = session.query(Paper).filter(Paper.procesado == True).count()
-            con_graficos = session.query(Paper).filter(Paper.num_graficos > 0).count()
-            
-            especialidades = session.query(Paper.especialidad)\
-                .filter(Paper.especialidad.isnot(None))\
-                .distinct()\
-                .count()
-            
-            avg_score = 0
-            scores = session.query(Paper.score_calidad)\
-                .filter(Paper.score_calidad.isnot(None))\
-                .all()
-            if scores:
-                avg_score = sum(s[0] for s in scores) / len(scores)
-            
-            # Breakdown por especialidad
-            from sqlalchemy import func
-            breakdown = session.query(Paper.especialidad, func.count(Paper.id))\
-                .filter(Paper.procesado == True)\
-                .group_by(Paper.especialidad)\
-                .all()
-            spec_stats = {b[0]: b[1] for b in breakdown if b[0]}
-
-            return {
-                "total_papers": total,
-                "procesados": procesados,
-                "pendientes": total - procesados,
-                "con_graficos": con_graficos,
-                "especialidades": especialidades,
-                "especialidades_breakdown": spec_stats,
-                "score_promedio": round(avg_score, 2)
-            }
+        """
+        Estadísticas generales del catálogo.
+        Lee la vista materializada paper_stats (una fila) con cache en proceso.
+        """
+        cached = stats_cache.get()
+        if cached is not None:
+            return cached
+        try:
+            with self.get_session() as session:
+                row = session.execute(stats_view_statement()).mappings().first()
+        except ProgrammingError:
+            # Vista aún no creada (migración pendiente): agregado en vivo
+            with self.get_session() as session:
+                row = session.execute(stats_live_statement()).mappings().first()
+        stats = build_stats(row)
+        stats_cache.set(stats)
+        return stats
+    
+    def mark_stats_dirty(self):
+        """
+        Tras crear, procesar o eliminar papers: invalida el cache y deja el refresco
+        de paper_stats al StatsRefresher (un REFRESH completo por escritura sería O(N)).
+        """
+        stats_cache.invalidate()
+        stats_refresher.mark_dirty()
+    
+    def refresh_stats(self):
+        """Recalcula paper_stats e invalida el cache (lo llama StatsRefresher)."""
+        try:
+            with self.get_session() as session:
+                session.execute(refresh_stats_statement())
+        except Exception as e:
+            logger.warning(f"No se pudo refrescar {PAPER_STATS_VIEW}: {e}")
+        stats_cache.invalidate()
     
+    # ==================== CACHE ====================
+
+    def get_cache_generation(self, name: str) -> int:
+        """Generación compartida de un cache (tabla cache_generations)."""
+        with self.get_session() as session:
+            return session.execute(
+                text("SELECT generation FROM cache_generations WHERE name = :name"), {"name": name}
+            ).scalar() or 0
+
     # ==================== CHANNELS ====================
 
     def add_channel(self, username: str, nombre: Optional[str] = None) -> Channel:
@@ -410,9 +862,12 @@ class DatabaseService:
 _db_service = None
 
 def get_db_service() -> DatabaseService:
-    """Obtiene la instancia global del servicio de base de datos."""
+    """
+    Obtiene la instancia global del servicio de base de datos.
+    No toca la base de datos: el engine conecta en la primera consulta y el
+    esquema se aplica con Alembic antes de arrancar (ver docs/MIGRATIONS.md).
+    """
     global _db_service
     if _db_service is None:
         _db_service = DatabaseService()
-        _db_service.init_db()
     return _db_service
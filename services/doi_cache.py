@@ -0,0 +1,171 @@
+"""
+Cache persistente de metadatos por DOI (PubMed + CrossRef fusionados).
+Clave: DOI normalizado en minúsculas. Backend SQLite en disco compartido por la
+API, los workers y los scripts (mismo volumen data/).
+
+- Aciertos (payload con datos) viven DOI_CACHE_TTL_DAYS; fallos (DOI sin
+  metadatos) se cachean en negativo DOI_CACHE_NEGATIVE_TTL_HOURS.
+- Pasado el TTL, la entrada se sirve como "stale" durante DOI_CACHE_STALE_DAYS
+  mientras se revalida en segundo plano (stale-while-revalidate).
+"""
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+FRESH = "fresh"
+STALE = "stale"
+MISS = "miss"
+
+
+class DOIMetadataCache:
+    """Cache en disco de metadatos enriquecidos por DOI, con caché negativa."""
+
+    def __init__(self,
+                 db_path: str = "data/doi_cache.sqlite",
+                 ttl_seconds: float = 30 * 86400,
+                 negative_ttl_seconds: float = 86400,
+                 stale_seconds: float = 7 * 86400):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.ttl_seconds = ttl_seconds
+        self.negative_ttl_seconds = negative_ttl_seconds
+        self.stale_seconds = stale_seconds
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS doi_cache (
+                doi TEXT PRIMARY KEY,
+                payload TEXT NOT NULL,
+                found INTEGER NOT NULL,
+                fetched_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.commit()
+
+        # DOIs con revalidación en curso (en este proceso)
+        self._refreshing = set()
+
+        # Contadores de la sesión actual
+        self.hits = 0
+        self.negative_hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(doi: str) -> str:
+        """Los DOIs no distinguen mayúsculas: misma clave para 10.1056/NEJM... y 10.1056/nejm..."""
+        return doi.strip().lower()
+
+    # ==================== LECTURA / ESCRITURA ====================
+
+    def lookup(self, doi: str) -> Tuple[Optional[Dict[str, Any]], str]:
+        """
+        Retorna (payload, estado): estado FRESH, STALE o MISS.
+        El payload de una entrada negativa es {} (DOI sin metadatos conocidos).
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT payload, found, fetched_at FROM doi_cache WHERE doi = ?", (self.make_key(doi),)
+            ).fetchone()
+
+            if row is None:
+                self.misses += 1
+                return None, MISS
+
+            payload, found, fetched_at = row
+            age = now - fetched_at
+            ttl = self.ttl_seconds if found else self.negative_ttl_seconds
+            if age <= ttl:
+                if found:
+                    self.hits += 1
+                else:
+                    self.negative_hits += 1
+                return json.loads(payload), FRESH
+            if found and age <= ttl + self.stale_seconds:
+                self.stale_hits += 1
+                return json.loads(payload), STALE
+
+            self.misses += 1
+            return None, MISS
+
+    def set(self, doi: str, payload: Dict[str, Any]):
+        """Guarda el resultado del enriquecimiento ({} = caché negativa)."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO doi_cache (doi, payload, found, fetched_at) VALUES (?, ?, ?, ?)",
+                (self.make_key(doi), json.dumps(payload, ensure_ascii=False, default=str),
+                 1 if payload else 0, time.time())
+            )
+            self._conn.commit()
+
+    def begin_refresh(self, doi: str) -> bool:
+        """Reserva la revalidación de un DOI; False si ya hay una en curso."""
+        key = self.make_key(doi)
+        with self._lock:
+            if key in self._refreshing:
+                return False
+            self._refreshing.add(key)
+            return True
+
+    def end_refresh(self, doi: str):
+        with self._lock:
+            self._refreshing.discard(self.make_key(doi))
+
+    def clear(self):
+        """Vacía el cache completo."""
+        with self._lock:
+            self._conn.execute("DELETE FROM doi_cache")
+            self._conn.commit()
+
+    # ==================== MÉTRICAS ====================
+
+    def stats(self) -> Dict[str, Any]:
+        """Contadores de acierto (positivos, negativos, stale) y ocupación actual."""
+        with self._lock:
+            entries, negatives = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(1 - found), 0) FROM doi_cache"
+            ).fetchone()
+        served = self.hits + self.negative_hits + self.stale_hits
+        lookups = served + self.misses
+        return {
+            "hits": self.hits,
+            "negative_hits": self.negative_hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "hit_rate": round(served / lookups, 3) if lookups else 0.0,
+            "entries": entries,
+            "negative_entries": negatives,
+        }
+
+
+# Singleton para uso global
+_doi_cache = None
+
+def get_doi_cache() -> Optional[DOIMetadataCache]:
+    """
+    Obtiene la instancia global del cache de DOIs.
+    Retorna None si DOI_CACHE_ENABLED=false.
+    """
+    global _doi_cache
+    if os.getenv("DOI_CACHE_ENABLED", "true").lower() in ("0", "false", "no"):
+        return None
+    if _doi_cache is None:
+        _doi_cache = DOIMetadataCache(
+            db_path=os.getenv("DOI_CACHE_PATH", "data/doi_cache.sqlite"),
+            ttl_seconds=float(os.getenv("DOI_CACHE_TTL_DAYS", "30")) * 86400,
+            negative_ttl_seconds=float(os.getenv("DOI_CACHE_NEGATIVE_TTL_HOURS", "24")) * 3600,
+            stale_seconds=float(os.getenv("DOI_CACHE_STALE_DAYS", "7")) * 86400,
+        )
+    return _doi_cache
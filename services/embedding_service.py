@@ -0,0 +1,168 @@
+"""
+Servicio de Embeddings local para MedFlix Core.
+Calcula embeddings en lotes con un modelo ONNX en CPU (all-MiniLM-L6-v2, el mismo
+que usa ChromaDB por defecto) y los cachea en disco por hash del texto.
+"""
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Función de embedding: lista de textos -> lista de vectores
+EmbeddingFunction = Callable[[List[str]], List]
+
+
+def default_embedding_function() -> EmbeddingFunction:
+    """Modelo ONNX de ChromaDB (CPU). El modelo se descarga en la primera llamada."""
+    from chromadb.utils.embedding_functions import ONNXMiniLM_L6_V2
+    return ONNXMiniLM_L6_V2(preferred_providers=["CPUExecutionProvider"])
+
+
+class EmbeddingCache:
+    """Cache SQLite de vectores float32 direccionados por hash (modelo + texto)."""
+
+    # Máximo de parámetros por consulta IN
+    LOOKUP_CHUNK = 500
+
+    def __init__(self, db_path: str = "data/embedding_cache.sqlite"):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS embedding_cache (
+                key TEXT PRIMARY KEY,
+                dim INTEGER NOT NULL,
+                vector BLOB NOT NULL,
+                created_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.commit()
+
+    def get_many(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        found = {}
+        with self._lock:
+            for i in range(0, len(keys), self.LOOKUP_CHUNK):
+                chunk = keys[i:i + self.LOOKUP_CHUNK]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embedding_cache WHERE key IN ({placeholders})", chunk
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32)
+        return found
+
+    def set_many(self, items: Dict[str, np.ndarray]):
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embedding_cache (key, dim, vector, created_at) VALUES (?, ?, ?, ?)",
+                [(key, int(vec.shape[0]), vec.tobytes(), now) for key, vec in items.items()]
+            )
+            self._conn.commit()
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM embedding_cache").fetchone()[0]
+
+
+class EmbeddingService:
+    """
+    Embeddings en lote con cache por hash.
+    Pensado para pasar vectores precalculados a Chroma (parámetro `embeddings`).
+    """
+
+    def __init__(self,
+                 embedding_function: Optional[EmbeddingFunction] = None,
+                 model_name: str = "all-MiniLM-L6-v2",
+                 batch_size: int = 64,
+                 cache: Optional[EmbeddingCache] = None):
+        self._embedding_function = embedding_function
+        self.model_name = model_name
+        self.batch_size = max(1, batch_size)
+        self.cache = cache
+
+        # Métricas de la sesión
+        self.hits = 0
+        self.misses = 0
+        self.batches = 0
+
+    @property
+    def embedding_function(self) -> EmbeddingFunction:
+        if self._embedding_function is None:
+            self._embedding_function = default_embedding_function()
+        return self._embedding_function
+
+    def _key(self, text: str) -> str:
+        return hashlib.sha256(f"{self.model_name}\0{text}".encode("utf-8")).hexdigest()
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embeddings para una lista de textos, en el mismo orden.
+        Textos repetidos o ya cacheados no se recalculan.
+        """
+        if not texts:
+            return []
+
+        keys = [self._key(t) for t in texts]
+        vectors: Dict[str, np.ndarray] = self.cache.get_many(list(set(keys))) if self.cache else {}
+
+        # Textos únicos que faltan, en orden de aparición
+        pending: Dict[str, str] = {}
+        for key, text in zip(keys, texts):
+            if key not in vectors and key not in pending:
+                pending[key] = text
+        self.hits += len(texts) - sum(1 for k in keys if k in pending)
+        self.misses += len(pending)
+
+        pending_keys = list(pending)
+        for start in range(0, len(pending_keys), self.batch_size):
+            batch_keys = pending_keys[start:start + self.batch_size]
+            batch_vectors = self.embedding_function([pending[k] for k in batch_keys])
+            computed = {k: np.asarray(v, dtype=np.float32) for k, v in zip(batch_keys, batch_vectors)}
+            self.batches += 1
+            vectors.update(computed)
+            if self.cache:
+                self.cache.set_many(computed)
+
+        return [vectors[k].tolist() for k in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed([text])[0]
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "batches": self.batches,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "batch_size": self.batch_size,
+            "cached_vectors": self.cache.count() if self.cache else 0,
+        }
+
+
+# Singleton para uso global
+_embedding_service = None
+
+def get_embedding_service() -> EmbeddingService:
+    """Obtiene la instancia global del servicio de embeddings."""
+    global _embedding_service
+    if _embedding_service is None:
+        cache_enabled = os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() not in ("0", "false", "no")
+        _embedding_service = EmbeddingService(
+            batch_size=int(os.getenv("EMBEDDING_BATCH_SIZE", "64")),
+            cache=EmbeddingCache(os.getenv("EMBEDDING_CACHE_PATH", "data/embedding_cache.sqlite")) if cache_enabled else None
+        )
+    return _embedding_service
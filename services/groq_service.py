@@ -1,20 +1,126 @@
 import os
+import re
+import asyncio
 import groq
-from typing import Dict, List, Optional
+from collections import deque
+from typing import AsyncIterator, Dict, Iterator, List, Optional
 import json
+import logging
 import time
 import threading
+from types import SimpleNamespace
 
 import groq
 
 from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
 import httpx
 
+from services.llm_cache import LLMResponseCache, get_llm_cache
+from services.metrics import percentiles
+
+logger = logging.getLogger(__name__)
+
 # Rate Limiter basado en límites del Free Tier de Groq
 # Fuente: https://console.groq.com/docs/rate-limits
 # Free Tier aproximado: 30 RPM, 6000 TPM (varía por modelo)
+class _TokenBucket:
+    """
+    Bucket de un modelo con dos dimensiones: requests/min y tokens/min.
+    Ambas se reponen de forma continua; una reserva puede dejar saldo negativo
+    (deuda) y el tiempo de espera es lo que tarda en volver a cero.
+    """
+    
+    def __init__(self, rpm: int, tpm: int):
+        self.lock = threading.Lock()
+        self.rpm = float(rpm)
+        self.tpm = float(tpm)
+        self.requests = float(rpm)
+        self.tokens = float(tpm)
+        self.blocked_until = 0.0
+        self.updated = time.monotonic()
+    
+    def _refill(self, now: float):
+        elapsed = now - self.updated
+        self.requests = min(self.rpm, self.requests + elapsed * self.rpm / 60.0)
+        self.tokens = min(self.tpm, self.tokens + elapsed * self.tpm / 60.0)
+        self.updated = now
+    
+    def reserve(self, tokens: int) -> float:
+        """Descuenta 1 request + tokens y retorna los segundos a esperar."""
+        with self.lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.requests -= 1
+            self.tokens -= min(tokens, self.tpm)
+            
+            wait = 0.0
+            if self.requests < 0:
+                wait = -self.requests * 60.0 / self.rpm
+            if self.tokens < 0:
+                wait = max(wait, -self.tokens * 60.0 / self.tpm)
+            return max(wait, self.blocked_until - now)
+    
+    def adjust_tokens(self, delta: int):
+        """Corrige el saldo con el consumo real (delta > 0 = se gastó más de lo estimado)."""
+        with self.lock:
+            self._refill(time.monotonic())
+            self.tokens -= delta
+    
+    def sync(self, limit_tokens=None, remaining_requests=None, remaining_tokens=None,
+             reset_requests=None, reset_tokens=None):
+        """Alinea el bucket con lo que reporta el servidor en los headers."""
+        with self.lock:
+            now = time.monotonic()
+            self._refill(now)
+            if limit_tokens:
+                self.tpm = float(limit_tokens)
+            if remaining_tokens is not None:
+                self.tokens = min(self.tokens, float(remaining_tokens))
+            if remaining_requests is not None:
+                self.requests = min(self.requests, float(remaining_requests))
+            if remaining_requests == 0 and reset_requests:
+                self.blocked_until = max(self.blocked_until, now + reset_requests)
+            if remaining_tokens == 0 and reset_tokens:
+                self.blocked_until = max(self.blocked_until, now + reset_tokens)
+    
+    def block(self, seconds: float):
+        """Bloquea el modelo (p.ej. Retry-After de un 429)."""
+        with self.lock:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+
+def _parse_duration(value) -> Optional[float]:
+    """Parsea duraciones de Groq ('2m59.56s', '7.66s', '120ms', '1h2m') o segundos planos."""
+    if isinstance(value, (int, float)):
+        return float(value)
+    if not isinstance(value, str) or not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = re.findall(r'(\d+(?:\.\d+)?)(ms|h|m|s)', value)
+    if not parts:
+        return None
+    factors = {"h": 3600.0, "m": 60.0, "s": 1.0, "ms": 0.001}
+    return sum(float(num) * factors[unit] for num, unit in parts)
+
+
+def _parse_int(value) -> Optional[int]:
+    if isinstance(value, (int, str)):
+        try:
+            return int(value)
+        except ValueError:
+            return None
+    return None
+
+
 class RateLimiter:
-    """Controla la tasa de requests para evitar 429 errors."""
+    """
+    Token bucket por modelo (RPM + TPM) para evitar 429 errors.
+    Cada modelo tiene su propio lock y la espera ocurre fuera de él,
+    así los hilos que usan modelos distintos no se bloquean entre sí.
+    """
     
     # Límites conservadores para Free Tier (por modelo)
     LIMITS = {
@@ -25,40 +131,179 @@ class RateLimiter:
         "default": {"rpm": 20, "tpm": 5000}  # Fallback conservador
     }
     
+    # Tokens reservados para la respuesta al estimar una request
+    COMPLETION_RESERVE = 512
+    
     def __init__(self):
-        self._lock = threading.Lock()
-        self._last_request_time = {}
-        self._request_count = {}
-        self._window_start = {}
+        self._lock = threading.Lock()  # Sólo protege el diccionario de buckets
+        self._buckets: Dict[str, _TokenBucket] = {}
     
-    def wait_if_needed(self, model: str):
-        """Espera si es necesario para respetar el rate limit."""
-        limits = self.LIMITS.get(model, self.LIMITS["default"])
-        rpm = limits["rpm"]
-        min_interval = 60.0 / rpm  # Segundos mínimos entre requests
-        
+    def _bucket(self, model: str) -> _TokenBucket:
         with self._lock:
-            now = time.time()
-            last = self._last_request_time.get(model, 0)
-            elapsed = now - last
-            
-            if elapsed < min_interval:
-                sleep_time = min_interval - elapsed
-                time.sleep(sleep_time)
-            
-            self._last_request_time[model] = time.time()
+            bucket = self._buckets.get(model)
+            if bucket is None:
+                limits = self.LIMITS.get(model, self.LIMITS["default"])
+                bucket = _TokenBucket(limits["rpm"], limits["tpm"])
+                self._buckets[model] = bucket
+            return bucket
+    
+    @classmethod
+    def estimate_tokens(cls, messages: List[Dict]) -> int:
+        """Estimación barata de tokens (~4 caracteres por token) + reserva de respuesta."""
+        chars = 0
+        for message in messages:
+            content = message.get("content", "")
+            if isinstance(content, str):
+                chars += len(content)
+            elif isinstance(content, list):
+                chars += sum(len(part.get("text", "")) for part in content if isinstance(part, dict))
+        return chars // 4 + cls.COMPLETION_RESERVE
+    
+    def wait_if_needed(self, model: str, tokens: int = 0) -> float:
+        """Reserva capacidad y duerme (fuera del lock) si es necesario. Retorna la espera."""
+        wait = self._bucket(model).reserve(tokens)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+    
+    async def acquire(self, model: str, tokens: int = 0) -> float:
+        """Versión async de wait_if_needed: no bloquea el event loop."""
+        wait = self._bucket(model).reserve(tokens)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+    
+    def record_usage(self, model: str, estimated: int, actual: int):
+        """Reconcilia la estimación con el `usage.total_tokens` real de la respuesta."""
+        self._bucket(model).adjust_tokens(actual - estimated)
+    
+    def update_from_headers(self, model: str, headers):
+        """
+        Ajusta el presupuesto con los headers x-ratelimit-* de Groq.
+        (requests = límite diario, tokens = límite por minuto)
+        """
+        bucket = self._bucket(model)
+        bucket.sync(
+            limit_tokens=_parse_int(headers.get("x-ratelimit-limit-tokens")),
+            remaining_requests=_parse_int(headers.get("x-ratelimit-remaining-requests")),
+            remaining_tokens=_parse_int(headers.get("x-ratelimit-remaining-tokens")),
+            reset_requests=_parse_duration(headers.get("x-ratelimit-reset-requests")),
+            reset_tokens=_parse_duration(headers.get("x-ratelimit-reset-tokens")),
+        )
+        retry_after = _parse_duration(headers.get("retry-after"))
+        if retry_after:
+            bucket.block(retry_after)
 
 # Instancia global del rate limiter
 _rate_limiter = RateLimiter()
 
+def _sync_rate_limits(response: httpx.Response):
+    """Hook httpx: alimenta el RateLimiter con los headers de cada respuesta de Groq."""
+    try:
+        body = json.loads(response.request.content or b"{}")
+        model = body.get("model")
+        if model:
+            _rate_limiter.update_from_headers(model, response.headers)
+    except Exception:
+        pass
+
+_backoff = wait_exponential(multiplier=2, min=2, max=120)
+
+def _retry_wait(retry_state) -> float:
+    """Usa el Retry-After del 429 si existe; si no, backoff exponencial."""
+    exc = retry_state.outcome.exception() if retry_state.outcome else None
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None)
+    if headers is not None:
+        retry_after = _parse_duration(headers.get("retry-after"))
+        if retry_after is not None:
+            return min(retry_after, 120)
+    return _backoff(retry_state)
+
+def _cached_completion(content: str) -> SimpleNamespace:
+    """Imita la forma de un ChatCompletion (choices[0].message.content) para respuestas cacheadas."""
+    return SimpleNamespace(
+        choices=[SimpleNamespace(message=SimpleNamespace(content=content))],
+        cached=True
+    )
+
+# Reintentos de las llamadas a la API (429, 5xx, red)
+_api_retry = retry(
+    stop=stop_after_attempt(7), # Aumentar intentos
+    wait=_retry_wait, # Retry-After del servidor o backoff exponencial (2s - 2 min)
+    retry=retry_if_exception_type((
+        httpx.HTTPStatusError, 
+        httpx.ReadTimeout, 
+        httpx.ConnectError,
+        groq.RateLimitError,
+        groq.InternalServerError,
+        groq.APIConnectionError
+    ))
+)
+
+
+class _StreamState:
+    """Acumulado de un stream en curso: fragmentos, TTFT y consumo reportado."""
+    
+    def __init__(self, started: float):
+        self.started = started
+        self.parts: List[str] = []
+        self.ttft: Optional[float] = None
+        self.usage = None
+    
+    def feed(self, chunk) -> Optional[str]:
+        """Procesa un chunk y retorna su texto (None si no trae)."""
+        # Groq envía el consumo real en el último chunk (x_groq.usage)
+        self.usage = getattr(getattr(chunk, "x_groq", None), "usage", None) or self.usage
+        delta = chunk.choices[0].delta.content if chunk.choices else None
+        if not delta:
+            return None
+        if self.ttft is None:
+            self.ttft = time.monotonic() - self.started
+        self.parts.append(delta)
+        return delta
+
+
+class StreamMetrics:
+    """Muestras recientes de time-to-first-token (TTFT) y duración de las completions en streaming."""
+    
+    def __init__(self, sample_size: int = 500):
+        self._lock = threading.Lock()
+        self._samples = deque(maxlen=sample_size)  # (ttft, total, cached)
+        self.streams = 0
+    
+    def record(self, model: str, ttft: float, total: float, cached: bool = False):
+        with self._lock:
+            self._samples.append((ttft, total, cached))
+            self.streams += 1
+        logger.info(f"Streaming {model}: TTFT {ttft * 1000:.0f} ms, total {total:.1f} s{' (cache)' if cached else ''}")
+    
+    def snapshot(self) -> Dict:
+        """Percentiles de TTFT y duración total sobre la muestra."""
+        with self._lock:
+            samples = list(self._samples)
+        return {
+            "streams": self.streams,
+            "sample": len(samples),
+            "cache_hits": sum(1 for _, _, cached in samples if cached),
+            "ttft_seconds": percentiles([ttft for ttft, _, _ in samples]),
+            "total_seconds": percentiles([total for _, total, _ in samples]),
+        }
+
+# Métricas globales del proceso (API, bot)
+stream_metrics = StreamMetrics()
+
 class GroqService:
-    def __init__(self):
+    def __init__(self, cache: Optional[LLMResponseCache] = None):
         self.api_key = os.getenv("GROQ_API_KEY")
         # ... (resto del init igual) ...
         if not self.api_key:
              # logging warning instead of error for test compatibility if needed
              pass
-        self.client = groq.Groq(api_key=self.api_key)
+        self.client = groq.Groq(
+            api_key=self.api_key,
+            http_client=groq.DefaultHttpxClient(event_hooks={"response": [_sync_rate_limits]})
+        )
         
         # Modelos optimizados
         # Llama 4 Maverick para análisis profundo (Auditoría Epistemológica)
@@ -67,24 +312,12 @@ class GroqService:
         self.fast_model = os.getenv("GROQ_FAST_MODEL", "llama-3.1-8b-instant")
         # Vision: llama-3.2-11b deprecado, usando 90b (o desactivar)
         self.vision_model = os.getenv("GROQ_VISION_MODEL", "llama-3.2-90b-vision-preview")
-
-    @retry(
-        stop=stop_after_attempt(7), # Aumentar intentos
-        wait=wait_exponential(multiplier=2, min=10, max=120), # Espera mínima 10s, max 2 min
-        retry=retry_if_exception_type((
-            httpx.HTTPStatusError, 
-            httpx.ReadTimeout, 
-            httpx.ConnectError,
-            groq.RateLimitError,
-            groq.InternalServerError,
-            groq.APIConnectionError
-        ))
-    )
-    def _make_completion_request(self, model, messages, response_format=None, temperature=0.3):
-        """Wrapper con retry para llamadas a la API"""
-        # Esperar si es necesario para respetar rate limits
-        _rate_limiter.wait_if_needed(model)
         
+        # Cache persistente de respuestas (None si GROQ_CACHE_ENABLED=false)
+        self.cache = cache or get_llm_cache()
+
+    @staticmethod
+    def _completion_kwargs(model, messages, response_format=None, temperature=0.3) -> Dict:
         kwargs = {
             "model": model,
             "messages": messages,
@@ -92,22 +325,233 @@ class GroqService:
         }
         if response_format:
             kwargs["response_format"] = response_format
-            
-        return self.client.chat.completions.create(**kwargs)
+        return kwargs
+
+    @staticmethod
+    def _record_usage(model, estimated_tokens: int, usage):
+        """Reconcilia el rate limiter con el consumo real (usage.total_tokens)."""
+        total_tokens = getattr(usage, "total_tokens", None)
+        if isinstance(total_tokens, int):
+            _rate_limiter.record_usage(model, estimated_tokens, total_tokens)
 
-    def analyze_text(self, text: str, prompt_template: str, use_deep_model: bool = True) -> str:
+    @_api_retry
+    def _request_with_retry(self, model, messages, response_format=None, temperature=0.3):
+        """Wrapper con retry para llamadas a la API"""
+        # Esperar si es necesario para respetar rate limits (RPM + TPM estimados)
+        estimated_tokens = _rate_limiter.estimate_tokens(messages)
+        _rate_limiter.wait_if_needed(model, tokens=estimated_tokens)
+        
+        completion = self.client.chat.completions.create(
+            **self._completion_kwargs(model, messages, response_format, temperature)
+        )
+        self._record_usage(model, estimated_tokens, getattr(completion, "usage", None))
+        return completion
+
+    @_api_retry
+    async def _request_with_retry_async(self, model, messages, response_format=None, temperature=0.3):
+        """
+        Versión async de _request_with_retry para la API y el bot: la espera del rate
+        limiter (y el backoff de los reintentos) es asyncio.sleep, y la llamada del SDK
+        síncrono corre en un hilo. El event loop nunca queda bloqueado.
+        """
+        estimated_tokens = _rate_limiter.estimate_tokens(messages)
+        await _rate_limiter.acquire(model, tokens=estimated_tokens)
+        
+        completion = await asyncio.to_thread(
+            self.client.chat.completions.create,
+            **self._completion_kwargs(model, messages, response_format, temperature)
+        )
+        self._record_usage(model, estimated_tokens, getattr(completion, "usage", None))
+        return completion
+
+    def _cache_lookup(self, model, messages, response_format, temperature, use_cache):
+        """(clave, respuesta cacheada o None). Sin cache configurado: (None, None)."""
+        if not self.cache:
+            return None, None
+        cache_key = self.cache.make_key(model, messages, temperature, response_format)
+        return cache_key, (self.cache.get(cache_key) if use_cache else None)
+
+    def _cache_store(self, cache_key, model, completion, response_format):
+        if cache_key:
+            content = completion.choices[0].message.content
+            if isinstance(content, str) and content and self._is_cacheable(content, response_format):
+                self.cache.set(cache_key, model, content)
+
+    def _make_completion_request(self, model, messages, response_format=None, temperature=0.3, use_cache=True):
+        """
+        Consulta el cache de respuestas antes de llamar a la API.
+        use_cache=False fuerza una llamada real (la respuesta nueva reemplaza la cacheada).
+        """
+        cache_key, cached = self._cache_lookup(model, messages, response_format, temperature, use_cache)
+        if cached is not None:
+            return _cached_completion(cached)
+        
+        completion = self._request_with_retry(model, messages, response_format, temperature)
+        self._cache_store(cache_key, model, completion, response_format)
+        return completion
+
+    async def _make_completion_request_async(self, model, messages, response_format=None, temperature=0.3, use_cache=True):
+        """Como _make_completion_request, sin bloquear el event loop (ver _request_with_retry_async)."""
+        cache_key, cached = self._cache_lookup(model, messages, response_format, temperature, use_cache)
+        if cached is not None:
+            return _cached_completion(cached)
+        
+        completion = await self._request_with_retry_async(model, messages, response_format, temperature)
+        self._cache_store(cache_key, model, completion, response_format)
+        return completion
+
+    @_api_retry
+    def _open_stream(self, model, messages, temperature=0.3):
+        """Abre una completion en streaming. El retry cubre la apertura (429, conexión), no el flujo."""
+        estimated_tokens = _rate_limiter.estimate_tokens(messages)
+        _rate_limiter.wait_if_needed(model, tokens=estimated_tokens)
+        stream = self.client.chat.completions.create(
+            model=model, messages=messages, temperature=temperature, stream=True
+        )
+        return stream, estimated_tokens
+
+    @_api_retry
+    async def _open_stream_async(self, model, messages, temperature=0.3):
+        """Versión async de _open_stream: espera del rate limiter sin bloquear el event loop."""
+        estimated_tokens = _rate_limiter.estimate_tokens(messages)
+        await _rate_limiter.acquire(model, tokens=estimated_tokens)
+        stream = await asyncio.to_thread(
+            self.client.chat.completions.create,
+            model=model, messages=messages, temperature=temperature, stream=True
+        )
+        return stream, estimated_tokens
+
+    def stream_completion(self, model, messages, temperature=0.3, use_cache=True) -> Iterator[str]:
+        """
+        Completion en streaming: genera los fragmentos de texto según llegan.
+        Registra el TTFT en stream_metrics y guarda la respuesta completa en el cache
+        LLM (con la misma clave que _make_completion_request; un hit se emite de una vez).
+        """
+        started = time.monotonic()
+        cache_key, cached = self._cache_lookup(model, messages, None, temperature, use_cache)
+        if cached is not None:
+            self._record_cached_stream(model, started)
+            yield cached
+            return
+        
+        stream, estimated_tokens = self._open_stream(model, messages, temperature)
+        state = _StreamState(started)
+        try:
+            for chunk in stream:
+                delta = state.feed(chunk)
+                if delta:
+                    yield delta
+        finally:
+            close = getattr(stream, "close", None)
+            if close:
+                close()
+        self._finish_stream(model, state, estimated_tokens, cache_key)
+
+    async def stream_completion_async(self, model, messages, temperature=0.3, use_cache=True) -> AsyncIterator[str]:
+        """
+        Como stream_completion, para el bot y los endpoints async: el rate limiter espera
+        con asyncio.sleep y cada chunk del stream (iterador síncrono del SDK) se lee en un hilo.
+        """
+        started = time.monotonic()
+        cache_key, cached = self._cache_lookup(model, messages, None, temperature, use_cache)
+        if cached is not None:
+            self._record_cached_stream(model, started)
+            yield cached
+            return
+        
+        stream, estimated_tokens = await self._open_stream_async(model, messages, temperature)
+        chunks = iter(stream)
+        state = _StreamState(started)
+        try:
+            while True:
+                chunk = await asyncio.to_thread(next, chunks, None)
+                if chunk is None:
+                    break
+                delta = state.feed(chunk)
+                if delta:
+                    yield delta
+        finally:
+            close = getattr(stream, "close", None)
+            if close:
+                close()
+        self._finish_stream(model, state, estimated_tokens, cache_key)
+
+    @staticmethod
+    def _record_cached_stream(model, started: float):
+        elapsed = time.monotonic() - started
+        stream_metrics.record(model, elapsed, elapsed, cached=True)
+
+    def _finish_stream(self, model, state: "_StreamState", estimated_tokens: int, cache_key):
+        """Métricas, reconciliación del rate limiter y cache al terminar un stream."""
+        total = time.monotonic() - state.started
+        stream_metrics.record(model, state.ttft if state.ttft is not None else total, total)
+        self._record_usage(model, estimated_tokens, state.usage)
+        content = "".join(state.parts)
+        if cache_key and content:
+            self.cache.set(cache_key, model, content)
+
+    @staticmethod
+    def _is_cacheable(content: str, response_format: Optional[Dict]) -> bool:
+        """No cachear respuestas JSON malformadas (se reintentarán en la próxima corrida)."""
+        if response_format and response_format.get("type") == "json_object":
+            try:
+                json.loads(content)
+            except json.JSONDecodeError:
+                return False
+        return True
+
+    def analyze_text(self, text: str, prompt_template: str, use_deep_model: bool = True, use_cache: bool = True) -> str:
         """Envía texto al modelo. Por defecto usa modelo profundo (70B) para auditoría."""
         model = self.deep_model if use_deep_model else self.fast_model
         try:
             completion = self._make_completion_request(
                 model=model,
-                messages=[{"role": "user", "content": prompt_template.format(text=text)}]
+                messages=[{"role": "user", "content": prompt_template.format(text=text)}],
+                use_cache=use_cache
+            )
+            return completion.choices[0].message.content
+        except Exception as e:
+            return f"Error en análisis de texto (tras reintentos): {str(e)}"
+
+    async def analyze_text_async(self, text: str, prompt_template: str, use_deep_model: bool = True, use_cache: bool = True) -> str:
+        """Como analyze_text, para callers async (no bloquea el event loop)."""
+        model = self.deep_model if use_deep_model else self.fast_model
+        try:
+            completion = await self._make_completion_request_async(
+                model=model,
+                messages=[{"role": "user", "content": prompt_template.format(text=text)}],
+                use_cache=use_cache
             )
             return completion.choices[0].message.content
         except Exception as e:
             return f"Error en análisis de texto (tras reintentos): {str(e)}"
 
-    def epistemological_audit(self, text: str) -> str:
+    async def stream_text_async(self, text: str, prompt_template: str, use_deep_model: bool = True, use_cache: bool = True) -> AsyncIterator[str]:
+        """Como stream_text, para callers async (no bloquea el event loop)."""
+        model = self.deep_model if use_deep_model else self.fast_model
+        try:
+            async for delta in self.stream_completion_async(
+                model=model,
+                messages=[{"role": "user", "content": prompt_template.format(text=text)}],
+                use_cache=use_cache
+            ):
+                yield delta
+        except Exception as e:
+            yield f"Error en análisis de texto (tras reintentos): {str(e)}"
+
+    def stream_text(self, text: str, prompt_template: str, use_deep_model: bool = True, use_cache: bool = True) -> Iterator[str]:
+        """Como analyze_text, pero genera la respuesta por fragmentos (chat en streaming)."""
+        model = self.deep_model if use_deep_model else self.fast_model
+        try:
+            yield from self.stream_completion(
+                model=model,
+                messages=[{"role": "user", "content": prompt_template.format(text=text)}],
+                use_cache=use_cache
+            )
+        except Exception as e:
+            yield f"Error en análisis de texto (tras reintentos): {str(e)}"
+
+    def epistemological_audit(self, text: str, use_cache: bool = True) -> str:
         """
         Realiza la 'Auditoría Epistemológica' de los 10 puntos.
         Trunca el texto si excede límites (simple truncation por ahora).
@@ -137,9 +581,9 @@ class GroqService:
         Al final, proporciona un veredicto de una frase: "Recomendado para cambio de práctica", "Evidencia débil", etc.
         """
         
-        return self.analyze_text(text="", prompt_template=prompt)
+        return self.analyze_text(text="", prompt_template=prompt, use_cache=use_cache)
 
-    def book_analysis(self, text: str) -> str:
+    def book_analysis(self, text: str, use_cache: bool = True) -> str:
         """
         Realiza un resumen y análisis de libro médico.
         """
@@ -160,7 +604,7 @@ class GroqService:
         
         Al final, proporciona un veredicto de una frase: "Referencia esencial", "Manual práctico", "Texto introductorio", etc.
         """
-        return self.analyze_text(text="", prompt_template=prompt)
+        return self.analyze_text(text="", prompt_template=prompt, use_cache=use_cache)
 
     def analyze_image_url(self, image_url: str, context: str = "") -> str:
         """
@@ -179,6 +623,7 @@ class GroqService:
         """
         
         try:
+            _rate_limiter.wait_if_needed(self.vision_model, tokens=_rate_limiter.estimate_tokens([{"content": prompt}]))
             chat_completion = self.client.chat.completions.create(
                 messages=[
                     {
@@ -225,6 +670,7 @@ class GroqService:
         """
         
         try:
+            _rate_limiter.wait_if_needed(self.vision_model, tokens=_rate_limiter.estimate_tokens([{"content": prompt}]))
             chat_completion = self.client.chat.completions.create(
                 messages=[
                     {
@@ -247,7 +693,7 @@ class GroqService:
                 "correct_answer": "A",
                 "explanation": f"Error: {str(e)}"
             }
-    def generate_snippets(self, text: str) -> Dict:
+    def generate_snippets(self, text: str, use_cache: bool = True) -> Dict:
         """Genera N, NNT, resumen y metadatos estructurados."""
         truncated_text = text[:12000]
         prompt = f"""
@@ -277,7 +723,8 @@ class GroqService:
             response = self._make_completion_request(
                 model=self.fast_model,
                 messages=[{"role": "user", "content": prompt}],
-                response_format={"type": "json_object"}
+                response_format={"type": "json_object"},
+                use_cache=use_cache
             )
             return json.loads(response.choices[0].message.content)
         except json.JSONDecodeError:
@@ -285,7 +732,7 @@ class GroqService:
         except Exception as e:
              return {"error": f"Error generando snippets (tras retries): {str(e)}"}
 
-    def generate_book_metadata(self, text: str) -> Dict:
+    def generate_book_metadata(self, text: str, use_cache: bool = True) -> Dict:
         """Extrae metadatos específicos de libros médicos."""
         truncated_text = text[:12000]
         prompt = f"""
@@ -313,13 +760,14 @@ class GroqService:
             response = self._make_completion_request(
                 model=self.fast_model,
                 messages=[{"role": "user", "content": prompt}],
-                response_format={"type": "json_object"}
+                response_format={"type": "json_object"},
+                use_cache=use_cache
             )
             return json.loads(response.choices[0].message.content)
         except Exception as e:
             return {"error": str(e)}
 
-    def generate_clinical_insights(self, text: str) -> Dict:
+    def generate_clinical_insights(self, text: str, use_cache: bool = True) -> Dict:
         """
         Extrae información crítica para decisiones clínicas rápidas (Modo Guardia).
         Enfocado en UCI y Emergencias.
@@ -345,13 +793,14 @@ class GroqService:
             response = self._make_completion_request(
                 model=self.fast_model,
                 messages=[{"role": "user", "content": prompt}],
-                response_format={"type": "json_object"}
+                response_format={"type": "json_object"},
+                use_cache=use_cache
             )
             return json.loads(response.choices[0].message.content)
         except Exception as e:
             return {"error": str(e), "bottom_line": "No se pudieron extraer insights clínicos."}
 
-    def extract_gpc_recommendations(self, text: str) -> Dict:
+    def extract_gpc_recommendations(self, text: str, use_cache: bool = True) -> Dict:
         """
         Extrae recomendaciones específicas de una Guía de Práctica Clínica.
         """
@@ -374,13 +823,14 @@ class GroqService:
             response = self._make_completion_request(
                 model=self.fast_model,
                 messages=[{"role": "user", "content": prompt}],
-                response_format={"type": "json_object"}
+                response_format={"type": "json_object"},
+                use_cache=use_cache
             )
             return json.loads(response.choices[0].message.content)
         except Exception:
             return {"clase_i": [], "clase_iia": [], "contraindicaciones_iii": [], "puntos_clave": []}
 
-    def suggest_calculators(self, text: str) -> List[str]:
+    def suggest_calculators(self, text: str, use_cache: bool = True) -> List[str]:
         """
         Sugiere calculadoras médicas relevantes basadas en el texto.
         """
@@ -394,7 +844,8 @@ class GroqService:
         try:
             completion = self._make_completion_request(
                 model=self.fast_model,
-                messages=[{"role": "user", "content": prompt}]
+                messages=[{"role": "user", "content": prompt}],
+                use_cache=use_cache
             )
             res = completion.choices[0].message.content
             return [c.strip() for c in res.split(",") if c.strip()]
@@ -0,0 +1,270 @@
+"""
+Clientes HTTP compartidos (httpx) para los servicios que llaman a APIs externas:
+enriquecimiento de metadatos (doi.org, PubMed, CrossRef), libros (OpenLibrary,
+Google Books) y notificaciones de Telegram.
+
+Un cliente por perfil (pool keep-alive, límite de conexiones, timeouts y
+reintentos propios) en vez de un handshake TCP+TLS por request. HTTP/2 se
+activa si está instalado `h2` (`pip install httpx[http2]`) y HTTP_CLIENT_HTTP2
+no lo desactiva. Cada request registra su latencia por host en `http_metrics`.
+"""
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+import httpx
+
+from services.metrics import percentiles
+
+logger = logging.getLogger(__name__)
+
+# Estados que se reintentan en métodos idempotentes (rate limit / caídas transitorias)
+RETRY_STATUSES = (429, 502, 503, 504)
+IDEMPOTENT_METHODS = ("GET", "HEAD", "OPTIONS")
+USER_AGENT = "MedFlix/1.0"
+
+
+@dataclass(frozen=True)
+class ClientPolicy:
+    """Pool, timeouts y reintentos de un perfil de cliente."""
+    timeout: float = 15.0
+    connect_timeout: float = 5.0
+    max_connections: int = 10
+    max_keepalive: int = 5
+    retries: int = 2          # Reintentos por estado (RETRY_STATUSES) en métodos idempotentes
+    connect_retries: int = 1  # Reintentos de conexión (los hace el transporte de httpx)
+    backoff: float = 0.5      # Espera base entre reintentos (se duplica; Retry-After manda)
+
+
+POLICIES: Dict[str, ClientPolicy] = {
+    # doi.org, PubMed E-utilities y CrossRef
+    "metadata": ClientPolicy(timeout=15.0, max_connections=20, max_keepalive=10),
+    # Backfill por lotes: efetch de 200 PMIDs tarda más; NCBI limita por IP
+    "metadata_backfill": ClientPolicy(timeout=60.0, max_connections=4, max_keepalive=4, retries=3),
+    # OpenLibrary / Google Books / portadas
+    "books": ClientPolicy(timeout=15.0, max_connections=10),
+    # Bot API de Telegram (POST: sin reintento por estado, no es idempotente)
+    "telegram": ClientPolicy(timeout=10.0, max_connections=5, max_keepalive=2),
+}
+DEFAULT_POLICY = ClientPolicy()
+
+
+def http2_enabled() -> bool:
+    """HTTP/2 si está instalado h2 y no se desactiva con HTTP_CLIENT_HTTP2=false."""
+    if os.getenv("HTTP_CLIENT_HTTP2", "true").lower() in ("0", "false", "no"):
+        return False
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class HTTPMetrics:
+    """Latencias recientes de las requests salientes, por host."""
+
+    def __init__(self, sample_size: int = 500):
+        self._lock = threading.Lock()
+        self._samples = defaultdict(lambda: deque(maxlen=sample_size))
+        self._counts = defaultdict(lambda: {"requests": 0, "errors": 0, "retries": 0})
+
+    def record(self, host: str, seconds: float, status: Optional[int] = None, retry: bool = False):
+        with self._lock:
+            self._samples[host].append(seconds)
+            counts = self._counts[host]
+            counts["requests"] += 1
+            if status is None or status >= 500:
+                counts["errors"] += 1
+            if retry:
+                counts["retries"] += 1
+        logger.debug(f"HTTP {host}: {seconds * 1000:.0f} ms (status {status})")
+
+    def snapshot(self) -> Dict:
+        """Conteos y percentiles de latencia (ms) por host."""
+        with self._lock:
+            samples = {host: list(values) for host, values in self._samples.items()}
+            counts = {host: dict(values) for host, values in self._counts.items()}
+        return {
+            host: {**counts[host], "latency_ms": percentiles([s * 1000 for s in values])}
+            for host, values in samples.items()
+        }
+
+    def reset(self):
+        with self._lock:
+            self._samples.clear()
+            self._counts.clear()
+
+
+# Métricas globales del proceso
+http_metrics = HTTPMetrics()
+
+
+def _retry_delay(response: httpx.Response, attempt: int, backoff: float) -> float:
+    retry_after = response.headers.get("Retry-After")
+    if retry_after and retry_after.isdigit():
+        return min(float(retry_after), 30.0)
+    return backoff * (2 ** attempt)
+
+
+def _should_retry(request: httpx.Request, response: httpx.Response, attempt: int, policy: ClientPolicy) -> bool:
+    return (request.method in IDEMPOTENT_METHODS and response.status_code in RETRY_STATUSES
+            and attempt < policy.retries)
+
+
+class InstrumentedTransport(httpx.BaseTransport):
+    """Transporte síncrono con métricas por host y reintentos por estado."""
+
+    def __init__(self, transport: httpx.BaseTransport, policy: ClientPolicy, metrics: HTTPMetrics):
+        self.transport = transport
+        self.policy = policy
+        self.metrics = metrics
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        attempt = 0
+        while True:
+            start = time.monotonic()
+            try:
+                response = self.transport.handle_request(request)
+            except httpx.TransportError:
+                self.metrics.record(request.url.host, time.monotonic() - start, None, retry=attempt > 0)
+                raise
+            self.metrics.record(request.url.host, time.monotonic() - start, response.status_code, retry=attempt > 0)
+            if not _should_retry(request, response, attempt, self.policy):
+                return response
+            response.close()
+            time.sleep(_retry_delay(response, attempt, self.policy.backoff))
+            attempt += 1
+
+    def close(self):
+        self.transport.close()
+
+
+class AsyncInstrumentedTransport(httpx.AsyncBaseTransport):
+    """Transporte async con métricas por host y reintentos por estado."""
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, policy: ClientPolicy, metrics: HTTPMetrics):
+        self.transport = transport
+        self.policy = policy
+        self.metrics = metrics
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        attempt = 0
+        while True:
+            start = time.monotonic()
+            try:
+                response = await self.transport.handle_async_request(request)
+            except httpx.TransportError:
+                self.metrics.record(request.url.host, time.monotonic() - start, None, retry=attempt > 0)
+                raise
+            self.metrics.record(request.url.host, time.monotonic() - start, response.status_code, retry=attempt > 0)
+            if not _should_retry(request, response, attempt, self.policy):
+                return response
+            await response.aclose()
+            await asyncio.sleep(_retry_delay(response, attempt, self.policy.backoff))
+            attempt += 1
+
+    async def aclose(self):
+        await self.transport.aclose()
+
+
+class HTTPClientRegistry:
+    """Un cliente sync y uno async por perfil, creados en el primer uso."""
+
+    def __init__(self, policies: Optional[Dict[str, ClientPolicy]] = None,
+                 metrics: Optional[HTTPMetrics] = None):
+        self.policies = policies if policies is not None else POLICIES
+        self.metrics = metrics or http_metrics
+        self._lock = threading.Lock()
+        self._clients: Dict[str, httpx.Client] = {}
+        # El AsyncClient queda ligado al event loop donde se usa: uno por (perfil, loop)
+        self._async_clients: Dict[str, Tuple[asyncio.AbstractEventLoop, httpx.AsyncClient]] = {}
+
+    def policy(self, name: str) -> ClientPolicy:
+        return self.policies.get(name, DEFAULT_POLICY)
+
+    def _client_kwargs(self, policy: ClientPolicy) -> Dict:
+        return {
+            "timeout": httpx.Timeout(policy.timeout, connect=policy.connect_timeout),
+            "headers": {"User-Agent": USER_AGENT},
+            # Mismo comportamiento que requests (portadas, doi.org)
+            "follow_redirects": True,
+        }
+
+    def _limits(self, policy: ClientPolicy) -> httpx.Limits:
+        return httpx.Limits(max_connections=policy.max_connections,
+                            max_keepalive_connections=policy.max_keepalive,
+                            keepalive_expiry=30.0)
+
+    def get(self, name: str) -> httpx.Client:
+        """Cliente síncrono compartido del perfil `name`."""
+        with self._lock:
+            client = self._clients.get(name)
+            if client is None or client.is_closed:
+                policy = self.policy(name)
+                transport = httpx.HTTPTransport(http2=http2_enabled(), limits=self._limits(policy),
+                                                retries=policy.connect_retries)
+                client = httpx.Client(transport=InstrumentedTransport(transport, policy, self.metrics),
+                                      **self._client_kwargs(policy))
+                self._clients[name] = client
+            return client
+
+    def get_async(self, name: str) -> httpx.AsyncClient:
+        """Cliente async compartido del perfil `name` para el event loop actual."""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            entry = self._async_clients.get(name)
+            if entry is None or entry[0] is not loop or entry[1].is_closed:
+                policy = self.policy(name)
+                transport = httpx.AsyncHTTPTransport(http2=http2_enabled(), limits=self._limits(policy),
+                                                     retries=policy.connect_retries)
+                client = httpx.AsyncClient(transport=AsyncInstrumentedTransport(transport, policy, self.metrics),
+                                           **self._client_kwargs(policy))
+                self._async_clients[name] = (loop, client)
+                return client
+            return entry[1]
+
+    def close(self):
+        """Cierra los clientes síncronos."""
+        with self._lock:
+            clients, self._clients = list(self._clients.values()), {}
+        for client in clients:
+            client.close()
+
+    async def aclose(self):
+        """Cierra los clientes async del loop actual y los síncronos (shutdown de la API)."""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            entries = list(self._async_clients.items())
+            self._async_clients = {name: entry for name, entry in entries if entry[0] is not loop}
+        for _, (entry_loop, client) in entries:
+            if entry_loop is loop:
+                await client.aclose()
+        self.close()
+
+
+# Singleton para uso global
+_registry = None
+_registry_lock = threading.Lock()
+
+def get_http_registry() -> HTTPClientRegistry:
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = HTTPClientRegistry()
+    return _registry
+
+
+def get_http_client(name: str) -> httpx.Client:
+    """Cliente síncrono compartido (keep-alive) del perfil `name`."""
+    return get_http_registry().get(name)
+
+
+def get_async_http_client(name: str) -> httpx.AsyncClient:
+    """Cliente async compartido (keep-alive) del perfil `name`."""
+    return get_http_registry().get_async(name)
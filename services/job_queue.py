@@ -0,0 +1,252 @@
+"""
+Cola de trabajos persistente para MedFlix Core.
+Respaldada por PostgreSQL (tabla jobs): los workers reclaman trabajos con
+SELECT ... FOR UPDATE SKIP LOCKED, así varios procesos consumen sin pisarse.
+"""
+import logging
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import func
+
+from models.job import Job
+from services.database import DatabaseService, get_db_service
+from services.metrics import percentiles
+
+logger = logging.getLogger(__name__)
+
+# Estados de un trabajo
+PENDING = "pendiente"
+RUNNING = "procesando"
+DONE = "completado"
+FAILED = "fallido"
+
+
+class JobQueue:
+    """Cola de trabajos sobre la tabla jobs."""
+
+    def __init__(self,
+                 db_service: Optional[DatabaseService] = None,
+                 retry_base_seconds: float = 30.0,
+                 stale_after_seconds: float = 300.0):
+        self.db = db_service or get_db_service()
+        self.retry_base_seconds = retry_base_seconds
+        self.stale_after_seconds = stale_after_seconds
+
+    # ==================== PRODUCTOR ====================
+
+    def enqueue(self,
+                payload: Dict[str, Any],
+                tipo: str = "analyze_pdf",
+                priority: int = 0,
+                max_attempts: int = 3,
+                job_id: Optional[str] = None) -> str:
+        """Inserta un trabajo pendiente. Un solo INSERT, sin trabajo adicional."""
+        with self.db.get_session() as session:
+            job = Job(
+                id=uuid.UUID(job_id) if job_id else uuid.uuid4(),
+                tipo=tipo,
+                payload=payload,
+                status=PENDING,
+                priority=priority,
+                max_attempts=max_attempts,
+                message="En cola",
+                created_at=datetime.utcnow(),
+                run_after=datetime.utcnow()
+            )
+            session.add(job)
+            session.flush()
+            return str(job.id)
+
+    # ==================== CONSUMIDOR ====================
+
+    def claim(self, worker_id: Optional[str] = None, tipos: Optional[List[str]] = None) -> Optional[Dict[str, Any]]:
+        """
+        Reclama el siguiente trabajo listo (mayor prioridad, más antiguo).
+        FOR UPDATE SKIP LOCKED: los trabajos bloqueados por otro worker se saltan.
+        """
+        worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        now = datetime.utcnow()
+        with self.db.get_session() as session:
+            query = session.query(Job).filter(Job.status == PENDING, Job.run_after <= now)
+            if tipos:
+                query = query.filter(Job.tipo.in_(tipos))
+            job = (
+                query.order_by(Job.priority.desc(), Job.created_at.asc())
+                .with_for_update(skip_locked=True)
+                .first()
+            )
+            if job is None:
+                return None
+
+            job.status = RUNNING
+            job.attempts = (job.attempts or 0) + 1
+            job.started_at = now
+            job.heartbeat_at = now
+            job.locked_by = worker_id
+            job.message = f"Procesando (intento {job.attempts}/{job.max_attempts})"
+            session.flush()
+            return job.to_dict()
+
+    def complete(self, job_id: str, result: Dict[str, Any], message: Optional[str] = None):
+        """Marca un trabajo como completado con su resultado."""
+        with self.db.get_session() as session:
+            job = session.get(Job, uuid.UUID(str(job_id)))
+            if job is None:
+                return
+            job.status = DONE
+            job.result = result
+            job.message = message or result.get("message")
+            job.finished_at = datetime.utcnow()
+            job.locked_by = None
+
+    def update_payload(self, job_id: str, payload: Dict[str, Any]):
+        """Reemplaza el payload de un trabajo (datos para retomar en un reintento)."""
+        with self.db.get_session() as session:
+            job = session.get(Job, uuid.UUID(str(job_id)))
+            if job is not None:
+                job.payload = dict(payload)
+
+    def fail(self, job_id: str, error: str) -> str:
+        """
+        Registra un fallo. Si quedan intentos, vuelve a la cola con backoff
+        exponencial; si no, queda como fallido.
+
+        Returns:
+            El nuevo estado del trabajo.
+        """
+        with self.db.get_session() as session:
+            job = session.get(Job, uuid.UUID(str(job_id)))
+            if job is None:
+                return FAILED
+            job.locked_by = None
+            if job.attempts < job.max_attempts:
+                delay = self.retry_base_seconds * (2 ** (job.attempts - 1))
+                job.status = PENDING
+                job.run_after = datetime.utcnow() + timedelta(seconds=delay)
+                job.message = f"Reintento {job.attempts + 1}/{job.max_attempts} en {int(delay)}s: {error}"
+            else:
+                job.status = FAILED
+                job.finished_at = datetime.utcnow()
+                job.message = error
+            logger.warning(f"Job {job_id} falló (intento {job.attempts}): {error}")
+            return job.status
+
+    def heartbeat(self, job_id: str, worker_id: str) -> bool:
+        """Señal de vida del worker que ejecuta el trabajo. False si ya no lo tiene reclamado."""
+        with self.db.get_session() as session:
+            count = (
+                session.query(Job)
+                .filter(Job.id == uuid.UUID(str(job_id)), Job.status == RUNNING, Job.locked_by == worker_id)
+                .update({Job.heartbeat_at: datetime.utcnow()}, synchronize_session=False)
+            )
+        return count > 0
+
+    def requeue_stale(self) -> int:
+        """
+        Trabajos 'procesando' sin heartbeat en stale_after_seconds (worker caído):
+        vuelven a la cola si les quedan intentos; si no, quedan como fallidos
+        (un trabajo que tumba al worker no se reencola indefinidamente).
+        """
+        cutoff = datetime.utcnow() - timedelta(seconds=self.stale_after_seconds)
+        last_seen = func.coalesce(Job.heartbeat_at, Job.started_at)
+        requeued = failed = 0
+        with self.db.get_session() as session:
+            stale = (
+                session.query(Job)
+                .filter(Job.status == RUNNING, last_seen < cutoff)
+                .with_for_update(skip_locked=True)
+                .all()
+            )
+            for job in stale:
+                job.locked_by = None
+                if job.attempts >= job.max_attempts:
+                    job.status = FAILED
+                    job.finished_at = datetime.utcnow()
+                    job.message = f"Worker sin respuesta en el intento {job.attempts}/{job.max_attempts}"
+                    failed += 1
+                else:
+                    job.status = PENDING
+                    job.run_after = datetime.utcnow()
+                    job.message = "Reencolado (worker sin respuesta)"
+                    requeued += 1
+        if requeued:
+            logger.warning(f"♻️ {requeued} trabajos reencolados (worker sin heartbeat)")
+        if failed:
+            logger.error(f"💀 {failed} trabajos marcados como fallidos: agotaron sus intentos sin terminar")
+        return requeued + failed
+
+    # ==================== CONSULTA ====================
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Obtiene un trabajo por ID."""
+        try:
+            key = uuid.UUID(str(job_id))
+        except ValueError:
+            return None
+        with self.db.get_session() as session:
+            job = session.get(Job, key)
+            return job.to_dict() if job else None
+
+    def list_jobs(self, status: Optional[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
+        """Lista trabajos recientes, opcionalmente filtrados por estado."""
+        with self.db.get_session() as session:
+            query = session.query(Job)
+            if status:
+                query = query.filter(Job.status == status)
+            jobs = query.order_by(Job.created_at.desc()).limit(limit).all()
+            return [job.to_dict() for job in jobs]
+
+    def stats(self, sample_size: int = 500) -> Dict[str, Any]:
+        """
+        Profundidad de la cola por estado y percentiles de latencia
+        (espera en cola y duración de ejecución) sobre los últimos trabajos terminados.
+        """
+        with self.db.get_session() as session:
+            depth = dict(
+                session.query(Job.status, func.count(Job.id)).group_by(Job.status).all()
+            )
+            oldest_pending = (
+                session.query(func.min(Job.created_at)).filter(Job.status == PENDING).scalar()
+            )
+            finished = (
+                session.query(Job.created_at, Job.started_at, Job.finished_at)
+                .filter(Job.status == DONE, Job.started_at.isnot(None), Job.finished_at.isnot(None))
+                .order_by(Job.finished_at.desc())
+                .limit(sample_size)
+                .all()
+            )
+
+        wait = [(started - created).total_seconds() for created, started, _ in finished]
+        run = [(done - started).total_seconds() for _, started, done in finished]
+        total = [(done - created).total_seconds() for created, _, done in finished]
+
+        return {
+            "depth": {s: depth.get(s, 0) for s in (PENDING, RUNNING, DONE, FAILED)},
+            "oldest_pending_seconds": (
+                round((datetime.utcnow() - oldest_pending).total_seconds(), 1) if oldest_pending else None
+            ),
+            "latency_seconds": {
+                "sample": len(finished),
+                "queue_wait": percentiles(wait),
+                "run": percentiles(run),
+                "total": percentiles(total),
+            }
+        }
+
+
+# Singleton para uso global
+_job_queue = None
+
+def get_job_queue() -> JobQueue:
+    """Obtiene la instancia global de la cola de trabajos."""
+    global _job_queue
+    if _job_queue is None:
+        _job_queue = JobQueue(
+            retry_base_seconds=float(os.getenv("JOB_RETRY_BASE_SECONDS", "30")),
+            stale_after_seconds=float(os.getenv("JOB_STALE_AFTER_SECONDS", "300"))
+        )
+    return _job_queue
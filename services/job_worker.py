@@ -0,0 +1,217 @@
+"""
+Worker de la cola de trabajos de MedFlix Core.
+Proceso independiente de la API: reclama trabajos de la tabla jobs y ejecuta el análisis.
+Escalar = lanzar más procesos (python -m services.job_worker).
+"""
+import logging
+import os
+import signal
+import socket
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+from dotenv import load_dotenv
+
+from services.job_queue import JobQueue, get_job_queue
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Archivo de vida del proceso (healthcheck del contenedor: python -m services.job_worker --healthcheck).
+# Fuera del volumen compartido data/: cada réplica del worker tiene el suyo.
+LIVENESS_FILE = os.getenv("JOB_WORKER_LIVENESS_FILE", "/tmp/medflix_job_worker.alive")
+LIVENESS_MAX_AGE_SECONDS = float(os.getenv("JOB_WORKER_LIVENESS_MAX_AGE_SECONDS", "120"))
+
+
+def touch_liveness(path: str = LIVENESS_FILE):
+    try:
+        Path(path).touch()
+    except OSError as e:
+        logger.warning(f"No se pudo actualizar {path}: {e}")
+
+
+def is_alive(path: str = LIVENESS_FILE, max_age: float = LIVENESS_MAX_AGE_SECONDS) -> bool:
+    """True si el bucle del worker (o el heartbeat del trabajo en curso) dio señal hace menos de max_age."""
+    try:
+        return time.time() - os.path.getmtime(path) < max_age
+    except OSError:
+        return False
+
+
+def build_job_result(result: Dict[str, Any]) -> Dict[str, Any]:
+    """Convierte el resultado de AnalysisCore al formato que expone /jobs/{id}."""
+    if result["status"] == "duplicate":
+        return {
+            "status": "duplicate",
+            "message": f"Documento duplicado. Razón: {result['reason']}",
+            "doc_id": result["data"]["hash"],
+            "analysis": result.get("analysis", ""),
+            "snippets": result.get("snippets", {})
+        }
+    data = result.get("data", {})
+    return {
+        "status": "success",
+        "message": "Análisis completado exitosamente",
+        "doc_id": result.get("doc_id") or result.get("job_id"),
+        "analysis": result.get("analysis") or data.get("analisis_completo"),
+        "snippets": result.get("snippets", {}),
+        "graficos_analizados": result.get("graficos_analizados", []),
+        "metadata": result.get("metadata", {})
+    }
+
+
+class JobWorker:
+    """Bucle de consumo de la cola: reclamar -> ejecutar -> completar/reintentar."""
+
+    def __init__(self,
+                 queue: Optional[JobQueue] = None,
+                 core=None,
+                 poll_interval: float = 2.0,
+                 worker_id: Optional[str] = None,
+                 heartbeat_interval: float = 30.0,
+                 requeue_interval: float = 60.0):
+        self.queue = queue or get_job_queue()
+        self._core = core
+        self.poll_interval = poll_interval
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self.heartbeat_interval = heartbeat_interval
+        self.requeue_interval = requeue_interval
+        self._next_requeue = 0.0
+        self._stopping = False
+
+        # Handlers por tipo de trabajo (reciben el trabajo completo: id, payload, intentos)
+        self.handlers: Dict[str, Callable[[Dict[str, Any]], Dict[str, Any]]] = {
+            "analyze_pdf": self._handle_analyze_pdf,
+        }
+
+    @property
+    def core(self):
+        # AnalysisCore se construye al primer trabajo (carga Chroma, Groq, etc.)
+        if self._core is None:
+            from core.analysis import AnalysisCore
+            self._core = AnalysisCore()
+        return self._core
+
+    def _handle_analyze_pdf(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        result = self.core.process_and_analyze(
+            self._resolve_file(job),
+            analyze_graphs=job["payload"].get("analyze_graphs", True)
+        )
+        return build_job_result(result)
+
+    def _resolve_file(self, job: Dict[str, Any]) -> str:
+        """
+        Ruta actual del PDF de un trabajo. Un intento fallido puede haber renombrado
+        el archivo: el hash queda en el payload en el primer intento y los reintentos
+        localizan el archivo por el paper ya creado con ese hash.
+        """
+        payload = job["payload"]
+        path = Path(payload["file_path"])
+        if path.exists():
+            if "hash" not in payload:
+                payload["hash"] = self.core.ingestion.compute_file_hash(path)
+                self.queue.update_payload(job["job_id"], payload)
+            return str(path)
+
+        paper = self.core.db_service.get_paper_by_hash(payload["hash"]) if payload.get("hash") else None
+        if paper is not None and paper.archivo_path and Path(paper.archivo_path).exists():
+            logger.info(f"📁 Job {job['job_id']}: archivo localizado por hash en {paper.archivo_path}")
+            return paper.archivo_path
+        raise FileNotFoundError(f"Archivo del trabajo no encontrado: {path}")
+
+    def run_once(self) -> bool:
+        """
+        Procesa un trabajo si hay alguno listo.
+
+        Returns:
+            True si se procesó (o falló) un trabajo, False si la cola estaba vacía.
+        """
+        job = self.queue.claim(self.worker_id, tipos=list(self.handlers))
+        if job is None:
+            return False
+
+        job_id = job["job_id"]
+        logger.info(f"⚙️ Job {job_id} ({job['tipo']}) intento {job['attempts']}/{job['max_attempts']}")
+        try:
+            with self._heartbeat(job_id):
+                result = self.handlers[job["tipo"]](job)
+            self.queue.complete(job_id, result)
+            logger.info(f"✅ Job {job_id} completado")
+        except Exception as e:
+            status = self.queue.fail(job_id, str(e))
+            logger.error(f"❌ Job {job_id} falló ({status}): {e}")
+        return True
+
+    @contextmanager
+    def _heartbeat(self, job_id: str):
+        """Actualiza heartbeat_at del trabajo cada heartbeat_interval mientras se ejecuta."""
+        done = threading.Event()
+
+        def beat():
+            while not done.wait(self.heartbeat_interval):
+                touch_liveness()
+                try:
+                    self.queue.heartbeat(job_id, self.worker_id)
+                except Exception as e:
+                    logger.warning(f"Heartbeat del job {job_id} falló: {e}")
+
+        thread = threading.Thread(target=beat, daemon=True, name=f"heartbeat-{job_id[:8]}")
+        thread.start()
+        try:
+            yield
+        finally:
+            done.set()
+            thread.join()
+
+    def requeue_stale_if_due(self):
+        """Reencola (o da por fallidos) trabajos de workers caídos, como mucho cada requeue_interval."""
+        now = time.monotonic()
+        if now < self._next_requeue:
+            return
+        self._next_requeue = now + self.requeue_interval
+        self.queue.requeue_stale()
+
+    def stop(self, *_):
+        logger.info("🛑 Deteniendo worker tras el trabajo en curso...")
+        self._stopping = True
+
+    def run_forever(self):
+        """Bucle principal. SIGTERM/SIGINT terminan tras el trabajo actual."""
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        logger.info(f"👷 Worker {self.worker_id} escuchando la cola...")
+
+        while not self._stopping:
+            touch_liveness()
+            try:
+                self.requeue_stale_if_due()
+                if not self.run_once():
+                    time.sleep(self.poll_interval)
+            except Exception as e:
+                # Errores de conexión a la DB: esperar y reintentar
+                logger.error(f"Error en el bucle del worker: {e}")
+                time.sleep(self.poll_interval)
+
+        # Refresco pendiente de paper_stats (diferido) antes de salir
+        from services.database import stats_refresher
+        stats_refresher.flush()
+
+
+if __name__ == "__main__":
+    import sys
+    if "--healthcheck" in sys.argv:
+        sys.exit(0 if is_alive() else 1)
+
+    logging.basicConfig(
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        level=logging.INFO
+    )
+    JobWorker(
+        poll_interval=float(os.getenv("JOB_POLL_INTERVAL", "2")),
+        heartbeat_interval=float(os.getenv("JOB_HEARTBEAT_SECONDS", "30")),
+        requeue_interval=float(os.getenv("JOB_REQUEUE_INTERVAL_SECONDS", "60")),
+    ).run_forever()
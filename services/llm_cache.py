@@ -0,0 +1,170 @@
+"""
+Cache persistente de respuestas LLM para MedFlix Core.
+Direccionado por contenido: (modelo, hash del prompt, temperatura, response_format).
+Backend SQLite en disco con evicción LRU por tamaño y TTL opcional.
+"""
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class LLMResponseCache:
+    """Cache en disco de completions de Groq."""
+
+    def __init__(self,
+                 db_path: str = "data/llm_cache.sqlite",
+                 max_bytes: int = 256 * 1024 * 1024,
+                 ttl_seconds: Optional[float] = None):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds or None
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS llm_cache (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                response TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_access ON llm_cache (last_access)")
+        self._conn.commit()
+
+        # Contadores de la sesión actual
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    # ==================== CLAVES ====================
+
+    @staticmethod
+    def make_key(model: str,
+                 messages: List[Dict[str, Any]],
+                 temperature: float,
+                 response_format: Optional[Dict] = None) -> str:
+        """Clave determinista: modelo + hash del prompt + temperatura + formato."""
+        prompt_hash = hashlib.sha256(
+            json.dumps(messages, sort_keys=True, ensure_ascii=False).encode("utf-8")
+        ).hexdigest()
+        fmt = json.dumps(response_format, sort_keys=True) if response_format else ""
+        raw = f"{model}|{prompt_hash}|{temperature}|{fmt}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    # ==================== LECTURA / ESCRITURA ====================
+
+    def get(self, key: str) -> Optional[str]:
+        """Retorna el contenido cacheado o None (miss o expirado)."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, created_at FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+
+            if row is None:
+                self.misses += 1
+                return None
+
+            response, created_at = row
+            if self.ttl_seconds and now - created_at > self.ttl_seconds:
+                self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                self._conn.commit()
+                self.misses += 1
+                return None
+
+            self._conn.execute("UPDATE llm_cache SET last_access = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+            return response
+
+    def set(self, key: str, model: str, response: str):
+        """Guarda una respuesta y aplica evicción LRU si se excede el tamaño."""
+        now = time.time()
+        size = len(response.encode("utf-8"))
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, model, response, size, created_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, model, response, size, now, now)
+            )
+            self._evict_if_needed()
+            self._conn.commit()
+
+    def _evict_if_needed(self):
+        """Elimina las entradas menos usadas recientemente hasta volver bajo max_bytes."""
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM llm_cache").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        rows = self._conn.execute("SELECT key, size FROM llm_cache ORDER BY last_access ASC").fetchall()
+        to_delete = []
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            to_delete.append((key,))
+            total -= size
+
+        self._conn.executemany("DELETE FROM llm_cache WHERE key = ?", to_delete)
+        self.evictions += len(to_delete)
+        logger.info(f"LLM cache: {len(to_delete)} entradas desalojadas (LRU)")
+
+    def clear(self):
+        """Vacía el cache completo."""
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_cache")
+            self._conn.commit()
+
+    # ==================== MÉTRICAS ====================
+
+    def stats(self) -> Dict[str, Any]:
+        """Contadores de hit/miss y ocupación actual."""
+        with self._lock:
+            entries, total_bytes = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_cache"
+            ).fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "entries": entries,
+            "size_bytes": total_bytes,
+            "max_bytes": self.max_bytes,
+        }
+
+
+# Singleton para uso global
+_llm_cache = None
+
+def get_llm_cache() -> Optional[LLMResponseCache]:
+    """
+    Obtiene la instancia global del cache LLM.
+    Retorna None si GROQ_CACHE_ENABLED=false.
+    """
+    global _llm_cache
+    if os.getenv("GROQ_CACHE_ENABLED", "true").lower() in ("0", "false", "no"):
+        return None
+    if _llm_cache is None:
+        ttl_hours = float(os.getenv("GROQ_CACHE_TTL_HOURS", "0"))
+        _llm_cache = LLMResponseCache(
+            db_path=os.getenv("GROQ_CACHE_PATH", "data/llm_cache.sqlite"),
+            max_bytes=int(float(os.getenv("GROQ_CACHE_MAX_MB", "256")) * 1024 * 1024),
+            ttl_seconds=ttl_hours * 3600 if ttl_hours > 0 else None
+        )
+    return _llm_cache
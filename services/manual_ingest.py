@@ -2,8 +2,7 @@
 import os
 import asyncio
 from pathlib import Path
-from services.database import get_db_service
-from core.analysis import AnalysisCore
+from core.batch_engine import BatchIngestionEngine
 import logging
 
 # Configuración de Logging
@@ -15,9 +14,6 @@ logger = logging.getLogger(__name__)
 
 async def scan_local_files():
     """Escanea y procesa archivos existentes en data/uploads_channels"""
-    db = get_db_service()
-    core = AnalysisCore()
-    
     target_dir = Path("data/uploads_channels")
     if not target_dir.exists():
         logger.error(f"El directorio {target_dir} no existe.")
@@ -25,41 +21,21 @@ async def scan_local_files():
 
     logger.info(f"📂 Escaneando directorio: {target_dir}")
     
-    pdf_files = list(target_dir.glob("*.pdf"))
+    pdf_files = sorted(target_dir.glob("*.pdf"))
     logger.info(f"Encontrados {len(pdf_files)} archivos PDF.")
     
-    processed_count = 0
-    duplicate_count = 0
-    error_count = 0
-
-    for file_path in pdf_files:
-        try:
-            logger.info(f"🧠 Procesando: {file_path.name}...")
-            
-            # Ejecutar análisis (usando thread pool porque AnalysisCore puede ser bloqueante)
-            loop = asyncio.get_running_loop()
-            result = await loop.run_in_executor(
-                None, 
-                core.process_and_analyze, 
-                str(file_path)
-            )
-            
-            status = result.get('status')
-            if status == 'success':
-                logger.info(f"✅ Éxito: {result.get('doc_id')}")
-                processed_count += 1
-            elif status == 'duplicate':
-                logger.info(f"⚠️ Duplicado: {result.get('reason')}")
-                duplicate_count += 1
-            else:
-                logger.warning(f"❌ Fallo: {result}")
-                error_count += 1
-                
-        except Exception as e:
-            logger.error(f"Error crítico con {file_path.name}: {e}")
-            error_count += 1
+    # Dedupe por hash, extracción en pool de procesos y análisis concurrente acotado.
+    # Reanudable vía checkpoint (BATCH_CHECKPOINT_PATH).
+    engine = BatchIngestionEngine(
+        checkpoint_path=os.getenv("BATCH_CHECKPOINT_PATH", "data/batch_checkpoint.jsonl")
+    )
+    summary = await engine.run(pdf_files)
             
-    logger.info(f"🏁 Resumen: Procesados {processed_count} | Duplicados {duplicate_count} | Errores {error_count}")
+    logger.info(
+        f"🏁 Resumen: Procesados {summary['success']} | Duplicados {summary['duplicate']} | "
+        f"Errores {summary['error']} | Ya procesados {summary['skipped']}"
+    )
+    return summary
 
 if __name__ == "__main__":
     asyncio.run(scan_local_files())
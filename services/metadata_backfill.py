@@ -0,0 +1,280 @@
+"""
+Backfill masivo de metadatos PubMed/CrossRef para la biblioteca existente.
+
+En vez de 2 round trips a PubMed + 1 a CrossRef por paper:
+- PubMed esearch con los DOIs del lote combinados con OR (POST).
+- PubMed efetch de hasta 200 PMIDs por request, parseado en streaming
+  (XMLPullParser: un PubmedArticle a la vez, sin cargar el XML completo).
+- CrossRef /works filtrado por varios DOIs (filter=doi:A,doi:B,...).
+Las requests a NCBI pasan por un limitador (3 req/s, 10 req/s con NCBI_API_KEY)
+y los resultados se escriben con bulk_update_papers. Los DOIs resueltos (o sin
+metadatos) quedan en el cache de DOIs: el siguiente backfill no los vuelve a pedir.
+
+Uso: python -m services.metadata_backfill [--limit N]
+"""
+import argparse
+import logging
+import os
+import threading
+import time
+import xml.etree.ElementTree as ET
+from typing import Dict, Iterable, Iterator, List, Optional
+
+import httpx
+
+from services.database import get_db_service
+from services.doi_cache import FRESH, STALE, get_doi_cache
+from services.http_clients import get_http_client
+from services.metadata_enricher import (
+    CROSSREF_WORKS,
+    PUBMED_BASE,
+    MetadataService,
+    enrichment_update_fields,
+    normalize_doi,
+)
+
+logger = logging.getLogger(__name__)
+
+# Tamaños de lote (efetch admite hasta 200 ids por request en este flujo)
+ESEARCH_BATCH = int(os.getenv("BACKFILL_ESEARCH_BATCH", "100"))
+EFETCH_BATCH = min(int(os.getenv("BACKFILL_EFETCH_BATCH", "200")), 200)
+CROSSREF_BATCH = int(os.getenv("BACKFILL_CROSSREF_BATCH", "50"))
+# Papers por UPDATE en bloque (bulk_update_papers)
+BULK_UPDATE_SIZE = 100
+
+
+def _chunks(items: List, size: int) -> Iterator[List]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+class NCBIRateLimiter:
+    """
+    Intervalo mínimo entre requests a E-utilities (compartido entre hilos).
+    NCBI permite 3 req/s sin API key y 10 req/s con ella.
+    """
+
+    def __init__(self, api_key: Optional[str] = None, rate: Optional[float] = None):
+        self.rate = rate or (10.0 if api_key else 3.0)
+        self.interval = 1.0 / self.rate
+        self._lock = threading.Lock()
+        self._next = 0.0
+
+    def acquire(self):
+        with self._lock:
+            now = time.monotonic()
+            wait = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if wait > 0:
+            time.sleep(wait)
+
+
+class MetadataBackfill:
+    """Resuelve DOIs por lotes contra PubMed y CrossRef y actualiza papers en bloque."""
+
+    def __init__(self,
+                 db=None,
+                 client: Optional[httpx.Client] = None,
+                 cache=None,
+                 pubmed_base: str = PUBMED_BASE,
+                 crossref_works: str = CROSSREF_WORKS,
+                 api_key: Optional[str] = None,
+                 limiter: Optional[NCBIRateLimiter] = None):
+        self.db = db or get_db_service()
+        # Perfil propio: timeouts largos (efetch por lotes) y pocas conexiones hacia NCBI
+        self.client = client or get_http_client("metadata_backfill")
+        self.cache = cache if cache is not None else get_doi_cache()
+        self.pubmed_base = pubmed_base
+        self.crossref_works = crossref_works
+        self.api_key = api_key if api_key is not None else os.getenv("NCBI_API_KEY")
+        self.limiter = limiter or NCBIRateLimiter(self.api_key)
+        self.crossref_mailto = os.getenv("CROSSREF_MAILTO")
+        # Sólo para reutilizar los parsers y el merge de PubMed/CrossRef
+        self.parser = MetadataService(cache=cache, http=self.client)
+
+    # ==================== PUBMED ====================
+
+    def _ncbi_params(self, **params) -> Dict:
+        if self.api_key:
+            params["api_key"] = self.api_key
+        return params
+
+    def esearch_pmids(self, dois: List[str]) -> List[str]:
+        """PMIDs de un lote de DOIs (un esearch con los términos combinados con OR)."""
+        term = " OR ".join(f'"{doi}"[doi]' for doi in dois)
+        self.limiter.acquire()
+        resp = self.client.post(f"{self.pubmed_base}/esearch.fcgi", data=self._ncbi_params(
+            db="pubmed", term=term, retmode="json", retmax=str(len(dois) * 2)
+        ))
+        resp.raise_for_status()
+        return resp.json().get("esearchresult", {}).get("idlist", [])
+
+    def efetch_articles(self, pmids: List[str]) -> Iterator[ET.Element]:
+        """Elementos PubmedArticle de un efetch, a medida que llegan (XML en streaming)."""
+        self.limiter.acquire()
+        with self.client.stream("POST", f"{self.pubmed_base}/efetch.fcgi", data=self._ncbi_params(
+            db="pubmed", id=",".join(pmids), retmode="xml"
+        )) as resp:
+            resp.raise_for_status()
+            parser = ET.XMLPullParser(events=("end",))
+            for chunk in resp.iter_bytes():
+                parser.feed(chunk)
+                yield from self._completed_articles(parser)
+            parser.close()
+            yield from self._completed_articles(parser)
+
+    @staticmethod
+    def _completed_articles(parser: ET.XMLPullParser) -> Iterator[ET.Element]:
+        for _, element in parser.read_events():
+            if element.tag == "PubmedArticle":
+                yield element
+                element.clear()  # memoria acotada: no se acumula el documento
+
+    @staticmethod
+    def _article_ids(article: ET.Element):
+        """(pmid, doi) de un PubmedArticle."""
+        pmid_el = article.find("./MedlineCitation/PMID")
+        doi_el = article.find(".//ArticleIdList/ArticleId[@IdType='doi']")
+        if doi_el is None:
+            doi_el = article.find(".//ELocationID[@EIdType='doi']")
+        pmid = pmid_el.text if pmid_el is not None else None
+        doi = normalize_doi(doi_el.text).lower() if doi_el is not None and doi_el.text else None
+        return pmid, doi
+
+    def fetch_pubmed(self, dois: List[str]) -> Dict[str, Dict]:
+        """{doi en minúsculas: metadatos PubMed} para los DOIs encontrados."""
+        wanted = {doi.lower(): doi for doi in dois}
+        pmids = []
+        for batch in _chunks(dois, ESEARCH_BATCH):
+            pmids.extend(self.esearch_pmids(batch))
+
+        found = {}
+        for batch in _chunks(list(dict.fromkeys(pmids)), EFETCH_BATCH):
+            for article in self.efetch_articles(batch):
+                pmid, doi = self._article_ids(article)
+                if doi in wanted and doi not in found:
+                    found[doi] = self.parser._parse_pubmed_element(wanted[doi], pmid, article)
+        return {doi: meta for doi, meta in found.items() if meta}
+
+    # ==================== CROSSREF ====================
+
+    def fetch_crossref(self, dois: List[str]) -> Dict[str, Dict]:
+        """{doi en minúsculas: metadatos CrossRef} con /works?filter=doi:A,doi:B,..."""
+        wanted = {doi.lower(): doi for doi in dois if "," not in doi}
+        found = {}
+        for batch in _chunks(list(wanted.values()), CROSSREF_BATCH):
+            params = {"filter": ",".join(f"doi:{doi}" for doi in batch), "rows": str(len(batch))}
+            if self.crossref_mailto:
+                params["mailto"] = self.crossref_mailto
+            resp = self.client.get(self.crossref_works, params=params)
+            resp.raise_for_status()
+            for item in resp.json().get("message", {}).get("items", []):
+                doi = (item.get("DOI") or "").lower()
+                if doi in wanted:
+                    found[doi] = self.parser._parse_crossref(wanted[doi], item)
+        return found
+
+    # ==================== LOTE ====================
+
+    def resolve(self, dois: List[str]) -> Dict[str, Dict]:
+        """
+        Metadatos fusionados por DOI (clave en minúsculas) para un lote.
+        Los DOIs sin datos en ninguna fuente van con {} (caché negativa).
+        """
+        pubmed, crossref = self.fetch_pubmed(dois), self.fetch_crossref(dois)
+        resolved = {}
+        for doi in dois:
+            key = doi.lower()
+            meta = self.parser._combinar(doi, None, pubmed.get(key, {}), crossref.get(key, {}))
+            # Sin validación doi.org: no tocar doi_validado
+            meta.pop("doi_validado", None)
+            resolved[key] = meta
+        return resolved
+
+    def _from_cache(self, doi: str) -> Optional[Dict]:
+        if not self.cache:
+            return None
+        cached, state = self.cache.lookup(doi)
+        return cached if state in (FRESH, STALE) else None
+
+    def run(self, limit: Optional[int] = None, batch_size: int = 200) -> Dict[str, int]:
+        """Recorre los papers pendientes, resuelve por lotes y escribe en bloque."""
+        stats = {"papers": 0, "cached": 0, "requested": 0, "enriched": 0, "not_found": 0, "errors": 0}
+        pending_updates: Dict[str, Dict] = {}
+
+        def flush():
+            if pending_updates:
+                self.db.bulk_update_papers(dict(pending_updates))
+                pending_updates.clear()
+
+        for rows in _chunks_iter(self.db.iter_papers_missing_enrichment(), batch_size, limit):
+            stats["papers"] += len(rows)
+            by_doi = {}
+            for row in rows:
+                by_doi.setdefault(normalize_doi(row.doi).lower(), []).append(row)
+
+            resolved, to_request = {}, []
+            for key, group in by_doi.items():
+                cached = self._from_cache(key)
+                if cached is None:
+                    to_request.append(normalize_doi(group[0].doi))
+                else:
+                    resolved[key] = cached
+                    stats["cached"] += len(group)
+
+            if to_request:
+                stats["requested"] += len(to_request)
+                try:
+                    fetched = self.resolve(to_request)
+                except (httpx.HTTPError, ET.ParseError, ValueError) as e:
+                    # Lote fallido: no se cachea en negativo, se reintenta en el próximo backfill
+                    logger.error(f"Backfill: lote de {len(to_request)} DOIs falló: {e}")
+                    stats["errors"] += len(to_request)
+                    fetched = {}
+                else:
+                    if self.cache:
+                        for key, meta in fetched.items():
+                            self.cache.set(key, meta)
+                resolved.update(fetched)
+
+            for key, group in by_doi.items():
+                meta = resolved.get(key)
+                if not meta:
+                    if key in resolved:  # {} = sin metadatos (los lotes fallidos no cuentan)
+                        stats["not_found"] += len(group)
+                    continue
+                for row in group:
+                    fields = enrichment_update_fields(meta, row)
+                    if fields:
+                        pending_updates[str(row.id)] = fields
+                        stats["enriched"] += 1
+                if len(pending_updates) >= BULK_UPDATE_SIZE:
+                    flush()
+
+        flush()
+        logger.info(f"🏁 Backfill de metadatos: {stats}")
+        return stats
+
+
+def _chunks_iter(rows: Iterable, size: int, limit: Optional[int] = None) -> Iterator[List]:
+    """Agrupa un iterador en listas de `size`, cortando en `limit` elementos."""
+    batch, seen = [], 0
+    for row in rows:
+        if limit is not None and seen >= limit:
+            break
+        batch.append(row)
+        seen += 1
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    arg_parser = argparse.ArgumentParser(description="Backfill de metadatos PubMed/CrossRef por lotes")
+    arg_parser.add_argument("--limit", type=int, default=None, help="Máximo de papers a procesar")
+    arg_parser.add_argument("--batch-size", type=int, default=200, help="DOIs por lote")
+    args = arg_parser.parse_args()
+    MetadataBackfill().run(limit=args.limit, batch_size=args.batch_size)
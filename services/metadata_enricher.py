@@ -3,24 +3,61 @@ Servicio de Enriquecimiento de Metadatos Multi-Fuente
 Integra DOI validation, PubMed (MeSH, afiliaciones, abstract estructurado) y CrossRef (funders, license, referencias)
 """
 
-from habanero import Crossref
-import requests
+import asyncio
+import httpx
 import logging
+import os
 import re
-from typing import Dict, Optional, List
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Awaitable, Dict, Optional, List, Tuple
 import xml.etree.ElementTree as ET
 
+from services.doi_cache import DOIMetadataCache, FRESH, STALE, get_doi_cache
+from services.http_clients import get_async_http_client, get_http_client
+
 logger = logging.getLogger(__name__)
 
+DOI_PATTERN = re.compile(r'^10\.\d{4,}/[^\s]+$')
+DOI_PREFIXES = ("https://doi.org/", "http://doi.org/", "doi:")
+
+PUBMED_BASE = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils"
+CROSSREF_WORKS = "https://api.crossref.org/works"
+
+# Timeout por fuente (s) y presupuesto total de reloj del enriquecimiento async:
+# las fuentes corren en paralelo, la latencia es la de la más lenta (acotada)
+SOURCE_TIMEOUTS = {
+    "doi.org": float(os.getenv("ENRICH_DOI_TIMEOUT_SECONDS", "10")),
+    "pubmed": float(os.getenv("ENRICH_PUBMED_TIMEOUT_SECONDS", "15")),
+    "crossref": float(os.getenv("ENRICH_CROSSREF_TIMEOUT_SECONDS", "15")),
+}
+ENRICH_BUDGET_SECONDS = float(os.getenv("ENRICH_BUDGET_SECONDS", "20"))
+
+# Revalidaciones async en curso (referencia fuerte hasta que terminan)
+_background_tasks = set()
+
+
+def normalize_doi(doi: str) -> str:
+    """Quita espacios y prefijos comunes (https://doi.org/, doi:)."""
+    doi = (doi or "").strip()
+    for prefix in DOI_PREFIXES:
+        if doi.startswith(prefix):
+            return doi[len(prefix):]
+    return doi
+
 
 class MetadataService:
     """Servicio de metadatos multi-fuente con merge inteligente."""
     
-    def __init__(self):
-        self.cr = Crossref()
-        self.pubmed_base = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils"
+    def __init__(self, cache: Optional[DOIMetadataCache] = None, http: Optional[httpx.Client] = None):
+        # Cliente compartido (keep-alive, reintentos, métricas por host) para la ruta síncrona
+        self.http = http or get_http_client("metadata")
+        self.pubmed_base = PUBMED_BASE
         # Cache simple de DOIs validados
         self._doi_cache = {}
+        # Cache persistente del resultado fusionado (compartido entre instancias y procesos)
+        self.cache = cache or get_doi_cache()
     
     # ==================== VALIDACIÓN DOI ====================
     
@@ -32,46 +69,63 @@ class MetadataService:
         if not doi:
             return {"valido": False, "error": "DOI vacío"}
         
-        # Verificar cache
-        if doi in self._doi_cache:
-            return self._doi_cache[doi]
-        
-        # Validar formato DOI (10.XXXX/...)
-        doi_pattern = r'^10\.\d{4,}/[^\s]+$'
-        if not re.match(doi_pattern, doi):
-            result = {"valido": False, "error": "Formato DOI inválido"}
-            self._doi_cache[doi] = result
-            return result
+        cached = self._validacion_local(doi)
+        if cached is not None:
+            return cached
         
         # Resolver via doi.org
         try:
-            resp = requests.head(
+            resp = self.http.head(
                 f"https://doi.org/{doi}",
-                allow_redirects=True,
-                timeout=10
+                follow_redirects=True,
+                timeout=SOURCE_TIMEOUTS["doi.org"]
             )
-            if resp.status_code == 200:
-                result = {
-                    "valido": True,
-                    "url_resuelta": resp.url,
-                    "error": None
-                }
-            else:
-                result = {
-                    "valido": False,
-                    "url_resuelta": None,
-                    "error": f"HTTP {resp.status_code}"
-                }
+            result = self._resultado_validacion(resp.status_code, str(resp.url))
         except Exception as e:
             result = {"valido": False, "error": str(e)}
         
         self._doi_cache[doi] = result
         return result
     
+    async def validar_doi_async(self, doi: str, client: httpx.AsyncClient) -> Dict:
+        """validar_doi sobre el cliente httpx compartido."""
+        if not doi:
+            return {"valido": False, "error": "DOI vacío"}
+        cached = self._validacion_local(doi)
+        if cached is not None:
+            return cached
+        try:
+            resp = await client.head(f"https://doi.org/{doi}", follow_redirects=True,
+                                     timeout=SOURCE_TIMEOUTS["doi.org"])
+            result = self._resultado_validacion(resp.status_code, str(resp.url))
+        except Exception as e:
+            result = {"valido": False, "error": str(e) or type(e).__name__}
+        self._doi_cache[doi] = result
+        return result
+    
+    def _validacion_local(self, doi: str) -> Optional[Dict]:
+        """Resultado sin red: cache o formato inválido (10.XXXX/...). None si hay que resolver."""
+        if doi in self._doi_cache:
+            return self._doi_cache[doi]
+        if not DOI_PATTERN.match(doi):
+            result = {"valido": False, "error": "Formato DOI inválido"}
+            self._doi_cache[doi] = result
+            return result
+        return None
+    
+    @staticmethod
+    def _resultado_validacion(status_code: int, url: str) -> Dict:
+        if status_code == 200:
+            return {"valido": True, "url_resuelta": url, "error": None}
+        return {"valido": False, "url_resuelta": None, "error": f"HTTP {status_code}"}
+    
     # ==================== PUBMED EXTENDIDO ====================
     
-    def _try_pubmed(self, doi: str) -> Dict:
-        """Busca metadata extendida en PubMed usando DOI."""
+    def _try_pubmed(self, doi: str) -> Optional[Dict]:
+        """
+        Busca metadata extendida en PubMed usando DOI.
+        {} = no encontrado; None = sin respuesta (error de red, timeout): no se cachea en negativo.
+        """
         try:
             # Paso 1: Buscar PMID por DOI
             search_url = f"{self.pubmed_base}/esearch.fcgi"
@@ -80,7 +134,7 @@ class MetadataService:
                 "term": f"{doi}[doi]",
                 "retmode": "json"
             }
-            resp = requests.get(search_url, params=params, timeout=10)
+            resp = self.http.get(search_url, params=params, timeout=10)
             data = resp.json()
             
             id_list = data.get("esearchresult", {}).get("idlist", [])
@@ -96,201 +150,242 @@ class MetadataService:
                 "id": pmid,
                 "retmode": "xml"
             }
-            resp = requests.get(fetch_url, params=params, timeout=15)
-            
-            # Parsear XML
-            root = ET.fromstring(resp.text)
-            article = root.find(".//Article")
-            if article is None:
-                return {}
-            
-            # === CAMPOS BÁSICOS ===
-            title_el = article.find(".//ArticleTitle")
-            title = title_el.text if title_el is not None else None
+            resp = self.http.get(fetch_url, params=params, timeout=15)
             
-            journal_el = article.find(".//Journal/Title")
-            journal = journal_el.text if journal_el is not None else None
-            
-            year_el = article.find(".//PubDate/Year")
-            year = int(year_el.text) if year_el is not None and year_el.text else None
-            
-            # === ABSTRACT ESTRUCTURADO ===
-            abstract_sections = {}
-            abstract_full = ""
-            abstract_elements = article.findall(".//Abstract/AbstractText")
-            
-            for abs_el in abstract_elements:
-                label = abs_el.get("Label", "texto")  # BACKGROUND, METHODS, RESULTS, etc.
-                text = abs_el.text or ""
-                label_lower = label.lower()
-                
-                # Mapear labels comunes a español
-                label_map = {
-                    "background": "antecedentes",
-                    "objective": "objetivo",
-                    "objectives": "objetivo",
-                    "methods": "metodos",
-                    "results": "resultados",
-                    "conclusions": "conclusiones",
-                    "conclusion": "conclusiones"
-                }
-                mapped_label = label_map.get(label_lower, label_lower)
-                abstract_sections[mapped_label] = text
-                abstract_full += f"{text} "
-            
-            # Si solo hay un AbstractText sin Label, es abstract simple
-            if len(abstract_elements) == 1 and not abstract_elements[0].get("Label"):
-                abstract_full = abstract_elements[0].text or ""
-            
-            # === AUTORES CON AFILIACIONES ===
-            autores = []
-            affiliaciones = []
-            for author in article.findall(".//Author"):
-                last = author.find("LastName")
-                first = author.find("ForeName")
-                if last is not None:
-                    nombre = f"{first.text if first is not None else ''} {last.text}".strip()
-                    autores.append(nombre)
-                    
-                    # Afiliaciones del autor
-                    for aff in author.findall(".//AffiliationInfo/Affiliation"):
-                        if aff.text:
-                            affiliaciones.append({
-                                "autor": nombre,
-                                "institucion": aff.text
-                            })
-            
-            # === MeSH TERMS ===
-            mesh_terms = []
-            mesh_list = root.find(".//MeshHeadingList")
-            if mesh_list is not None:
-                for mesh in mesh_list.findall(".//MeshHeading"):
-                    descriptor = mesh.find("DescriptorName")
-                    if descriptor is not None and descriptor.text:
-                        # Incluir qualifiers si existen
-                        qualifiers = [q.text for q in mesh.findall("QualifierName") if q.text]
-                        if qualifiers:
-                            mesh_terms.append(f"{descriptor.text}/{'/'.join(qualifiers)}")
-                        else:
-                            mesh_terms.append(descriptor.text)
-            
-            return {
-                "doi": doi,
-                "pmid": pmid,
-                "titulo": title,
-                "revista": journal,
-                "año": year,
-                "autores": autores,
-                "abstract": abstract_full.strip(),
-                "abstract_estructurado": abstract_sections if len(abstract_sections) > 1 else {},
-                "affiliaciones": affiliaciones,
-                "mesh_terms": mesh_terms,
-            }
+            return self._parse_pubmed(doi, pmid, resp.text)
             
         except Exception as e:
             logger.debug(f"PubMed lookup falló para DOI {doi}: {e}")
+            return None
+    
+    async def _try_pubmed_async(self, doi: str, client: httpx.AsyncClient) -> Optional[Dict]:
+        """_try_pubmed sobre el cliente httpx compartido (esearch + efetch)."""
+        try:
+            resp = await client.get(f"{self.pubmed_base}/esearch.fcgi", params={
+                "db": "pubmed", "term": f"{doi}[doi]", "retmode": "json"
+            })
+            id_list = resp.json().get("esearchresult", {}).get("idlist", [])
+            if not id_list:
+                return {}
+            pmid = id_list[0]
+            resp = await client.get(f"{self.pubmed_base}/efetch.fcgi", params={
+                "db": "pubmed", "id": pmid, "retmode": "xml"
+            })
+            return self._parse_pubmed(doi, pmid, resp.text)
+        except Exception as e:
+            # None = sin respuesta (no se cachea en negativo); {} = no encontrado
+            logger.debug(f"PubMed lookup falló para DOI {doi}: {e}")
+            return None
+    
+    def _parse_pubmed(self, doi: str, pmid: str, xml_text: str) -> Dict:
+        """Metadatos de un efetch (XML) de PubMed."""
+        return self._parse_pubmed_element(doi, pmid, ET.fromstring(xml_text))
+    
+    def _parse_pubmed_element(self, doi: str, pmid: str, root: ET.Element) -> Dict:
+        """Metadatos de un elemento PubmedArticle (o del documento completo de un efetch)."""
+        article = root.find(".//Article")
+        if article is None:
             return {}
+        
+        # === CAMPOS BÁSICOS ===
+        title_el = article.find(".//ArticleTitle")
+        title = title_el.text if title_el is not None else None
+        
+        journal_el = article.find(".//Journal/Title")
+        journal = journal_el.text if journal_el is not None else None
+        
+        year_el = article.find(".//PubDate/Year")
+        year = int(year_el.text) if year_el is not None and year_el.text else None
+        
+        # === ABSTRACT ESTRUCTURADO ===
+        abstract_sections = {}
+        abstract_full = ""
+        abstract_elements = article.findall(".//Abstract/AbstractText")
+        
+        for abs_el in abstract_elements:
+            label = abs_el.get("Label", "texto")  # BACKGROUND, METHODS, RESULTS, etc.
+            text = abs_el.text or ""
+            label_lower = label.lower()
+            
+            # Mapear labels comunes a español
+            label_map = {
+                "background": "antecedentes",
+                "objective": "objetivo",
+                "objectives": "objetivo",
+                "methods": "metodos",
+                "results": "resultados",
+                "conclusions": "conclusiones",
+                "conclusion": "conclusiones"
+            }
+            mapped_label = label_map.get(label_lower, label_lower)
+            abstract_sections[mapped_label] = text
+            abstract_full += f"{text} "
+        
+        # Si solo hay un AbstractText sin Label, es abstract simple
+        if len(abstract_elements) == 1 and not abstract_elements[0].get("Label"):
+            abstract_full = abstract_elements[0].text or ""
+        
+        # === AUTORES CON AFILIACIONES ===
+        autores = []
+        affiliaciones = []
+        for author in article.findall(".//Author"):
+            last = author.find("LastName")
+            first = author.find("ForeName")
+            if last is not None:
+                nombre = f"{first.text if first is not None else ''} {last.text}".strip()
+                autores.append(nombre)
+                
+                # Afiliaciones del autor
+                for aff in author.findall(".//AffiliationInfo/Affiliation"):
+                    if aff.text:
+                        affiliaciones.append({
+                            "autor": nombre,
+                            "institucion": aff.text
+                        })
+        
+        # === MeSH TERMS ===
+        mesh_terms = []
+        mesh_list = root.find(".//MeshHeadingList")
+        if mesh_list is not None:
+            for mesh in mesh_list.findall(".//MeshHeading"):
+                descriptor = mesh.find("DescriptorName")
+                if descriptor is not None and descriptor.text:
+                    # Incluir qualifiers si existen
+                    qualifiers = [q.text for q in mesh.findall("QualifierName") if q.text]
+                    if qualifiers:
+                        mesh_terms.append(f"{descriptor.text}/{'/'.join(qualifiers)}")
+                    else:
+                        mesh_terms.append(descriptor.text)
+        
+        return {
+            "doi": doi,
+            "pmid": pmid,
+            "titulo": title,
+            "revista": journal,
+            "año": year,
+            "autores": autores,
+            "abstract": abstract_full.strip(),
+            "abstract_estructurado": abstract_sections if len(abstract_sections) > 1 else {},
+            "affiliaciones": affiliaciones,
+            "mesh_terms": mesh_terms,
+        }
     
     # ==================== CROSSREF EXTENDIDO ====================
     
-    def _try_crossref(self, doi: str) -> Dict:
-        """Consulta CrossRef API para obtener metadatos extendidos."""
+    def _try_crossref(self, doi: str) -> Optional[Dict]:
+        """Consulta CrossRef API para obtener metadatos extendidos (None = sin respuesta)."""
         try:
-            res = self.cr.works(ids=doi)
-            message = res.get('message', {})
-            
-            # === CAMPOS BÁSICOS ===
-            titles = message.get('title', [])
-            title = titles[0] if titles else None
-            
-            container_titles = message.get('container-title', [])
-            journal = container_titles[0] if container_titles else None
-            
-            issued = message.get('issued', {}).get('date-parts', [])
-            year = issued[0][0] if issued and issued[0] else None
-            
-            publish_date = None
-            if issued and len(issued[0]) >= 3:
-                publish_date = f"{issued[0][0]}-{issued[0][1]:02d}-{issued[0][2]:02d}"
-            elif issued and len(issued[0]) == 2:
-                publish_date = f"{issued[0][0]}-{issued[0][1]:02d}-01"
-            
-            # Autores
-            autores = []
-            for auth in message.get('author', []):
-                name = f"{auth.get('given', '')} {auth.get('family', '')}".strip()
-                if name:
-                    autores.append(name)
-            
-            # Abstract (limpiar HTML)
-            abstract = message.get('abstract', '')
-            if abstract and "<" in abstract:
-                abstract = re.sub('<[^<]+?>', '', abstract)
-            
-            # === FUNDERS (Financiadores) ===
-            funders = []
-            for funder in message.get('funder', []):
-                funder_entry = {
-                    "nombre": funder.get('name'),
-                    "doi": funder.get('DOI'),
-                    "award": funder.get('award', [])
-                }
-                if funder_entry["nombre"]:
-                    funders.append(funder_entry)
-            
-            # === LICENSE ===
-            license_url = None
-            licenses = message.get('license', [])
-            if licenses:
-                # Preferir la primera URL disponible
-                license_url = licenses[0].get('URL')
-            
-            # === CROSSMARK STATUS ===
-            crossmark_status = "current"  # default
-            # Verificar si hay actualizaciones o retracciones
-            update_to = message.get('update-to', [])
-            if update_to:
-                crossmark_status = "actualizado"
-            # Verificar assertions (retracciones, correcciones)
-            for assertion in message.get('assertion', []):
-                if assertion.get('name') == 'retracted':
-                    crossmark_status = "retractado"
-                    break
-                elif assertion.get('name') == 'correction':
-                    crossmark_status = "corregido"
-            
-            # === REFERENCIAS ===
-            referencias = []
-            for ref in message.get('reference', []):
-                ref_doi = ref.get('DOI')
-                if ref_doi:
-                    referencias.append({
-                        "doi": ref_doi,
-                        "key": ref.get('key', ''),
-                        "año": ref.get('year')
-                    })
-            
-            # === TIPO DE ESTUDIO (aproximado) ===
-            tipo = message.get('type', '')  # journal-article, book-chapter, etc.
-            
-            return {
-                "doi": doi,
-                "titulo": title,
-                "revista": journal,
-                "año": year,
-                "fecha_publicacion": publish_date,
-                "autores": autores,
-                "abstract": abstract.strip() if abstract else None,
-                "funders": funders,
-                "license": license_url,
-                "crossmark_status": crossmark_status,
-                "referencias": referencias,
-                "tipo_crossref": tipo,
-            }
-            
+            resp = self.http.get(f"{CROSSREF_WORKS}/{doi}", timeout=SOURCE_TIMEOUTS["crossref"])
+            if resp.status_code == 404:
+                return {}
+            resp.raise_for_status()
+            return self._parse_crossref(doi, resp.json().get('message', {}))
         except Exception as e:
             logger.error(f"Error consultando CrossRef para DOI {doi}: {e}")
-            return {}
+            return None
+    
+    async def _try_crossref_async(self, doi: str, client: httpx.AsyncClient) -> Optional[Dict]:
+        """_try_crossref sobre el cliente httpx async compartido."""
+        try:
+            resp = await client.get(f"{CROSSREF_WORKS}/{doi}")
+            if resp.status_code == 404:
+                return {}
+            resp.raise_for_status()
+            return self._parse_crossref(doi, resp.json().get('message', {}))
+        except Exception as e:
+            logger.error(f"Error consultando CrossRef para DOI {doi}: {e!r}")
+            return None
+    
+    def _parse_crossref(self, doi: str, message: Dict) -> Dict:
+        """Metadatos de un `message` de CrossRef /works."""
+        # === CAMPOS BÁSICOS ===
+        titles = message.get('title', [])
+        title = titles[0] if titles else None
+        
+        container_titles = message.get('container-title', [])
+        journal = container_titles[0] if container_titles else None
+        
+        issued = message.get('issued', {}).get('date-parts', [])
+        year = issued[0][0] if issued and issued[0] else None
+        
+        publish_date = None
+        if issued and len(issued[0]) >= 3:
+            publish_date = f"{issued[0][0]}-{issued[0][1]:02d}-{issued[0][2]:02d}"
+        elif issued and len(issued[0]) == 2:
+            publish_date = f"{issued[0][0]}-{issued[0][1]:02d}-01"
+        
+        # Autores
+        autores = []
+        for auth in message.get('author', []):
+            name = f"{auth.get('given', '')} {auth.get('family', '')}".strip()
+            if name:
+                autores.append(name)
+        
+        # Abstract (limpiar HTML)
+        abstract = message.get('abstract', '')
+        if abstract and "<" in abstract:
+            abstract = re.sub('<[^<]+?>', '', abstract)
+        
+        # === FUNDERS (Financiadores) ===
+        funders = []
+        for funder in message.get('funder', []):
+            funder_entry = {
+                "nombre": funder.get('name'),
+                "doi": funder.get('DOI'),
+                "award": funder.get('award', [])
+            }
+            if funder_entry["nombre"]:
+                funders.append(funder_entry)
+        
+        # === LICENSE ===
+        license_url = None
+        licenses = message.get('license', [])
+        if licenses:
+            # Preferir la primera URL disponible
+            license_url = licenses[0].get('URL')
+        
+        # === CROSSMARK STATUS ===
+        crossmark_status = "current"  # default
+        # Verificar si hay actualizaciones o retracciones
+        update_to = message.get('update-to', [])
+        if update_to:
+            crossmark_status = "actualizado"
+        # Verificar assertions (retracciones, correcciones)
+        for assertion in message.get('assertion', []):
+            if assertion.get('name') == 'retracted':
+                crossmark_status = "retractado"
+                break
+            elif assertion.get('name') == 'correction':
+                crossmark_status = "corregido"
+        
+        # === REFERENCIAS ===
+        referencias = []
+        for ref in message.get('reference', []):
+            ref_doi = ref.get('DOI')
+            if ref_doi:
+                referencias.append({
+                    "doi": ref_doi,
+                    "key": ref.get('key', ''),
+                    "año": ref.get('year')
+                })
+        
+        # === TIPO DE ESTUDIO (aproximado) ===
+        tipo = message.get('type', '')  # journal-article, book-chapter, etc.
+        
+        return {
+            "doi": doi,
+            "titulo": title,
+            "revista": journal,
+            "año": year,
+            "fecha_publicacion": publish_date,
+            "autores": autores,
+            "abstract": abstract.strip() if abstract else None,
+            "funders": funders,
+            "license": license_url,
+            "crossmark_status": crossmark_status,
+            "referencias": referencias,
+            "tipo_crossref": tipo,
+        }
     
     # ==================== MERGE INTELIGENTE ====================
     
@@ -340,8 +435,8 @@ class MetadataService:
     
     def get_metadata_by_doi(self, doi: str, validar: bool = True) -> Dict:
         """
-        Obtiene metadatos enriquecidos para un DOI.
-        Consulta ambas fuentes y fusiona resultados.
+        Obtiene metadatos enriquecidos para un DOI (versión síncrona: scripts, workers).
+        Consulta ambas fuentes en paralelo y fusiona resultados.
         
         Args:
             doi: El DOI del paper
@@ -354,27 +449,134 @@ class MetadataService:
             return {}
         
         # Normalizar DOI (quitar prefijos comunes)
-        doi = doi.strip()
-        if doi.startswith("https://doi.org/"):
-            doi = doi.replace("https://doi.org/", "")
-        elif doi.startswith("http://doi.org/"):
-            doi = doi.replace("http://doi.org/", "")
-        elif doi.startswith("doi:"):
-            doi = doi.replace("doi:", "")
+        doi = normalize_doi(doi)
+        
+        cached, state = self.cache.lookup(doi) if self.cache else (None, None)
+        if state == STALE and self.cache.begin_refresh(doi):
+            threading.Thread(target=self._refresh, args=(doi, validar), daemon=True,
+                             name="doi-revalidate").start()
+        if state in (FRESH, STALE):
+            return cached
         
+        meta, complete = self._fetch_metadata(doi, validar)
+        # Como en la ruta async: una caída o timeout de las fuentes no se cachea en negativo
+        if self.cache and (meta or complete):
+            self.cache.set(doi, meta)
+        return meta
+    
+    def _refresh(self, doi: str, validar: bool):
+        """Revalidación en segundo plano de una entrada stale."""
+        try:
+            meta, _ = self._fetch_metadata(doi, validar)
+            if meta:
+                self.cache.set(doi, meta)
+        except Exception as e:
+            logger.warning(f"Revalidación DOI {doi} falló: {e}")
+        finally:
+            self.cache.end_refresh(doi)
+    
+    def _fetch_metadata(self, doi: str, validar: bool) -> Tuple[Dict, bool]:
+        """Consulta las fuentes (sin cache) y fusiona. Retorna (metadatos, todas_respondieron)."""
+        # Las tres consultas son independientes: en paralelo (latencia = la más lenta)
+        with ThreadPoolExecutor(max_workers=3, thread_name_prefix="doi-enrich") as pool:
+            validation = pool.submit(self.validar_doi, doi) if validar else None
+            pubmed = pool.submit(self._try_pubmed, doi)
+            crossref = pool.submit(self._try_crossref, doi)
+            validation = validation.result() if validation else None
+            pubmed, crossref = pubmed.result(), crossref.result()
+        complete = pubmed is not None and crossref is not None
+        return self._combinar(doi, validation, pubmed or {}, crossref or {}), complete
+    
+    async def get_metadata_by_doi_async(self, doi: str, validar: bool = True,
+                                        client: Optional[httpx.AsyncClient] = None,
+                                        budget: Optional[float] = None) -> Dict:
+        """
+        get_metadata_by_doi sin bloquear el event loop: doi.org, PubMed y CrossRef
+        en paralelo sobre el cliente httpx compartido. Cada fuente tiene su timeout
+        (SOURCE_TIMEOUTS) y el conjunto un presupuesto de reloj (ENRICH_BUDGET_SECONDS);
+        la fuente que no responde a tiempo cuenta como vacía.
+        """
+        if not doi:
+            return {}
+        
+        doi = normalize_doi(doi)
+        client = client or get_async_http_client("metadata")
+        
+        cached, state = self.cache.lookup(doi) if self.cache else (None, None)
+        if state == STALE and self.cache.begin_refresh(doi):
+            task = asyncio.create_task(self._refresh_async(doi, validar, client, budget))
+            _background_tasks.add(task)
+            task.add_done_callback(_background_tasks.discard)
+        if state in (FRESH, STALE):
+            return cached
+        
+        meta, complete = await self._fetch_metadata_async(doi, validar, client, budget)
+        # Sin respuesta completa de las fuentes no se cachea en negativo (podría ser transitorio)
+        if self.cache and (meta or complete):
+            self.cache.set(doi, meta)
+        return meta
+    
+    async def _refresh_async(self, doi: str, validar: bool, client: httpx.AsyncClient,
+                             budget: Optional[float]):
+        try:
+            meta, _ = await self._fetch_metadata_async(doi, validar, client, budget)
+            if meta:
+                self.cache.set(doi, meta)
+        except Exception as e:
+            logger.warning(f"Revalidación DOI {doi} falló: {e}")
+        finally:
+            self.cache.end_refresh(doi)
+    
+    async def _fetch_metadata_async(self, doi: str, validar: bool, client: httpx.AsyncClient,
+                                    budget: Optional[float]) -> Tuple[Dict, bool]:
+        """Consulta las fuentes en paralelo (sin cache). Retorna (metadatos, todas_respondieron)."""
+        budget = ENRICH_BUDGET_SECONDS if budget is None else budget
+        
+        sources = {
+            "pubmed": self._try_pubmed_async(doi, client),
+            "crossref": self._try_crossref_async(doi, client),
+        }
+        if validar:
+            sources["doi.org"] = self.validar_doi_async(doi, client)
+        tasks = {
+            name: asyncio.ensure_future(self._timed_source(name, coro, SOURCE_TIMEOUTS[name]))
+            for name, coro in sources.items()
+        }
+        done, pending = await asyncio.wait(tasks.values(), timeout=budget)
+        for task in pending:
+            task.cancel()
+        if pending:
+            late = [name for name, task in tasks.items() if task in pending]
+            logger.warning(f"Enriquecimiento DOI {doi}: presupuesto de {budget}s agotado ({', '.join(late)})")
+        
+        results = {name: task.result() for name, task in tasks.items() if task in done}
+        complete = not pending and all(result is not None for result in results.values())
+        meta = self._combinar(doi, results.get("doi.org") if validar else None,
+                              results.get("pubmed") or {}, results.get("crossref") or {})
+        return meta, complete
+    
+    @staticmethod
+    async def _timed_source(name: str, coro: Awaitable[Dict], timeout: float) -> Optional[Dict]:
+        """Consulta de una fuente acotada por su timeout; None si no llega a tiempo."""
+        start = time.monotonic()
+        try:
+            return await asyncio.wait_for(coro, timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"{name}: sin respuesta en {timeout}s")
+            return None
+        finally:
+            logger.debug(f"{name}: {time.monotonic() - start:.2f}s")
+    
+    def _combinar(self, doi: str, validation: Optional[Dict], pubmed_data: Dict, crossref_data: Dict) -> Dict:
+        """Fusiona los resultados de las fuentes y añade el estado de validación."""
         # Validación DOI (opcional pero recomendada)
         doi_validado = False
-        if validar:
-            validation = self.validar_doi(doi)
+        if validation is not None:
             doi_validado = validation.get("valido", False)
             if not doi_validado:
                 logger.warning(f"DOI no válido: {doi} - {validation.get('error')}")
                 # Continuamos de todos modos, quizás las APIs lo tengan
         
-        # Consultar ambas fuentes
-        pubmed_data = self._try_pubmed(doi)
-        crossref_data = self._try_crossref(doi)
-        
         # Determinar fuente y fusionar
         if pubmed_data and crossref_data:
             meta = self._fusionar_metadatos(pubmed_data, crossref_data)
@@ -419,3 +621,37 @@ class MetadataService:
                 enriched[key] = value
         
         return enriched
+
+
+def enrichment_update_fields(enriched_data: Dict, paper) -> Dict:
+    """
+    Mapea los metadatos enriquecidos a columnas de papers (enrich-doi, backfill).
+    No sobrescribe título ni abstract existentes del paper.
+    """
+    update_fields = {}
+    
+    # Campos básicos
+    if enriched_data.get("titulo") and not paper.titulo:
+        update_fields["titulo"] = enriched_data["titulo"]
+    if enriched_data.get("autores"):
+        update_fields["autores"] = enriched_data["autores"]
+    if enriched_data.get("revista"):
+        update_fields["revista"] = enriched_data["revista"]
+    if enriched_data.get("año"):
+        update_fields["año"] = enriched_data["año"]
+    if enriched_data.get("abstract") and not paper.abstract:
+        update_fields["abstract"] = enriched_data["abstract"]
+    
+    # Campos multi-fuente
+    for field in ("pmid", "mesh_terms", "abstract_estructurado", "affiliaciones", "funders",
+                  "license", "referencias", "crossmark_status"):
+        if enriched_data.get(field):
+            update_fields[field] = enriched_data[field]
+    if enriched_data.get("fecha_publicacion"):
+        update_fields["fecha_publicacion_exacta"] = enriched_data["fecha_publicacion"]
+    if enriched_data.get("metadata_source"):
+        update_fields["metadata_source"] = enriched_data["metadata_source"]
+    if enriched_data.get("doi_validado") is not None:
+        update_fields["doi_validado"] = enriched_data["doi_validado"]
+    
+    return update_fields
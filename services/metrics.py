@@ -0,0 +1,18 @@
+"""
+Utilidades de métricas compartidas de MedFlix Core.
+Percentiles de latencia para /jobs/stats, el streaming de Groq y los clientes HTTP.
+"""
+import math
+from typing import Dict, List, Optional
+
+
+def percentiles(values: List[float], points=(50, 90, 99)) -> Dict[str, Optional[float]]:
+    """Percentiles por rango más cercano sobre una muestra."""
+    if not values:
+        return {f"p{p}": None for p in points}
+    ordered = sorted(values)
+    result = {}
+    for p in points:
+        idx = min(len(ordered) - 1, max(0, math.ceil(p / 100 * len(ordered)) - 1))
+        result[f"p{p}"] = round(ordered[idx], 2)
+    return result
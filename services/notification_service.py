@@ -1,12 +1,17 @@
 import os
 import httpx
 import logging
-from typing import Dict, Any
+from typing import Dict, Any, Optional
+
+from services.http_clients import get_async_http_client, get_http_client
 
 logger = logging.getLogger(__name__)
 
 class NotificationService:
-    def __init__(self):
+    def __init__(self, http: Optional[httpx.Client] = None, async_http: Optional[httpx.AsyncClient] = None):
+        # Clientes inyectables; por defecto los compartidos del perfil "telegram"
+        self._http = http
+        self._async_http = async_http
         self.bot_token = os.getenv("TELEGRAM_BOT_TOKEN")
         self.chat_id = os.getenv("TELEGRAM_ADMIN_ID") or os.getenv("TELEGRAM_CHAT_ID")
         self.api_url = f"https://api.telegram.org/bot{self.bot_token}"
@@ -24,9 +29,8 @@ class NotificationService:
         }
 
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(url, json=payload)
-                return response.status_code == 200
+            response = await (self._async_http or get_async_http_client("telegram")).post(url, json=payload)
+            return response.status_code == 200
         except Exception as e:
             logger.error(f"Error enviando notificación: {e}")
             return False
@@ -54,15 +58,14 @@ class NotificationService:
         )
         
         try:
-            # Dado que el Core es síncrono por ahora, forzamos un loop o usamos una llamada síncrona de httpx
-            with httpx.Client() as client:
-                url = f"{self.api_url}/sendMessage"
-                payload = {
-                    "chat_id": self.chat_id,
-                    "text": message,
-                    "parse_mode": "Markdown"
-                }
-                client.post(url, json=payload)
-                logger.info(f"🚀 Alerta proactiva enviada para: {titulo}")
+            # El Core es síncrono: cliente httpx síncrono compartido (keep-alive)
+            url = f"{self.api_url}/sendMessage"
+            payload = {
+                "chat_id": self.chat_id,
+                "text": message,
+                "parse_mode": "Markdown"
+            }
+            (self._http or get_http_client("telegram")).post(url, json=payload)
+            logger.info(f"🚀 Alerta proactiva enviada para: {titulo}")
         except Exception as e:
             logger.error(f"Error en alerta proactiva: {e}")
@@ -0,0 +1,98 @@
+"""
+Paginación keyset (por cursor) para los listados de papers.
+El cursor es opaco para el cliente: base64 de (orden, valor de la clave, id) de la última fila.
+"""
+import base64
+import binascii
+import json
+import uuid
+from datetime import datetime
+from typing import Any, List, NamedTuple, Optional
+
+from sqlalchemy import desc, func, literal_column, tuple_
+
+from models.paper import Paper
+
+# Orden -> (expresión de la clave, tipo del valor). Siempre DESC, desempate por id DESC.
+# score_calidad puede ser NULL: se ordena como -1 para que el keyset sea total.
+# El -1.0 va como literal (no parámetro) para que coincida con los índices de expresión
+# de models.paper (ix_papers_quality, ix_papers_especialidad_quality).
+KEYSET_SORTS = {
+    "recent": (Paper.fecha_subida, "datetime"),
+    "quality": (func.coalesce(Paper.score_calidad, literal_column("-1.0")), "float"),
+    "deleted": (func.coalesce(Paper.deleted_at, Paper.fecha_subida), "datetime"),
+}
+
+
+class InvalidCursorError(ValueError):
+    """Cursor mal formado o de otro orden."""
+
+
+class Page(NamedTuple):
+    items: List[Paper]
+    next_cursor: Optional[str]
+
+
+def _sort_value(paper: Paper, sort: str) -> Any:
+    if sort == "recent":
+        return paper.fecha_subida
+    if sort == "quality":
+        return paper.score_calidad if paper.score_calidad is not None else -1.0
+    return paper.deleted_at or paper.fecha_subida
+
+
+def encode_cursor(sort: str, paper: Paper) -> str:
+    value = _sort_value(paper, sort)
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    raw = json.dumps({"s": sort, "v": value, "id": str(paper.id)}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(sort: str, cursor: str):
+    """Retorna (valor, id) de la última fila vista. Lanza InvalidCursorError."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        if data["s"] != sort:
+            raise InvalidCursorError(f"El cursor corresponde al orden '{data['s']}', no a '{sort}'")
+        kind = KEYSET_SORTS[sort][1]
+        value = datetime.fromisoformat(data["v"]) if kind == "datetime" else float(data["v"])
+        return value, uuid.UUID(data["id"])
+    except InvalidCursorError:
+        raise
+    except (binascii.Error, ValueError, KeyError, TypeError, UnicodeDecodeError) as e:
+        raise InvalidCursorError("Cursor inválido") from e
+
+
+def keyset_statement(query, sort: str, limit: int, cursor: Optional[str] = None, offset: int = 0):
+    """
+    Aplica orden + keyset a una query de Paper (Query o select()).
+    Pide limit+1 filas para saber si hay más sin hacer COUNT.
+    `offset` se mantiene por compatibilidad y sólo se usa sin cursor.
+    """
+    if sort not in KEYSET_SORTS:
+        raise ValueError(f"Orden no soportado: {sort}")
+    key, _ = KEYSET_SORTS[sort]
+
+    if cursor:
+        value, last_id = decode_cursor(sort, cursor)
+        query = query.filter(tuple_(key, Paper.id) < tuple_(value, last_id))
+    query = query.order_by(desc(key), desc(Paper.id))
+    if offset and not cursor:
+        query = query.offset(offset)
+    return query.limit(limit + 1)
+
+
+def build_page(rows: List[Paper], sort: str, limit: int) -> Page:
+    """Recorta las limit+1 filas de keyset_statement y calcula el cursor siguiente."""
+    has_more = len(rows) > limit
+    items = list(rows[:limit])
+    next_cursor = encode_cursor(sort, items[-1]) if has_more and items else None
+    return Page(items, next_cursor)
+
+
+def keyset_page(query, sort: str, limit: int, cursor: Optional[str] = None, offset: int = 0) -> Page:
+    """Trae una página de una Query (sesión síncrona)."""
+    rows = keyset_statement(query, sort, limit, cursor=cursor, offset=offset).all()
+    return build_page(rows, sort, limit)
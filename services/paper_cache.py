@@ -0,0 +1,320 @@
+"""
+Cache read-through de respuestas de papers para la API de MedFlix Core.
+Guarda los payloads ya serializados del detalle (/papers/{id}) y de las páginas
+de tarjetas (listados y búsqueda). LRU + TTL en proceso; backend Redis opcional
+(PAPER_CACHE_REDIS_URL) para compartirlo entre procesos.
+
+Invalidación: DatabaseService / AsyncDatabaseService llaman a invalidate_papers()
+una vez por escritura (o por lote). El detalle se borra por ID; las tarjetas van
+versionadas con una generación que se incrementa, así cualquier listado previo
+queda obsoleto.
+
+Entre procesos: con Redis el cache es uno solo. Con el LRU en proceso, cada
+escritura incrementa además la generación compartida en Postgres (tabla
+cache_generations) dentro de su propia transacción (ver shared_generation_enabled),
+y cada proceso que lee del cache la consulta cada PAPER_CACHE_SYNC_SECONDS: si
+cambió, vacía su cache local. El desfase máximo tras una escritura de otro proceso
+(job_worker, batch) es ese intervalo (con PAPER_CACHE_SYNC_SECONDS=0, el TTL). Los
+procesos que escriben deben tener el cache activado (PAPER_CACHE_ENABLED) para
+publicar la generación.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class LRUTTLCache:
+    """Diccionario acotado en entradas con expiración por TTL (thread-safe)."""
+
+    def __init__(self, max_entries: int = 2048, ttl_seconds: float = 300.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+        self._generation = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if time.monotonic() >= expires_at:
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key: str):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def generation(self) -> int:
+        return self._generation
+
+    def bump_generation(self):
+        with self._lock:
+            self._generation += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def size(self) -> int:
+        return len(self._data)
+
+
+class RedisCacheBackend:
+    """
+    Mismo contrato que LRUTTLCache sobre Redis (JSON + SETEX).
+    La evicción la hace Redis (maxmemory-policy allkeys-lru recomendado).
+    """
+
+    GENERATION_KEY = "generation"
+
+    def __init__(self, url: str, ttl_seconds: float = 300.0, prefix: str = "medflix:papers:"):
+        import redis  # dependencia opcional
+
+        self.client = redis.Redis.from_url(url)
+        self.ttl_seconds = ttl_seconds
+        self.prefix = prefix
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        raw = self.client.get(self.prefix + key)
+        return json.loads(raw) if raw is not None else None
+
+    def set(self, key: str, value: Any):
+        self.client.setex(self.prefix + key, max(1, int(self.ttl_seconds)), json.dumps(value, default=str))
+
+    def delete(self, key: str):
+        self.client.delete(self.prefix + key)
+
+    def generation(self) -> int:
+        return int(self.client.get(self.prefix + self.GENERATION_KEY) or 0)
+
+    def bump_generation(self):
+        self.client.incr(self.prefix + self.GENERATION_KEY)
+
+    def clear(self):
+        for key in self.client.scan_iter(match=self.prefix + "*"):
+            self.client.delete(key)
+
+    def size(self) -> int:
+        return sum(1 for _ in self.client.scan_iter(match=self.prefix + "*"))
+
+
+class SharedGeneration:
+    """
+    Generación de invalidación compartida entre procesos.
+    `read` lee el contador (en Postgres, ver get_paper_cache); lo incrementan las
+    propias escrituras en su transacción. Un hilo lo consulta cada poll_seconds y
+    llama a `on_change` cuando cambió.
+    """
+
+    def __init__(self, read: Callable[[], int], poll_seconds: float = 2.0):
+        self._read = read
+        self.poll_seconds = poll_seconds
+        self.on_change: Optional[Callable[[], None]] = None
+        self._seen: Optional[int] = None
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def check(self) -> bool:
+        """Lee la generación; True (y on_change) si cambió desde la última lectura."""
+        current = self._read()
+        with self._lock:
+            changed = self._seen is not None and current != self._seen
+            self._seen = current
+        if changed and self.on_change is not None:
+            self.on_change()
+        return changed
+
+    def watch(self):
+        """Arranca el hilo de sondeo (una vez, al primer uso del cache para lectura)."""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, daemon=True, name="paper-cache-sync")
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                self.check()
+            except Exception as e:
+                logger.warning(f"No se pudo leer la generación compartida del cache: {e}")
+            time.sleep(self.poll_seconds)
+
+
+class PaperCache:
+    """Payloads de detalle y de tarjetas, con métricas de aciertos por tipo."""
+
+    KINDS = ("detail", "cards")
+
+    def __init__(self, backend=None, shared_generation: Optional[SharedGeneration] = None):
+        self.backend = backend or LRUTTLCache()
+        self.shared_generation = shared_generation
+        if shared_generation is not None:
+            shared_generation.on_change = self._drop_local
+        self._lock = threading.Lock()
+        self._counters = {kind: {"hits": 0, "misses": 0} for kind in self.KINDS}
+
+    # ==================== CLAVES ====================
+
+    @staticmethod
+    def detail_key(paper_id: str) -> str:
+        return f"detail:{paper_id}"
+
+    def cards_key(self, name: str, **params) -> str:
+        """Clave de una página de tarjetas, ligada a la generación actual."""
+        self._watch_shared()
+        args = json.dumps(params, sort_keys=True, default=str)
+        return f"cards:{self._safe(self.backend.generation, 0)}:{name}:{args}"
+
+    # ==================== LECTURA / ESCRITURA ====================
+
+    def get_detail(self, paper_id: str) -> Optional[Dict[str, Any]]:
+        return self._get("detail", self.detail_key(paper_id))
+
+    def set_detail(self, paper_id: str, payload: Dict[str, Any]):
+        self._safe(self.backend.set, None, self.detail_key(paper_id), payload)
+
+    def get_cards(self, key: str) -> Optional[Any]:
+        return self._get("cards", key)
+
+    def set_cards(self, key: str, payload: Any):
+        self._safe(self.backend.set, None, key, payload)
+
+    def invalidate_papers(self, paper_ids: Iterable = ()):
+        """Borra el detalle de cada paper y deja obsoletas todas las tarjetas (una sola vez)."""
+        for paper_id in paper_ids:
+            self._safe(self.backend.delete, None, self.detail_key(str(paper_id)))
+        self._safe(self.backend.bump_generation, None)
+
+    def invalidate_paper(self, paper_id: Optional[str] = None):
+        """Borra el detalle del paper (si se indica) y deja obsoletas todas las tarjetas."""
+        self.invalidate_papers([paper_id] if paper_id is not None else [])
+
+    def clear(self):
+        self._safe(self.backend.clear, None)
+
+    # ==================== MÉTRICAS ====================
+
+    def stats(self) -> Dict[str, Any]:
+        """Aciertos/fallos por tipo de payload y tasa de acierto (0-1)."""
+        with self._lock:
+            counters = {kind: dict(c) for kind, c in self._counters.items()}
+        stats: Dict[str, Any] = {
+            "backend": type(self.backend).__name__,
+            "entries": self._safe(self.backend.size, None),
+            "evictions": self.backend.evictions,
+        }
+        total_hits = total_lookups = 0
+        for kind, c in counters.items():
+            lookups = c["hits"] + c["misses"]
+            total_hits += c["hits"]
+            total_lookups += lookups
+            stats[kind] = {**c, "hit_rate": round(c["hits"] / lookups, 3) if lookups else 0.0}
+        stats["hit_rate"] = round(total_hits / total_lookups, 3) if total_lookups else 0.0
+        return stats
+
+    def _watch_shared(self):
+        if self.shared_generation is not None:
+            self.shared_generation.watch()
+
+    def _drop_local(self):
+        # Otro proceso escribió: nada de lo cacheado aquí es fiable
+        logger.info("Cache de papers invalidado por una escritura de otro proceso")
+        self._safe(self.backend.clear, None)
+        self._safe(self.backend.bump_generation, None)
+
+    def _get(self, kind: str, key: str) -> Optional[Any]:
+        self._watch_shared()
+        value = self._safe(self.backend.get, None, key)
+        with self._lock:
+            self._counters[kind]["hits" if value is not None else "misses"] += 1
+        return value
+
+    @staticmethod
+    def _safe(fn, default, *args):
+        # Un backend compartido caído no debe tumbar la API: se sirve desde la DB
+        try:
+            return fn(*args)
+        except Exception as e:
+            logger.warning(f"Cache de papers no disponible: {e}")
+            return default
+
+
+# Singleton para uso global
+_paper_cache = None
+
+def get_paper_cache() -> Optional[PaperCache]:
+    """
+    Obtiene la instancia global del cache de papers.
+    Retorna None si PAPER_CACHE_ENABLED=false. Con el LRU en proceso se sincroniza
+    con las escrituras de otros procesos vía cache_generations (PAPER_CACHE_SYNC_SECONDS).
+    """
+    global _paper_cache
+    if os.getenv("PAPER_CACHE_ENABLED", "true").lower() in ("0", "false", "no"):
+        return None
+    if _paper_cache is None:
+        ttl = float(os.getenv("PAPER_CACHE_TTL_SECONDS", "300"))
+        backend = None
+        redis_url = os.getenv("PAPER_CACHE_REDIS_URL")
+        if redis_url:
+            try:
+                backend = RedisCacheBackend(redis_url, ttl_seconds=ttl)
+            except ImportError:
+                logger.warning("PAPER_CACHE_REDIS_URL definido pero falta el paquete redis; usando cache en proceso")
+        if backend is None:
+            backend = LRUTTLCache(
+                max_entries=int(os.getenv("PAPER_CACHE_MAX_ENTRIES", "2048")),
+                ttl_seconds=ttl
+            )
+        shared = None
+        sync_seconds = float(os.getenv("PAPER_CACHE_SYNC_SECONDS", "2"))
+        if isinstance(backend, LRUTTLCache) and sync_seconds > 0:
+            from services.database import get_db_service
+            shared = SharedGeneration(
+                read=lambda: get_db_service().get_cache_generation("papers"),
+                poll_seconds=sync_seconds
+            )
+        _paper_cache = PaperCache(backend, shared_generation=shared)
+    return _paper_cache
+
+
+def shared_generation_enabled() -> bool:
+    """
+    True si las escrituras deben incrementar cache_generations en su transacción
+    (cache en proceso sincronizado entre procesos).
+    """
+    cache = get_paper_cache()
+    return cache is not None and cache.shared_generation is not None
+
+
+def invalidate_papers(paper_ids: Iterable = ()):
+    """Invalida el cache global tras una escritura o un lote (no-op si está desactivado)."""
+    cache = get_paper_cache()
+    if cache is not None:
+        cache.invalidate_papers(paper_ids)
+
+
+def invalidate_paper(paper_id: Optional[str] = None):
+    """Invalida el cache global tras escribir un paper (no-op si está desactivado)."""
+    invalidate_papers([paper_id] if paper_id is not None else [])
@@ -0,0 +1,75 @@
+import os
+import logging
+from pathlib import Path
+
+# Configurar logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("reindex_chunks")
+
+from services.database import get_db_service
+from services.vector_store import VectorStoreService
+from core.ingestion import IngestionService
+from core.chunking import chunk_document
+
+
+def reindex_all(only_missing: bool = True, papers_per_flush: int = 20):
+    """
+    Indexa en chunks por página los papers ya procesados
+    (los subidos antes del chunking sólo tienen el documento-resumen).
+    Se chunkea el texto de todas las páginas; con --all se reindexan también los
+    papers cuyos chunks se generaron sólo con las primeras 30 páginas.
+    """
+    db = get_db_service()
+    vector_store = VectorStoreService()
+    ingestion = IngestionService()
+
+    # Generador por páginas (keyset): memoria constante; el total sale de paper_stats
+    papers = db.iter_all_papers()
+    logger.info(f"🔍 {db.get_stats()['total_papers']} papers en la biblioteca.")
+
+    indexed_papers = 0
+    indexed_chunks = 0
+    skipped = 0
+    pending = []  # [(paper_id, chunks, metadata)] a indexar en bloque
+
+    def flush():
+        nonlocal indexed_papers, indexed_chunks
+        if not pending:
+            return
+        try:
+            # Embeddings de todo el bloque en lotes (EMBEDDING_BATCH_SIZE)
+            indexed_chunks += vector_store.add_chunks_many(pending)
+            indexed_papers += len(pending)
+        except Exception as e:
+            logger.error(f"❌ Error indexando bloque de {len(pending)} papers: {e}")
+        pending.clear()
+
+    for paper in papers:
+        paper_id = str(paper.id)
+        try:
+            if only_missing and vector_store.has_chunks(paper_id):
+                skipped += 1
+                continue
+            if not paper.archivo_path or not os.path.exists(paper.archivo_path):
+                logger.warning(f"   Archivo no encontrado para {paper_id}")
+                continue
+
+            # Pasada de texto completa (sin el tope de páginas del prompt)
+            extracted = ingestion.extract(Path(paper.archivo_path), with_thumbnail=False, max_text_pages=None)
+            chunks = chunk_document(extracted)
+            pending.append((paper_id, chunks, {"title": paper.titulo, "specialty": paper.especialidad or ""}))
+            logger.info(f"🧩 {paper.titulo[:50]}: {len(chunks)} chunks")
+
+            if len(pending) >= papers_per_flush:
+                flush()
+        except Exception as e:
+            logger.error(f"❌ Error indexando {paper_id}: {e}")
+    flush()
+
+    logger.info(f"📈 Embeddings: {vector_store.embedder.stats()}")
+    logger.info(f"🏁 Indexados {indexed_papers} papers ({indexed_chunks} chunks). Ya indexados: {skipped}")
+
+
+if __name__ == "__main__":
+    import sys
+    reindex_all(only_missing="--all" not in sys.argv)
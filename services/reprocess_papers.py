@@ -13,21 +13,42 @@ from services.database import get_db_service
 from services.metadata_enricher import MetadataService
 from services.groq_service import GroqService
 from core.analysis import AnalysisCore
-import fitz  # PyMuPDF
+from core.ingestion import ANALYSIS_TEXT_PAGES, IngestionService
 
-async def reprocess_all():
+# Papers por UPDATE en bloque (bulk_update_papers)
+BULK_UPDATE_SIZE = 100
+
+async def reprocess_all(use_cache: bool = True):
+    """
+    Revisa toda la biblioteca (thumbnails, abstract, veredicto IA, nombres de archivo).
+    use_cache=False (--no-cache) fuerza llamadas nuevas a Groq en vez de reutilizar
+    las respuestas cacheadas.
+    """
     db = get_db_service()
     md_service = MetadataService()
     groq = GroqService()
+    ingestion = IngestionService()
     
-    # Obtener todos los papers (sin limite de paginacion idealmente, pero aqui 1000)
-    papers = db.get_all_papers(limit=2000)
-    logger.info(f"🔍 Encontrados {len(papers)} papers para revisar.")
+    # Recorrer toda la biblioteca por páginas (keyset), sin materializarla en memoria;
+    # el total sale de paper_stats (una fila) en vez de contar la lista
+    papers = db.iter_all_papers()
+    logger.info(f"🔍 {db.get_stats()['total_papers']} papers en la biblioteca para revisar.")
     
     processed_count = 0
     renamed_count = 0
     enriched_count = 0
     thumbs_fixed = 0
+    pending_updates = {}  # {paper_id: campos}, se aplican en bloque
+    
+    def flush_updates():
+        nonlocal processed_count
+        if not pending_updates:
+            return
+        try:
+            processed_count += db.bulk_update_papers(pending_updates)
+        except Exception as e:
+            logger.error(f"❌ Error actualizando bloque de {len(pending_updates)} papers: {e}")
+        pending_updates.clear()
     
     for paper in papers:
         try:
@@ -38,17 +59,27 @@ async def reprocess_all():
             # Contexto del archivo
             current_path = Path(paper.archivo_path)
             
-            # 1. FIX THUMBNAILS
             # Verificar si existe el thumbnail físico
             thumb_ok = False
             if paper.thumbnail_path and os.path.exists(paper.thumbnail_path):
                 thumb_ok = True
+            needs_text = not paper.veredicto_ia
             
-            if not thumb_ok and process_thumbnail(paper, current_path):
-                 thumbs_fixed += 1
-                 # Nota: process_thumbnail ya actualiza la DB o devuelve path? 
-                 # Lo haremos manual aqui para ser explícitos
-                 pass 
+            # Una sola apertura del PDF para thumbnail + texto
+            extracted = None
+            if (not thumb_ok or needs_text) and os.path.exists(current_path):
+                try:
+                    extracted = ingestion.extract(
+                        current_path, with_thumbnail=not thumb_ok, max_text_pages=ANALYSIS_TEXT_PAGES
+                    )
+                except Exception as e:
+                    logger.error(f"   Error leyendo PDF: {e}")
+            
+            # 1. FIX THUMBNAILS
+            if not thumb_ok and extracted and extracted.thumbnail_path:
+                updates['thumbnail_path'] = extracted.thumbnail_path
+                logger.info(f"   🖼️ Thumbnail generado: {Path(extracted.thumbnail_path).name}")
+                thumbs_fixed += 1
 
             # 2. ENRIQUECIMIENTO (Abstract, Veredicto)
             # Si falta abstract o veredicto, intentar enriquecer
@@ -60,17 +91,12 @@ async def reprocess_all():
                     enriched_count += 1
             
             # Si no hay veredicto IA y tenemos texto (u acceso al archivo)
-            if not paper.veredicto_ia and os.path.exists(current_path):
-                # Leer contenido breve
+            if needs_text and extracted:
                 try:
-                    doc = fitz.open(current_path)
-                    text = ""
-                    for page in doc:
-                        text += page.get_text()
-                        if len(text) > 15000: break
+                    text = extracted.analysis_text[:15000]
                     
                     if text:
-                        audit = groq.epistemological_audit(text)
+                        audit = groq.epistemological_audit(text, use_cache=use_cache)
                         if audit and isinstance(audit, dict):
                              updates['veredicto_ia'] = audit.get('veredicto_breve')
                              # Si ya que estamos, el score es null, actualizarlo
@@ -108,12 +134,14 @@ async def reprocess_all():
 
             # Aplicar actualizaciones
             if updates:
-                db.update_paper(str(paper.id), **updates)
-                processed_count += 1
+                pending_updates[str(paper.id)] = updates
+                if len(pending_updates) >= BULK_UPDATE_SIZE:
+                    flush_updates()
                 
         except Exception as e:
             logger.error(f"❌ Error procesando paper {paper.id}: {e}")
 
+    flush_updates()
     logger.info("🏁 REPROCESAMIENTO FINALIZADO")
     logger.info(f"   - Papers actualizados en DB: {processed_count}")
     logger.info(f"   - Thumbnails generados: {thumbs_fixed}")
@@ -121,33 +149,5 @@ async def reprocess_all():
     logger.info(f"   - Enriquecidos (DOI/IA): {enriched_count}")
 
 
-def process_thumbnail(paper, pdf_path):
-    """Genera thumbnail si el PDF existe."""
-    if not pdf_path or not os.path.exists(pdf_path):
-        return False
-        
-    try:
-        doc = fitz.open(pdf_path)
-        page = doc.load_page(0)
-        pix = page.get_pixmap(matrix=fitz.Matrix(1, 1))
-        
-        # Nombre hash o basado en ID
-        thumb_name = f"thumb_{paper.id}.png"
-        thumb_dir = Path("data/thumbnails")
-        thumb_dir.mkdir(parents=True, exist_ok=True)
-        thumb_path = thumb_dir / thumb_name
-        
-        pix.save(str(thumb_path))
-        
-        # Guardar en DB
-        from services.database import get_db_service
-        db = get_db_service()
-        db.update_paper(str(paper.id), thumbnail_path=str(thumb_path))
-        logger.info(f"   🖼️ Thumbnail generado: {thumb_name}")
-        return True
-    except Exception as e:
-        logger.error(f"   Error generando thumb: {e}")
-        return False
-
 if __name__ == "__main__":
-    asyncio.run(reprocess_all())
+    asyncio.run(reprocess_all(use_cache="--no-cache" not in sys.argv))
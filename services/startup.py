@@ -0,0 +1,66 @@
+"""
+Informe de arranque por fases (imports, routers, scheduler, servicios...).
+La API lo expone en /health y lo registra en el log al terminar el lifespan;
+el bot lo registra al arrancar el polling.
+"""
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class StartupReport:
+    """Duración de cada fase de arranque de un proceso, en orden de registro."""
+
+    def __init__(self, process: str = "api"):
+        self.process = process
+        self.started = time.monotonic()
+        self._last = self.started
+        self._phases: List[Dict] = []
+        self._lock = threading.Lock()
+        self.ready_seconds: Optional[float] = None
+
+    @contextmanager
+    def phase(self, name: str):
+        """Mide el bloque como fase `name` (se registra aunque falle)."""
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.record(name, time.monotonic() - start)
+
+    def checkpoint(self, name: str):
+        """Registra como fase `name` el tiempo desde la fase anterior (o desde el inicio)."""
+        self.record(name, time.monotonic() - self._last)
+
+    def record(self, name: str, seconds: float):
+        with self._lock:
+            self._phases.append({"phase": name, "seconds": round(seconds, 4)})
+            self._last = time.monotonic()
+
+    def mark_ready(self) -> float:
+        """Marca el proceso como listo; devuelve los segundos desde el inicio."""
+        self.ready_seconds = round(time.monotonic() - self.started, 4)
+        return self.ready_seconds
+
+    def as_dict(self) -> Dict:
+        with self._lock:
+            phases = list(self._phases)
+        return {
+            "process": self.process,
+            "phases": phases,
+            "total_seconds": round(sum(p["seconds"] for p in phases), 4),
+            "ready_seconds": self.ready_seconds,
+        }
+
+    def log_summary(self, log: Optional[logging.Logger] = None):
+        report = self.as_dict()
+        detail = ", ".join(f"{p['phase']}={p['seconds']:.3f}s" for p in report["phases"])
+        (log or logger).info(f"Arranque {self.process}: {report['total_seconds']:.3f}s ({detail})")
+
+
+# Un informe por proceso: se crea al importar este módulo (lo antes posible)
+startup_report = StartupReport()
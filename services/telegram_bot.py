@@ -1,12 +1,13 @@
 import os
 import logging
+from services.startup import startup_report
 import asyncio
 from telegram import Update
 from telegram.ext import ApplicationBuilder, ContextTypes, CommandHandler, MessageHandler, filters
 from dotenv import load_dotenv
 from pathlib import Path
-from core.analysis import AnalysisCore
-from services.groq_service import GroqService
+from typing import Optional
+from core.analysis import AnalysisCore, get_analysis_core
 from services.reference_generator import ReferenceGenerator
 
 # Configuración de Logging
@@ -18,13 +19,16 @@ logging.basicConfig(
 load_dotenv()
 TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
 
-# Instancia global del Core
-# En producción, gestionar esto con cuidado para threads/async
-try:
-    analysis_core = AnalysisCore()
-except Exception as e:
-    logging.error(f"Error inicializando AnalysisCore: {e}")
-    analysis_core = None
+def get_core() -> Optional[AnalysisCore]:
+    """
+    Core compartido, creado en el primer mensaje (Chroma y Groq no se abren al
+    importar el módulo). None si no se puede inicializar; se reintenta en el siguiente.
+    """
+    try:
+        return get_analysis_core()
+    except Exception as e:
+        logging.error(f"Error inicializando AnalysisCore: {e}")
+        return None
 
 UPLOAD_DIR = Path("data/uploads_telegram")
 UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
@@ -35,10 +39,11 @@ reference_generator = ReferenceGenerator()
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await context.bot.send_message(
         chat_id=update.effective_chat.id,
-        text="👋 ¡Hola! Soy MedFlix Bot.\n\nEnvíame un archivo PDF para analizarlo con 'Auditoría Epistemológica' o hazme una pregunta para buscar en tu biblioteca."
+        text="👋 ¡Hola! Soy MedFlix Bot.\n\nEnvíame un archivo PDF para analizarlo con 'Auditoría Epistemológica' o hazme una pregunta para buscar en tu biblioteca.\n\nPara chatear con un paper: /preguntar {doc_id} {pregunta}"
     )
 
 async def handle_document(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    analysis_core = get_core()
     if not analysis_core:
         await update.message.reply_text("❌ El sistema de análisis no está disponible en este momento.")
         return
@@ -109,6 +114,7 @@ async def handle_document(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 async def handle_text(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Maneja consultas de texto (RAG simple)"""
+    analysis_core = get_core()
     if not analysis_core:
         await update.message.reply_text("❌ El sistema no está disponible.")
         return
@@ -138,6 +144,7 @@ async def citar_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     Comando /citar {doc_id} - Genera cita Vancouver para un paper
     Uso: /citar abc123 o /citar abc123 apa
     """
+    analysis_core = get_core()
     if not analysis_core:
         await update.message.reply_text("❌ El sistema no está disponible.")
         return
@@ -170,6 +177,45 @@ async def citar_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         parse_mode='Markdown'
     )
 
+# Telegram limita las ediciones de un mensaje: acumular tokens y editar cada STREAM_EDIT_INTERVAL s
+STREAM_EDIT_INTERVAL = 1.0
+TELEGRAM_MAX_CHARS = 4096
+
+async def preguntar_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    Comando /preguntar {doc_id} {pregunta} - Chat con un paper, respuesta en streaming
+    (el mensaje se va editando a medida que llegan los tokens de Groq).
+    """
+    analysis_core = get_core()
+    if not analysis_core:
+        await update.message.reply_text("❌ El sistema no está disponible.")
+        return
+    
+    args = context.args
+    if len(args) < 2:
+        await update.message.reply_text(
+            "💬 *Uso:* `/preguntar {doc_id} {pregunta}`\n\n"
+            "Ejemplo: `/preguntar abc123 ¿Cuál es el NNT?`",
+            parse_mode='Markdown'
+        )
+        return
+    
+    doc_id, question = args[0], " ".join(args[1:])
+    reply = await update.message.reply_text("🧠 Pensando...")
+    
+    # Generador async: rate limiter y lectura del stream sin bloquear el event loop
+    loop = asyncio.get_running_loop()
+    answer, shown, last_edit = "", "", 0.0
+    async for token in analysis_core.stream_chat_with_paper_async(doc_id, question):
+        answer += token
+        if loop.time() - last_edit >= STREAM_EDIT_INTERVAL and answer[:TELEGRAM_MAX_CHARS] != shown:
+            shown = answer[:TELEGRAM_MAX_CHARS]
+            await reply.edit_text(shown + " ▌")
+            last_edit = loop.time()
+    
+    # Quitar el cursor (▌) de la última edición
+    await reply.edit_text(answer[:TELEGRAM_MAX_CHARS] or "Sin respuesta.")
+
 if __name__ == '__main__':
     if not TOKEN:
         print("Error: TELEGRAM_BOT_TOKEN no encontrada en variables de entorno.")
@@ -178,13 +224,18 @@ if __name__ == '__main__':
         
         start_handler = CommandHandler('start', start)
         citar_handler = CommandHandler('citar', citar_command)
+        preguntar_handler = CommandHandler('preguntar', preguntar_command)
         doc_handler = MessageHandler(filters.Document.PDF, handle_document)
         text_handler = MessageHandler(filters.TEXT & (~filters.COMMAND), handle_text)
         
         application.add_handler(start_handler)
         application.add_handler(citar_handler)
+        application.add_handler(preguntar_handler)
         application.add_handler(doc_handler)
         application.add_handler(text_handler)
         
+        startup_report.process = "bot"
+        startup_report.checkpoint("setup")
+        startup_report.log_summary()
         print("Bot iniciado. Escuchando...")
         application.run_polling()
@@ -7,7 +7,8 @@ from dotenv import load_dotenv
 
 # Importar DB Service
 from services.database import get_db_service
-from core.analysis import AnalysisCore
+from services.job_queue import get_job_queue
+from core.analysis import get_analysis_core
 
 # Configuración de Logging
 logging.basicConfig(
@@ -28,6 +29,9 @@ SESSION_NAME = str(SESSION_PATH)
 DOWNLOAD_DIR = Path("data/uploads_channels")
 DOWNLOAD_DIR.mkdir(parents=True, exist_ok=True)
 
+# Prioridad de los PDFs de canales en la cola (las subidas manuales usan 0)
+CHANNEL_JOB_PRIORITY = -1
+
 class ChannelIngestor:
     def __init__(self):
         if not API_ID or not API_HASH:
@@ -36,9 +40,13 @@ class ChannelIngestor:
         self.client = TelegramClient(SESSION_NAME, int(API_ID), API_HASH)
         self.db = get_db_service()
         
-        # Inicializar Core para análisis
+        # Los PDFs se encolan para los workers; el scan sólo descarga
+        use_queue = os.getenv("CHANNEL_SCAN_USE_QUEUE", "true").lower() not in ("0", "false", "no")
+        self.job_queue = get_job_queue() if use_queue else None
+        
+        # Core compartido del proceso (en la API, el mismo que usan los routers)
         try:
-            self.core = AnalysisCore()
+            self.core = get_analysis_core()
             logger.info("AnalysisCore inicializado correctamente.")
         except Exception as e:
             logger.error(f"Error inicializando AnalysisCore: {e}")
@@ -139,6 +147,21 @@ class ChannelIngestor:
                     else:
                         pass
 
+                    # ENCOLAR PDFs para los workers (no se analiza en este proceso)
+                    if not process_as_quiz and self.job_queue:
+                        try:
+                            job_id = self.job_queue.enqueue(
+                                {"file_path": str(target_file), "file_name": file_name, "channel": channel_username},
+                                priority=CHANNEL_JOB_PRIORITY
+                            )
+                            logger.info(f"📬 Encolado {file_name} (job {job_id})")
+                            processed += 1
+                            scan_status.status["stats"]["nuevos_descargados"] += 1
+                        except Exception as e:
+                            logger.error(f"Error encolando {file_name}: {e}")
+                            scan_status.status["stats"]["errores"] += 1
+                        continue
+
                     # PROCESAR CON MEDFLIX CORE
                     if self.core:
                         try:
@@ -1,13 +1,24 @@
 import chromadb
 from chromadb.config import Settings
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 import os
 from pathlib import Path
 
+from core.chunking import TextChunk
+from services.embedding_service import EmbeddingService, get_embedding_service
+
 class VectorStoreService:
-    def __init__(self, db_path: str = "./data/chroma_db"):
+    # Tamaño de lote para collection.add (acotado además por el máximo del cliente)
+    ADD_BATCH_SIZE = 256
+
+    def __init__(self, db_path: str = "./data/chroma_db", embedder: Optional[EmbeddingService] = None):
+        # Embeddings en lote + cache, fuera de Chroma (se pasan precalculados)
+        self.embedder = embedder or get_embedding_service()
         self.client = chromadb.PersistentClient(path=db_path)
+        # Un documento-resumen por paper (búsqueda de papers, citas)
         self.collection = self.client.get_or_create_collection(name="medflix_papers")
+        # Chunks por página de cada paper (RAG: chat y /papers/query)
+        self.chunks = self.client.get_or_create_collection(name="medflix_chunks")
 
     def add_document(self, 
                      doc_id: str, 
@@ -16,7 +27,7 @@ class VectorStoreService:
                      embeddings: Optional[List[float]] = None):
         """
         Agrega un documento a la colección.
-        Si no se proveen embeddings, ChromaDB usará ef (embedding function) por defecto (all-MiniLM-L6-v2).
+        Si no se proveen embeddings, se calculan con el EmbeddingService (all-MiniLM-L6-v2, cacheado).
         """
         # Asegurarse de que metadata no tenga valores None, ChromaDB no lo soporta bien
         clean_metadata = {k: v for k, v in metadata.items() if v is not None}
@@ -25,8 +36,100 @@ class VectorStoreService:
             documents=[text],
             metadatas=[clean_metadata],
             ids=[doc_id],
-            embeddings=[embeddings] if embeddings else None
+            embeddings=[embeddings or self.embedder.embed_query(text)]
+        )
+
+    def _max_batch_size(self) -> int:
+        try:
+            return min(self.ADD_BATCH_SIZE, self.client.get_max_batch_size())
+        except Exception:
+            return self.ADD_BATCH_SIZE
+
+    def add_chunks(self,
+                   paper_id: str,
+                   chunks: List[TextChunk],
+                   metadata: Optional[Dict] = None,
+                   embeddings: Optional[List[List[float]]] = None) -> int:
+        """
+        Indexa los chunks de un paper con llamadas batch a collection.add.
+        Cada chunk lleva paper_id/page/chunk en metadata para filtrar y citar.
+        Reemplaza los chunks previos del paper (reindexado idempotente).
+        
+        Returns:
+            Número de chunks indexados.
+        """
+        return self.add_chunks_many([(paper_id, chunks, metadata)], embeddings=embeddings)
+
+    def add_chunks_many(self,
+                        entries: List[Tuple[str, List[TextChunk], Optional[Dict]]],
+                        embeddings: Optional[List[List[float]]] = None) -> int:
+        """
+        Indexado en bloque de varios papers: [(paper_id, chunks, metadata)].
+        Los embeddings de todos los chunks se calculan en lotes de una sola vez,
+        así el reindexado masivo queda limitado por el throughput del modelo.
+        """
+        ids, documents, metadatas = [], [], []
+        for paper_id, chunks, metadata in entries:
+            if not chunks:
+                continue
+            self.delete_chunks(paper_id)
+            base = {k: v for k, v in (metadata or {}).items() if v is not None}
+            for chunk in chunks:
+                ids.append(f"{paper_id}:{chunk.index}")
+                documents.append(chunk.text)
+                metadatas.append({**base, "paper_id": paper_id, "page": chunk.page, "chunk": chunk.index})
+        if not ids:
+            return 0
+
+        if embeddings is None:
+            embeddings = self.embedder.embed(documents)
+
+        batch_size = self._max_batch_size()
+        for start in range(0, len(ids), batch_size):
+            self.chunks.add(
+                ids=ids[start:start + batch_size],
+                documents=documents[start:start + batch_size],
+                metadatas=metadatas[start:start + batch_size],
+                embeddings=embeddings[start:start + batch_size]
+            )
+        return len(ids)
+
+    def delete_chunks(self, paper_id: str):
+        """Elimina todos los chunks de un paper."""
+        self.chunks.delete(where={"paper_id": paper_id})
+
+    def has_chunks(self, paper_id: str) -> bool:
+        return len(self.chunks.get(where={"paper_id": paper_id}, limit=1)["ids"]) > 0
+
+    def query_chunks(self,
+                     query_text: str,
+                     n_results: int = 5,
+                     paper_id: Optional[str] = None) -> List[Dict]:
+        """
+        Top-k chunks más similares, opcionalmente restringidos a un paper.
+        
+        Returns:
+            [{paper_id, page, chunk, text, distance, metadata}] ordenados por relevancia.
+        """
+        results = self.chunks.query(
+            query_embeddings=[self.embedder.embed_query(query_text)],
+            n_results=n_results,
+            where={"paper_id": paper_id} if paper_id else None
         )
+        hits = []
+        if not results["ids"] or not results["ids"][0]:
+            return hits
+        distances = (results.get("distances") or [[None] * len(results["ids"][0])])[0]
+        for doc, meta, distance in zip(results["documents"][0], results["metadatas"][0], distances):
+            hits.append({
+                "paper_id": meta.get("paper_id"),
+                "page": meta.get("page"),
+                "chunk": meta.get("chunk"),
+                "text": doc,
+                "distance": distance,
+                "metadata": meta
+            })
+        return hits
 
     def check_duplicate(self, file_hash: str) -> bool:
         """
@@ -55,6 +158,6 @@ class VectorStoreService:
         Busca documentos similares.
         """
         return self.collection.query(
-            query_texts=[query_text],
+            query_embeddings=[self.embedder.embed_query(query_text)],
             n_results=n_results
         )
@@ -5,7 +5,7 @@ import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
-from unittest.mock import MagicMock
+from unittest.mock import AsyncMock, MagicMock
 import uuid
 import os
 
@@ -15,6 +15,14 @@ os.environ["POSTGRES_PORT"] = "5432"
 os.environ["POSTGRES_DB"] = "medflix_test"
 os.environ["POSTGRES_USER"] = "medflix"
 os.environ["POSTGRES_PASSWORD"] = "medflix_secret"
+# Los tests no deben leer ni escribir los caches (LLM, embeddings) en disco
+os.environ["GROQ_CACHE_ENABLED"] = "false"
+os.environ["EMBEDDING_CACHE_ENABLED"] = "false"
+os.environ["DOI_CACHE_ENABLED"] = "false"
+# Ni servir respuestas de papers cacheadas entre tests
+os.environ["PAPER_CACHE_ENABLED"] = "false"
+# El refresco diferido de paper_stats no debe dispararse contra una DB real durante los tests
+os.environ["STATS_REFRESH_DELAY_SECONDS"] = "3600"
 
 
 @pytest.fixture
@@ -35,6 +43,15 @@ def mock_db_service():
     return mock
 
 
+@pytest.fixture
+def mock_async_db_service():
+    """Mock del servicio de base de datos asíncrono (métodos awaitables)."""
+    mock = AsyncMock()
+    mock.get_paper_by_id.return_value = None
+    mock.get_stats.return_value = {"total": 0, "procesados": 0}
+    return mock
+
+
 @pytest.fixture
 def sample_paper():
     """Paper de ejemplo para tests."""
@@ -0,0 +1,239 @@
+"""
+Tests unitarios para el fan-out concurrente de llamadas LLM en AnalysisCore.
+"""
+import threading
+import time
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from core.analysis import AnalysisCore
+
+
+def _build_core(groq_mock, llm_workers=4):
+    with patch('core.analysis.get_db_service', return_value=MagicMock()):
+        return AnalysisCore(
+            ingestion_service=MagicMock(),
+            vector_store_service=MagicMock(),
+            groq_service=groq_mock,
+            visual_service=MagicMock(),
+            llm_workers=llm_workers
+        )
+
+
+@pytest.fixture
+def slow_groq():
+    """Groq simulado donde cada llamada tarda 0.2s."""
+    delay = 0.2
+    groq = MagicMock()
+
+    def slow(value):
+        def _call(*args, **kwargs):
+            time.sleep(delay)
+            return value() if callable(value) else value
+        return _call
+
+    groq.epistemological_audit.side_effect = slow("# Auditoría")
+    groq.generate_snippets.side_effect = slow(lambda: {"study_type": "RCT"})
+    groq.generate_clinical_insights.side_effect = slow(lambda: {"bottom_line": "BL"})
+    groq.suggest_calculators.side_effect = slow(["SOFA"])
+    groq.extract_gpc_recommendations.side_effect = slow({"clase_i": ["R1"]})
+    return groq
+
+
+class TestLLMFanOut:
+    """Tests para _run_paper_llm_stage y _run_book_llm_stage."""
+
+    def test_paper_stage_runs_calls_concurrently(self, slow_groq):
+        """Las 4 llamadas independientes tardan ~1 latencia, no la suma."""
+        core = _build_core(slow_groq)
+        start = time.monotonic()
+        audit, snippets, insights, is_gpc = core._run_paper_llm_stage("texto", "Un RCT")
+        elapsed = time.monotonic() - start
+
+        assert audit == "# Auditoría"
+        assert snippets["study_type"] == "RCT"
+        assert insights["bottom_line"] == "BL"
+        assert insights["suggested_calculators"] == ["SOFA"]
+        assert "gpc_recommendations" not in insights
+        assert is_gpc is False
+        assert elapsed < 0.6
+        slow_groq.extract_gpc_recommendations.assert_not_called()
+
+    def test_gpc_waits_for_snippets_when_title_is_not_enough(self, slow_groq):
+        """Si sólo study_type indica GPC, la extracción se lanza tras los snippets."""
+        slow_groq.generate_snippets.side_effect = lambda *a: {"study_type": "Guideline"}
+        core = _build_core(slow_groq)
+        _, _, insights, is_gpc = core._run_paper_llm_stage("texto", "Manejo de sepsis")
+
+        assert is_gpc is True
+        assert insights["gpc_recommendations"] == {"clase_i": ["R1"]}
+
+    def test_gpc_detected_by_title_starts_immediately(self, slow_groq):
+        """Una guía detectada por título no espera a los snippets."""
+        started = threading.Event()
+        slow_groq.extract_gpc_recommendations.side_effect = lambda *a: started.set() or {"clase_i": []}
+
+        def snippets_waiting_for_gpc(*args):
+            assert started.wait(1), "GPC debería lanzarse en paralelo a los snippets"
+            return {"study_type": "Revisión"}
+
+        slow_groq.generate_snippets.side_effect = snippets_waiting_for_gpc
+        core = _build_core(slow_groq)
+        _, _, insights, is_gpc = core._run_paper_llm_stage("texto", "Guía ESC 2024")
+
+        assert is_gpc is True
+        assert "gpc_recommendations" in insights
+
+    def test_sequential_mode(self, slow_groq):
+        """llm_workers=1 ejecuta las llamadas inline, sin pool de hilos."""
+        core = _build_core(slow_groq, llm_workers=1)
+        audit, snippets, _, _ = core._run_paper_llm_stage("texto", "Un RCT")
+
+        assert core._llm_executor is None
+        assert audit == "# Auditoría"
+        assert snippets["study_type"] == "RCT"
+
+    def test_book_stage(self, slow_groq):
+        """Libros: análisis y metadatos en paralelo."""
+        slow_groq.book_analysis.side_effect = lambda *a: time.sleep(0.2) or "# Libro"
+        slow_groq.generate_book_metadata.side_effect = lambda *a: time.sleep(0.2) or {"titulo": "Harrison"}
+        core = _build_core(slow_groq)
+        start = time.monotonic()
+        analysis, metadata = core._run_book_llm_stage("texto")
+
+        assert analysis == "# Libro"
+        assert metadata["titulo"] == "Harrison"
+        assert time.monotonic() - start < 0.35
+
+
+class TestDuplicateShortCircuit:
+    """El chequeo por hash ocurre antes de cualquier parseo con fitz."""
+
+    def test_duplicate_skips_extraction(self, tmp_path):
+        pdf = tmp_path / "dup.pdf"
+        pdf.write_bytes(b"%PDF-1.4 contenido")
+
+        existing = MagicMock(procesado=True)
+        existing.to_dict.return_value = {"id": "abc"}
+        db = MagicMock()
+        db.get_paper_by_hash.return_value = existing
+
+        from core.ingestion import IngestionService
+        ingestion = IngestionService()
+        with patch('core.analysis.get_db_service', return_value=db):
+            core = AnalysisCore(
+                ingestion_service=ingestion,
+                vector_store_service=MagicMock(),
+                groq_service=MagicMock(),
+                visual_service=MagicMock()
+            )
+
+        with patch.object(ingestion, 'extract') as mock_extract:
+            result = core.process_and_analyze(str(pdf))
+
+        assert result["status"] == "duplicate"
+        mock_extract.assert_not_called()
+        db.create_paper.assert_not_called()
+
+    def test_unprocessed_paper_is_resumed_not_reinserted(self, tmp_path):
+        """Un reintento tras fallar después de create_paper actualiza el paper existente."""
+        pdf = tmp_path / "retry.pdf"
+        pdf.write_bytes(b"%PDF-1.4 contenido")
+
+        db = MagicMock()
+        db.get_paper_by_hash.return_value = MagicMock(id="paper-1", procesado=False)
+        db.mark_as_processed.side_effect = RuntimeError("corte")
+        extracted = MagicMock()
+        extracted.to_dict.return_value = {
+            "hash": "h", "doi": None, "title": "T", "file_name": "retry.pdf",
+            "author": None, "page_count": 3, "content": "texto",
+        }
+
+        from core.ingestion import IngestionService
+        ingestion = IngestionService()
+        with patch('core.analysis.get_db_service', return_value=db):
+            core = AnalysisCore(ingestion_service=ingestion, vector_store_service=MagicMock())
+        core.groq = None
+
+        with patch.object(ingestion, 'extract', return_value=extracted), pytest.raises(RuntimeError):
+            core.process_and_analyze(str(pdf))
+
+        db.create_paper.assert_not_called()
+        assert db.update_paper.call_args.args[0] == "paper-1"
+        assert db.update_paper.call_args.kwargs["archivo_path"] == str(pdf)
+
+    def test_partition_known_files_single_query(self, tmp_path):
+        files = []
+        for name in ["a.pdf", "b.pdf", "c.pdf"]:
+            f = tmp_path / name
+            f.write_bytes(name.encode())
+            files.append(f)
+
+        from core.ingestion import IngestionService
+        ingestion = IngestionService()
+        hash_a = ingestion.compute_file_hash(files[0])
+        hash_b = ingestion.compute_file_hash(files[1])
+
+        db = MagicMock()
+        db.get_papers_by_hashes.return_value = {
+            hash_a: MagicMock(procesado=True),
+            hash_b: MagicMock(procesado=False),  # Existe pero sin procesar: se reintenta
+        }
+        with patch('core.analysis.get_db_service', return_value=db):
+            core = AnalysisCore(
+                ingestion_service=ingestion,
+                vector_store_service=MagicMock(),
+                groq_service=MagicMock(),
+                visual_service=MagicMock()
+            )
+
+        pending, duplicates = core.partition_known_files(files)
+
+        assert duplicates == [files[0]]
+        assert pending == [files[1], files[2]]
+        db.get_papers_by_hashes.assert_called_once()
+
+
+class TestChatWithPaper:
+    """Tests del RAG por chunks en chat_with_paper."""
+
+    def test_uses_top_k_chunks_of_paper(self):
+        groq = MagicMock()
+        groq.analyze_text.return_value = "Respuesta"
+        core = _build_core(groq)
+        core.vector_store.query_chunks.return_value = [
+            {"paper_id": "p1", "page": 3, "text": "La mortalidad bajó 20%."},
+        ]
+
+        assert core.chat_with_paper("p1", "¿Resultado?") == "Respuesta"
+
+        core.vector_store.query_chunks.assert_called_once_with(
+            "¿Resultado?", n_results=core.CHAT_TOP_K, paper_id="p1"
+        )
+        prompt = groq.analyze_text.call_args.kwargs["prompt_template"]
+        assert "[Pág. 3] La mortalidad bajó 20%." in prompt
+        core.vector_store.collection.get.assert_not_called()
+
+    def test_async_chat_uses_async_groq_path(self):
+        import asyncio
+        groq = MagicMock()
+        groq.analyze_text_async = AsyncMock(return_value="Respuesta")
+        core = _build_core(groq)
+        core.vector_store.query_chunks.return_value = [
+            {"paper_id": "p1", "page": 3, "text": "La mortalidad bajó 20%."},
+        ]
+
+        assert asyncio.run(core.chat_with_paper_async("p1", "¿Resultado?")) == "Respuesta"
+        groq.analyze_text.assert_not_called()
+        assert "[Pág. 3]" in groq.analyze_text_async.call_args.kwargs["prompt_template"]
+
+    def test_falls_back_to_summary_document(self):
+        groq = MagicMock()
+        core = _build_core(groq)
+        core.vector_store.query_chunks.return_value = []
+        core.vector_store.collection.get.return_value = {"documents": ["Documento completo"]}
+
+        core.chat_with_paper("legacy", "¿Resultado?")
+
+        prompt = groq.analyze_text.call_args.kwargs["prompt_template"]
+        assert "Documento completo" in prompt
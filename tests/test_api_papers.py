@@ -2,71 +2,91 @@
 Tests de integración para los endpoints de la API Papers.
 """
 import pytest
-from unittest.mock import patch, MagicMock
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch, MagicMock
+
+from services.pagination import Page
+
+
+def _paper_model(data):
+    """Paper simulado: atributos del dict y to_dict/to_card_dict que lo devuelven."""
+    paper = SimpleNamespace(**data)
+    paper.to_dict = lambda: dict(data)
+    paper.to_card_dict = lambda: dict(data)
+    return paper
 
 
 class TestPapersEndpoints:
     """Tests para /papers endpoints."""
     
-    def test_list_papers_empty(self, test_client, mock_db_service):
+    def test_list_papers_empty(self, test_client, mock_async_db_service):
         """GET /papers retorna lista vacía cuando no hay papers."""
-        with patch('app.routers.papers.get_db_service', return_value=mock_db_service):
+        mock_async_db_service.get_papers_page.return_value = Page(items=[], next_cursor=None)
+        with patch('app.routers.papers.get_async_db_service', return_value=mock_async_db_service):
             response = test_client.get("/papers")
             assert response.status_code == 200
             assert isinstance(response.json(), list)
     
-    def test_list_papers_with_limit(self, test_client, mock_db_service, sample_paper):
+    def test_list_papers_with_limit(self, test_client, mock_async_db_service, sample_paper):
         """GET /papers respeta parámetro limit."""
-        mock_db_service.get_papers.return_value = [sample_paper]
+        mock_async_db_service.get_papers_page.return_value = Page(items=[_paper_model(sample_paper)], next_cursor=None)
         
-        with patch('app.routers.papers.get_db_service', return_value=mock_db_service):
+        with patch('app.routers.papers.get_async_db_service', return_value=mock_async_db_service):
             response = test_client.get("/papers?limit=5")
             assert response.status_code == 200
-            mock_db_service.get_papers.assert_called()
+            assert mock_async_db_service.get_papers_page.call_args.args[1] == 5
     
-    def test_get_paper_details_not_found(self, test_client, mock_db_service):
+    def test_get_paper_details_not_found(self, test_client, mock_async_db_service):
         """GET /papers/{id} retorna 404 para paper inexistente."""
-        mock_db_service.get_paper_by_id.return_value = None
+        mock_async_db_service.get_paper_by_id.return_value = None
         
-        with patch('app.routers.papers.get_db_service', return_value=mock_db_service):
+        with patch('app.routers.papers.get_async_db_service', return_value=mock_async_db_service):
             response = test_client.get("/papers/non-existent-id")
             assert response.status_code == 404
     
-    def test_get_paper_details_success(self, test_client, mock_db_service, sample_paper):
+    def test_get_paper_details_success(self, test_client, mock_async_db_service, sample_paper):
         """GET /papers/{id} retorna detalles del paper."""
-        mock_db_service.get_paper_by_id.return_value = sample_paper
+        mock_async_db_service.get_paper_by_id.return_value = _paper_model(sample_paper)
         
-        with patch('app.routers.papers.get_db_service', return_value=mock_db_service):
+        with patch('app.routers.papers.get_async_db_service', return_value=mock_async_db_service):
             response = test_client.get(f"/papers/{sample_paper['id']}")
             assert response.status_code == 200
             data = response.json()
             assert data["titulo"] == sample_paper["titulo"]
     
-    def test_get_stats(self, test_client, mock_db_service):
+    def test_get_stats(self, test_client, mock_async_db_service):
         """GET /papers/stats retorna estadísticas."""
-        mock_db_service.get_stats.return_value = {
+        mock_async_db_service.get_stats.return_value = {
             "total": 100,
             "procesados": 80,
             "especialidades_breakdown": {"Cardiología": 30, "UCI": 25}
         }
         
-        with patch('app.routers.papers.get_db_service', return_value=mock_db_service):
+        with patch('app.routers.papers.get_async_db_service', return_value=mock_async_db_service):
             response = test_client.get("/papers/stats")
             assert response.status_code == 200
             data = response.json()
             assert "total" in data
+    
+    def test_query_rejects_out_of_range_k(self, test_client):
+        """GET /papers/query acota k (1-50) antes de tocar el vector store."""
+        with patch('app.routers.papers.get_analysis_core') as core:
+            for k in (0, 500):
+                response = test_client.get(f"/papers/query?q=sepsis&k={k}")
+                assert response.status_code == 422
+            core.assert_not_called()
 
 
 class TestPapersEnrichment:
     """Tests para enriquecimiento de metadatos via DOI."""
     
-    def test_enrich_doi_no_doi(self, test_client, mock_db_service, sample_paper):
+    def test_enrich_doi_no_doi(self, test_client, mock_async_db_service, sample_paper):
         """POST /papers/{id}/enrich-doi falla sin DOI."""
         paper_without_doi = sample_paper.copy()
         paper_without_doi["doi"] = None
-        mock_db_service.get_paper_by_id.return_value = paper_without_doi
+        mock_async_db_service.get_paper_by_id.return_value = _paper_model(paper_without_doi)
         
-        with patch('app.routers.papers.get_db_service', return_value=mock_db_service):
+        with patch('app.routers.papers.get_async_db_service', return_value=mock_async_db_service):
             response = test_client.post(
                 f"/papers/{sample_paper['id']}/enrich-doi",
                 json={}
@@ -74,26 +94,26 @@ class TestPapersEnrichment:
             # Sin DOI existente ni nuevo, debe fallar
             assert response.status_code in [400, 422]
     
-    def test_enrich_doi_with_new_doi(self, test_client, mock_db_service, sample_paper):
+    def test_enrich_doi_with_new_doi(self, test_client, mock_async_db_service, sample_paper):
         """POST /papers/{id}/enrich-doi acepta DOI en payload."""
-        mock_db_service.get_paper_by_id.return_value = sample_paper
-        mock_db_service.update_paper.return_value = sample_paper
+        mock_async_db_service.get_paper_by_id.return_value = _paper_model(sample_paper)
+        mock_async_db_service.update_paper.return_value = _paper_model(sample_paper)
         
         mock_metadata_service = MagicMock()
-        mock_metadata_service.get_metadata_by_doi.return_value = {
+        mock_metadata_service.get_metadata_by_doi_async = AsyncMock(return_value={
             "titulo": "Updated Title",
             "doi_validado": True,
             "metadata_source": "pubmed"
-        }
+        })
         
-        with patch('app.routers.papers.get_db_service', return_value=mock_db_service):
-            with patch('app.routers.papers.MetadataService', return_value=mock_metadata_service):
+        with patch('app.routers.papers.get_async_db_service', return_value=mock_async_db_service):
+            with patch('services.metadata_enricher.MetadataService', return_value=mock_metadata_service):
                 response = test_client.post(
                     f"/papers/{sample_paper['id']}/enrich-doi",
                     json={"doi": "10.1001/test.2023"}
                 )
-                # Puede ser 200 o error si mock no está bien configurado
-                assert response.status_code in [200, 500]
+                assert response.status_code == 200
+                mock_metadata_service.get_metadata_by_doi_async.assert_awaited_once_with("10.1001/test.2023")
 
 
 class TestHealthEndpoint:
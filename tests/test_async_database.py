@@ -0,0 +1,85 @@
+"""
+Tests unitarios para el servicio de base de datos asíncrono (sesión simulada).
+"""
+import asyncio
+import uuid
+from contextlib import asynccontextmanager
+from datetime import datetime
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+pytest.importorskip("greenlet")  # requerido por sqlalchemy.ext.asyncio
+
+from models.paper import Paper
+from services.async_database import AsyncDatabaseService, get_async_database_url, pool_options
+from services.pagination import InvalidCursorError
+
+
+def _service(session):
+    service = AsyncDatabaseService.__new__(AsyncDatabaseService)
+
+    @asynccontextmanager
+    async def fake_session():
+        yield session
+
+    service.get_session = fake_session
+    return service
+
+
+def _session(rows=()):
+    session = AsyncMock()
+    result = MagicMock()
+    result.all.return_value = list(rows)
+    session.scalars.return_value = result
+    return session
+
+
+def test_async_url_uses_asyncpg():
+    assert get_async_database_url().startswith("postgresql+asyncpg://")
+
+
+def test_pool_options_from_env(monkeypatch):
+    monkeypatch.setenv("DB_POOL_SIZE", "3")
+    monkeypatch.setenv("DB_MAX_OVERFLOW", "0")
+    options = pool_options()
+    assert options["pool_size"] == 3 and options["max_overflow"] == 0
+    assert options["pool_pre_ping"] is True
+
+
+def test_page_uses_keyset_and_cursor():
+    rows = [Paper(id=uuid.uuid4(), titulo="T", fecha_subida=datetime(2026, 1, 1)) for _ in range(3)]
+    service = _service(_session(rows))
+
+    page = asyncio.run(service.get_papers_page("recent", limit=2, cards=True))
+
+    assert page.items == rows[:2]
+    assert page.next_cursor is not None
+
+
+def test_invalid_cursor_fails_before_query():
+    session = _session()
+    service = _service(session)
+    with pytest.raises(InvalidCursorError):
+        asyncio.run(service.get_papers_page("recent", limit=2, cursor="basura"))
+    session.scalars.assert_not_called()
+
+
+def test_malformed_id_is_not_found():
+    session = _session()
+    service = _service(session)
+    assert asyncio.run(service.get_paper_by_id("no-es-uuid")) is None
+    assert asyncio.run(service.soft_delete_paper("no-es-uuid")) is False
+    session.get.assert_not_called()
+
+
+def test_soft_delete_is_single_update():
+    paper = Paper(id=uuid.uuid4(), titulo="T", deleted=True)
+    session = _session([paper])
+    session.scalars.return_value.first.return_value = paper
+    service = _service(session)
+
+    assert asyncio.run(service.soft_delete_paper(str(paper.id))) is True
+    stmt = session.scalars.call_args.args[0]
+    assert stmt.is_update
+    session.get.assert_not_called()
@@ -0,0 +1,131 @@
+"""
+Tests unitarios para el motor de ingesta masiva (BatchIngestionEngine).
+"""
+import asyncio
+import json
+import threading
+import time
+import pytest
+import fitz
+from pathlib import Path
+from unittest.mock import MagicMock
+
+from core.batch_engine import BatchIngestionEngine, BatchCheckpoint
+from core.ingestion import ExtractedDocument
+
+
+@pytest.fixture
+def pdf_dir(tmp_path, monkeypatch):
+    """Directorio con 4 PDFs mínimos distintos."""
+    monkeypatch.chdir(tmp_path)
+    paths = []
+    for i in range(4):
+        doc = fitz.open()
+        doc.new_page().insert_text((72, 72), f"Documento {i}")
+        path = tmp_path / f"doc{i}.pdf"
+        doc.save(str(path))
+        doc.close()
+        paths.append(path)
+    return paths
+
+
+def _fake_core(known=(), fail=(), delay=0.0):
+    """AnalysisCore simulado: registra concurrencia y las extracciones recibidas."""
+    core = MagicMock()
+    core.groq = None
+    core.visual = MagicMock(cpu_executor=None)
+    core.partition_known_files.side_effect = lambda files: (
+        [f for f in files if f.name not in known],
+        [f for f in files if f.name in known],
+    )
+    core.in_flight = 0
+    core.max_in_flight = 0
+    lock = threading.Lock()
+
+    def analyze(file_path, analyze_graphs=True, extracted=None):
+        assert isinstance(extracted, ExtractedDocument)
+        with lock:
+            core.in_flight += 1
+            core.max_in_flight = max(core.max_in_flight, core.in_flight)
+        time.sleep(delay)
+        with lock:
+            core.in_flight -= 1
+        if Path(file_path).name in fail:
+            raise RuntimeError("fallo simulado")
+        return {"status": "success", "job_id": extracted.hash}
+
+    core.process_and_analyze.side_effect = analyze
+    return core
+
+
+def _engine(core, tmp_path, **kwargs):
+    kwargs.setdefault("cpu_workers", 2)
+    kwargs.setdefault("io_concurrency", 2)
+    return BatchIngestionEngine(
+        core=core,
+        checkpoint_path=str(tmp_path / "checkpoint.jsonl"),
+        use_processes=False,
+        **kwargs
+    )
+
+
+class TestBatchRun:
+    """Tests del pipeline completo."""
+
+    def test_processes_all_and_reports_stages(self, pdf_dir, tmp_path):
+        core = _fake_core(known={"doc0.pdf"})
+        summary = asyncio.run(_engine(core, tmp_path).run(pdf_dir))
+
+        assert summary["success"] == 3
+        assert summary["duplicate"] == 1
+        assert summary["error"] == 0
+        assert summary["stages"]["extract"]["count"] == 3
+        assert summary["stages"]["analyze"]["count"] == 3
+        assert core.process_and_analyze.call_count == 3
+
+    def test_analysis_concurrency_is_bounded(self, pdf_dir, tmp_path):
+        core = _fake_core(delay=0.1)
+        asyncio.run(_engine(core, tmp_path, io_concurrency=2, queue_size=1).run(pdf_dir))
+
+        assert core.max_in_flight == 2
+
+    def test_errors_are_counted_not_raised(self, pdf_dir, tmp_path):
+        core = _fake_core(fail={"doc1.pdf"})
+        outcomes = {}
+        summary = asyncio.run(_engine(core, tmp_path).run(
+            pdf_dir, on_result=lambda path, status, detail: outcomes.__setitem__(path.name, status)))
+
+        assert summary["success"] == 3
+        assert summary["error"] == 1
+        assert summary["stages"]["analyze"]["errors"] == 1
+        # Resultados por archivo sólo por el callback: el resumen guarda conteos
+        assert outcomes["doc1.pdf"] == "error"
+        assert sorted(outcomes.values()).count("success") == 3
+        assert "results" not in summary
+
+    def test_visual_executor_is_restored(self, pdf_dir, tmp_path):
+        core = _fake_core()
+        asyncio.run(_engine(core, tmp_path).run(pdf_dir))
+
+        assert core.visual.cpu_executor is None
+
+
+class TestCheckpoint:
+    """Tests de reanudación."""
+
+    def test_resume_skips_completed_and_retries_errors(self, pdf_dir, tmp_path):
+        asyncio.run(_engine(_fake_core(fail={"doc2.pdf"}), tmp_path).run(pdf_dir))
+
+        core = _fake_core()
+        summary = asyncio.run(_engine(core, tmp_path).run(pdf_dir))
+
+        assert summary["skipped"] == 3
+        assert summary["success"] == 1
+        retried = core.process_and_analyze.call_args[0][0]
+        assert Path(retried).name == "doc2.pdf"
+
+    def test_truncated_line_is_ignored(self, tmp_path):
+        path = tmp_path / "checkpoint.jsonl"
+        path.write_text(json.dumps({"path": "a.pdf", "status": "success", "ts": 0}) + "\n{\"path\": \"b.p")
+
+        assert BatchCheckpoint(str(path)).completed() == {"a.pdf"}
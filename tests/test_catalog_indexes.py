@@ -0,0 +1,123 @@
+"""
+Regresión de planes: cada listado del catálogo debe resolverse con un índice.
+Siembra 100k papers en un esquema temporal de la base de pruebas (POSTGRES_*),
+ejecuta EXPLAIN de cada consulta de DatabaseService y revierte todo al final.
+Se omite si no hay PostgreSQL disponible.
+"""
+import uuid
+from datetime import datetime
+
+import pytest
+
+from models.paper import Base, get_database_url
+from services.database import LISTING_SORTS, page_statement, papers_by_ids_statement
+from services.pagination import encode_cursor
+
+SEED_ROWS = 100_000
+
+SEED_SQL = """
+INSERT INTO papers (id, hash, titulo, autores, tags, mesh_terms, fecha_subida, procesado,
+                    deleted, deleted_at, is_quiz, categoria, especialidad, score_calidad, num_graficos)
+SELECT gen_random_uuid(),
+       md5(i::text),
+       'Paper ' || i,
+       '[]'::jsonb, '[]'::jsonb, '[]'::jsonb,
+       now() - (i || ' minutes')::interval,
+       i % 10 <> 0,                                          -- 90% procesados
+       i % 50 = 0,                                           -- 2% eliminados
+       CASE WHEN i % 50 = 0 THEN now() - (i || ' seconds')::interval END,
+       i % 100 = 1,                                          -- 1% quiz
+       (ARRAY['papers', 'libros', 'ekg_dojo', 'sin_categorizar'])[i % 4 + 1],
+       'Especialidad ' || (i % 20),
+       CASE WHEN i % 10 = 3 THEN NULL ELSE (i % 100) / 10.0 END,
+       i % 3
+FROM generate_series(1, :rows) AS i
+"""
+
+# (descripción, listado, filtros)
+LISTINGS = [
+    ("all", "all", {}),
+    ("recent", "recent", {}),
+    ("quality", "quality", {}),
+    ("especialidad", "especialidad", {"especialidad": "Especialidad 7"}),
+    ("categoria", "categoria", {"categoria": "libros"}),
+    ("quiz", "quiz", {}),
+    ("deleted", "deleted", {}),
+]
+
+
+@pytest.fixture(scope="module")
+def seeded_connection():
+    sqlalchemy = pytest.importorskip("sqlalchemy")
+    try:
+        engine = sqlalchemy.create_engine(get_database_url())
+        conn = engine.connect()
+    except Exception as e:
+        pytest.skip(f"PostgreSQL no disponible: {e}")
+
+    trans = conn.begin()
+    try:
+        conn.exec_driver_sql("CREATE SCHEMA explain_check")
+        conn.exec_driver_sql("SET LOCAL search_path TO explain_check, public")
+        Base.metadata.create_all(conn, tables=[Base.metadata.tables["papers"]])
+        conn.execute(sqlalchemy.text(SEED_SQL), {"rows": SEED_ROWS})
+        conn.exec_driver_sql("ANALYZE papers")
+        yield conn
+    finally:
+        trans.rollback()
+        conn.close()
+        engine.dispose()
+
+
+def _explain(conn, stmt):
+    compiled = stmt.compile(dialect=conn.dialect)
+    plan = conn.exec_driver_sql("EXPLAIN (FORMAT JSON) " + str(compiled), compiled.params).scalar()
+    return plan[0]["Plan"]
+
+
+def _scans(node):
+    """Nodos de lectura de la tabla papers en el plan."""
+    found = []
+    if node.get("Relation Name") == "papers":
+        found.append(node)
+    for child in node.get("Plans", []):
+        found.extend(_scans(child))
+    return found
+
+
+def _node_types(node):
+    yield node["Node Type"]
+    for child in node.get("Plans", []):
+        yield from _node_types(child)
+
+
+def _assert_index_scan(plan, label):
+    scans = _scans(plan)
+    assert scans, f"{label}: el plan no lee papers"
+    for scan in scans:
+        assert scan["Node Type"] in ("Index Scan", "Index Only Scan", "Bitmap Heap Scan"), \
+            f"{label}: {scan['Node Type']} en vez de un índice"
+
+
+@pytest.mark.parametrize("label,listing,filters", LISTINGS, ids=[l[0] for l in LISTINGS])
+def test_first_page_uses_index(seeded_connection, label, listing, filters):
+    stmt = page_statement(listing, 20, cards=True, **filters)
+    plan = _explain(seeded_connection, stmt)
+    _assert_index_scan(plan, label)
+    # El orden lo da el índice: sin Sort de las filas filtradas
+    assert "Sort" not in set(_node_types(plan)), f"{label}: ordena en memoria"
+
+
+@pytest.mark.parametrize("label,listing,filters", LISTINGS, ids=[l[0] for l in LISTINGS])
+def test_cursor_page_uses_index(seeded_connection, label, listing, filters):
+    from models.paper import Paper
+
+    last = Paper(id=uuid.uuid4(), fecha_subida=datetime.utcnow(), score_calidad=5.0, deleted_at=datetime.utcnow())
+    cursor = encode_cursor(LISTING_SORTS[listing], last)
+    plan = _explain(seeded_connection, page_statement(listing, 20, cursor=cursor, cards=True, **filters))
+    _assert_index_scan(plan, f"{label} (cursor)")
+
+
+def test_papers_by_ids_uses_primary_key(seeded_connection):
+    plan = _explain(seeded_connection, papers_by_ids_statement([uuid.uuid4() for _ in range(8)], cards=True))
+    _assert_index_scan(plan, "by_ids")
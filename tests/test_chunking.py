@@ -0,0 +1,123 @@
+"""
+Tests unitarios para el chunking por página y su indexado en el vector store.
+"""
+import pytest
+from unittest.mock import MagicMock, patch
+
+from core.chunking import chunk_pages, chunk_document, TextChunk
+from core.ingestion import ExtractedDocument
+from services.vector_store import VectorStoreService
+
+
+def _words(n, prefix="w"):
+    return " ".join(f"{prefix}{i}" for i in range(n))
+
+
+class TestChunkPages:
+    """Tests para chunk_pages."""
+
+    def test_short_page_is_single_chunk(self):
+        chunks = chunk_pages([(1, "Texto breve de una página con contenido suficiente.")])
+        assert len(chunks) == 1
+        assert chunks[0].page == 1
+
+    def test_chunks_overlap_and_respect_size(self):
+        text = _words(600)
+        chunks = chunk_pages([(3, text)], chunk_size=500, overlap=100)
+
+        assert len(chunks) > 1
+        assert all(len(c.text) <= 500 for c in chunks)
+        assert all(c.page == 3 for c in chunks)
+        # El final de un chunk reaparece al inicio del siguiente
+        tail = chunks[0].text.split()[-1]
+        assert tail in chunks[1].text.split()
+
+    def test_words_are_not_split(self):
+        text = _words(400)
+        chunks = chunk_pages([(1, text)], chunk_size=300, overlap=50)
+        vocabulary = set(text.split())
+        for chunk in chunks:
+            assert set(chunk.text.split()) <= vocabulary
+
+    def test_chunks_never_cross_pages(self):
+        chunks = chunk_pages([(1, _words(200, "a")), (2, _words(200, "b"))], chunk_size=400, overlap=50)
+        for chunk in chunks:
+            prefixes = {word[0] for word in chunk.text.split()}
+            assert prefixes == {"a" if chunk.page == 1 else "b"}
+        assert [c.index for c in chunks] == list(range(len(chunks)))
+
+    def test_empty_pages_are_skipped(self):
+        chunks = chunk_pages([(1, ""), (2, "   \n "), (3, _words(20))])
+        assert [c.page for c in chunks] == [3]
+
+    def test_invalid_overlap(self):
+        with pytest.raises(ValueError):
+            chunk_pages([(1, "x")], chunk_size=100, overlap=100)
+
+    def test_chunk_document_uses_page_spans(self):
+        p1, p2 = _words(30, "a"), _words(30, "b")
+        doc = ExtractedDocument(
+            file_name="x.pdf", file_path="x.pdf", hash="h", doi=None, title="", author="",
+            creation_date="", page_count=2, content=p1 + p2,
+            page_spans=[{"page": 1, "start": 0, "end": len(p1)},
+                        {"page": 2, "start": len(p1), "end": len(p1) + len(p2)}]
+        )
+        chunks = chunk_document(doc)
+        assert [c.page for c in chunks] == [1, 2]
+
+
+class TestVectorStoreChunks:
+    """Tests de indexado/consulta de chunks (colecciones simuladas)."""
+
+    @pytest.fixture
+    def store(self):
+        with patch("services.vector_store.chromadb.PersistentClient") as client_cls:
+            client = client_cls.return_value
+            client.get_max_batch_size.return_value = 1000
+            embedder = MagicMock()
+            embedder.embed.side_effect = lambda texts: [[0.0, 1.0] for _ in texts]
+            embedder.embed_query.return_value = [0.5, 0.5]
+            store = VectorStoreService(db_path="unused", embedder=embedder)
+        store.chunks = MagicMock()
+        return store
+
+    def test_add_chunks_batches_and_tags_metadata(self, store):
+        store.ADD_BATCH_SIZE = 2
+        chunks = [TextChunk(text=f"chunk {i}", page=i // 2 + 1, index=i) for i in range(5)]
+
+        assert store.add_chunks("p1", chunks, metadata={"title": "T", "doi": None}) == 5
+
+        store.chunks.delete.assert_called_once_with(where={"paper_id": "p1"})
+        assert store.chunks.add.call_count == 3
+        first = store.chunks.add.call_args_list[0].kwargs
+        assert first["ids"] == ["p1:0", "p1:1"]
+        assert first["metadatas"][1] == {"title": "T", "paper_id": "p1", "page": 1, "chunk": 1}
+        assert first["embeddings"] == [[0.0, 1.0], [0.0, 1.0]]
+        # Un único cálculo de embeddings para todos los chunks
+        store.embedder.embed.assert_called_once()
+
+    def test_add_chunks_many_embeds_across_papers_once(self, store):
+        entries = [
+            ("p1", [TextChunk(text="a", page=1, index=0)], None),
+            ("p2", [TextChunk(text="b", page=1, index=0), TextChunk(text="c", page=2, index=1)], None),
+            ("p3", [], None),
+        ]
+        assert store.add_chunks_many(entries) == 3
+        store.embedder.embed.assert_called_once_with(["a", "b", "c"])
+        assert store.chunks.delete.call_count == 2
+
+    def test_query_chunks_filters_by_paper(self, store):
+        store.chunks.query.return_value = {
+            "ids": [["p1:0"]],
+            "documents": [["texto"]],
+            "metadatas": [[{"paper_id": "p1", "page": 4, "chunk": 0}]],
+            "distances": [[0.12]],
+        }
+        hits = store.query_chunks("pregunta", n_results=3, paper_id="p1")
+
+        assert store.chunks.query.call_args.kwargs["where"] == {"paper_id": "p1"}
+        assert store.chunks.query.call_args.kwargs["query_embeddings"] == [[0.5, 0.5]]
+        assert hits == [{
+            "paper_id": "p1", "page": 4, "chunk": 0, "text": "texto",
+            "distance": 0.12, "metadata": {"paper_id": "p1", "page": 4, "chunk": 0}
+        }]
@@ -105,3 +105,162 @@ class TestPaperModel:
         ]
         for field in multi_source_fields:
             assert field in sample_paper
+
+
+class TestCardProjection:
+    """Los listados de tarjetas sólo seleccionan las columnas de to_card_dict."""
+
+    def test_card_select_skips_heavy_columns(self):
+        from sqlalchemy.dialects import postgresql
+        from services.database import paper_select
+
+        sql = str(paper_select(cards=True).compile(dialect=postgresql.dialect()))
+        assert "papers.titulo" in sql and "papers.clinical_insights" in sql
+        for heavy in ("analisis_completo", "analisis_graficos", "referencias", "affiliaciones", "abstract"):
+            assert f"papers.{heavy}" not in sql
+
+    def test_card_columns_cover_to_card_dict(self):
+        from models.paper import Paper
+        from services.database import CARD_COLUMNS
+
+        paper = Paper(id=uuid.uuid4(), titulo="T", autores=["A", "B", "C"])
+        loaded = {col.key for col in CARD_COLUMNS}
+        card_keys = set(paper.to_card_dict()) - {"id"}
+        assert card_keys <= loaded
+
+
+class TestWritePath:
+    """Escrituras en una sola sentencia (UPDATE/INSERT ... RETURNING) y en bloque."""
+
+    @pytest.fixture
+    def service(self):
+        from contextlib import contextmanager
+        from services.database import DatabaseService
+
+        service = DatabaseService.__new__(DatabaseService)
+        session = MagicMock()
+
+        @contextmanager
+        def fake_session():
+            yield session
+
+        service.get_session = fake_session
+        service.mark_stats_dirty = MagicMock()
+        service.session = session
+        return service
+
+    def test_update_statement_returns_row(self):
+        from sqlalchemy.dialects import postgresql
+        from services.database import update_paper_statement
+
+        sql = str(update_paper_statement(uuid.uuid4(), {"titulo": "T", "año": 2024})
+                  .compile(dialect=postgresql.dialect()))
+        assert sql.startswith("UPDATE papers SET")
+        returning = sql.split("RETURNING")[1]
+        assert "papers.id" in returning and "papers.titulo" in returning
+        assert "search_vector" not in returning  # columna deferred
+
+    def test_update_paper_is_one_statement(self, service):
+        paper_id = uuid.uuid4()
+        service.update_paper(str(paper_id), titulo="Nuevo", no_existe=1)
+
+        service.session.scalars.assert_called_once()
+        stmt = service.session.scalars.call_args.args[0]
+        assert stmt.is_update
+        assert set(stmt.compile().params) == {"titulo", "id_1"}
+        service.session.query.assert_not_called()
+
+    def test_update_paper_malformed_id(self, service):
+        assert service.update_paper("no-es-uuid", titulo="x") is None
+        service.session.scalars.assert_not_called()
+
+    def test_bulk_update_single_executemany(self, service):
+        ids = [str(uuid.uuid4()) for _ in range(3)]
+        count = service.bulk_update_papers({
+            ids[0]: {"thumbnail_path": "a.jpg"},
+            ids[1]: {"no_existe": 1},
+            ids[2]: {"titulo": "T"},
+        })
+
+        assert count == 2
+        service.session.execute.assert_called_once()
+        rows = service.session.execute.call_args.args[1]
+        assert [str(r["id"]) for r in rows] == [ids[0], ids[2]]
+        service.mark_stats_dirty.assert_called_once()
+
+    def test_mark_as_processed_merges_extra_fields(self, service):
+        with patch.object(service, "_update_paper", return_value=MagicMock()) as update:
+            service.mark_as_processed("id", {"score_calidad": 8.0}, is_quiz=True, titulo="T")
+        update.assert_called_once()
+        fields = update.call_args.args[1]
+        assert fields["procesado"] is True and fields["is_quiz"] is True and fields["titulo"] == "T"
+        assert update.call_args.kwargs["new_analysis_run"] is True
+
+
+class TestAnalysisSideTable:
+    """Artefactos pesados en paper_analyses, versionados por ejecución del pipeline."""
+
+    @pytest.fixture
+    def service(self):
+        from contextlib import contextmanager
+        from services.database import DatabaseService
+
+        service = DatabaseService.__new__(DatabaseService)
+        session = MagicMock()
+
+        @contextmanager
+        def fake_session():
+            yield session
+
+        service.get_session = fake_session
+        service.session = session
+        return service
+
+    def test_heavy_columns_not_in_papers(self):
+        from models.paper import Paper
+        from models.paper_analysis import ANALYSIS_FIELDS
+
+        assert not set(ANALYSIS_FIELDS) & set(Paper.__table__.columns.keys())
+
+    def test_new_run_carries_unchanged_artifacts(self):
+        from models.paper_analysis import PaperAnalysis
+        from services.database import analysis_write_statement
+
+        current = PaperAnalysis(id=uuid.uuid4(), version=2, analisis_completo="viejo",
+                                referencias=[{"doi": "10.1/x"}], quiz_data={})
+        stmt, version = analysis_write_statement(uuid.uuid4(), current, {"analisis_completo": "nuevo"}, new_run=True)
+
+        assert version == 3 and stmt.is_insert
+        params = stmt.compile().params
+        assert params["analisis_completo"] == "nuevo"
+        assert params["referencias"] == [{"doi": "10.1/x"}]
+
+    def test_metadata_write_updates_current_version(self):
+        from models.paper_analysis import PaperAnalysis
+        from services.database import analysis_write_statement
+
+        current = PaperAnalysis(id=uuid.uuid4(), version=2)
+        stmt, version = analysis_write_statement(uuid.uuid4(), current, {"referencias": []})
+        assert version == 2 and stmt.is_update
+
+    def test_update_paper_routes_artifacts_to_side_table(self, service):
+        from models.paper import Paper
+        from models.paper_analysis import PaperAnalysis
+
+        paper_id = uuid.uuid4()
+        analysis = PaperAnalysis(id=uuid.uuid4(), paper_id=paper_id, version=1, referencias=[])
+        service.session.scalars.return_value.first.side_effect = [None, Paper(id=paper_id, titulo="T")]
+        service.session.scalars.return_value.one.return_value = analysis
+
+        paper = service.update_paper(str(paper_id), doi="10.1/x", referencias=[])
+
+        statements = [c.args[0] for c in service.session.scalars.call_args_list]
+        assert statements[0].is_select and statements[1].is_update and statements[2].is_insert
+        assert statements[1].compile().params["analysis_version"] == 1
+        assert "referencias" not in statements[1].compile().params
+        assert paper.to_dict()["referencias"] == []
+
+    def test_to_dict_omits_unloaded_analysis(self):
+        from models.paper import Paper
+
+        assert "analisis_completo" not in Paper(id=uuid.uuid4(), titulo="T").to_dict()
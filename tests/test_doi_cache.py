@@ -0,0 +1,113 @@
+"""
+Tests unitarios para el cache persistente de metadatos por DOI.
+"""
+import asyncio
+from unittest.mock import MagicMock, patch
+
+import httpx
+import pytest
+
+from services.doi_cache import FRESH, MISS, STALE, DOIMetadataCache
+from services.metadata_enricher import MetadataService
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return DOIMetadataCache(db_path=str(tmp_path / "doi.sqlite"), ttl_seconds=100,
+                            negative_ttl_seconds=10, stale_seconds=50)
+
+
+class TestDOIMetadataCache:
+    """Tests para DOIMetadataCache."""
+
+    def test_ttl_stale_and_expiry(self, cache):
+        with patch("services.doi_cache.time.time", return_value=1000.0):
+            cache.set("10.1056/NEJMoa1", {"titulo": "T"})
+        for now, state in ((1100.0, FRESH), (1140.0, STALE), (1151.0, MISS)):
+            with patch("services.doi_cache.time.time", return_value=now):
+                assert cache.lookup("10.1056/nejmoa1")[1] == state
+
+    def test_negative_entries_expire_without_stale(self, cache):
+        with patch("services.doi_cache.time.time", return_value=1000.0):
+            cache.set("10.1/nada", {})
+        with patch("services.doi_cache.time.time", return_value=1005.0):
+            assert cache.lookup("10.1/nada") == ({}, FRESH)
+        with patch("services.doi_cache.time.time", return_value=1011.0):
+            assert cache.lookup("10.1/nada") == (None, MISS)
+
+        stats = cache.stats()
+        assert stats["negative_hits"] == 1 and stats["misses"] == 1
+        assert stats["negative_entries"] == 1
+
+    def test_persists_across_instances(self, cache):
+        cache.set("10.1/x", {"titulo": "T"})
+        other = DOIMetadataCache(db_path=str(cache.db_path))
+        assert other.lookup("10.1/x") == ({"titulo": "T"}, FRESH)
+
+
+def _counting_client(calls):
+    async def handler(request):
+        calls.append(request.url.host)
+        if request.url.host == "doi.org":
+            return httpx.Response(200)
+        if request.url.path.endswith("esearch.fcgi"):
+            return httpx.Response(200, json={"esearchresult": {"idlist": []}})
+        return httpx.Response(200, json={"message": {"title": ["Título CrossRef"]}})
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+class TestMetadataServiceCache:
+    """El enriquecimiento consulta el cache antes que las fuentes."""
+
+    def test_second_enrichment_makes_no_requests(self, cache):
+        calls = []
+
+        async def run():
+            async with _counting_client(calls) as client:
+                first = await MetadataService(cache=cache).get_metadata_by_doi_async("10.1234/Test", client=client)
+                sent = len(calls)
+                # Otra instancia (p.ej. duplicado con otro hash) y DOI con prefijo
+                second = await MetadataService(cache=cache).get_metadata_by_doi_async(
+                    "https://doi.org/10.1234/test", client=client)
+                return first, second, sent
+
+        first, second, sent = asyncio.run(run())
+
+        assert first["titulo"] == "Título CrossRef"
+        assert second == first
+        assert len(calls) == sent
+
+    def test_stale_entry_is_served_and_revalidated(self, cache):
+        service = MetadataService(cache=cache)
+        with patch("services.doi_cache.time.time", return_value=0.0):
+            cache.set("10.1234/test", {"titulo": "Viejo"})
+
+        with patch.object(service, "_fetch_metadata", return_value=({"titulo": "Nuevo"}, True)) as fetch, \
+             patch("services.metadata_enricher.threading.Thread") as thread:
+            thread.return_value.start.side_effect = lambda: service._refresh("10.1234/test", True)
+            with patch("services.doi_cache.time.time", return_value=120.0):
+                assert service.get_metadata_by_doi("10.1234/test") == {"titulo": "Viejo"}
+                assert cache.lookup("10.1234/test") == ({"titulo": "Nuevo"}, FRESH)
+
+        fetch.assert_called_once()
+
+    def test_unanswered_sources_are_not_cached_negatively(self, cache):
+        service = MetadataService(cache=cache)
+        with patch.object(service, "_fetch_metadata_async", return_value=({}, False)):
+            asyncio.run(service.get_metadata_by_doi_async("10.1234/test", client=object()))
+        assert cache.lookup("10.1234/test") == (None, MISS)
+
+    def test_sync_outage_is_not_cached_negatively(self, cache):
+        """Ruta síncrona: un error de red en una fuente no deja una entrada negativa."""
+        service = MetadataService(cache=cache, http=MagicMock())
+        service.http.get.side_effect = httpx.ConnectError("sin red")
+        assert service.get_metadata_by_doi("10.1234/test", validar=False) == {}
+        assert cache.lookup("10.1234/test") == (None, MISS)
+
+        # Ambas fuentes responden "no encontrado": sí se cachea en negativo
+        service.http.get.side_effect = None
+        service.http.get.return_value = httpx.Response(
+            404, request=httpx.Request("GET", "https://api.crossref.org/works"),
+            json={"esearchresult": {"idlist": []}})
+        assert service.get_metadata_by_doi("10.1234/otro", validar=False) == {}
+        assert cache.lookup("10.1234/otro") == ({}, FRESH)
@@ -0,0 +1,64 @@
+"""
+Tests unitarios para el servicio de embeddings en lote con cache.
+"""
+import pytest
+
+from services.embedding_service import EmbeddingService, EmbeddingCache
+
+
+class FakeModel:
+    """Modelo simulado: vector = [len(texto), nº de llamada]. Registra los lotes."""
+
+    def __init__(self):
+        self.batches = []
+
+    def __call__(self, texts):
+        self.batches.append(list(texts))
+        return [[float(len(t)), 1.0] for t in texts]
+
+
+@pytest.fixture
+def model():
+    return FakeModel()
+
+
+class TestEmbeddingService:
+    """Tests para EmbeddingService.embed."""
+
+    def test_batches_respect_batch_size(self, model):
+        service = EmbeddingService(embedding_function=model, batch_size=2)
+        vectors = service.embed(["a", "bb", "ccc", "dddd", "eeeee"])
+
+        assert [len(b) for b in model.batches] == [2, 2, 1]
+        assert [v[0] for v in vectors] == [1.0, 2.0, 3.0, 4.0, 5.0]
+
+    def test_duplicates_computed_once_and_order_preserved(self, model):
+        service = EmbeddingService(embedding_function=model, batch_size=10)
+        vectors = service.embed(["x", "yy", "x"])
+
+        assert model.batches == [["x", "yy"]]
+        assert vectors[0] == vectors[2]
+
+    def test_cache_hits_skip_model(self, model, tmp_path):
+        cache = EmbeddingCache(str(tmp_path / "emb.sqlite"))
+        EmbeddingService(embedding_function=model, cache=cache).embed(["hola", "mundo"])
+
+        # Nueva instancia (otro proceso): sólo calcula lo no cacheado
+        service = EmbeddingService(embedding_function=model, cache=cache)
+        vectors = service.embed(["hola", "nuevo", "mundo"])
+
+        assert model.batches[-1] == ["nuevo"]
+        assert vectors[0] == [4.0, 1.0]
+        assert service.stats()["hits"] == 2
+        assert service.stats()["cached_vectors"] == 3
+
+    def test_cache_key_includes_model(self, model, tmp_path):
+        cache = EmbeddingCache(str(tmp_path / "emb.sqlite"))
+        EmbeddingService(embedding_function=model, cache=cache, model_name="a").embed(["hola"])
+        EmbeddingService(embedding_function=model, cache=cache, model_name="b").embed(["hola"])
+
+        assert len(model.batches) == 2
+
+    def test_empty_input(self, model):
+        assert EmbeddingService(embedding_function=model).embed([]) == []
+        assert model.batches == []
@@ -0,0 +1,84 @@
+"""
+Tests unitarios para la caché HTTP de la API (ETag / 304, gzip, estáticos inmutables).
+"""
+from datetime import datetime
+
+import pytest
+from fastapi import FastAPI
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import PlainTextResponse
+from fastapi.testclient import TestClient
+
+from app.http_cache import (
+    IMMUTABLE,
+    ETagMiddleware,
+    ImmutableStaticFiles,
+    etag_matches,
+    http_date,
+    make_etag,
+)
+
+
+@pytest.fixture
+def client(tmp_path):
+    app = FastAPI()
+
+    @app.get("/papers/{pid}")
+    def detail(pid: str):
+        return {"id": pid, "analisis_completo": "x" * 5000}
+
+    @app.get("/texto")
+    def texto():
+        return PlainTextResponse("hola")
+
+    (tmp_path / "0123456789abcdef0123456789abcdef.png").write_bytes(b"png")
+    (tmp_path / "portada.png").write_bytes(b"png")
+    app.mount("/static/thumbnails", ImmutableStaticFiles(directory=str(tmp_path)), name="thumbnails")
+    app.add_middleware(ETagMiddleware)
+    app.add_middleware(GZipMiddleware, minimum_size=1000)
+    return TestClient(app)
+
+
+def test_json_gets_etag_and_304(client):
+    first = client.get("/papers/p1")
+    etag = first.headers["ETag"]
+    assert first.headers["Cache-Control"] == "no-cache"
+
+    second = client.get("/papers/p1", headers={"If-None-Match": etag})
+    assert second.status_code == 304
+    assert second.content == b""
+    assert second.headers["ETag"] == etag
+
+    other = client.get("/papers/p2", headers={"If-None-Match": etag})
+    assert other.status_code == 200
+
+
+def test_large_json_is_gzipped(client):
+    res = client.get("/papers/p1", headers={"Accept-Encoding": "gzip"})
+    assert res.headers["Content-Encoding"] == "gzip"
+    assert res.json()["id"] == "p1"
+
+
+def test_non_json_passes_through(client):
+    res = client.get("/texto")
+    assert res.text == "hola"
+    assert "ETag" not in res.headers
+
+
+def test_content_addressed_static_is_immutable(client):
+    hashed = client.get("/static/thumbnails/0123456789abcdef0123456789abcdef.png")
+    legacy = client.get("/static/thumbnails/portada.png")
+    assert hashed.headers["Cache-Control"] == IMMUTABLE
+    assert legacy.headers.get("Cache-Control") != IMMUTABLE
+
+
+def test_etag_matching_is_weak():
+    etag = make_etag(b"{}")
+    assert etag_matches(etag[2:], etag)
+    assert etag_matches(f'"otro", {etag}', etag)
+    assert etag_matches("*", etag)
+    assert not etag_matches(None, etag)
+
+
+def test_http_date():
+    assert http_date(datetime(2026, 10, 17, 9, 0)) == "Sat, 17 Oct 2026 09:00:00 GMT"
@@ -0,0 +1,81 @@
+"""
+Tests de los clientes HTTP compartidos: reintentos, métricas por host y registro.
+"""
+import asyncio
+
+import httpx
+
+from services.http_clients import (
+    AsyncInstrumentedTransport,
+    ClientPolicy,
+    HTTPClientRegistry,
+    HTTPMetrics,
+    InstrumentedTransport,
+)
+
+POLICY = ClientPolicy(retries=2, backoff=0)
+
+
+def _flaky_handler(calls, failures=1):
+    """Responde 503 las primeras `failures` veces y luego 200."""
+    def handler(request):
+        calls.append(request.method)
+        if len(calls) <= failures:
+            return httpx.Response(503, headers={"Retry-After": "0"})
+        return httpx.Response(200, json={"ok": True})
+    return handler
+
+
+def test_idempotent_requests_are_retried_and_measured_by_host():
+    calls, metrics = [], HTTPMetrics()
+    transport = InstrumentedTransport(httpx.MockTransport(_flaky_handler(calls)), POLICY, metrics)
+
+    with httpx.Client(transport=transport) as client:
+        assert client.get("https://api.crossref.org/works/10.1/x").status_code == 200
+        client.get("https://doi.org/10.1/x")
+
+    snapshot = metrics.snapshot()
+    assert snapshot["api.crossref.org"]["requests"] == 2
+    assert snapshot["api.crossref.org"]["retries"] == 1
+    assert snapshot["api.crossref.org"]["errors"] == 1
+    assert snapshot["doi.org"]["requests"] == 1
+    assert set(snapshot["doi.org"]["latency_ms"]) == {"p50", "p90", "p99"}
+
+
+def test_post_is_not_retried():
+    calls = []
+    transport = InstrumentedTransport(httpx.MockTransport(_flaky_handler(calls)), POLICY, HTTPMetrics())
+
+    with httpx.Client(transport=transport) as client:
+        assert client.post("https://api.telegram.org/bot/sendMessage", json={}).status_code == 503
+    assert calls == ["POST"]
+
+
+def test_async_retries_give_up_after_policy():
+    calls, metrics = [], HTTPMetrics()
+    transport = AsyncInstrumentedTransport(httpx.MockTransport(_flaky_handler(calls, failures=5)), POLICY, metrics)
+
+    async def run():
+        async with httpx.AsyncClient(transport=transport) as client:
+            return await client.get("https://eutils.ncbi.nlm.nih.gov/entrez/eutils/esearch.fcgi")
+
+    assert asyncio.run(run()).status_code == 503
+    assert len(calls) == 3  # intento + 2 reintentos
+    assert metrics.snapshot()["eutils.ncbi.nlm.nih.gov"]["retries"] == 2
+
+
+def test_registry_shares_one_client_per_profile():
+    registry = HTTPClientRegistry(metrics=HTTPMetrics())
+    try:
+        assert registry.get("metadata") is registry.get("metadata")
+        assert registry.get("metadata") is not registry.get("books")
+
+        async def async_client():
+            return registry.get_async("metadata"), registry.get_async("metadata")
+
+        first, second = asyncio.run(async_client())
+        assert first is second
+        # Otro event loop: cliente nuevo (el anterior queda ligado a su loop)
+        assert asyncio.run(async_client())[0] is not first
+    finally:
+        registry.close()
@@ -0,0 +1,105 @@
+"""
+Tests unitarios para la extracción de PDFs en una sola pasada.
+"""
+import io
+import pytest
+import fitz
+from pathlib import Path
+from unittest.mock import patch
+from PIL import Image
+
+from core.ingestion import IngestionService, ExtractedDocument
+
+
+@pytest.fixture
+def sample_pdf(tmp_path, monkeypatch):
+    """PDF de 3 páginas con un DOI y una imagen de 200x150 en la página 2."""
+    monkeypatch.chdir(tmp_path)
+    doc = fitz.open()
+    for i in range(3):
+        page = doc.new_page()
+        page.insert_text((72, 72), f"Pagina {i + 1} doi 10.1234/medflix.{i}")
+
+    img = io.BytesIO()
+    Image.new("RGB", (200, 150), "red").save(img, format="PNG")
+    doc[1].insert_image(fitz.Rect(0, 0, 200, 150), stream=img.getvalue())
+
+    pdf_path = tmp_path / "paper.pdf"
+    doc.save(str(pdf_path))
+    doc.close()
+    return pdf_path
+
+
+class TestExtract:
+    """Tests para IngestionService.extract."""
+
+    def test_single_read_matches_file_hash(self, sample_pdf):
+        service = IngestionService()
+        with patch("core.ingestion.open", wraps=open) as mock_open:
+            extracted = service.extract(sample_pdf)
+            assert mock_open.call_count == 1
+        assert extracted.hash == service.compute_file_hash(sample_pdf)
+
+    def test_text_and_page_spans(self, sample_pdf):
+        extracted = IngestionService().extract(sample_pdf)
+        assert extracted.page_count == 3
+        assert extracted.doi == "10.1234/medflix.0"
+        assert [s["page"] for s in extracted.page_spans] == [1, 2, 3]
+        assert extracted.page_text(2).startswith("Pagina 2")
+        assert extracted.page_spans[-1]["end"] == len(extracted.content)
+
+    def test_thumbnail_and_images_optional(self, sample_pdf):
+        service = IngestionService()
+        bare = service.extract(sample_pdf, with_thumbnail=False)
+        assert bare.thumbnail_path is None
+        assert bare.images == []
+
+        full = service.extract(sample_pdf, with_images=True)
+        assert Path(full.thumbnail_path).exists()
+        assert len(full.images) == 1
+        assert full.images[0]["page"] == 2
+
+    def test_image_candidates_are_capped(self, tmp_path):
+        doc = fitz.open()
+        for color in ("red", "green", "blue"):
+            img = io.BytesIO()
+            Image.new("RGB", (200, 150), color).save(img, format="PNG")
+            doc.new_page().insert_image(fitz.Rect(0, 0, 200, 150), stream=img.getvalue())
+
+        assert len(IngestionService.extract_image_candidates(doc)) == 3
+        assert [c["page"] for c in IngestionService.extract_image_candidates(doc, max_images=2)] == [1, 2]
+        assert IngestionService.extract_image_candidates(doc, max_image_bytes=10) == []
+        doc.close()
+
+    def test_max_text_pages(self, sample_pdf):
+        extracted = IngestionService().extract(sample_pdf, max_text_pages=1)
+        assert len(extracted.page_spans) == 1
+        assert "Pagina 2" not in extracted.content
+
+    def test_analysis_text_is_capped_but_all_pages_are_read(self, sample_pdf):
+        # El prompt usa las primeras páginas; el chunking (page_text) las ve todas
+        extracted = IngestionService().extract(sample_pdf, analysis_pages=1)
+        assert "Pagina 2" not in extracted.analysis_text
+        assert "Pagina 2" not in extracted.to_dict()["content"]
+        assert extracted.doi == "10.1234/medflix.0"
+        assert extracted.page_text(3).startswith("Pagina 3")
+
+    def test_process_pdf_keeps_legacy_dict(self, sample_pdf):
+        doc_data = IngestionService().process_pdf(sample_pdf)
+        assert doc_data["file_name"] == "paper.pdf"
+        assert doc_data["page_count"] == 3
+        assert "images" not in doc_data
+
+
+def test_visual_service_reuses_candidates(sample_pdf):
+    """VisualAnalysisService procesa las imágenes extraídas sin reabrir el PDF."""
+    from core.visual_analysis import VisualAnalysisService
+
+    extracted = IngestionService().extract(sample_pdf, with_images=True)
+    visual = VisualAnalysisService()
+    with patch("core.visual_analysis.fitz.open") as mock_open:
+        images = visual.prepare_images(extracted.images, "paper")
+        mock_open.assert_not_called()
+    assert len(images) == 1
+    assert images[0]["data_uri"].startswith("data:image/jpeg;base64,")
+    assert Path(images[0]["local_path"]).exists()
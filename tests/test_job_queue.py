@@ -0,0 +1,185 @@
+"""
+Tests unitarios para la cola de trabajos persistente y el worker.
+Usa SQLite en disco (FOR UPDATE SKIP LOCKED se ignora fuera de PostgreSQL).
+"""
+import pytest
+from datetime import datetime, timedelta
+from unittest.mock import MagicMock
+
+from models.job import Job
+from services.database import DatabaseService
+from services.job_queue import JobQueue
+from services.job_worker import JobWorker, is_alive, touch_liveness
+
+
+@pytest.fixture
+def queue(tmp_path):
+    db = DatabaseService(database_url=f"sqlite:///{tmp_path / 'jobs.db'}")
+    Job.__table__.create(db.engine)
+    return JobQueue(db_service=db, retry_base_seconds=0)
+
+
+class TestJobQueue:
+    """Tests para JobQueue."""
+
+    def test_claim_respects_priority_then_age(self, queue):
+        low = queue.enqueue({"file_path": "a.pdf"}, priority=-1)
+        first = queue.enqueue({"file_path": "b.pdf"})
+        second = queue.enqueue({"file_path": "c.pdf"})
+
+        assert queue.claim("w1")["job_id"] == first
+        assert queue.claim("w1")["job_id"] == second
+        assert queue.claim("w1")["job_id"] == low
+        assert queue.claim("w1") is None
+
+    def test_claim_marks_running(self, queue):
+        job_id = queue.enqueue({"file_path": "a.pdf"})
+        job = queue.claim("w1")
+
+        assert job["status"] == "procesando"
+        assert job["attempts"] == 1
+        assert queue.get(job_id)["locked_by"] == "w1"
+
+    def test_fail_retries_until_max_attempts(self, queue):
+        job_id = queue.enqueue({"file_path": "a.pdf"}, max_attempts=2)
+
+        queue.claim("w1")
+        assert queue.fail(job_id, "boom") == "pendiente"
+        queue.claim("w1")
+        assert queue.fail(job_id, "boom") == "fallido"
+        assert queue.claim("w1") is None
+        assert queue.get(job_id)["message"] == "boom"
+
+    def test_retry_waits_for_backoff(self, queue):
+        queue.retry_base_seconds = 60
+        job_id = queue.enqueue({"file_path": "a.pdf"})
+        queue.claim("w1")
+        queue.fail(job_id, "boom")
+
+        assert queue.claim("w1") is None
+
+    def test_requeue_stale(self, queue):
+        job_id = queue.enqueue({"file_path": "a.pdf"})
+        queue.claim("w1")
+        with queue.db.get_session() as session:
+            job = session.query(Job).first()
+            job.started_at = job.heartbeat_at = datetime.utcnow() - timedelta(hours=2)
+
+        assert queue.requeue_stale() == 1
+        assert queue.claim("w2")["job_id"] == job_id
+
+    def test_heartbeat_keeps_job_alive(self, queue):
+        job_id = queue.enqueue({"file_path": "a.pdf"})
+        queue.claim("w1")
+        with queue.db.get_session() as session:
+            job = session.query(Job).first()
+            job.started_at = job.heartbeat_at = datetime.utcnow() - timedelta(hours=2)
+
+        assert queue.heartbeat(job_id, "w1") is True
+        assert queue.heartbeat(job_id, "otro") is False
+        assert queue.requeue_stale() == 0
+
+    def test_stale_job_without_attempts_left_fails(self, queue):
+        """Un trabajo que tumba al worker en su último intento no vuelve a la cola."""
+        job_id = queue.enqueue({"file_path": "a.pdf"}, max_attempts=1)
+        queue.claim("w1")
+        with queue.db.get_session() as session:
+            job = session.query(Job).first()
+            job.heartbeat_at = datetime.utcnow() - timedelta(hours=2)
+
+        assert queue.requeue_stale() == 1
+        assert queue.get(job_id)["status"] == "fallido"
+        assert queue.claim("w2") is None
+
+    def test_stats_depth_and_latency(self, queue):
+        done = queue.enqueue({"file_path": "a.pdf"})
+        queue.enqueue({"file_path": "b.pdf"})
+        queue.claim("w1")
+        queue.complete(done, {"status": "success"})
+
+        stats = queue.stats()
+        assert stats["depth"]["pendiente"] == 1
+        assert stats["depth"]["completado"] == 1
+        assert stats["latency_seconds"]["sample"] == 1
+        assert stats["latency_seconds"]["run"]["p50"] is not None
+
+    def test_get_unknown_or_invalid_id(self, queue):
+        assert queue.get("no-es-un-uuid") is None
+        assert queue.get("00000000-0000-0000-0000-000000000000") is None
+
+
+def _core():
+    core = MagicMock()
+    core.ingestion.compute_file_hash.return_value = "hash-1"
+    return core
+
+
+@pytest.fixture
+def pdf(tmp_path):
+    path = tmp_path / "a.pdf"
+    path.write_bytes(b"%PDF-1.4")
+    return path
+
+
+class TestJobWorker:
+    """Tests para JobWorker.run_once."""
+
+    def test_success_completes_job(self, queue, pdf):
+        core = _core()
+        core.process_and_analyze.return_value = {"status": "success", "job_id": "paper-1", "data": {}}
+        job_id = queue.enqueue({"file_path": str(pdf)})
+
+        assert JobWorker(queue=queue, core=core).run_once() is True
+        job = queue.get(job_id)
+        assert job["status"] == "completado"
+        assert job["result"]["doc_id"] == "paper-1"
+
+    def test_exception_schedules_retry(self, queue, pdf):
+        core = _core()
+        core.process_and_analyze.side_effect = RuntimeError("groq caído")
+        job_id = queue.enqueue({"file_path": str(pdf)})
+
+        JobWorker(queue=queue, core=core).run_once()
+        job = queue.get(job_id)
+        assert job["status"] == "pendiente"
+        assert job["payload"]["hash"] == "hash-1"
+
+    def test_retry_finds_renamed_file_by_hash(self, queue, pdf, tmp_path):
+        """Si el intento anterior renombró el PDF, el reintento lo localiza por hash."""
+        renamed = tmp_path / "Titulo_legible.pdf"
+        core = _core()
+
+        def analyze(path, analyze_graphs=True):
+            if core.process_and_analyze.call_count == 1:
+                pdf.rename(renamed)
+                raise RuntimeError("fallo tras renombrar")
+            return {"status": "success", "job_id": "paper-1", "data": {}}
+
+        core.process_and_analyze.side_effect = analyze
+        core.db_service.get_paper_by_hash.return_value = MagicMock(archivo_path=str(renamed))
+        job_id = queue.enqueue({"file_path": str(pdf)})
+
+        worker = JobWorker(queue=queue, core=core)
+        worker.run_once()
+        worker.run_once()
+
+        assert queue.get(job_id)["status"] == "completado"
+        core.db_service.get_paper_by_hash.assert_called_once_with("hash-1")
+        assert core.process_and_analyze.call_args.args[0] == str(renamed)
+
+    def test_requeue_runs_periodically(self, queue):
+        worker = JobWorker(queue=queue, core=_core(), requeue_interval=60)
+        queue.requeue_stale = MagicMock()
+        worker.requeue_stale_if_due()
+        worker.requeue_stale_if_due()
+        queue.requeue_stale.assert_called_once()
+
+    def test_empty_queue(self, queue):
+        assert JobWorker(queue=queue, core=MagicMock()).run_once() is False
+
+    def test_liveness_file(self, tmp_path):
+        alive = tmp_path / "worker.alive"
+        assert is_alive(str(alive)) is False
+        touch_liveness(str(alive))
+        assert is_alive(str(alive), max_age=60) is True
+        assert is_alive(str(alive), max_age=0) is False
@@ -0,0 +1,78 @@
+"""
+Tests unitarios para el cache persistente de respuestas LLM.
+"""
+import pytest
+from unittest.mock import patch
+
+from services.llm_cache import LLMResponseCache
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return LLMResponseCache(db_path=str(tmp_path / "llm_cache.sqlite"))
+
+
+def _key(prompt, temperature=0.3, response_format=None, model="llama-3.1-8b-instant"):
+    return LLMResponseCache.make_key(
+        model, [{"role": "user", "content": prompt}], temperature, response_format
+    )
+
+
+class TestCacheKeys:
+    """La clave depende de modelo, prompt, temperatura y formato."""
+
+    def test_same_inputs_same_key(self):
+        assert _key("hola") == _key("hola")
+
+    def test_key_varies_with_each_component(self):
+        base = _key("hola")
+        assert _key("adiós") != base
+        assert _key("hola", temperature=0.7) != base
+        assert _key("hola", response_format={"type": "json_object"}) != base
+        assert _key("hola", model="otro-modelo") != base
+
+
+class TestCacheOperations:
+    """Lectura, escritura, TTL y evicción LRU."""
+
+    def test_miss_then_hit(self, cache):
+        key = _key("hola")
+        assert cache.get(key) is None
+        cache.set(key, "m", "respuesta")
+        assert cache.get(key) == "respuesta"
+
+        stats = cache.stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+        assert stats["hit_rate"] == 0.5
+
+    def test_persists_across_instances(self, tmp_path):
+        path = str(tmp_path / "persist.sqlite")
+        LLMResponseCache(db_path=path).set("k", "m", "guardado")
+        assert LLMResponseCache(db_path=path).get("k") == "guardado"
+
+    def test_ttl_expiration(self, tmp_path):
+        cache = LLMResponseCache(db_path=str(tmp_path / "ttl.sqlite"), ttl_seconds=60)
+        with patch("services.llm_cache.time.time", return_value=1000.0):
+            cache.set("k", "m", "valor")
+        with patch("services.llm_cache.time.time", return_value=1030.0):
+            assert cache.get("k") == "valor"
+        with patch("services.llm_cache.time.time", return_value=1100.0):
+            assert cache.get("k") is None
+        assert cache.stats()["entries"] == 0
+
+    def test_lru_eviction_by_size(self, tmp_path):
+        cache = LLMResponseCache(db_path=str(tmp_path / "lru.sqlite"), max_bytes=25)
+        with patch("services.llm_cache.time.time", return_value=1.0):
+            cache.set("a", "m", "x" * 10)
+        with patch("services.llm_cache.time.time", return_value=2.0):
+            cache.set("b", "m", "y" * 10)
+        with patch("services.llm_cache.time.time", return_value=3.0):
+            cache.get("a")  # "a" pasa a ser el más reciente
+        with patch("services.llm_cache.time.time", return_value=4.0):
+            cache.set("c", "m", "z" * 10)
+
+        assert cache.get("b") is None
+        assert cache.get("a") == "x" * 10
+        assert cache.get("c") == "z" * 10
+        assert cache.stats()["evictions"] == 1
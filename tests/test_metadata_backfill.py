@@ -0,0 +1,131 @@
+"""
+Tests del backfill de metadatos por lotes contra un servidor HTTP local
+que imita E-utilities (esearch/efetch) y CrossRef /works.
+"""
+import json
+import threading
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+from urllib.parse import parse_qs, urlparse
+
+import httpx
+import pytest
+
+from services.doi_cache import DOIMetadataCache
+from services.metadata_backfill import MetadataBackfill, NCBIRateLimiter
+
+ARTICLES = {
+    "111": ("10.1000/A1", "Sepsis"),
+    "222": ("10.1000/a2", "Shock"),
+}
+
+
+def _pubmed_article(pmid, doi, mesh):
+    return f"""
+    <PubmedArticle>
+        <MedlineCitation>
+            <PMID>{pmid}</PMID>
+            <Article><ArticleTitle>Paper {pmid}</ArticleTitle><Journal><Title>J</Title></Journal></Article>
+            <MeshHeadingList><MeshHeading><DescriptorName>{mesh}</DescriptorName></MeshHeading></MeshHeadingList>
+        </MedlineCitation>
+        <PubmedData><ArticleIdList><ArticleId IdType="doi">{doi}</ArticleId></ArticleIdList></PubmedData>
+    </PubmedArticle>"""
+
+
+class StandIn(BaseHTTPRequestHandler):
+    requests = []
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, body, content_type):
+        data = body.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        form = parse_qs(self.rfile.read(int(self.headers["Content-Length"])).decode())
+        path = urlparse(self.path).path
+        self.requests.append((path, form))
+        if path.endswith("esearch.fcgi"):
+            term = form["term"][0].lower()
+            ids = [pmid for pmid, (doi, _) in ARTICLES.items() if f'"{doi.lower()}"[doi]' in term]
+            self._reply(json.dumps({"esearchresult": {"idlist": ids}}), "application/json")
+        else:
+            ids = form["id"][0].split(",")
+            body = "".join(_pubmed_article(pmid, *ARTICLES[pmid]) for pmid in ids)
+            self._reply(f"<PubmedArticleSet>{body}</PubmedArticleSet>", "text/xml")
+
+    def do_GET(self):
+        query = parse_qs(urlparse(self.path).query)
+        self.requests.append(("/works", query))
+        dois = [part[4:] for part in query["filter"][0].split(",")]
+        items = [{"DOI": doi.lower(), "title": [f"CR {doi}"], "license": [{"URL": "cc-by"}]}
+                 for doi in dois if doi.lower() != "10.1000/missing"]
+        self._reply(json.dumps({"message": {"items": items}}), "application/json")
+
+
+@pytest.fixture
+def stand_in():
+    StandIn.requests = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandIn)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+
+
+def _row(doi, titulo=None):
+    return SimpleNamespace(id=uuid.uuid4(), doi=doi, titulo=titulo, abstract=None)
+
+
+def _backfill(base, rows, cache):
+    db = MagicMock()
+    db.iter_papers_missing_enrichment.side_effect = lambda: iter(rows)
+    backfill = MetadataBackfill(
+        db=db, client=httpx.Client(), cache=cache,
+        pubmed_base=f"{base}/eutils", crossref_works=f"{base}/works",
+        api_key="", limiter=NCBIRateLimiter(rate=1000),
+    )
+    return backfill, db
+
+
+def test_backfill_resolves_batch_with_few_requests(stand_in, tmp_path):
+    cache = DOIMetadataCache(db_path=str(tmp_path / "doi.sqlite"))
+    rows = [_row("10.1000/a1"), _row("https://doi.org/10.1000/A2", titulo="Propio"), _row("10.1000/missing")]
+    backfill, db = _backfill(stand_in, rows, cache)
+
+    stats = backfill.run()
+
+    # 1 esearch + 1 efetch + 1 CrossRef para todo el lote
+    assert [path for path, _ in StandIn.requests] == ["/eutils/esearch.fcgi", "/eutils/efetch.fcgi", "/works"]
+    assert stats["enriched"] == 2 and stats["not_found"] == 1
+
+    updates = db.bulk_update_papers.call_args.args[0]
+    first, second = updates[str(rows[0].id)], updates[str(rows[1].id)]
+    assert first["pmid"] == "111" and first["mesh_terms"] == ["Sepsis"]
+    assert first["metadata_source"] == "merged" and first["license"] == "cc-by"
+    assert "titulo" not in second  # no sobrescribe el título existente
+    assert "doi_validado" not in first
+    assert str(rows[2].id) not in updates
+
+    # Segundo backfill: todo sale del cache de DOIs (incluida la entrada negativa)
+    StandIn.requests = []
+    stats = backfill.run()
+    assert StandIn.requests == []
+    assert stats["cached"] == 3 and stats["not_found"] == 1
+
+
+def test_efetch_is_streamed_per_article(stand_in):
+    backfill, _ = _backfill(stand_in, [], cache=None)
+    pmids = [pmid for pmid, _ in (backfill._article_ids(a) for a in backfill.efetch_articles(["111", "222"]))]
+    assert pmids == ["111", "222"]
+
+
+def test_api_key_raises_ncbi_rate():
+    assert NCBIRateLimiter().rate == 3.0
+    assert NCBIRateLimiter(api_key="clave").rate == 10.0
@@ -2,6 +2,10 @@
 Tests unitarios para el servicio de metadatos multi-fuente.
 """
 
+import asyncio
+import time
+
+import httpx
 import pytest
 from unittest.mock import MagicMock, patch
 import json
@@ -11,8 +15,8 @@ from services.metadata_enricher import MetadataService
 
 @pytest.fixture
 def metadata_service():
-    """Fixture que retorna una instancia del servicio."""
-    return MetadataService()
+    """Fixture que retorna una instancia del servicio (cliente HTTP simulado)."""
+    return MetadataService(http=MagicMock(spec=httpx.Client))
 
 
 # ==================== TESTS VALIDACIÓN DOI ====================
@@ -22,8 +26,8 @@ class TestValidacionDOI:
     
     def test_doi_formato_valido(self, metadata_service):
         """DOI con formato correcto pasa validación de formato."""
-        # Mock de requests.head para evitar llamadas reales
-        with patch('requests.head') as mock_head:
+        # Mock del cliente HTTP para evitar llamadas reales
+        with patch.object(metadata_service.http, 'head') as mock_head:
             mock_head.return_value = MagicMock(status_code=200, url="https://example.com/paper")
             
             resultado = metadata_service.validar_doi("10.1056/NEJMoa2007764")
@@ -47,7 +51,7 @@ class TestValidacionDOI:
     
     def test_doi_cache(self, metadata_service):
         """DOIs validados se cachean."""
-        with patch('requests.head') as mock_head:
+        with patch.object(metadata_service.http, 'head') as mock_head:
             mock_head.return_value = MagicMock(status_code=200, url="https://test.com")
             
             # Primera llamada
@@ -64,9 +68,9 @@ class TestValidacionDOI:
 class TestPubMed:
     """Tests para extracción de metadatos PubMed."""
     
-    @patch('requests.get')
-    def test_pubmed_extrae_mesh_terms(self, mock_get, metadata_service):
+    def test_pubmed_extrae_mesh_terms(self, metadata_service):
         """PubMed extrae términos MeSH correctamente."""
+        mock_get = metadata_service.http.get
         # Mock de búsqueda PMID
         mock_search = MagicMock()
         mock_search.json.return_value = {"esearchresult": {"idlist": ["12345678"]}}
@@ -102,9 +106,9 @@ class TestPubMed:
         assert "Cardiovascular Diseases" in resultado.get("mesh_terms", [])
         assert "Biomarkers/blood" in resultado.get("mesh_terms", [])
     
-    @patch('requests.get')
-    def test_pubmed_abstract_estructurado(self, mock_get, metadata_service):
+    def test_pubmed_abstract_estructurado(self, metadata_service):
         """PubMed extrae abstract con secciones."""
+        mock_get = metadata_service.http.get
         mock_search = MagicMock()
         mock_search.json.return_value = {"esearchresult": {"idlist": ["12345678"]}}
         
@@ -138,9 +142,9 @@ class TestPubMed:
         assert "resultados" in abstract_est
         assert "conclusiones" in abstract_est
     
-    @patch('requests.get')
-    def test_pubmed_afiliaciones(self, mock_get, metadata_service):
+    def test_pubmed_afiliaciones(self, metadata_service):
         """PubMed extrae afiliaciones de autores."""
+        mock_get = metadata_service.http.get
         mock_search = MagicMock()
         mock_search.json.return_value = {"esearchresult": {"idlist": ["12345678"]}}
         
@@ -178,6 +182,10 @@ class TestPubMed:
 
 # ==================== TESTS CROSSREF ====================
 
+def _crossref_response(body):
+    return httpx.Response(200, json=body, request=httpx.Request("GET", "https://api.crossref.org/works"))
+
+
 class TestCrossRef:
     """Tests para extracción de metadatos CrossRef."""
     
@@ -193,7 +201,7 @@ class TestCrossRef:
             }
         }
         
-        with patch.object(metadata_service.cr, 'works', return_value=mock_response):
+        with patch.object(metadata_service.http, 'get', return_value=_crossref_response(mock_response)):
             resultado = metadata_service._try_crossref("10.1234/test")
             funders = resultado.get("funders", [])
             
@@ -212,7 +220,7 @@ class TestCrossRef:
             }
         }
         
-        with patch.object(metadata_service.cr, 'works', return_value=mock_response):
+        with patch.object(metadata_service.http, 'get', return_value=_crossref_response(mock_response)):
             resultado = metadata_service._try_crossref("10.1234/test")
             
             assert "creativecommons" in resultado.get("license", "")
@@ -230,7 +238,7 @@ class TestCrossRef:
             }
         }
         
-        with patch.object(metadata_service.cr, 'works', return_value=mock_response):
+        with patch.object(metadata_service.http, 'get', return_value=_crossref_response(mock_response)):
             resultado = metadata_service._try_crossref("10.1234/test")
             referencias = resultado.get("referencias", [])
             
@@ -324,3 +332,79 @@ class TestGetMetadataByDOI:
                     resultado = metadata_service.get_metadata_by_doi("10.9999/noexiste")
                     
                     assert resultado == {}
+
+
+# ==================== TESTS ENRIQUECIMIENTO ASYNC ====================
+
+PUBMED_XML = """
+<PubmedArticleSet><PubmedArticle><MedlineCitation>
+    <Article><ArticleTitle>Título PubMed</ArticleTitle><Journal><Title>NEJM</Title></Journal></Article>
+    <MeshHeadingList><MeshHeading><DescriptorName>Sepsis</DescriptorName></MeshHeading></MeshHeadingList>
+</MedlineCitation></PubmedArticle></PubmedArticleSet>
+"""
+
+
+def _fake_client(delays):
+    """Cliente httpx con transporte local: cada host responde tras delays[host] segundos."""
+    async def handler(request):
+        await asyncio.sleep(delays.get(request.url.host, 0))
+        if request.url.host == "doi.org":
+            return httpx.Response(200)
+        if request.url.path.endswith("esearch.fcgi"):
+            return httpx.Response(200, json={"esearchresult": {"idlist": ["111"]}})
+        if request.url.path.endswith("efetch.fcgi"):
+            return httpx.Response(200, text=PUBMED_XML)
+        return httpx.Response(200, json={"message": {"title": ["Título CrossRef"], "license": [{"URL": "cc-by"}]}})
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+class TestGetMetadataByDOIAsync:
+    """Tests para get_metadata_by_doi_async (fuentes concurrentes)."""
+
+    def test_sources_run_concurrently(self, metadata_service):
+        """La latencia es la de la fuente más lenta, no la suma."""
+        delays = {"doi.org": 0.2, "eutils.ncbi.nlm.nih.gov": 0.1, "api.crossref.org": 0.2}
+
+        async def run():
+            async with _fake_client(delays) as client:
+                start = time.monotonic()
+                meta = await metadata_service.get_metadata_by_doi_async("doi:10.1234/test", client=client)
+                return meta, time.monotonic() - start
+
+        meta, elapsed = asyncio.run(run())
+
+        assert meta["metadata_source"] == "merged"
+        assert meta["titulo"] == "Título PubMed"
+        assert meta["mesh_terms"] == ["Sepsis"]
+        assert meta["license"] == "cc-by"
+        assert meta["doi_validado"] is True
+        assert elapsed < 0.45  # secuencial: 0.2 + 0.1*2 + 0.2
+
+    def test_slow_source_is_cut_by_budget(self, metadata_service):
+        """Una fuente que excede el presupuesto cuenta como vacía."""
+        delays = {"api.crossref.org": 2.0}
+
+        async def run():
+            async with _fake_client(delays) as client:
+                start = time.monotonic()
+                meta = await metadata_service.get_metadata_by_doi_async("10.1234/test", client=client, budget=0.3)
+                return meta, time.monotonic() - start
+
+        meta, elapsed = asyncio.run(run())
+
+        assert meta["metadata_source"] == "pubmed"
+        assert elapsed < 1.0
+
+    def test_source_timeout(self, metadata_service):
+        """El timeout por fuente también acota cada consulta."""
+        delays = {"eutils.ncbi.nlm.nih.gov": 2.0}
+
+        async def run():
+            async with _fake_client(delays) as client:
+                with patch.dict("services.metadata_enricher.SOURCE_TIMEOUTS", {"pubmed": 0.2}):
+                    return await metadata_service.get_metadata_by_doi_async("10.1234/test", client=client)
+
+        meta = asyncio.run(run())
+
+        assert meta["metadata_source"] == "crossref"
+        assert meta["titulo"] == "Título CrossRef"
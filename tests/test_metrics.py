@@ -0,0 +1,13 @@
+"""
+Tests unitarios para las utilidades de métricas compartidas.
+"""
+from services.metrics import percentiles
+
+
+class TestPercentiles:
+    def test_nearest_rank(self):
+        values = list(range(1, 101))
+        assert percentiles(values) == {"p50": 50, "p90": 90, "p99": 99}
+
+    def test_empty(self):
+        assert percentiles([])["p50"] is None
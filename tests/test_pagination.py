@@ -0,0 +1,88 @@
+"""
+Tests unitarios para la paginación keyset de los listados de papers.
+"""
+import uuid
+from datetime import datetime
+from unittest.mock import MagicMock
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from models.paper import Paper
+from services.pagination import InvalidCursorError, decode_cursor, encode_cursor, keyset_page
+
+
+def _paper(**kwargs):
+    defaults = {"id": uuid.uuid4(), "titulo": "T", "fecha_subida": datetime(2026, 10, 1, 12, 30)}
+    defaults.update(kwargs)
+    return Paper(**defaults)
+
+
+def _fake_query(rows):
+    """Query encadenable que registra filter/order_by/offset/limit."""
+    query = MagicMock()
+    for method in ("filter", "order_by", "offset", "limit"):
+        getattr(query, method).return_value = query
+    query.all.return_value = rows
+    return query
+
+
+class TestCursor:
+    """Tests para encode_cursor / decode_cursor."""
+
+    def test_round_trip_recent(self):
+        paper = _paper()
+        value, last_id = decode_cursor("recent", encode_cursor("recent", paper))
+        assert value == paper.fecha_subida
+        assert last_id == paper.id
+
+    def test_quality_null_score_sorts_last(self):
+        value, _ = decode_cursor("quality", encode_cursor("quality", _paper(score_calidad=None)))
+        assert value == -1.0
+
+    def test_cursor_from_other_sort_is_rejected(self):
+        with pytest.raises(InvalidCursorError):
+            decode_cursor("quality", encode_cursor("recent", _paper()))
+
+    @pytest.mark.parametrize("cursor", ["basura", "", "eyJzIjoicmVjZW50In0"])
+    def test_malformed_cursor(self, cursor):
+        with pytest.raises(InvalidCursorError):
+            decode_cursor("recent", cursor)
+
+
+class TestKeysetPage:
+    """Tests para keyset_page."""
+
+    def test_next_cursor_points_to_last_item(self):
+        rows = [_paper() for _ in range(3)]
+        page = keyset_page(_fake_query(rows), "recent", limit=2)
+
+        assert page.items == rows[:2]
+        assert decode_cursor("recent", page.next_cursor)[1] == rows[1].id
+
+    def test_last_page_has_no_cursor(self):
+        rows = [_paper() for _ in range(2)]
+        page = keyset_page(_fake_query(rows), "recent", limit=2)
+        assert page.next_cursor is None
+
+    def test_cursor_filters_by_tuple_and_ignores_offset(self):
+        query = _fake_query([])
+        cursor = encode_cursor("quality", _paper(score_calidad=7.5))
+
+        keyset_page(query, "quality", limit=10, cursor=cursor, offset=40)
+
+        condition = query.filter.call_args.args[0]
+        sql = str(condition.compile(dialect=postgresql.dialect()))
+        assert "(coalesce(papers.score_calidad" in sql and ", papers.id) <" in sql
+        query.offset.assert_not_called()
+        query.limit.assert_called_once_with(11)
+
+    def test_offset_without_cursor(self):
+        query = _fake_query([])
+        keyset_page(query, "recent", limit=5, offset=10)
+        query.filter.assert_not_called()
+        query.offset.assert_called_once_with(10)
+
+    def test_unknown_sort(self):
+        with pytest.raises(ValueError):
+            keyset_page(_fake_query([]), "alfabetico", limit=5)
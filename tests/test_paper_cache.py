@@ -0,0 +1,170 @@
+"""
+Tests unitarios para el cache de respuestas de papers (detalle y tarjetas).
+"""
+import asyncio
+import uuid
+from contextlib import asynccontextmanager, contextmanager
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from models.paper import Paper
+from services.database import DatabaseService
+from services.paper_cache import LRUTTLCache, PaperCache, SharedGeneration, get_paper_cache
+
+
+class TestLRUTTLCache:
+    """Tests para LRUTTLCache."""
+
+    def test_evicts_least_recently_used(self):
+        cache = LRUTTLCache(max_entries=2, ttl_seconds=60)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+
+        assert cache.get("b") is None
+        assert cache.get("a") == 1 and cache.get("c") == 3
+        assert cache.evictions == 1
+
+    def test_expires_after_ttl(self):
+        cache = LRUTTLCache(ttl_seconds=30)
+        with patch("services.paper_cache.time.monotonic", return_value=100.0):
+            cache.set("a", 1)
+        with patch("services.paper_cache.time.monotonic", return_value=131.0):
+            assert cache.get("a") is None
+
+
+class TestPaperCache:
+    """Tests para PaperCache."""
+
+    def test_hit_rate_per_kind(self):
+        cache = PaperCache(LRUTTLCache())
+        assert cache.get_detail("p1") is None
+        cache.set_detail("p1", {"id": "p1"})
+        assert cache.get_detail("p1") == {"id": "p1"}
+
+        stats = cache.stats()
+        assert stats["detail"] == {"hits": 1, "misses": 1, "hit_rate": 0.5}
+        assert stats["cards"]["hit_rate"] == 0.0
+        assert stats["backend"] == "LRUTTLCache"
+
+    def test_invalidate_drops_detail_and_card_pages(self):
+        cache = PaperCache(LRUTTLCache())
+        key = cache.cards_key("recent", limit=20, cursor=None)
+        cache.set_cards(key, {"items": [], "next_cursor": None})
+        cache.set_detail("p1", {"id": "p1"})
+
+        cache.invalidate_paper("p1")
+
+        assert cache.get_detail("p1") is None
+        assert cache.get_cards(cache.cards_key("recent", limit=20, cursor=None)) is None
+
+    def test_backend_failure_is_a_miss(self):
+        backend = MagicMock()
+        backend.get.side_effect = ConnectionError("redis caído")
+        backend.generation.return_value = 0
+        cache = PaperCache(backend)
+
+        assert cache.get_detail("p1") is None
+        cache.invalidate_paper("p1")  # no propaga el error
+
+
+    def test_write_in_other_process_drops_local_cache(self):
+        generation = {"value": 0}
+        shared = SharedGeneration(read=lambda: generation["value"])
+        cache = PaperCache(LRUTTLCache(), shared_generation=shared)
+        with patch.object(shared, "watch"):
+            key = cache.cards_key("recent", limit=20, cursor=None)
+            cache.set_cards(key, {"items": []})
+            cache.set_detail("p1", {"id": "p1"})
+
+            assert shared.check() is False  # primera lectura: referencia
+            generation["value"] += 1         # escritura del worker
+            assert shared.check() is True
+
+            assert cache.get_detail("p1") is None
+            assert cache.get_cards(cache.cards_key("recent", limit=20, cursor=None)) is None
+
+    def test_invalidate_many_bumps_generation_once(self):
+        backend = LRUTTLCache()
+        cache = PaperCache(backend)
+        for pid in ("p1", "p2", "p3"):
+            cache.set_detail(pid, {"id": pid})
+
+        cache.invalidate_papers(["p1", "p2", "p3"])
+
+        assert backend.generation() == 1
+        assert all(cache.get_detail(pid) is None for pid in ("p1", "p2", "p3"))
+
+
+def test_disabled_by_env(monkeypatch):
+    monkeypatch.setenv("PAPER_CACHE_ENABLED", "false")
+    assert get_paper_cache() is None
+
+
+def test_update_paper_invalidates_cache():
+    paper = Paper(id=uuid.uuid4(), titulo="T")
+    service = DatabaseService.__new__(DatabaseService)
+    session = MagicMock()
+    session.scalars.return_value.first.return_value = paper
+
+    @contextmanager
+    def fake_session():
+        yield session
+
+    service.get_session = fake_session
+    with patch("services.database.invalidate_paper") as invalidate:
+        service.update_paper(str(paper.id), categoria="libros")
+        invalidate.assert_called_once_with(paper.id)
+
+        session.scalars.return_value.first.return_value = None
+        service.update_paper(str(uuid.uuid4()), categoria="libros")
+        invalidate.assert_called_once()
+
+
+def _service_with_session():
+    service = DatabaseService.__new__(DatabaseService)
+    session = MagicMock()
+
+    @contextmanager
+    def fake_session():
+        yield session
+
+    service.get_session = fake_session
+    return service, session
+
+
+def test_bulk_update_bumps_shared_generation_once_in_transaction():
+    service, session = _service_with_session()
+    ids = [str(uuid.uuid4()) for _ in range(50)]
+    with patch("services.database.shared_generation_enabled", return_value=True), \
+            patch("services.database.invalidate_papers") as invalidate, \
+            patch("services.database.stats_refresher"):
+        service.bulk_update_papers({pid: {"categoria": "libros"} for pid in ids})
+
+    sqls = [str(call.args[0]) for call in session.execute.call_args_list]
+    assert sum("cache_generations" in sql for sql in sqls) == 1
+    invalidate.assert_called_once()
+    assert len(list(invalidate.call_args.args[0])) == 50
+
+
+def test_async_update_bumps_through_async_session():
+    from services.async_database import AsyncDatabaseService
+
+    paper = Paper(id=uuid.uuid4(), titulo="T")
+    service = AsyncDatabaseService.__new__(AsyncDatabaseService)
+    session = MagicMock()
+    session.execute = AsyncMock()
+    session.scalars = AsyncMock(return_value=MagicMock(first=MagicMock(return_value=paper)))
+
+    @asynccontextmanager
+    async def fake_session():
+        yield session
+
+    service.get_session = fake_session
+    with patch("services.async_database.shared_generation_enabled", return_value=True), \
+            patch("services.async_database.invalidate_paper"), \
+            patch("services.database.get_db_service") as sync_db:
+        asyncio.run(service.update_paper(str(paper.id), categoria="libros"))
+
+    assert "cache_generations" in str(session.execute.await_args.args[0])
+    sync_db.assert_not_called()
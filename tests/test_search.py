@@ -0,0 +1,61 @@
+"""
+Tests unitarios para la búsqueda full-text de papers (tsvector).
+"""
+from contextlib import contextmanager
+from unittest.mock import MagicMock, patch
+
+from sqlalchemy.dialects import postgresql
+
+from services.database import DatabaseService, build_tsquery_text, search_statement
+
+
+class TestBuildTsquery:
+    """Tests para build_tsquery_text."""
+
+    def test_prefix_and_conjunction(self):
+        assert build_tsquery_text("Beta Bloq") == "beta:* & bloq:*"
+
+    def test_operators_are_stripped(self):
+        assert build_tsquery_text("sepsis' | !shock & (x") == "sepsis:* & shock:* & x:*"
+
+    def test_accents_are_kept(self):
+        assert build_tsquery_text("cardiología") == "cardiología:*"
+
+    def test_empty(self):
+        assert build_tsquery_text("  !!  ") == ""
+        assert build_tsquery_text(None) == ""
+
+
+class TestSearchPapers:
+    """La consulta usa el índice (@@) y ordena por ts_rank."""
+
+    def _run(self, query):
+        service = DatabaseService.__new__(DatabaseService)
+        session = MagicMock()
+
+        @contextmanager
+        def fake_session():
+            yield session
+
+        with patch.object(service, "get_session", fake_session, create=True):
+            service.search_papers(query)
+        return session
+
+    def test_query_uses_tsvector_and_rank(self):
+        compiled = search_statement("sepsis", limit=5).compile(dialect=postgresql.dialect())
+        sql = str(compiled)
+
+        assert "search_vector @@" in sql
+        assert sql.count("to_tsquery(") == 6  # filtro y ts_rank
+        assert "ORDER BY ts_rank(" in sql
+        params = set(compiled.params.values())
+        assert {"spanish", "english", "simple", "sepsis:*"} <= params
+
+    def test_search_papers_executes_statement(self):
+        session = self._run("sepsis")
+        session.scalars.assert_called_once()
+
+    def test_empty_query_skips_database(self):
+        assert search_statement("   ") is None
+        session = self._run("   ")
+        session.scalars.assert_not_called()
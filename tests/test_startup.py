@@ -0,0 +1,78 @@
+"""
+Tests del arranque perezoso de la API: tiempo de import en frío e informe por fases.
+"""
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+from core.analysis import AnalysisCore
+from services.startup import StartupReport
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Presupuesto del import en frío de app.main (ajustable en máquinas lentas / CI)
+COLD_START_BUDGET = float(os.getenv("COLD_START_BUDGET_SECONDS", "4"))
+
+# Importar la API no debe cargar estos módulos: se cargan en el primer uso
+HEAVY_MODULES = ("chromadb", "telethon", "sentence_transformers", "onnxruntime")
+
+COLD_IMPORT = f"""
+import json, sys, time
+start = time.perf_counter()
+import app.main
+elapsed = time.perf_counter() - start
+print(json.dumps({{
+    "elapsed": elapsed,
+    "loaded": [m for m in {HEAVY_MODULES!r} if m in sys.modules],
+    "phases": [p["phase"] for p in app.main.startup_report.as_dict()["phases"]],
+}}))
+"""
+
+
+def test_cold_import_of_api_is_fast_and_lazy():
+    env = {**os.environ, "PYTHONDONTWRITEBYTECODE": "1", "PYTHONWARNINGS": "ignore"}
+    out = subprocess.run(
+        [sys.executable, "-c", COLD_IMPORT], cwd=ROOT, env=env,
+        capture_output=True, text=True, timeout=60, check=True,
+    )
+    result = json.loads(out.stdout.strip().splitlines()[-1])
+
+    assert result["loaded"] == []
+    assert result["phases"] == ["imports", "app_setup"]
+    assert result["elapsed"] < COLD_START_BUDGET, f"import app.main: {result['elapsed']:.2f}s"
+
+
+def test_analysis_core_builds_services_on_first_use():
+    vector_store = MagicMock()
+    build = MagicMock(return_value=vector_store)
+    with patch("core.analysis.get_db_service", return_value=MagicMock()), \
+         patch.object(AnalysisCore.vector_store, "factory", build):
+        core = AnalysisCore(ingestion_service=MagicMock())
+        build.assert_not_called()
+
+        assert core.vector_store is vector_store
+        assert core.vector_store is vector_store
+        build.assert_called_once_with(core)
+
+
+def test_injected_services_are_used_as_is():
+    groq = MagicMock()
+    with patch("core.analysis.get_db_service", return_value=MagicMock()):
+        core = AnalysisCore(ingestion_service=MagicMock(), groq_service=groq)
+    assert core.groq is groq
+
+
+def test_startup_report_phases():
+    report = StartupReport("api")
+    report.checkpoint("imports")
+    with report.phase("scheduler"):
+        pass
+    report.mark_ready()
+
+    data = report.as_dict()
+    assert [p["phase"] for p in data["phases"]] == ["imports", "scheduler"]
+    assert data["total_seconds"] == round(sum(p["seconds"] for p in data["phases"]), 4)
+    assert data["ready_seconds"] >= 0
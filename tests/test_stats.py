@@ -0,0 +1,108 @@
+"""
+Tests unitarios para las estadísticas del catálogo (vista paper_stats + cache en proceso).
+"""
+from contextlib import contextmanager
+from datetime import datetime
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from services.database import DatabaseService, StatsCache, StatsRefresher, build_stats, stats_cache
+
+ROW = {
+    "total_papers": 10,
+    "procesados": 7,
+    "con_graficos": 2,
+    "especialidades": 3,
+    "score_promedio": 6.456,
+    "especialidades_breakdown": {"UCI": 4, "Cardiología": 3},
+    "refreshed_at": datetime(2026, 10, 17, 9, 0),
+}
+
+
+@pytest.fixture
+def service():
+    stats_cache.invalidate()
+    service = DatabaseService.__new__(DatabaseService)
+    session = MagicMock()
+    session.execute.return_value.mappings.return_value.first.return_value = ROW
+
+    @contextmanager
+    def fake_session():
+        yield session
+
+    service.get_session = fake_session
+    service.session = session
+    yield service
+    stats_cache.invalidate()
+
+
+class TestStatsCache:
+    """Tests para StatsCache."""
+
+    def test_expires_after_ttl(self):
+        cache = StatsCache(ttl_seconds=30)
+        with patch("services.database.time.monotonic", return_value=100.0):
+            cache.set({"total_papers": 1})
+        with patch("services.database.time.monotonic", return_value=129.0):
+            assert cache.get() == {"total_papers": 1}
+        with patch("services.database.time.monotonic", return_value=131.0):
+            assert cache.get() is None
+
+    def test_invalidate(self):
+        cache = StatsCache(ttl_seconds=30)
+        cache.set({"total_papers": 1})
+        cache.invalidate()
+        assert cache.get() is None
+
+
+def test_build_stats_from_view_row():
+    stats = build_stats(ROW)
+    assert stats["pendientes"] == 3
+    assert stats["score_promedio"] == 6.46
+    assert stats["especialidades_breakdown"] == {"UCI": 4, "Cardiología": 3}
+    assert stats["actualizado"] == "2026-10-17T09:00:00"
+
+
+def test_get_stats_reads_view_once(service):
+    first = service.get_stats()
+    second = service.get_stats()
+
+    assert first == second
+    assert service.session.execute.call_count == 1
+    sql = str(service.session.execute.call_args.args[0])
+    assert sql == "SELECT * FROM paper_stats"
+
+
+def test_refresh_invalidates_cache(service):
+    service.get_stats()
+    service.refresh_stats()
+
+    sql = str(service.session.execute.call_args.args[0])
+    assert sql == "REFRESH MATERIALIZED VIEW CONCURRENTLY paper_stats"
+    assert stats_cache.get() is None
+
+
+def test_soft_delete_marks_stats_dirty(service):
+    stats_cache.set({"total_papers": 1})
+    with patch.object(service, "update_paper", return_value=MagicMock()) as update, \
+            patch("services.database.stats_refresher") as refresher:
+        assert service.soft_delete_paper("id") is True
+    assert update.call_args.kwargs["deleted"] is True
+    # Sin REFRESH en línea: sólo se invalida el cache y se marca la vista
+    assert stats_cache.get() is None
+    refresher.mark_dirty.assert_called_once()
+    service.session.execute.assert_not_called()
+
+
+def test_refresher_debounces_writes():
+    refresher = StatsRefresher(delay_seconds=60)
+    db = MagicMock()
+    with patch("services.database.get_db_service", return_value=db):
+        for _ in range(100):
+            refresher.mark_dirty()
+        db.refresh_stats.assert_not_called()
+        refresher.flush()
+        refresher.flush()  # nada pendiente: no vuelve a refrescar
+    db.refresh_stats.assert_called_once()
+    assert not refresher.dirty
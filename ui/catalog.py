@@ -1,6 +1,7 @@
 
 import streamlit as st
 import requests
+import json
 import time
 from pathlib import Path
 from typing import List, Dict, Optional
@@ -35,23 +36,97 @@ if 'page' not in st.session_state:
     st.session_state.page = 1
 
 # --- FUNCIONES API HELPER ---
-def fetch_papers(limit=10, offset=0, specialty=None, sort="recent"):
-    params = {"limit": limit, "offset": offset, "sort": sort}
-    if specialty and specialty != "Todas":
-        params["specialty"] = specialty
+# Máximo de respuestas guardadas para revalidar con ETag
+ETAG_STORE_SIZE = 512
+
+@st.cache_resource
+def _etag_store():
+    """Respuestas GET por URL con su ETag (compartidas entre reruns y sesiones)."""
+    return {"session": requests.Session(), "responses": {}}
+
+def api_get(path, params=None, **kwargs):
+    """
+    GET condicional a la API: reenvía el ETag guardado en If-None-Match y, si la
+    respuesta es 304, devuelve la respuesta anterior sin volver a descargar el JSON.
+    """
+    store = _etag_store()
+    key = (path, tuple(sorted((params or {}).items())))
+    cached = store["responses"].get(key)
+    headers = {"If-None-Match": cached.headers["ETag"]} if cached is not None else {}
+    res = store["session"].get(f"{API_URL}{path}", params=params, headers=headers, **kwargs)
+    if res.status_code == 304 and cached is not None:
+        return cached
+    if res.status_code == 200 and res.headers.get("ETag"):
+        if len(store["responses"]) >= ETAG_STORE_SIZE:
+            store["responses"].clear()
+        store["responses"][key] = res
+    return res
+
+def fetch_page(path="/papers", params=None, cursor=None):
+    """Una página de un listado paginado por cursor. Retorna (items, next_cursor)."""
+    params = dict(params or {})
+    if cursor:
+        params["cursor"] = cursor
     try:
-        res = requests.get(f"{API_URL}/papers", params=params)
-        return res.json() if res.status_code == 200 else []
+        res = api_get(path, params)
+        if res.status_code == 200:
+            return res.json(), res.headers.get("X-Next-Cursor")
     except:
-        return []
+        pass
+    return [], None
+
+def fetch_papers(limit=10, cursor=None, specialty=None, sort="recent", with_cursor=False):
+    params = {"limit": limit, "sort": sort}
+    if specialty and specialty != "Todas":
+        params["specialty"] = specialty
+    papers, next_cursor = fetch_page("/papers", params, cursor)
+    return (papers, next_cursor) if with_cursor else papers
+
+def fetch_pages(key, path, params):
+    """
+    Listado con "Cargar más": recorre por cursor tantas páginas como se hayan pedido.
+    Se vuelve a consultar en cada rerun, así las acciones (mover, borrar) se ven al instante.
+    """
+    pages = st.session_state.get(f"pages_{key}", 1)
+    items, cursor = [], None
+    for _ in range(pages):
+        batch, cursor = fetch_page(path, params, cursor)
+        items.extend(batch)
+        if not cursor:
+            break
+    return items, cursor
+
+def load_more_button(key, cursor):
+    if cursor and st.button("⬇️ Cargar más", key=f"more_{key}"):
+        st.session_state[f"pages_{key}"] = st.session_state.get(f"pages_{key}", 1) + 1
+        st.rerun()
 
 def get_paper_details(pid):
     try:
-        res = requests.get(f"{API_URL}/papers/{pid}")
+        res = api_get(f"/papers/{pid}")
         return res.json() if res.status_code == 200 else None
     except:
         return None
 
+def stream_chat(pid, question):
+    """Tokens de POST /papers/chat/{id}/stream (SSE) según llegan, para st.write_stream."""
+    try:
+        with requests.post(f"{API_URL}/papers/chat/{pid}/stream", json={"question": question},
+                           stream=True, timeout=(5, 120)) as res:
+            if res.status_code != 200:
+                yield "Error"
+                return
+            res.encoding = "utf-8"
+            for line in res.iter_lines(decode_unicode=True):
+                if line.startswith("event: done"):
+                    return
+                if line.startswith("data: "):
+                    token = json.loads(line[len("data: "):]).get("token")
+                    if token:
+                        yield token
+    except Exception as e:
+        yield f"Error de conexión: {e}"
+
 def poll_jobs():
     if not st.session_state.active_jobs: return
     completed = []
@@ -464,16 +539,9 @@ if st.session_state.current_view == "detail" and st.session_state.selected_paper
                 with st.chat_message("user"):
                     st.write(prompt)
                 
-                with st.spinner("Analizando..."):
-                    try:
-                        res = requests.post(f"{API_URL}/papers/chat/{paper['id']}", json={"question": prompt})
-                        ans = res.json().get("answer", "Error")
-                    except Exception as e:
-                        ans = f"Error de conexión: {e}"
-                
-                st.session_state[k_chat].append({"role": "assistant", "content": ans})
                 with st.chat_message("assistant"):
-                    st.write(ans)
+                    ans = st.write_stream(stream_chat(paper['id'], prompt))
+                st.session_state[k_chat].append({"role": "assistant", "content": ans})
 
         with tab3:
             st.write("### ✏️ Editar Metadatos")
@@ -488,7 +556,7 @@ if st.session_state.current_view == "detail" and st.session_state.selected_paper
                 new_year = st.number_input("Año", value=paper.get("año") or 2024, min_value=1900, max_value=2030)
                 # Obtener especialidades dinámicas
                 try:
-                    especialidades_db = requests.get(f"{API_URL}/papers/especialidades").json()
+                    especialidades_db = api_get("/papers/especialidades").json()
                 except:
                     especialidades_db = ["Cardiología", "UCI", "Infectología", "Neurología", "Neumonía", "ECG"]
                 
@@ -628,7 +696,7 @@ if st.session_state.current_view == "detail" and st.session_state.selected_paper
 elif st.session_state.current_view == "home":
     # Cargar Stats
     try:
-        stats = requests.get(f"{API_URL}/papers/stats").json()
+        stats = api_get("/papers/stats").json()
         specs = stats.get("especialidades_breakdown", {})
     except:
         specs = {}
@@ -671,11 +739,7 @@ elif st.session_state.current_view == "ekg_dojo":
     st.markdown("Pon a prueba tus habilidades interpretando trazados reales analizados por IA.")
     
     # Fetch quizzes
-    try:
-        res = requests.get(f"{API_URL}/papers", params={"is_quiz": True, "limit": 50})
-        quizzes = res.json() if res.status_code == 200 else []
-    except:
-        quizzes = []
+    quizzes, quizzes_cursor = fetch_pages("ekg_dojo", "/papers", {"is_quiz": True, "limit": 50})
 
     if not quizzes:
         st.info("Aún no hay desafíos disponibles. Esperando nuevos casos de ECG...")
@@ -692,6 +756,7 @@ elif st.session_state.current_view == "ekg_dojo":
                          st.session_state.dojo_active_id = q['id']
                          st.session_state.dojo_revealed = False
                          st.rerun()
+            load_more_button("ekg_dojo", quizzes_cursor)
 
         with c_play:
             if 'dojo_active_id' in st.session_state:
@@ -746,11 +811,7 @@ elif st.session_state.current_view == "categoria_papers":
     st.markdown("## 📄 Papers Científicos")
     st.markdown("Estudios con DOI validado y metadatos enriquecidos.")
     
-    try:
-        res = requests.get(f"{API_URL}/papers", params={"categoria": "papers", "limit": 50})
-        papers_list = res.json() if res.status_code == 200 else []
-    except:
-        papers_list = []
+    papers_list, papers_cursor = fetch_pages("categoria_papers", "/papers", {"categoria": "papers", "limit": 48})
     
     if not papers_list:
         st.info("No hay papers en esta categoría. Los estudios con DOI aparecerán aquí.")
@@ -761,17 +822,14 @@ elif st.session_state.current_view == "categoria_papers":
                 if i + j < len(papers_list):
                     with cols[j]:
                         render_card(papers_list[i+j], f"papers_{i}")
+        load_more_button("categoria_papers", papers_cursor)
 
 # 2.7 VIEW LIBROS (Categoría: libros por especialidad)
 elif st.session_state.current_view == "categoria_libros":
     st.markdown("## 📚 Libros de Medicina")
     st.markdown("Libros y manuales organizados por especialidad.")
     
-    try:
-        res = requests.get(f"{API_URL}/papers", params={"categoria": "libros", "limit": 50})
-        libros = res.json() if res.status_code == 200 else []
-    except:
-        libros = []
+    libros, libros_cursor = fetch_pages("categoria_libros", "/papers", {"categoria": "libros", "limit": 50})
     
     if not libros:
         st.info("No hay libros en esta categoría. Los documentos con más de 200 páginas se catalogarán aquí.")
@@ -789,6 +847,7 @@ elif st.session_state.current_view == "categoria_libros":
             for i, book in enumerate(books[:8]):
                 with cols[i % 4]:
                     render_card(book, f"libro_{specialty}")
+        load_more_button("categoria_libros", libros_cursor)
 
 # 2.8.5 VIEW CATEGORIA GUIAS (Fase 2)
 elif st.session_state.current_view == "categoria_guias":
@@ -797,8 +856,7 @@ elif st.session_state.current_view == "categoria_guias":
     
     try:
         # Buscamos papers que tengan 'guía' o similar en el tipo o título
-        res = requests.get(f"{API_URL}/papers", params={"limit": 50})
-        all_p = res.json() if res.status_code == 200 else []
+        all_p, _ = fetch_pages("categoria_guias", "/papers", {"limit": 50})
         # Filtrado simple en frontend por ahora (o podríamos añadir un filtro al endpoint)
         guias = [p for p in all_p if any(kw in (p.get('titulo') or "").lower() for kw in ["guía", "guia", "guideline"])]
     except:
@@ -865,16 +923,12 @@ elif st.session_state.current_view == "sin_categorizar":
     tab_sin_cat, tab_deleted = st.tabs(["📋 Pendientes", "🗑️ Eliminados"])
     
     with tab_sin_cat:
-        try:
-            res = requests.get(f"{API_URL}/papers", params={"categoria": "sin_categorizar", "limit": 50})
-            sin_cat = res.json() if res.status_code == 200 else []
-        except:
-            sin_cat = []
+        sin_cat, sin_cat_cursor = fetch_pages("sin_categorizar", "/papers", {"categoria": "sin_categorizar", "limit": 50})
         
         if not sin_cat:
             st.success("✅ No hay documentos sin categorizar.")
         else:
-            st.warning(f"Hay {len(sin_cat)} documentos pendientes de clasificar.")
+            st.warning(f"Hay {len(sin_cat)}{'+' if sin_cat_cursor else ''} documentos pendientes de clasificar.")
             for paper in sin_cat:
                 with st.container(border=True):
                     c1, c2, c3 = st.columns([3, 2, 1])
@@ -903,13 +957,10 @@ elif st.session_state.current_view == "sin_categorizar":
                         if st.button("🗑️", key=f"del_{paper['id']}", use_container_width=True):
                             requests.delete(f"{API_URL}/papers/{paper['id']}")
                             st.rerun()
+            load_more_button("sin_categorizar", sin_cat_cursor)
     
     with tab_deleted:
-        try:
-            res = requests.get(f"{API_URL}/papers/deleted", params={"limit": 50})
-            deleted = res.json() if res.status_code == 200 else []
-        except:
-            deleted = []
+        deleted, deleted_cursor = fetch_pages("deleted", "/papers/deleted", {"limit": 50})
         
         if not deleted:
             st.info("No hay documentos eliminados.")
@@ -927,6 +978,7 @@ elif st.session_state.current_view == "sin_categorizar":
                         if st.button("⛔ Borrar", key=f"perm_{paper['id']}"):
                             requests.delete(f"{API_URL}/papers/{paper['id']}/permanent")
                             st.rerun()
+            load_more_button("deleted", deleted_cursor)
 
 # 2.9 VIEW SEARCH RESULTS
 elif st.session_state.current_view == "search_results":
@@ -934,7 +986,7 @@ elif st.session_state.current_view == "search_results":
     st.markdown(f"## 🔍 Resultados para: *{q}*")
     
     try:
-        res = requests.get(f"{API_URL}/papers/search", params={"q": q, "limit": 20})
+        res = api_get("/papers/search", params={"q": q, "limit": 20})
         results = res.json() if res.status_code == 200 else []
     except:
         results = []
@@ -965,9 +1017,18 @@ elif st.session_state.current_view == "browse":
     st.title(f"Explorando: {filt.get('specialty', 'Todos')} ({filt.get('sort', 'Reciente')})")
     
     limit = 12
-    offset = (st.session_state.page - 1) * limit
     
-    papers = fetch_papers(limit=limit, offset=offset, specialty=filt.get("specialty"), sort=filt.get("sort"))
+    # Cursores por página (keyset): browse_cursors[n] abre la página n+1
+    if st.session_state.get("browse_cursors_key") != str(filt):
+        st.session_state.browse_cursors_key = str(filt)
+        st.session_state.browse_cursors = [None]
+        st.session_state.page = 1
+    cursors = st.session_state.browse_cursors
+    page_cursor = cursors[st.session_state.page - 1] if st.session_state.page <= len(cursors) else None
+    
+    papers, next_cursor = fetch_papers(
+        limit=limit, cursor=page_cursor, specialty=filt.get("specialty"), sort=filt.get("sort"), with_cursor=True
+    )
     
     # Grid 4x3
     # Dividir lista en chunks de 4
@@ -987,8 +1048,10 @@ elif st.session_state.current_view == "browse":
                 st.session_state.page -= 1
                 st.rerun()
         col_page.markdown(f"<p style='text-align:center'>Página <b>{st.session_state.page}</b></p>", unsafe_allow_html=True)
-        if len(papers) == limit: # Asumimos que si trae limit, hay más
+        if next_cursor:
             if col_next.button("Next ▶"):
+                del cursors[st.session_state.page:]
+                cursors.append(next_cursor)
                 st.session_state.page += 1
                 st.rerun()
 